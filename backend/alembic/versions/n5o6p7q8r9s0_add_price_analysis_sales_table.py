@@ -0,0 +1,145 @@
+"""add price_analysis_sales table
+
+Moves comparable sales (price_analyses.comparable_sales_json) and neighboring
+sales (price_analyses.trend_projection_json["neighboring_sales"]) out of the
+JSON blobs into references to dvf_sales.
+
+Revision ID: n5o6p7q8r9s0
+Revises: m4n5o6p7q8r9
+Create Date: 2026-10-18
+"""
+
+import json
+
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from alembic import op
+
+revision = "n5o6p7q8r9s0"
+down_revision = "m4n5o6p7q8r9"
+branch_labels = None
+depends_on = None
+
+
+def _refs(price_analysis_id: int, kind: str, sales) -> list[dict]:
+    """Build reference rows from serialized sale dicts, keeping their order."""
+    rows = []
+    seen = set()
+    for position, sale in enumerate(sales or []):
+        sale_id = sale.get("id") if isinstance(sale, dict) else None
+        if sale_id is None or sale_id in seen:
+            continue
+        seen.add(sale_id)
+        rows.append(
+            {
+                "price_analysis_id": price_analysis_id,
+                "dvf_sale_id": int(sale_id),
+                "kind": kind,
+                "position": position,
+                "is_outlier": bool(sale.get("is_outlier", False)),
+            }
+        )
+    return rows
+
+
+def upgrade() -> None:
+    sales_table = op.create_table(
+        "price_analysis_sales",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column(
+            "price_analysis_id",
+            sa.Integer(),
+            sa.ForeignKey("price_analyses.id", ondelete="CASCADE"),
+            nullable=False,
+        ),
+        sa.Column("dvf_sale_id", sa.Integer(), nullable=False),
+        sa.Column("kind", sa.String(20), nullable=False),
+        sa.Column("position", sa.Integer(), nullable=False),
+        sa.Column("is_outlier", sa.Boolean(), nullable=False, server_default=sa.false()),
+        sa.UniqueConstraint(
+            "price_analysis_id", "kind", "dvf_sale_id", name="uq_price_analysis_sale"
+        ),
+    )
+    op.create_index(
+        "ix_price_analysis_sales_analysis_kind",
+        "price_analysis_sales",
+        ["price_analysis_id", "kind", "position"],
+    )
+
+    # Convert existing analyses
+    conn = op.get_bind()
+    analyses = conn.execute(
+        sa.text("SELECT id, comparable_sales_json, trend_projection_json FROM price_analyses")
+    ).fetchall()
+    for pa_id, comparable, trend_projection in analyses:
+        rows = _refs(pa_id, "comparable", comparable)
+        if isinstance(trend_projection, dict):
+            rows += _refs(pa_id, "neighboring", trend_projection.pop("neighboring_sales", None))
+            conn.execute(
+                sa.text("UPDATE price_analyses SET trend_projection_json = :tp WHERE id = :id"),
+                {"tp": json.dumps(trend_projection), "id": pa_id},
+            )
+        if rows:
+            conn.execute(sales_table.insert(), rows)
+
+    op.drop_column("price_analyses", "comparable_sales_json")
+
+
+def _sale_dict(row) -> dict:
+    """Serialized sale dict as stored in the JSON blobs (without lots_detail)."""
+    return {
+        "id": row.id,
+        "address": row.adresse_complete or "",
+        "sale_date": row.date_mutation.isoformat() if row.date_mutation else "",
+        "sale_price": float(row.prix) if row.prix else 0,
+        "postal_code": row.code_postal or "",
+        "city": row.nom_commune or "",
+        "property_type": row.type_principal or "",
+        "surface_area": row.surface_bati,
+        "rooms": row.nombre_pieces,
+        "price_per_sqm": float(row.prix_m2) if row.prix_m2 else None,
+        "unit_count": row.nombre_lots,
+        "is_multi_unit": (row.nombre_lots or 1) > 1,
+        "is_outlier": row.is_outlier,
+        "longitude": row.longitude,
+        "latitude": row.latitude,
+    }
+
+
+def downgrade() -> None:
+    op.add_column(
+        "price_analyses", sa.Column("comparable_sales_json", postgresql.JSON(), nullable=True)
+    )
+
+    # Rebuild the JSON blobs from the references that still resolve
+    conn = op.get_bind()
+    rows = conn.execute(
+        sa.text(
+            """
+            SELECT pas.price_analysis_id, pas.kind, pas.is_outlier, s.id, s.adresse_complete,
+                   s.date_mutation, s.prix, s.code_postal, s.nom_commune, s.type_principal,
+                   s.surface_bati, s.nombre_pieces, s.prix_m2, s.nombre_lots, s.longitude,
+                   s.latitude
+            FROM price_analysis_sales pas
+            JOIN dvf_sales s ON s.id = pas.dvf_sale_id
+            ORDER BY pas.price_analysis_id, pas.kind, pas.position
+            """
+        )
+    ).fetchall()
+    sales: dict[tuple[int, str], list[dict]] = {}
+    for row in rows:
+        sales.setdefault((row.price_analysis_id, row.kind), []).append(_sale_dict(row))
+
+    analyses = conn.execute(sa.text("SELECT id, trend_projection_json FROM price_analyses"))
+    for pa_id, trend_projection in analyses.fetchall():
+        params = {"id": pa_id, "comparable": json.dumps(sales.get((pa_id, "comparable"), []))}
+        sql = "UPDATE price_analyses SET comparable_sales_json = :comparable"
+        if isinstance(trend_projection, dict):
+            trend_projection["neighboring_sales"] = sales.get((pa_id, "neighboring"), [])
+            params["tp"] = json.dumps(trend_projection)
+            sql += ", trend_projection_json = :tp"
+        conn.execute(sa.text(f"{sql} WHERE id = :id"), params)
+
+    op.drop_index("ix_price_analysis_sales_analysis_kind", table_name="price_analysis_sales")
+    op.drop_table("price_analysis_sales")
@@ -0,0 +1,46 @@
+"""add processing_jobs table
+
+Durable background job queue replacing the in-process bulk processing threads.
+
+Revision ID: o6p7q8r9s0t1
+Revises: n5o6p7q8r9s0
+Create Date: 2026-10-18
+"""
+
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from alembic import op
+
+revision = "o6p7q8r9s0t1"
+down_revision = "n5o6p7q8r9s0"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "processing_jobs",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column("kind", sa.String(50), nullable=False),
+        sa.Column("payload", postgresql.JSON(), nullable=False),
+        sa.Column("status", sa.String(20), nullable=False, server_default="queued"),
+        sa.Column("priority", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("attempts", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("max_attempts", sa.Integer(), nullable=False, server_default="3"),
+        sa.Column("run_at", sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        sa.Column("locked_by", sa.String(100), nullable=True),
+        sa.Column("locked_until", sa.DateTime(), nullable=True),
+        sa.Column("last_error", sa.Text(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("started_at", sa.DateTime(), nullable=True),
+        sa.Column("finished_at", sa.DateTime(), nullable=True),
+    )
+    op.create_index("ix_processing_jobs_id", "processing_jobs", ["id"])
+    op.create_index("ix_processing_jobs_claim", "processing_jobs", ["status", "run_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_processing_jobs_claim", table_name="processing_jobs")
+    op.drop_index("ix_processing_jobs_id", table_name="processing_jobs")
+    op.drop_table("processing_jobs")
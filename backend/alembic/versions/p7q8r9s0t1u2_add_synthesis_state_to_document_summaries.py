@@ -0,0 +1,29 @@
+"""add synthesis_state to document_summaries
+
+Digest fingerprints of the documents an overall synthesis covers, so it can
+be updated with only the documents that changed.
+
+Revision ID: p7q8r9s0t1u2
+Revises: o6p7q8r9s0t1
+Create Date: 2026-10-19
+"""
+
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from alembic import op
+
+revision = "p7q8r9s0t1u2"
+down_revision = "o6p7q8r9s0t1"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "document_summaries", sa.Column("synthesis_state", postgresql.JSON(), nullable=True)
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("document_summaries", "synthesis_state")
@@ -0,0 +1,56 @@
+"""add llm_calls table
+
+Token usage, latency, retries and estimated cost of each Gemini call of the
+document pipeline.
+
+Revision ID: q8r9s0t1u2v3
+Revises: p7q8r9s0t1u2
+Create Date: 2026-10-19
+"""
+
+import sqlalchemy as sa
+
+from alembic import op
+
+revision = "q8r9s0t1u2v3"
+down_revision = "p7q8r9s0t1u2"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "llm_calls",
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column(
+            "document_id",
+            sa.Integer(),
+            sa.ForeignKey("documents.id", ondelete="SET NULL"),
+            nullable=True,
+        ),
+        sa.Column("workflow_id", sa.String(), nullable=True),
+        sa.Column("document_category", sa.String(), nullable=True),
+        sa.Column("operation", sa.String(50), nullable=False),
+        sa.Column("model", sa.String(), nullable=False),
+        sa.Column("input_tokens", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("output_tokens", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("thinking_tokens", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("latency_ms", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("attempts", sa.Integer(), nullable=False, server_default="1"),
+        sa.Column("hedged", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("cost_usd", sa.Float(), nullable=False, server_default="0"),
+        sa.Column("error", sa.String(100), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+    )
+    op.create_index("ix_llm_calls_id", "llm_calls", ["id"])
+    op.create_index("ix_llm_calls_document_id", "llm_calls", ["document_id"])
+    op.create_index("ix_llm_calls_workflow_id", "llm_calls", ["workflow_id"])
+    op.create_index("ix_llm_calls_created_at", "llm_calls", ["created_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_llm_calls_created_at", table_name="llm_calls")
+    op.drop_index("ix_llm_calls_workflow_id", table_name="llm_calls")
+    op.drop_index("ix_llm_calls_document_id", table_name="llm_calls")
+    op.drop_index("ix_llm_calls_id", table_name="llm_calls")
+    op.drop_table("llm_calls")
@@ -0,0 +1,72 @@
+"""reference dvf sales by id_mutation
+
+price_analysis_sales pointed at dvf_sales.id, which the DVF import renumbers
+(TRUNCATE + COPY). References now use id_mutation, the natural key of a sale.
+price_analyses.dvf_generation records the DVF cache generation an analysis was
+computed against, so a re-import marks it stale.
+
+Revision ID: r9s0t1u2v3w4
+Revises: q8r9s0t1u2v3
+Create Date: 2026-10-19
+"""
+
+import sqlalchemy as sa
+
+from alembic import op
+
+revision = "r9s0t1u2v3w4"
+down_revision = "q8r9s0t1u2v3"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "price_analyses",
+        sa.Column("dvf_generation", sa.Integer(), nullable=False, server_default="0"),
+    )
+
+    op.add_column("price_analysis_sales", sa.Column("id_mutation", sa.String(), nullable=True))
+    op.execute(
+        """
+        UPDATE price_analysis_sales pas
+        SET id_mutation = s.id_mutation
+        FROM dvf_sales s
+        WHERE s.id = pas.dvf_sale_id
+        """
+    )
+    # Already dangling (DVF re-imported since the analysis ran); the next refresh rebuilds them
+    op.execute("DELETE FROM price_analysis_sales WHERE id_mutation IS NULL")
+
+    op.drop_constraint("uq_price_analysis_sale", "price_analysis_sales", type_="unique")
+    op.drop_column("price_analysis_sales", "dvf_sale_id")
+    op.alter_column("price_analysis_sales", "id_mutation", nullable=False)
+    op.create_unique_constraint(
+        "uq_price_analysis_sale",
+        "price_analysis_sales",
+        ["price_analysis_id", "kind", "id_mutation"],
+    )
+
+
+def downgrade() -> None:
+    op.add_column("price_analysis_sales", sa.Column("dvf_sale_id", sa.Integer(), nullable=True))
+    op.execute(
+        """
+        UPDATE price_analysis_sales pas
+        SET dvf_sale_id = s.id
+        FROM dvf_sales s
+        WHERE s.id_mutation = pas.id_mutation
+        """
+    )
+    op.execute("DELETE FROM price_analysis_sales WHERE dvf_sale_id IS NULL")
+
+    op.drop_constraint("uq_price_analysis_sale", "price_analysis_sales", type_="unique")
+    op.drop_column("price_analysis_sales", "id_mutation")
+    op.alter_column("price_analysis_sales", "dvf_sale_id", nullable=False)
+    op.create_unique_constraint(
+        "uq_price_analysis_sale",
+        "price_analysis_sales",
+        ["price_analysis_id", "kind", "dvf_sale_id"],
+    )
+
+    op.drop_column("price_analyses", "dvf_generation")
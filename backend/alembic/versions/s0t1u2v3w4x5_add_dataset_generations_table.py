@@ -0,0 +1,32 @@
+"""add dataset_generations table
+
+Durable import generation of each dataset, bumped by scripts/import_dvf.py in
+the same transaction as the data. Price analyses compare their dvf_generation
+against it; Redis only caches the value.
+
+Revision ID: s0t1u2v3w4x5
+Revises: r9s0t1u2v3w4
+Create Date: 2026-10-19
+"""
+
+import sqlalchemy as sa
+
+from alembic import op
+
+revision = "s0t1u2v3w4x5"
+down_revision = "r9s0t1u2v3w4"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "dataset_generations",
+        sa.Column("name", sa.String(50), primary_key=True),
+        sa.Column("generation", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("imported_at", sa.DateTime(), nullable=True),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("dataset_generations")
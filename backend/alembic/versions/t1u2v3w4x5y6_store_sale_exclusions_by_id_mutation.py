@@ -0,0 +1,53 @@
+"""store sale exclusions by id_mutation
+
+price_analyses.excluded_sale_ids / excluded_neighboring_sale_ids held
+dvf_sales.id, which the DVF import renumbers, so exclusions silently pointed at
+other sales after a re-import. They are now stored as id_mutation; ids that no
+longer exist in dvf_sales are dropped.
+
+Revision ID: t1u2v3w4x5y6
+Revises: s0t1u2v3w4x5
+Create Date: 2026-10-19
+"""
+
+import sqlalchemy as sa
+
+from alembic import op
+
+revision = "t1u2v3w4x5y6"
+down_revision = "s0t1u2v3w4x5"
+branch_labels = None
+depends_on = None
+
+COLUMNS = [
+    ("excluded_sale_ids", "excluded_sale_mutations"),
+    ("excluded_neighboring_sale_ids", "excluded_neighboring_sale_mutations"),
+]
+
+# Map a JSON array through dvf_sales, keeping its order and dropping unknown entries
+CONVERT_SQL = """
+UPDATE price_analyses pa
+SET {target} = COALESCE(
+    (
+        SELECT json_agg(s.{to_key} ORDER BY e.ord)
+        FROM json_array_elements_text(pa.{source}) WITH ORDINALITY AS e(value, ord)
+        JOIN dvf_sales s ON s.{from_key}::text = e.value
+    ),
+    '[]'::json
+)
+WHERE json_typeof(pa.{source}) = 'array'
+"""
+
+
+def upgrade() -> None:
+    for old, new in COLUMNS:
+        op.add_column("price_analyses", sa.Column(new, sa.JSON(), nullable=True))
+        op.execute(CONVERT_SQL.format(target=new, source=old, from_key="id", to_key="id_mutation"))
+        op.drop_column("price_analyses", old)
+
+
+def downgrade() -> None:
+    for old, new in COLUMNS:
+        op.add_column("price_analyses", sa.Column(old, sa.JSON(), nullable=True))
+        op.execute(CONVERT_SQL.format(target=old, source=new, from_key="id_mutation", to_key="id"))
+        op.drop_column("price_analyses", new)
@@ -8,4 +8,5 @@ Routes:
 - /api/analysis - Price analysis and reports
 - /api/photos - Photo redesign
 - /api/webhooks - External service webhooks
+- /api/admin - Admin statistics (superusers)
 """
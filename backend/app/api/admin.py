@@ -0,0 +1,53 @@
+"""Admin API routes (superusers only)."""
+
+import logging
+from datetime import datetime, timedelta
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.orm import Session
+
+from app.core.better_auth_security import get_current_user_hybrid as get_current_user
+from app.core.database import get_db
+from app.models.user import User
+from app.services.ai import get_llm_gateway
+from app.services.ai.llm_usage import llm_usage_stats
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+
+def get_superuser(
+    current_user: str = Depends(get_current_user), db: Session = Depends(get_db)
+) -> User:
+    """The authenticated user, who must be a superuser."""
+    user = db.query(User).filter(User.id == int(current_user)).first()
+    if not user or not user.is_superuser:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin access required")
+    return user
+
+
+@router.get("/llm-stats")
+async def get_llm_stats(
+    days: int = Query(30, ge=1, le=365),
+    workflow_id: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    admin: User = Depends(get_superuser),
+    db: Session = Depends(get_db),
+):
+    """
+    LLM token usage, latency, retries and estimated cost of the document
+    pipeline over the last `days`.
+
+    Persisted calls are aggregated in total, by operation (prompt) and model,
+    by document category, and for the most expensive documents and
+    workflows; `process` holds this instance's in-memory totals since it
+    started, with p95 latencies.
+    """
+    since = datetime.utcnow() - timedelta(days=days)
+    return {
+        "since": since.isoformat(),
+        **llm_usage_stats(db, since=since, workflow_id=workflow_id, limit=limit),
+        "process": get_llm_gateway().metrics.snapshot(),
+    }
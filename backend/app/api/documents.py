@@ -1,14 +1,16 @@
 """Documents API routes with comprehensive logging and multimodal support."""
 
+import asyncio
 import hashlib
 import json
 import logging
 import os
 import uuid
 from datetime import datetime
-from typing import Any, Dict, Optional
+from typing import Optional
 
 import PyPDF2
+import redis
 from fastapi import (
     APIRouter,
     Depends,
@@ -19,14 +21,16 @@ from fastapi import (
     UploadFile,
     status,
 )
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 
 from app.core.better_auth_security import get_current_user_hybrid as get_current_user
 from app.core.config import settings
 from app.core.database import get_db
 from app.core.i18n import get_local, get_output_language, translate
+from app.core.responses import FastJSONResponse, raw_json
 from app.models.document import Document, DocumentSummary
-from app.models.user import User
+from app.models.user import User, increment_documents_analyzed
 from app.schemas.document import (
     BulkDeleteRequest,
     DiagnosticAnalysisResponse,
@@ -36,9 +40,11 @@ from app.schemas.document import (
     TaxChargesAnalysisResponse,
 )
 from app.services.ai import get_document_analyzer
-from app.services.ai.document_processor import get_document_processor
 from app.services.documents import DocumentParser
-from app.services.storage import get_storage_service
+from app.services.documents.progress import WORKFLOW_DONE, format_sse, stream_progress
+from app.services.documents.synthesis import get_property_synthesizer, schedule_synthesis
+from app.services.jobs import get_job_worker
+from app.services.storage import FileTooLargeError, HashingReader, get_storage_service
 
 # Backward compatibility aliases
 get_gemini_llm_service = get_document_analyzer
@@ -59,107 +65,38 @@ def get_doc_parser():
     return _doc_parser
 
 
-async def _regenerate_overall_synthesis(
-    property_id: int, db: Session, output_language: str = "French"
-):
+async def _regenerate_overall_synthesis(property_id: int, output_language: str = "French"):
     """
-    Regenerate the overall property synthesis from all analyzed documents.
+    Rebuild the overall property synthesis from all analyzed documents now.
 
-    Called after individual uploads and deletions to keep synthesis up-to-date.
+    Used by the manual regeneration endpoint; uploads and deletions go
+    through _schedule_overall_synthesis instead. The synthesizer opens its
+    own short sessions around the Gemini call.
     """
     try:
-        # Fetch all analyzed documents for this property
-        analyzed_docs = (
-            db.query(Document)
-            .filter(
-                Document.property_id == property_id,
-                Document.is_analyzed == True,
-            )
-            .all()
+        await get_property_synthesizer().update(
+            property_id, output_language=output_language, full=True
         )
-
-        # Get existing synthesis record (category=NULL for overall)
-        existing_synthesis = (
-            db.query(DocumentSummary)
-            .filter(DocumentSummary.property_id == property_id, DocumentSummary.category == None)
-            .first()
+    except Exception as e:
+        logger.error(
+            f"Failed to regenerate synthesis for property {property_id}: {e}", exc_info=True
         )
 
-        # If no analyzed documents remain, delete synthesis
-        if not analyzed_docs:
-            if existing_synthesis:
-                db.delete(existing_synthesis)
-                db.commit()
-                logger.info(f"Deleted synthesis for property {property_id} (no documents)")
-            return
-
-        # Build results list from stored analysis data
-        results = []
-        for doc in analyzed_docs:
-            result_data: Dict[str, Any] = {
-                "summary": doc.analysis_summary or "",
-                "key_insights": doc.key_insights or [],
-                "estimated_annual_cost": doc.estimated_annual_cost or 0.0,
-                "one_time_costs": doc.one_time_costs or [],
-            }
-            # Include full extracted_data so the AI synthesizer has complete context
-            # (e.g., detailed tax breakdown, diagnostic findings, charge details)
-            if doc.extracted_data:
-                try:
-                    extracted = (
-                        json.loads(doc.extracted_data)
-                        if isinstance(doc.extracted_data, str)
-                        else doc.extracted_data
-                    )
-                    result_data["extracted_data"] = extracted
-                except (json.JSONDecodeError, TypeError):
-                    pass
-            results.append(
-                {
-                    "filename": doc.filename,
-                    "document_type": doc.document_category,
-                    "result": result_data,
-                    "document_id": doc.id,
-                }
-            )
-
-        # Call synthesize_results
-        processor = get_document_processor()
-        synthesis = await processor.synthesize_results(results, output_language=output_language)
-
-        # Save/update DocumentSummary where category=NULL
-        if not existing_synthesis:
-            existing_synthesis = DocumentSummary(property_id=property_id)
-            db.add(existing_synthesis)
-
-        existing_synthesis.overall_summary = synthesis.get("summary", "")
-        existing_synthesis.total_annual_cost = synthesis.get("total_annual_costs", 0.0)
-        existing_synthesis.total_one_time_cost = synthesis.get("total_one_time_costs", 0.0)
-        existing_synthesis.risk_level = synthesis.get("risk_level", "unknown")
-        existing_synthesis.key_findings = synthesis.get("key_findings", [])
-        existing_synthesis.recommendations = synthesis.get("recommendations", [])
-
-        # Preserve user_overrides from previous synthesis_data when regenerating
-        if existing_synthesis.synthesis_data:
-            try:
-                old_data = json.loads(existing_synthesis.synthesis_data)
-                if "user_overrides" in old_data:
-                    synthesis["user_overrides"] = old_data["user_overrides"]
-            except (json.JSONDecodeError, TypeError):
-                pass
 
-        existing_synthesis.synthesis_data = json.dumps(synthesis)
-        existing_synthesis.last_updated = datetime.utcnow()
+def _schedule_overall_synthesis(property_id: int, db: Session, output_language: str = "French"):
+    """
+    Queue an incremental update of the overall synthesis after an upload or deletion.
 
+    Changes arriving in quick succession are folded into a single update.
+    """
+    try:
+        job_id = schedule_synthesis(db, property_id, output_language=output_language)
         db.commit()
-        logger.info(
-            f"Regenerated synthesis for property {property_id} from {len(analyzed_docs)} documents"
-        )
-
+        get_job_worker().notify()
+        logger.info(f"Scheduled synthesis job {job_id} for property {property_id}")
     except Exception as e:
-        logger.error(
-            f"Failed to regenerate synthesis for property {property_id}: {e}", exc_info=True
-        )
+        db.rollback()
+        logger.error(f"Failed to schedule synthesis for property {property_id}: {e}", exc_info=True)
 
 
 def extract_text_from_pdf(
@@ -335,9 +272,9 @@ async def upload_document(
                     property_id, db, output_language=output_language
                 )
 
-            # Regenerate overall synthesis after any upload
-            logger.info(f"Triggering overall synthesis regeneration for property {property_id}")
-            await _regenerate_overall_synthesis(property_id, db, output_language=output_language)
+            # Update overall synthesis after any upload
+            logger.info(f"Triggering overall synthesis update for property {property_id}")
+            _schedule_overall_synthesis(property_id, db, output_language=output_language)
         except Exception as e:
             logger.error(f"Auto-parse failed for document ID {document.id}: {e}", exc_info=True)
             # Don't fail the upload if parsing fails - document is still saved
@@ -419,10 +356,10 @@ async def bulk_delete_documents(
 
     db.commit()
 
-    # Regenerate synthesis once per property
+    # Update synthesis once per property
     output_language = get_output_language(get_local(request))
     for pid in property_ids:
-        await _regenerate_overall_synthesis(pid, db, output_language=output_language)
+        _schedule_overall_synthesis(pid, db, output_language=output_language)
 
     return {"deleted_count": len(documents)}
 
@@ -546,9 +483,7 @@ async def analyze_pvag(
     document.extracted_data = json.dumps(analysis)
 
     # Increment user's documents analyzed count
-    user = db.query(User).filter(User.id == int(current_user)).first()
-    if user:
-        user.documents_analyzed_count = (user.documents_analyzed_count or 0) + 1
+    increment_documents_analyzed(db, int(current_user))
 
     db.commit()
 
@@ -621,9 +556,7 @@ async def analyze_diagnostic(
     document.risk_flags = json.dumps(analysis.get("risk_flags", []))
 
     # Increment user's documents analyzed count
-    user = db.query(User).filter(User.id == int(current_user)).first()
-    if user:
-        user.documents_analyzed_count = (user.documents_analyzed_count or 0) + 1
+    increment_documents_analyzed(db, int(current_user))
 
     db.commit()
 
@@ -682,9 +615,7 @@ async def analyze_tax_charges(
     document.extracted_data = json.dumps(analysis)
 
     # Increment user's documents analyzed count
-    user = db.query(User).filter(User.id == int(current_user)).first()
-    if user:
-        user.documents_analyzed_count = (user.documents_analyzed_count or 0) + 1
+    increment_documents_analyzed(db, int(current_user))
 
     db.commit()
 
@@ -730,11 +661,11 @@ async def delete_document(
     db.delete(document)
     db.commit()
 
-    # Regenerate overall synthesis after deletion
+    # Update overall synthesis after deletion
     if property_id:
         locale = get_local(request)
         output_language = get_output_language(locale)
-        await _regenerate_overall_synthesis(property_id, db, output_language=output_language)
+        _schedule_overall_synthesis(property_id, db, output_language=output_language)
 
     return None
 
@@ -1034,7 +965,9 @@ async def regenerate_overall_synthesis(
         )
 
     output_language = get_output_language(locale)
-    await _regenerate_overall_synthesis(property_id, db, output_language=output_language)
+    # Don't keep the ownership check's transaction open during the Gemini call
+    db.commit()
+    await _regenerate_overall_synthesis(property_id, output_language=output_language)
 
     # Return the updated synthesis
     synthesis = (
@@ -1269,6 +1202,10 @@ async def bulk_upload_documents(
     3. Synthesize results across all documents
     4. Generate comprehensive property summary
 
+    Files are streamed to storage in chunks and hashed on the way, a few at
+    a time (BULK_UPLOAD_CONCURRENCY). The response is sent as soon as the
+    document records and the processing job are committed.
+
     Returns:
     - workflow_id: ID to track the bulk processing workflow
     - document_ids: List of created document IDs
@@ -1311,178 +1248,171 @@ async def bulk_upload_documents(
         raise HTTPException(status_code=500, detail=translate("user_uuid_not_found", locale))
     user_uuid = user.uuid
 
-    uploaded_documents = []
-    document_uploads_info = []
-
-    try:
-        # Step 1: Upload all files to storage and create document records
-        storage_service = get_storage_service()
+    # Step 1: Validate files (size from the multipart headers, checked again while streaming)
+    accepted = []
+    for file in files:
+        file_ext = os.path.splitext(file.filename)[1].lower()
+        if file_ext not in settings.ALLOWED_EXTENSIONS:
+            logger.warning(f"Skipping invalid file type: {file.filename}")
+            continue
+        if file.size is not None and file.size > settings.MAX_UPLOAD_SIZE:
+            logger.warning(
+                f"Skipping oversized file: {file.filename} "
+                f"({file.size} bytes, max {settings.MAX_UPLOAD_SIZE})"
+            )
+            continue
+        accepted.append((file, file_ext))
 
-        for file in files:
-            # Validate file
-            file_ext = os.path.splitext(file.filename)[1].lower()
-            if file_ext not in settings.ALLOWED_EXTENSIONS:
-                logger.warning(f"Skipping invalid file type: {file.filename}")
-                continue
+    if not accepted:
+        return {
+            "status": "pending",
+            "document_ids": [],
+            "total_files": 0,
+            "message": "No valid documents to process",
+        }
 
-            # Read file
-            content = await file.read()
-            file_size = len(content)
+    storage_service = get_storage_service()
+    upload_slots = asyncio.Semaphore(settings.BULK_UPLOAD_CONCURRENCY)
 
-            # Validate file size — skip oversized files in bulk
-            if file_size > settings.MAX_UPLOAD_SIZE:
+    async def store_file(file: UploadFile, file_ext: str) -> Optional[dict]:
+        """Stream one file to storage, hashing it on the way. None if oversized."""
+        doc_uuid = str(uuid.uuid4())
+        # UUIDs in path: {user_uuid}/documents/{doc_uuid}/{filename}
+        storage_key = f"{user_uuid}/documents/{doc_uuid}/{file.filename}"
+        reader = HashingReader(file.file, max_bytes=settings.MAX_UPLOAD_SIZE)
+        async with upload_slots:
+            try:
+                # Blocking storage client: read and sent chunk by chunk in a thread
+                await asyncio.to_thread(
+                    storage_service.upload_stream,
+                    reader,
+                    storage_key,
+                    file.size,
+                    content_type=file.content_type or "application/octet-stream",
+                    metadata={
+                        "document_uuid": doc_uuid,
+                        "user_uuid": user_uuid,
+                        "property_id": str(property_id),
+                    },
+                )
+            except FileTooLargeError:
                 logger.warning(
-                    f"Skipping oversized file: {file.filename} "
-                    f"({file_size} bytes, max {settings.MAX_UPLOAD_SIZE})"
+                    f"Skipping oversized file: {file.filename} (max {settings.MAX_UPLOAD_SIZE})"
                 )
-                continue
+                return None
+        logger.info(f"Uploaded {file.filename} to storage: {storage_key}")
+        return {
+            "doc_uuid": doc_uuid,
+            "storage_key": storage_key,
+            "filename": file.filename,
+            "file_type": file_ext,
+            "file_size": reader.size,
+            "file_hash": reader.hexdigest(),
+        }
 
-            file_hash = hashlib.sha256(content).hexdigest()
+    def discard(stored_files: list[dict]) -> None:
+        """Delete the stored objects of an upload that did not go through."""
+        for stored in stored_files:
+            try:
+                storage_service.delete_file(stored["storage_key"])
+            except Exception as e:
+                logger.warning(f"Could not delete {stored['storage_key']}: {e}")
 
-            # Generate UUID for document path
-            doc_uuid = str(uuid.uuid4())
+    # Step 2: Stream the files to storage concurrently (bounded)
+    outcomes = await asyncio.gather(
+        *(store_file(file, file_ext) for file, file_ext in accepted), return_exceptions=True
+    )
+    stored_files = [o for o in outcomes if isinstance(o, dict)]
+    errors = [o for o in outcomes if isinstance(o, BaseException)]
+    if errors:
+        logger.error(f"Bulk upload failed: {errors[0]}", exc_info=errors[0])
+        await asyncio.to_thread(discard, stored_files)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=translate("bulk_upload_failed", locale, error=str(errors[0])),
+        )
+
+    if not stored_files:
+        return {
+            "status": "pending",
+            "document_ids": [],
+            "total_files": 0,
+            "message": "No valid documents to process",
+        }
 
-            # Create document record
-            document = Document(
-                uuid=doc_uuid,
+    # Step 3: Create the document records and queue their processing in one transaction
+    try:
+        from app.services.documents import get_bulk_processor
+
+        workflow_id = f"bulk-{property_id}-{int(datetime.now().timestamp())}-{uuid.uuid4().hex[:8]}"
+        uploaded_documents = [
+            Document(
+                uuid=stored["doc_uuid"],
                 user_id=int(current_user),
                 property_id=property_id,
-                filename=file.filename,
-                file_path="",  # Will be updated
-                file_type=file_ext,
+                filename=stored["filename"],
+                file_path=f"storage://{storage_service.bucket}/{stored['storage_key']}",
+                file_type=stored["file_type"],
                 document_category="pending_classification",  # Agent will classify
-                file_size=file_size,
-                file_hash=file_hash,
-                processing_status="pending",
-            )
-            db.add(document)
-            db.flush()  # Get document ID
-
-            # Upload to storage with UUIDs in path: {user_uuid}/documents/{doc_uuid}/{filename}
-            storage_key = f"{user_uuid}/documents/{doc_uuid}/{file.filename}"
-            storage_service.upload_file(
-                file_data=content,
-                filename=storage_key,
-                content_type=file.content_type or "application/octet-stream",
-                metadata={
-                    "document_uuid": doc_uuid,
-                    "user_uuid": user_uuid,
-                    "property_id": str(property_id),
-                },
-            )
-
-            # Update document
-            document.storage_key = storage_key
-            document.storage_bucket = storage_service.bucket
-            document.file_path = f"storage://{storage_service.bucket}/{storage_key}"
-
-            uploaded_documents.append(document)
-            document_uploads_info.append(
-                {
-                    "document_id": document.id,
-                    "document_uuid": doc_uuid,
-                    "storage_key": storage_key,
-                    "filename": file.filename,
-                }
+                file_size=stored["file_size"],
+                file_hash=stored["file_hash"],
+                storage_key=stored["storage_key"],
+                storage_bucket=storage_service.bucket,
+                workflow_id=workflow_id,
+                processing_status="processing",
             )
+            for stored in stored_files
+        ]
+        db.add_all(uploaded_documents)
+        db.flush()  # Get document IDs
 
-            logger.info(f"Uploaded {file.filename} to storage: {storage_key}")
-
-        db.commit()
-
-        # Step 2: Start async background processing
-        if len(uploaded_documents) > 0:
-            try:
-                from app.services.documents import get_bulk_processor
-
-                # Generate workflow ID
-                workflow_id = (
-                    f"bulk-{property_id}-{int(datetime.now().timestamp())}-{uuid.uuid4().hex[:8]}"
-                )
-
-                # Update documents with workflow ID
-                for doc in uploaded_documents:
-                    doc.workflow_id = workflow_id
-                    doc.processing_status = "processing"
-
-                db.commit()
-
-                # Start background processing
-                output_language = get_output_language(locale)
-                processor = get_bulk_processor()
-                processor.start_background_task(
-                    workflow_id=workflow_id,
-                    property_id=property_id,
-                    document_uploads=document_uploads_info,
-                    output_language=output_language,
-                )
-
-                logger.info(f"Started async bulk processing: {workflow_id}")
-
-                return {
-                    "status": "processing",
-                    "workflow_id": workflow_id,
-                    "document_ids": [doc.id for doc in uploaded_documents],
-                    "total_files": len(uploaded_documents),
-                    "message": (
-                        f"Successfully uploaded {len(uploaded_documents)} documents. "
-                        "The AI agent is now classifying and processing them. "
-                        "Check the status to see progress."
-                    ),
-                }
-
-            except Exception as e:
-                logger.error(f"Failed to start processing: {e}", exc_info=True)
-                # Mark documents as failed
-                for doc in uploaded_documents:
-                    doc.processing_status = "failed"
-                    doc.processing_error = f"Failed to start processing: {str(e)}"
-                db.commit()
-
-                raise HTTPException(
-                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                    detail=translate("failed_start_processing", locale, error=str(e)),
-                )
-        else:
-            return {
-                "status": "pending",
-                "document_ids": [],
-                "total_files": 0,
-                "message": "No valid documents to process",
+        document_uploads_info = [
+            {
+                "document_id": document.id,
+                "document_uuid": stored["doc_uuid"],
+                "storage_key": stored["storage_key"],
+                "filename": stored["filename"],
+                "file_hash": stored["file_hash"],
             }
+            for document, stored in zip(uploaded_documents, stored_files)
+        ]
 
-    except HTTPException:
-        db.rollback()
-        raise
+        output_language = get_output_language(locale)
+        job_id = get_bulk_processor().start_background_task(
+            workflow_id=workflow_id,
+            property_id=property_id,
+            document_uploads=document_uploads_info,
+            output_language=output_language,
+            db=db,
+        )
+        db.commit()
     except Exception as e:
         db.rollback()
-        logger.error(f"Bulk upload failed: {e}", exc_info=True)
+        logger.error(f"Failed to start processing: {e}", exc_info=True)
+        await asyncio.to_thread(discard, stored_files)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=translate("bulk_upload_failed", locale, error=str(e)),
+            detail=translate("failed_start_processing", locale, error=str(e)),
         )
 
+    get_job_worker().notify()
+    logger.info(f"Queued async bulk processing: {workflow_id} (job {job_id})")
 
-@router.get("/bulk-status/{workflow_id}")
-async def get_bulk_processing_status(
-    request: Request,
-    workflow_id: str,
-    db: Session = Depends(get_db),
-    current_user: str = Depends(get_current_user),
-):
-    """
-    Get the status of a bulk document processing workflow.
-
-    Returns:
-    - status: Overall workflow status
-    - documents: List of document statuses
-    - synthesis: Final synthesis (if complete)
-    - progress: Processing progress
-    """
-    locale = get_local(request)
+    return {
+        "status": "processing",
+        "workflow_id": workflow_id,
+        "document_ids": [doc.id for doc in uploaded_documents],
+        "total_files": len(uploaded_documents),
+        "message": (
+            f"Successfully uploaded {len(uploaded_documents)} documents. "
+            "The AI agent is now classifying and processing them. "
+            "Check the status to see progress."
+        ),
+    }
 
-    logger.info(f"Bulk status check for workflow {workflow_id}")
 
+def _bulk_status(workflow_id: str, db: Session, current_user: str, locale: str) -> dict:
+    """Status of a bulk workflow: document statuses, progress and synthesis."""
     # Get all documents for this workflow
     documents = (
         db.query(Document)
@@ -1504,12 +1434,6 @@ async def get_bulk_processing_status(
         .first()
     )
 
-    logger.info(f"Synthesis found for property {property_id}: {synthesis is not None}")
-    if synthesis:
-        logger.info(
-            f"Synthesis data - risk: {synthesis.risk_level}, summary length: {len(synthesis.overall_summary) if synthesis.overall_summary else 0}"
-        )
-
     # Calculate progress
     total = len(documents)
     completed = sum(1 for d in documents if d.processing_status == "completed")
@@ -1527,7 +1451,12 @@ async def get_bulk_processing_status(
     else:
         overall_status = "unknown"
 
-    response_data = {
+    logger.debug(
+        f"Bulk status {workflow_id}: {overall_status}, {completed}/{total} completed, "
+        f"synthesis: {synthesis is not None}"
+    )
+
+    return {
         "workflow_id": workflow_id,
         "property_id": property_id,
         "status": overall_status,
@@ -1557,14 +1486,88 @@ async def get_bulk_processing_status(
             "risk_level": synthesis.risk_level if synthesis else None,
             "key_findings": synthesis.key_findings if synthesis else [],
             "recommendations": synthesis.recommendations if synthesis else [],
-            "synthesis_data": json.loads(synthesis.synthesis_data)
-            if synthesis and synthesis.synthesis_data
-            else None,
+            # Stored as JSON text by the processor — embedded as-is, not re-parsed
+            "synthesis_data": raw_json(synthesis.synthesis_data) if synthesis else None,
         }
         if synthesis
         else None,
     }
 
-    logger.info(f"Returning synthesis: {response_data['synthesis'] is not None}")
 
-    return response_data
+@router.get("/bulk-status/{workflow_id}")
+async def get_bulk_processing_status(
+    request: Request,
+    workflow_id: str,
+    db: Session = Depends(get_db),
+    current_user: str = Depends(get_current_user),
+):
+    """
+    Get the status of a bulk document processing workflow.
+
+    Returns:
+    - status: Overall workflow status
+    - documents: List of document statuses
+    - synthesis: Final synthesis (if complete)
+    - progress: Processing progress
+
+    Prefer GET /bulk-status/{workflow_id}/events, which pushes the changes.
+    """
+    locale = get_local(request)
+    return FastJSONResponse(_bulk_status(workflow_id, db, current_user, locale))
+
+
+@router.get("/bulk-status/{workflow_id}/events")
+async def stream_bulk_processing_status(
+    request: Request,
+    workflow_id: str,
+    db: Session = Depends(get_db),
+    current_user: str = Depends(get_current_user),
+):
+    """
+    Server-sent events for a bulk document processing workflow.
+
+    The stream starts with a `snapshot` event (the GET /bulk-status response),
+    then relays the workflow's progress events: classified, chunk_done,
+    document_saved, document_failed, synthesis_done and workflow_done, after
+    which it ends. Events carry ids, so a reconnect with Last-Event-ID
+    resumes where it stopped. If progress events are unavailable (Redis
+    down), a `fallback` event tells the client to poll GET /bulk-status.
+    """
+    locale = get_local(request)
+    snapshot = _bulk_status(workflow_id, db, current_user, locale)
+    # Nothing else needs the database: give the connection back for the stream's lifetime
+    db.close()
+
+    try:
+        last_event_id = int(request.headers.get("last-event-id") or 0)
+    except ValueError:
+        last_event_id = 0
+
+    progress = snapshot["progress"]
+    finished = progress["failed"] == progress["total"] or (
+        progress["completed"] + progress["failed"] == progress["total"]
+        and snapshot["synthesis"] is not None
+    )
+
+    async def events():
+        yield format_sse("snapshot", snapshot)
+        if finished:
+            yield format_sse(WORKFLOW_DONE, {"status": snapshot["status"]})
+            return
+        try:
+            async for event in stream_progress(workflow_id, last_event_id):
+                if await request.is_disconnected():
+                    return
+                if event is None:
+                    yield ": keepalive\n\n"
+                else:
+                    yield format_sse(event["event"], event["data"], event["id"])
+        except redis.RedisError as e:
+            logger.warning(f"Progress stream for {workflow_id} unavailable: {e}")
+            yield format_sse("fallback", {"poll": f"/api/documents/bulk-status/{workflow_id}"})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
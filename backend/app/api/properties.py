@@ -1,21 +1,29 @@
 """Properties API routes."""
 
-import json
 import logging
 import statistics
 from collections import defaultdict
 from datetime import datetime
-from typing import List
+from typing import List, Literal
 
 from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import Response
 from pydantic import BaseModel
-from sqlalchemy import func
-from sqlalchemy.orm import Session
+from sqlalchemy import Text, cast, func
+from sqlalchemy import inspect as sa_inspect
+from sqlalchemy.orm import Session, defer
 
 from app.core.better_auth_security import get_current_user_hybrid as get_current_user
-from app.core.cache import cache_get, cache_set, get_redis
+from app.core.cache import cached, get_bytes_codec, invalidate_tags
 from app.core.database import get_db
+from app.core.http_cache import (
+    is_not_modified,
+    make_etag,
+    not_modified_response,
+    validator_headers,
+)
 from app.core.i18n import get_local, translate
+from app.core.responses import FastJSONResponse, json_dumps, raw_json
 from app.models.document import Document, DocumentSummary
 from app.models.photo import Photo, PhotoRedesign
 from app.models.price_analysis import PriceAnalysis
@@ -23,6 +31,7 @@ from app.models.property import DVFSale, Property
 from app.schemas.property import (
     ExcludeSalesRequest,
     PriceAnalysisFullResponse,
+    PriceAnalysisSalesPageResponse,
     PriceAnalysisSummaryResponse,
     PropertyCreate,
     PropertyResponse,
@@ -30,7 +39,13 @@ from app.schemas.property import (
     PropertyUpdate,
     PropertyWithSynthesisResponse,
 )
-from app.services.dvf_service import DVFService, _street_ilike_pattern, dvf_service
+from app.services import price_analysis_sales
+from app.services.dvf_service import (
+    DVFService,
+    _street_ilike_pattern,
+    dvf_service,
+    get_dvf_generation,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -68,11 +83,13 @@ async def get_dvf_stats(
     """
     get_local(request)
 
-    # Check Redis cache first
-    cached = cache_get("dvf_stats")
-    if cached:
-        return DVFStatsResponse(**json.loads(cached))
+    return DVFStatsResponse(**await _load_dvf_stats(db))
 
+
+# Cached for 1 hour — count only changes on DVF import (which invalidates the "dvf" tag)
+@cached(key="dvf_stats", ttl=3600, tags=["dvf"])
+async def _load_dvf_stats(db: Session) -> dict:
+    """Count DVF records and format them for display."""
     total = db.query(func.count(DVFSale.id)).scalar() or 0
 
     # Format the count for display
@@ -83,17 +100,12 @@ async def get_dvf_stats(
     else:
         formatted = str(total)
 
-    result = DVFStatsResponse(
+    return DVFStatsResponse(
         total_records=total,
         total_imports=0,
         last_updated=None,
         formatted_count=formatted,
-    )
-
-    # Cache for 1 hour — count only changes on DVF import
-    cache_set("dvf_stats", json.dumps(result.model_dump()), 3600)
-
-    return result
+    ).model_dump()
 
 
 @router.get("/search-addresses", response_model=List[AddressSearchResult])
@@ -337,6 +349,9 @@ async def update_property(
 
     db.commit()
     db.refresh(property)
+
+    # Cached analyses were computed against the previous property values
+    invalidate_tags(f"property:{property_id}")
     return property
 
 
@@ -363,53 +378,10 @@ async def delete_property(
 
     db.delete(property)
     db.commit()
+    invalidate_tags(f"property:{property_id}")
     return None
 
 
-def _serialize_sale(sale: DVFSale, is_outlier: bool = False) -> dict:
-    """Serialize a DVFSale to a JSON-safe dict for persistence."""
-    result = {
-        "id": sale.id,
-        "address": sale.adresse_complete or "",
-        "sale_date": sale.date_mutation.isoformat()
-        if hasattr(sale.date_mutation, "isoformat")
-        else str(sale.date_mutation),
-        "sale_price": float(sale.prix) if sale.prix else 0,
-        "postal_code": sale.code_postal or "",
-        "city": sale.nom_commune or "",
-        "property_type": sale.type_principal or "",
-        "surface_area": sale.surface_bati,
-        "rooms": sale.nombre_pieces,
-        "price_per_sqm": float(sale.prix_m2) if sale.prix_m2 else None,
-        "unit_count": sale.nombre_lots,
-        "is_multi_unit": (sale.nombre_lots or 1) > 1,
-        "is_outlier": is_outlier,
-        "longitude": sale.longitude,
-        "latitude": sale.latitude,
-    }
-
-    # Include individual lot details for multi-unit sales
-    if (sale.nombre_lots or 1) > 1 and hasattr(sale, "lots") and sale.lots:
-        total_surface = sum(lot.surface_bati or 0 for lot in sale.lots)
-        result["lots_detail"] = [
-            {
-                "lot_type": lot.lot_type,
-                "surface_area": lot.surface_bati,
-                "rooms": lot.nombre_pieces,
-                "price_per_sqm": (
-                    round(float(sale.prix) / total_surface, 2)
-                    if sale.prix and total_surface > 0 and lot.surface_bati
-                    else None
-                ),
-            }
-            for lot in sale.lots
-        ]
-        # Use actual lot count from data (nombre_lots can be unreliable)
-        result["unit_count"] = len(sale.lots)
-
-    return result
-
-
 def _compute_market_trend_json(property_obj: Property, db: Session) -> dict:
     """Compute yearly market trend data for chart."""
     neighboring_sales = dvf_service.get_neighboring_sales_for_trend(
@@ -470,19 +442,22 @@ def _run_trend_analysis(
     property_obj: Property,
     db: Session,
     locale: str = "fr",
-    excluded_sale_ids: list[int] | None = None,
-    excluded_neighboring_sale_ids: list[int] | None = None,
+    excluded_mutations: list[str] | None = None,
+    excluded_neighboring_mutations: list[str] | None = None,
 ) -> PriceAnalysis:
     """
     Run full trend analysis, persist results, return PriceAnalysis row.
 
-    excluded_sale_ids / excluded_neighboring_sale_ids are the **complete**
-    exclusion lists (including auto-detected outliers on first run).
-    The backend uses ONLY these lists to decide what is excluded — there is
-    no additional auto-outlier filtering on top.
+    excluded_mutations / excluded_neighboring_mutations are the **complete**
+    exclusion lists (including auto-detected outliers on first run), as DVF
+    id_mutation so they survive re-imports. The backend uses ONLY these lists
+    to decide what is excluded — there is no additional auto-outlier
+    filtering on top.
     """
-    excluded_sale_ids = excluded_sale_ids or []
-    excluded_neighboring_sale_ids = excluded_neighboring_sale_ids or []
+    excluded_mutations = excluded_mutations or []
+    excluded_neighboring_mutations = excluded_neighboring_mutations or []
+    # Read before querying DVF so an import running meanwhile leaves the result stale
+    dvf_generation = get_dvf_generation(db)
 
     exact_sales = dvf_service.get_exact_address_sales(
         db=db,
@@ -501,15 +476,17 @@ def _run_trend_analysis(
     neighboring_outlier_flags = dvf_service.detect_outliers_iqr(neighboring_sales)
 
     # On first run (empty exclusion lists), auto-populate with detected outlier IDs
-    if not excluded_neighboring_sale_ids:
-        excluded_neighboring_sale_ids = [
-            int(sale.id) for i, sale in enumerate(neighboring_sales) if neighboring_outlier_flags[i]
+    if not excluded_neighboring_mutations:
+        excluded_neighboring_mutations = [
+            sale.id_mutation
+            for i, sale in enumerate(neighboring_sales)
+            if neighboring_outlier_flags[i]
         ]
 
     # Filter neighboring sales using the persisted exclusion list only
-    excluded_neighboring_set = set(excluded_neighboring_sale_ids)
+    excluded_neighboring_set = set(excluded_neighboring_mutations)
     filtered_neighboring_sales = [
-        sale for sale in neighboring_sales if sale.id not in excluded_neighboring_set
+        sale for sale in neighboring_sales if sale.id_mutation not in excluded_neighboring_set
     ]
 
     # Trend projection
@@ -522,36 +499,18 @@ def _run_trend_analysis(
     # Price analysis on comparable sales
     comparable_for_analysis = exact_sales if exact_sales else neighboring_sales
 
-    # Eagerly load lot details for multi-unit sales (needed for serialization)
-    multi_unit_ids = [sale.id for sale in comparable_for_analysis if (sale.nombre_lots or 1) > 1]
-    if multi_unit_ids:
-        from app.models.property import DVFSaleLot
-
-        lots_by_mutation = defaultdict(list)
-        lots = (
-            db.query(DVFSaleLot)
-            .join(DVFSale, DVFSaleLot.id_mutation == DVFSale.id_mutation)
-            .filter(DVFSale.id.in_(multi_unit_ids))
-            .all()
-        )
-        for lot in lots:
-            lots_by_mutation[lot.id_mutation].append(lot)
-        for sale in comparable_for_analysis:
-            if sale.id in multi_unit_ids:
-                sale.lots = lots_by_mutation.get(sale.id_mutation, [])
-
     outlier_flags = dvf_service.detect_outliers_iqr(comparable_for_analysis)
 
     # On first run, auto-populate with detected outlier IDs
-    if not excluded_sale_ids:
-        excluded_sale_ids = [
-            int(sale.id) for i, sale in enumerate(comparable_for_analysis) if outlier_flags[i]
+    if not excluded_mutations:
+        excluded_mutations = [
+            sale.id_mutation for i, sale in enumerate(comparable_for_analysis) if outlier_flags[i]
         ]
 
     # Build exclude indices from the persisted exclusion list only
-    excluded_sale_set = set(excluded_sale_ids)
+    excluded_set = set(excluded_mutations)
     exclude_indices = [
-        i for i, sale in enumerate(comparable_for_analysis) if sale.id in excluded_sale_set
+        i for i, sale in enumerate(comparable_for_analysis) if sale.id_mutation in excluded_set
     ]
 
     analysis = dvf_service.calculate_price_analysis(
@@ -563,27 +522,10 @@ def _run_trend_analysis(
         locale=locale,
     )
 
-    # Build serialized comparable sales (with lots detail for multi-unit sales)
-    comparable_sales_json = [
-        _serialize_sale(sale, is_outlier=outlier_flags[i] if i < len(outlier_flags) else False)
-        for i, sale in enumerate(comparable_for_analysis)
-    ]
-
-    # Build trend projection with neighboring sales (ensure date objects are serialized)
+    # Trend projection summary (sales are stored as references, see below)
     trend_projection_json = {
         k: (v.isoformat() if hasattr(v, "isoformat") else v) for k, v in trend_projection.items()
     }
-    trend_projection_json["neighboring_sales"] = [
-        {
-            **_serialize_sale(
-                sale,
-                is_outlier=neighboring_outlier_flags[i]
-                if i < len(neighboring_outlier_flags)
-                else False,
-            ),
-        }
-        for i, sale in enumerate(neighboring_sales)
-    ]
 
     # Compute market trend for chart
     market_trend_json = _compute_market_trend_json(property_obj, db)
@@ -593,6 +535,7 @@ def _run_trend_analysis(
     if not pa:
         pa = PriceAnalysis(property_id=property_obj.id)
         db.add(pa)
+        db.flush()
 
     pa.estimated_value = analysis["estimated_value"]
     pa.price_per_sqm = analysis["price_per_sqm"]
@@ -610,12 +553,20 @@ def _run_trend_analysis(
     pa.trend_source = trend_projection.get("trend_source")
     pa.trend_sample_size = trend_projection.get("trend_sample_size")
 
-    pa.comparable_sales_json = comparable_sales_json
     pa.trend_projection_json = trend_projection_json
     pa.market_trend_json = market_trend_json
 
-    pa.excluded_sale_ids = excluded_sale_ids
-    pa.excluded_neighboring_sale_ids = excluded_neighboring_sale_ids
+    pa.excluded_sale_mutations = excluded_mutations
+    pa.excluded_neighboring_sale_mutations = excluded_neighboring_mutations
+    pa.dvf_generation = dvf_generation
+
+    # Comparable / neighboring sales: DVF ids + flags, details served by /price-analysis/sales
+    price_analysis_sales.replace_sales(
+        db, pa.id, price_analysis_sales.COMPARABLE, comparable_for_analysis, outlier_flags
+    )
+    price_analysis_sales.replace_sales(
+        db, pa.id, price_analysis_sales.NEIGHBORING, neighboring_sales, neighboring_outlier_flags
+    )
 
     # Also update property-level fields
     property_obj.estimated_value = analysis["estimated_value"]
@@ -633,12 +584,17 @@ def _run_trend_analysis(
     return pa
 
 
-def _is_stale(pa: PriceAnalysis, property_obj: Property) -> bool:
-    """Check if analysis is stale (property updated after analysis, or >30 days old)."""
+def _is_stale(pa: PriceAnalysis, property_obj: Property, db: Session) -> bool:
+    """
+    Check if analysis is stale (property updated after analysis, DVF data
+    re-imported since, or >30 days old).
+    """
     if not pa.updated_at:
         return True
     if property_obj.updated_at and property_obj.updated_at > pa.updated_at:
         return True
+    if get_dvf_generation(db) != (pa.dvf_generation or 0):
+        return True
     if (datetime.utcnow() - pa.updated_at).days > 30:
         return True
     return False
@@ -659,8 +615,20 @@ def _pa_to_summary(pa: PriceAnalysis, stale: bool) -> dict:
     }
 
 
-def _pa_to_full(pa: PriceAnalysis, stale: bool) -> dict:
-    """Convert PriceAnalysis row to full dict."""
+# JSON columns: deferred on reads and passed through as raw JSON text
+_PA_JSON_COLUMNS = ("trend_projection_json", "market_trend_json")
+
+
+def _pa_to_full(
+    pa: PriceAnalysis, stale: bool, db: Session, json_columns: dict | None = None
+) -> dict:
+    """
+    Convert PriceAnalysis row to full dict (json_columns overrides the JSON blobs).
+
+    Exclusions are stored as id_mutation and returned as the current sale ids.
+    """
+    if json_columns is None:
+        json_columns = {name: getattr(pa, name) for name in _PA_JSON_COLUMNS}
     return {
         **_pa_to_summary(pa, stale),
         "price_per_sqm": pa.price_per_sqm,
@@ -670,14 +638,44 @@ def _pa_to_full(pa: PriceAnalysis, stale: bool) -> dict:
         "projected_price_per_sqm": pa.projected_price_per_sqm,
         "trend_source": pa.trend_source,
         "trend_sample_size": pa.trend_sample_size,
-        "comparable_sales": pa.comparable_sales_json or [],
-        "trend_projection": pa.trend_projection_json,
-        "market_trend": pa.market_trend_json,
-        "excluded_sale_ids": pa.excluded_sale_ids or [],
-        "excluded_neighboring_sale_ids": pa.excluded_neighboring_sale_ids or [],
+        "trend_projection": json_columns["trend_projection_json"],
+        "market_trend": json_columns["market_trend_json"],
+        "excluded_sale_ids": price_analysis_sales.ids_for_mutations(
+            db, pa.excluded_sale_mutations or []
+        ),
+        "excluded_neighboring_sale_ids": price_analysis_sales.ids_for_mutations(
+            db, pa.excluded_neighboring_sale_mutations or []
+        ),
     }
 
 
+def _pa_full_body(pa: PriceAnalysis, db: Session) -> bytes:
+    """
+    Encode the full analysis response without Pydantic re-validation.
+
+    The data was produced and stored by the server itself. JSON columns that
+    are not loaded on the instance are read as text and embedded verbatim
+    instead of being parsed and re-serialized. Sales are only counted here;
+    their details are paginated by /price-analysis/sales.
+    """
+    json_columns = None
+    if any(name in sa_inspect(pa).unloaded for name in _PA_JSON_COLUMNS):
+        row = (
+            db.query(*(cast(getattr(PriceAnalysis, name), Text) for name in _PA_JSON_COLUMNS))
+            .filter(PriceAnalysis.id == pa.id)
+            .one()
+        )
+        json_columns = {name: raw_json(text) for name, text in zip(_PA_JSON_COLUMNS, row)}
+    counts = price_analysis_sales.count_sales(db, pa.id)
+    return json_dumps(
+        {
+            **_pa_to_full(pa, False, db, json_columns),
+            "comparable_sales_count": counts[price_analysis_sales.COMPARABLE],
+            "neighboring_sales_count": counts[price_analysis_sales.NEIGHBORING],
+        }
+    )
+
+
 def _get_or_run_analysis(
     property_obj: Property, db: Session, locale: str, auto_refresh_if_stale: bool = False
 ) -> tuple[PriceAnalysis | None, bool]:
@@ -685,17 +683,22 @@ def _get_or_run_analysis(
     Get cached analysis or auto-run if missing.
     Returns (PriceAnalysis, is_stale) or (None, False) if can't run.
     """
-    pa = db.query(PriceAnalysis).filter(PriceAnalysis.property_id == property_obj.id).first()
+    pa = (
+        db.query(PriceAnalysis)
+        .options(*(defer(getattr(PriceAnalysis, name)) for name in _PA_JSON_COLUMNS))
+        .filter(PriceAnalysis.property_id == property_obj.id)
+        .first()
+    )
 
     if pa:
-        stale = _is_stale(pa, property_obj)
+        stale = _is_stale(pa, property_obj, db)
         if stale and auto_refresh_if_stale:
             pa = _run_trend_analysis(
                 property_obj,
                 db,
                 locale,
-                excluded_sale_ids=pa.excluded_sale_ids or [],
-                excluded_neighboring_sale_ids=pa.excluded_neighboring_sale_ids or [],
+                excluded_mutations=pa.excluded_sale_mutations or [],
+                excluded_neighboring_mutations=pa.excluded_neighboring_sale_mutations or [],
             )
             return pa, False
         return pa, stale
@@ -708,6 +711,59 @@ def _get_or_run_analysis(
     return None, False
 
 
+# Price analysis bodies are cached pre-encoded for 30 min (compressed when large) and
+# dropped via the "property:{id}" tag whenever the analysis or the property changes,
+# and via the "dvf" tag when the DVF data is re-imported.
+@cached(
+    key="price_analysis_summary:{property_obj.id}",
+    ttl=1800,
+    tags=["property:{property_obj.id}", "dvf"],
+    codec=get_bytes_codec(),
+)
+async def _price_analysis_summary_body(
+    property_obj: Property, db: Session, locale: str
+) -> bytes | None:
+    """Encoded summary response body, or None when no analysis can be run."""
+    pa, _stale = _get_or_run_analysis(property_obj, db, locale, auto_refresh_if_stale=True)
+    if not pa:
+        return None
+    return PriceAnalysisSummaryResponse(**_pa_to_summary(pa, False)).model_dump_json().encode()
+
+
+@cached(
+    key="price_analysis_full:{property_obj.id}",
+    ttl=1800,
+    tags=["property:{property_obj.id}", "dvf"],
+    codec=get_bytes_codec(),
+)
+async def _price_analysis_full_body(
+    property_obj: Property, db: Session, locale: str
+) -> bytes | None:
+    """Encoded full response body, or None when no analysis can be run."""
+    pa, _stale = _get_or_run_analysis(property_obj, db, locale, auto_refresh_if_stale=True)
+    if not pa:
+        return None
+    return _pa_full_body(pa, db)
+
+
+def _fresh_analysis_version(property_obj: Property, db: Session) -> datetime | None:
+    """
+    updated_at of the property's analysis, or None if missing or stale.
+
+    Only selects the version columns so conditional requests can be answered
+    without loading the JSON columns. A stale analysis has no usable version
+    because serving it triggers a re-run.
+    """
+    row = (
+        db.query(PriceAnalysis.updated_at, PriceAnalysis.dvf_generation)
+        .filter(PriceAnalysis.property_id == property_obj.id)
+        .first()
+    )
+    if row is None or _is_stale(row, property_obj, db):
+        return None
+    return row.updated_at
+
+
 @router.get("/{property_id}/price-analysis", response_model=PriceAnalysisSummaryResponse)
 async def get_price_analysis_summary(
     property_id: int,
@@ -721,12 +777,6 @@ async def get_price_analysis_summary(
     """
     locale = get_local(request)
 
-    # Check Redis cache first
-    cache_key = f"price_analysis_summary:{property_id}"
-    cached = cache_get(cache_key)
-    if cached:
-        return PriceAnalysisSummaryResponse(**json.loads(cached))
-
     property_obj = (
         db.query(Property)
         .filter(Property.id == property_id, Property.user_id == int(current_user))
@@ -737,16 +787,26 @@ async def get_price_analysis_summary(
             status_code=status.HTTP_404_NOT_FOUND, detail=translate("property_not_found", locale)
         )
 
-    pa, _stale = _get_or_run_analysis(property_obj, db, locale, auto_refresh_if_stale=True)
-    if not pa:
-        return PriceAnalysisSummaryResponse()
-
-    result = _pa_to_summary(pa, False)
+    # Unchanged analysis: answer 304 before touching the body
+    version = _fresh_analysis_version(property_obj, db)
+    if version is not None:
+        etag = make_etag("price-analysis", property_obj.id, version)
+        if is_not_modified(request, etag, version):
+            return not_modified_response(etag, version)
 
-    # Cache for 30 min
-    cache_set(cache_key, json.dumps(result, default=str), 1800)
+    # Cache hits return the pre-encoded body as-is
+    body = await _price_analysis_summary_body(property_obj, db, locale)
+    if body is None:
+        return PriceAnalysisSummaryResponse()
 
-    return PriceAnalysisSummaryResponse(**result)
+    # No validators when the analysis could not be versioned (e.g. the re-run failed)
+    version = version or _fresh_analysis_version(property_obj, db)
+    headers = (
+        validator_headers(make_etag("price-analysis", property_obj.id, version), version)
+        if version is not None
+        else None
+    )
+    return Response(content=body, media_type="application/json", headers=headers)
 
 
 @router.get("/{property_id}/price-analysis/full", response_model=PriceAnalysisFullResponse)
@@ -759,12 +819,6 @@ async def get_price_analysis_full(
     """Get full price analysis data for the Price Analyst page."""
     locale = get_local(request)
 
-    # Check Redis cache first
-    cache_key = f"price_analysis_full:{property_id}"
-    cached = cache_get(cache_key)
-    if cached:
-        return PriceAnalysisFullResponse(**json.loads(cached))
-
     property_obj = (
         db.query(Property)
         .filter(Property.id == property_id, Property.user_id == int(current_user))
@@ -775,16 +829,104 @@ async def get_price_analysis_full(
             status_code=status.HTTP_404_NOT_FOUND, detail=translate("property_not_found", locale)
         )
 
-    pa, _stale = _get_or_run_analysis(property_obj, db, locale, auto_refresh_if_stale=True)
-    if not pa:
+    # Unchanged analysis: answer 304 before touching the body
+    version = _fresh_analysis_version(property_obj, db)
+    if version is not None:
+        etag = make_etag("price-analysis-full", property_obj.id, version)
+        if is_not_modified(request, etag, version):
+            return not_modified_response(etag, version)
+
+    # Cache hits return the pre-encoded (decompressed) body as-is,
+    # skipping JSON decoding and Pydantic re-validation of thousands of sales
+    body = await _price_analysis_full_body(property_obj, db, locale)
+    if body is None:
         return PriceAnalysisFullResponse()
 
-    result = _pa_to_full(pa, False)
+    # No validators when the analysis could not be versioned (e.g. the re-run failed)
+    version = version or _fresh_analysis_version(property_obj, db)
+    headers = (
+        validator_headers(make_etag("price-analysis-full", property_obj.id, version), version)
+        if version is not None
+        else None
+    )
+    return Response(content=body, media_type="application/json", headers=headers)
 
-    # Cache for 30 min
-    cache_set(cache_key, json.dumps(result, default=str), 1800)
 
-    return PriceAnalysisFullResponse(**result)
+@router.get("/{property_id}/price-analysis/sales", response_model=PriceAnalysisSalesPageResponse)
+async def get_price_analysis_sales(
+    property_id: int,
+    request: Request,
+    kind: Literal["comparable", "neighboring"] = "comparable",
+    page: int = Query(1, ge=1),
+    page_size: int = Query(50, ge=1, le=200),
+    sort: Literal["position", "sale_date", "sale_price", "price_per_sqm", "surface_area"] = (
+        "position"
+    ),
+    order: Literal["asc", "desc"] = "asc",
+    db: Session = Depends(get_db),
+    current_user: str = Depends(get_current_user),
+):
+    """Paginated, sortable comparable or neighboring sales of the price analysis."""
+    locale = get_local(request)
+
+    property_obj = (
+        db.query(Property)
+        .filter(Property.id == property_id, Property.user_id == int(current_user))
+        .first()
+    )
+    if not property_obj:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail=translate("property_not_found", locale)
+        )
+
+    pa = (
+        db.query(
+            PriceAnalysis.id,
+            PriceAnalysis.updated_at,
+            PriceAnalysis.excluded_sale_mutations,
+            PriceAnalysis.excluded_neighboring_sale_mutations,
+        )
+        .filter(PriceAnalysis.property_id == property_obj.id)
+        .first()
+    )
+    if not pa:
+        return PriceAnalysisSalesPageResponse(kind=kind, page=page, page_size=page_size)
+
+    # Sale details are read from dvf_sales, so a DVF re-import changes the page
+    etag = make_etag(
+        "price-analysis-sales",
+        pa.id,
+        pa.updated_at,
+        get_dvf_generation(db),
+        kind,
+        page,
+        page_size,
+        sort,
+        order,
+    )
+    if is_not_modified(request, etag, pa.updated_at):
+        return not_modified_response(etag, pa.updated_at)
+
+    items, total = price_analysis_sales.list_sales(
+        db,
+        pa.id,
+        kind,
+        sort=sort,
+        descending=order == "desc",
+        offset=(page - 1) * page_size,
+        limit=page_size,
+        excluded_mutations=(
+            pa.excluded_sale_mutations
+            if kind == "comparable"
+            else pa.excluded_neighboring_sale_mutations
+        )
+        or [],
+    )
+
+    return FastJSONResponse(
+        {"kind": kind, "items": items, "total": total, "page": page, "page_size": page_size},
+        headers=validator_headers(etag, pa.updated_at),
+    )
 
 
 @router.post("/{property_id}/price-analysis/refresh", response_model=PriceAnalysisFullResponse)
@@ -815,25 +957,23 @@ async def refresh_price_analysis(
 
     # Preserve user exclusions from existing analysis
     existing = db.query(PriceAnalysis).filter(PriceAnalysis.property_id == property_obj.id).first()
-    excluded_sale_ids: list[int] = existing.excluded_sale_ids if existing else []
-    excluded_neighboring: list[int] = existing.excluded_neighboring_sale_ids if existing else []
+    excluded: list[str] = existing.excluded_sale_mutations if existing else []
+    excluded_neighboring: list[str] = (
+        existing.excluded_neighboring_sale_mutations if existing else []
+    )
 
     pa = _run_trend_analysis(
         property_obj,
         db,
         locale,
-        excluded_sale_ids=excluded_sale_ids or [],
-        excluded_neighboring_sale_ids=excluded_neighboring or [],
+        excluded_mutations=excluded or [],
+        excluded_neighboring_mutations=excluded_neighboring or [],
     )
 
     # Invalidate cached price analysis
-    try:
-        r = get_redis()
-        r.delete(f"price_analysis_summary:{property_id}", f"price_analysis_full:{property_id}")
-    except Exception:
-        logger.debug("Failed to invalidate price analysis cache for property %s", property_id)
+    invalidate_tags(f"property:{property_id}")
 
-    return PriceAnalysisFullResponse(**_pa_to_full(pa, False))
+    return Response(content=_pa_full_body(pa, db), media_type="application/json")
 
 
 @router.post(
@@ -869,18 +1009,17 @@ async def exclude_sales(
         property_obj,
         db,
         locale,
-        excluded_sale_ids=body.excluded_sale_ids,
-        excluded_neighboring_sale_ids=body.excluded_neighboring_sale_ids,
+        # The client sends the sale ids it was served; they are stored as id_mutation
+        excluded_mutations=price_analysis_sales.mutations_for_ids(db, body.excluded_sale_ids),
+        excluded_neighboring_mutations=price_analysis_sales.mutations_for_ids(
+            db, body.excluded_neighboring_sale_ids
+        ),
     )
 
     # Invalidate cached price analysis
-    try:
-        r = get_redis()
-        r.delete(f"price_analysis_summary:{property_id}", f"price_analysis_full:{property_id}")
-    except Exception:
-        logger.debug("Failed to invalidate price analysis cache for property %s", property_id)
+    invalidate_tags(f"property:{property_id}")
 
-    return PriceAnalysisFullResponse(**_pa_to_full(pa, False))
+    return Response(content=_pa_full_body(pa, db), media_type="application/json")
 
 
 @router.get("/{property_id}/market-trend")
@@ -906,9 +1045,35 @@ async def get_market_trend(
             status_code=status.HTTP_404_NOT_FOUND, detail=translate("property_not_found", locale)
         )
 
-    # Try cached
-    pa = db.query(PriceAnalysis).filter(PriceAnalysis.property_id == property_obj.id).first()
-    if pa and pa.market_trend_json:
-        return pa.market_trend_json
+    # Stored trend: versioned by the analysis row. Only the timestamp is selected
+    # so unchanged data is answered with a 304 without loading the JSON.
+    row = (
+        db.query(PriceAnalysis.updated_at)
+        .filter(
+            PriceAnalysis.property_id == property_obj.id,
+            PriceAnalysis.market_trend_json.isnot(None),
+        )
+        .first()
+    )
+    if row is not None:
+        etag = make_etag("market-trend", property_obj.id, row.updated_at)
+        if is_not_modified(request, etag, row.updated_at):
+            return not_modified_response(etag, row.updated_at)
+        market_trend = (
+            db.query(cast(PriceAnalysis.market_trend_json, Text))
+            .filter(PriceAnalysis.property_id == property_obj.id)
+            .scalar()
+        )
+        return FastJSONResponse(
+            raw_json(market_trend), headers=validator_headers(etag, row.updated_at)
+        )
 
-    return _compute_market_trend_json(property_obj, db)
+    # Computed on the fly from DVF: versioned by the DVF generation and the property
+    etag = make_etag(
+        "market-trend", property_obj.id, property_obj.updated_at, get_dvf_generation(db)
+    )
+    if is_not_modified(request, etag):
+        return not_modified_response(etag)
+    return FastJSONResponse(
+        _compute_market_trend_json(property_obj, db), headers=validator_headers(etag)
+    )
@@ -3,18 +3,44 @@ Fault-tolerant Redis cache helpers.
 
 Redis down = cache miss, never an error. All operations are wrapped
 in try/except so callers never need to handle Redis failures.
+
+Two flavours of helpers are provided:
+- cache_get / cache_set store plain text values.
+- cache_get_obj / cache_set_obj and cache_get_bytes / cache_set_bytes store
+  binary payloads through a pluggable codec (orjson/msgpack/json, optionally
+  compressed with zstd or zlib). Use the bytes helpers to cache pre-encoded
+  response bodies that can be returned as-is on a hit.
+- @cached memoizes a function behind a Redis lock (stampede protection),
+  refreshes hot entries probabilistically before they expire and registers
+  each entry under tags so related entries can be dropped together with
+  invalidate_tags().
 """
 
+import asyncio
+import functools
+import inspect
+import json
 import logging
-from typing import Optional
+import math
+import random
+import struct
+import time
+import uuid
+import zlib
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Iterable, Optional, Union
 
+import msgpack
+import orjson
 import redis
+import zstandard
 
 from app.core.config import settings
 
 logger = logging.getLogger(__name__)
 
 _redis_client: Optional[redis.Redis] = None
+_redis_binary_client: Optional[redis.Redis] = None
 
 
 def get_redis() -> redis.Redis:
@@ -32,6 +58,21 @@ def get_redis() -> redis.Redis:
     return _redis_client
 
 
+def get_redis_binary() -> redis.Redis:
+    """Return a lazy singleton Redis client that returns raw bytes."""
+    global _redis_binary_client
+    if _redis_binary_client is None:
+        _redis_binary_client = redis.Redis(
+            host=settings.REDIS_HOST,
+            port=settings.REDIS_PORT,
+            db=settings.REDIS_DB,
+            decode_responses=False,
+            socket_connect_timeout=2,
+            socket_timeout=2,
+        )
+    return _redis_binary_client
+
+
 def cache_get(key: str) -> Optional[str]:
     """Get a value from Redis. Returns None on miss or error."""
     try:
@@ -47,3 +88,510 @@ def cache_set(key: str, value: str, ttl: int) -> None:
         get_redis().set(key, value, ex=ttl)
     except Exception:
         logger.warning("Redis cache_set failed for key=%s", key, exc_info=True)
+
+
+# =============================================================================
+# Codecs
+# =============================================================================
+
+
+class CacheCodec(ABC):
+    """Serializes Python values to bytes for storage in Redis."""
+
+    name: str = ""
+
+    @abstractmethod
+    def encode(self, value: Any) -> bytes:
+        """Encode a value to bytes."""
+        pass
+
+    @abstractmethod
+    def decode(self, data: bytes) -> Any:
+        """Decode bytes produced by encode()."""
+        pass
+
+
+class RawCodec(CacheCodec):
+    """Pass-through codec for values that are already bytes (e.g. response bodies)."""
+
+    name = "raw"
+
+    def encode(self, value: Any) -> bytes:
+        return value if isinstance(value, bytes) else bytes(value)
+
+    def decode(self, data: bytes) -> Any:
+        return data
+
+
+class JsonCodec(CacheCodec):
+    """Standard library JSON codec. Non-JSON types are stringified."""
+
+    name = "json"
+
+    def encode(self, value: Any) -> bytes:
+        return json.dumps(value, default=str, separators=(",", ":")).encode("utf-8")
+
+    def decode(self, data: bytes) -> Any:
+        return json.loads(data)
+
+
+class OrjsonCodec(CacheCodec):
+    """orjson codec — several times faster than json for large payloads."""
+
+    name = "orjson"
+
+    def encode(self, value: Any) -> bytes:
+        return orjson.dumps(value, default=str, option=orjson.OPT_NON_STR_KEYS)
+
+    def decode(self, data: bytes) -> Any:
+        return orjson.loads(data)
+
+
+class MsgpackCodec(CacheCodec):
+    """MessagePack codec — compact binary encoding."""
+
+    name = "msgpack"
+
+    def encode(self, value: Any) -> bytes:
+        return msgpack.packb(value, default=str, use_bin_type=True)
+
+    def decode(self, data: bytes) -> Any:
+        return msgpack.unpackb(data, raw=False, strict_map_key=False)
+
+
+# Single-byte frame header written by CompressedCodec
+_FRAME_PLAIN = b"\x00"
+_FRAME_ZLIB = b"\x01"
+_FRAME_ZSTD = b"\x02"
+
+
+class CompressedCodec(CacheCodec):
+    """
+    Wraps another codec and compresses payloads above a size threshold.
+
+    Compresses with zstd (or zlib). Each payload is prefixed with a one-byte
+    header so values written with either compressor (or none) can always be
+    decoded.
+    """
+
+    def __init__(
+        self, inner: CacheCodec, min_size: int = 1024, level: int = 3, compressor: str = "zstd"
+    ):
+        if compressor not in ("zstd", "zlib"):
+            raise ValueError(f"Unknown cache compressor: {compressor}")
+        self.inner = inner
+        self.min_size = min_size
+        self.level = level
+        self.compressor = compressor
+        self.name = f"{inner.name}+{compressor}"
+
+    def encode(self, value: Any) -> bytes:
+        payload = self.inner.encode(value)
+        if len(payload) < self.min_size:
+            return _FRAME_PLAIN + payload
+        if self.compressor == "zstd":
+            return _FRAME_ZSTD + zstandard.ZstdCompressor(level=self.level).compress(payload)
+        return _FRAME_ZLIB + zlib.compress(payload, self.level)
+
+    def decode(self, data: bytes) -> Any:
+        header, payload = data[:1], data[1:]
+        if header == _FRAME_PLAIN:
+            return self.inner.decode(payload)
+        if header == _FRAME_ZLIB:
+            return self.inner.decode(zlib.decompress(payload))
+        if header == _FRAME_ZSTD:
+            return self.inner.decode(zstandard.ZstdDecompressor().decompress(payload))
+        raise ValueError(f"Unknown cache frame header: {header!r}")
+
+
+_SERIALIZERS = {
+    "json": JsonCodec,
+    "orjson": OrjsonCodec,
+    "msgpack": MsgpackCodec,
+    "raw": RawCodec,
+}
+
+
+def get_codec(spec: str) -> CacheCodec:
+    """
+    Build a codec from a spec string such as "orjson", "msgpack+zstd" or "json+zlib".
+
+    A "+zstd" or "+zlib" suffix enables compression. Unknown serializers fall
+    back to stdlib json (with a warning).
+    """
+    name, _, compression = spec.strip().lower().partition("+")
+    codec_cls = _SERIALIZERS.get(name)
+    if codec_cls is None:
+        logger.warning("Unknown cache codec %s, falling back to json", name)
+        codec_cls = JsonCodec
+    codec: CacheCodec = codec_cls()
+    if compression:
+        codec = CompressedCodec(
+            codec, min_size=settings.CACHE_COMPRESS_MIN_BYTES, compressor=compression
+        )
+    return codec
+
+
+_default_codec: Optional[CacheCodec] = None
+_bytes_codec: Optional[CacheCodec] = None
+
+
+def get_default_codec() -> CacheCodec:
+    """Return the codec configured by CACHE_CODEC (lazy singleton)."""
+    global _default_codec
+    if _default_codec is None:
+        _default_codec = get_codec(settings.CACHE_CODEC)
+    return _default_codec
+
+
+def get_bytes_codec() -> CacheCodec:
+    """Codec for pre-encoded payloads: no serialization, compression only."""
+    global _bytes_codec
+    if _bytes_codec is None:
+        _bytes_codec = CompressedCodec(RawCodec(), min_size=settings.CACHE_COMPRESS_MIN_BYTES)
+    return _bytes_codec
+
+
+def cache_get_obj(key: str, codec: Optional[CacheCodec] = None) -> Optional[Any]:
+    """Get and decode a value. Returns None on miss, error or undecodable payload."""
+    codec = codec or get_default_codec()
+    try:
+        data = get_redis_binary().get(key)
+    except Exception:
+        logger.warning("Redis cache_get_obj failed for key=%s", key, exc_info=True)
+        return None
+    if data is None:
+        return None
+    try:
+        return codec.decode(data)
+    except Exception:
+        # Stale format (e.g. written by an older release) — treat as a miss
+        logger.warning("Cache decode failed for key=%s (codec=%s)", key, codec.name)
+        return None
+
+
+def cache_set_obj(key: str, value: Any, ttl: int, codec: Optional[CacheCodec] = None) -> None:
+    """Encode and store a value with a TTL (seconds). Silently ignores errors."""
+    codec = codec or get_default_codec()
+    try:
+        get_redis_binary().set(key, codec.encode(value), ex=ttl)
+    except Exception:
+        logger.warning("Redis cache_set_obj failed for key=%s", key, exc_info=True)
+
+
+def cache_get_bytes(key: str) -> Optional[bytes]:
+    """Get a pre-encoded payload (e.g. a JSON response body). Returns None on miss."""
+    return cache_get_obj(key, codec=get_bytes_codec())
+
+
+def cache_set_bytes(key: str, value: bytes, ttl: int) -> None:
+    """Store a pre-encoded payload, compressed when large. Silently ignores errors."""
+    cache_set_obj(key, value, ttl, codec=get_bytes_codec())
+
+
+# =============================================================================
+# Tags and generations
+# =============================================================================
+
+_TAG_PREFIX = "cache:tag:"
+_LOCK_PREFIX = "cache:lock:"
+_GENERATION_PREFIX = "cache:generation:"
+# Cached generations are re-read from the database this often
+GENERATION_TTL = 300
+
+
+def _tag_key(tag: str) -> str:
+    return f"{_TAG_PREFIX}{tag}"
+
+
+def invalidate_tags(*tags: str) -> int:
+    """
+    Delete every cache entry registered under any of the given tags.
+
+    Returns the number of entries deleted (0 when Redis is unavailable).
+    """
+    if not tags:
+        return 0
+    try:
+        r = get_redis_binary()
+        pipe = r.pipeline(transaction=True)
+        for tag in tags:
+            pipe.smembers(_tag_key(tag))
+            pipe.delete(_tag_key(tag))
+        results = pipe.execute()
+        members = set()
+        for tag_members in results[::2]:
+            members.update(tag_members or ())
+        return r.delete(*members) if members else 0
+    except Exception:
+        logger.warning("Redis invalidate_tags failed for tags=%s", tags, exc_info=True)
+        return 0
+
+
+def get_generation(name: str) -> Optional[int]:
+    """
+    Cached generation counter of a dataset (e.g. "dvf"), or None when it is not
+    cached or Redis is unavailable. The durable value lives in the database.
+    """
+    try:
+        value = get_redis_binary().get(f"{_GENERATION_PREFIX}{name}")
+        return int(value) if value is not None else None
+    except Exception:
+        logger.warning("Redis get_generation failed for name=%s", name, exc_info=True)
+        return None
+
+
+def set_generation(name: str, generation: int) -> None:
+    """
+    Cache a dataset's generation for GENERATION_TTL seconds, so a missed
+    update converges to the durable value. Silently ignores errors.
+    """
+    try:
+        get_redis_binary().set(f"{_GENERATION_PREFIX}{name}", generation, ex=GENERATION_TTL)
+    except Exception:
+        logger.warning("Redis set_generation failed for name=%s", name, exc_info=True)
+
+
+def publish_generation(name: str, generation: int) -> None:
+    """Mark a dataset as changed: cache its new generation and drop entries tagged with it."""
+    set_generation(name, generation)
+    invalidate_tags(name)
+
+
+# =============================================================================
+# @cached decorator
+# =============================================================================
+
+# Entry envelope: expiry timestamp and recompute duration, followed by the payload
+_ENVELOPE = struct.Struct("!dd")
+_LOCK_POLL_INTERVAL = 0.05
+# Sentinel for "Redis unavailable" (as opposed to a plain miss)
+_UNAVAILABLE = object()
+
+
+def _load_entry(key: str, codec: CacheCodec) -> Any:
+    """Return (value, expires_at, delta), None on miss, or _UNAVAILABLE on Redis errors."""
+    try:
+        data = get_redis_binary().get(key)
+    except Exception:
+        logger.warning("Redis cached lookup failed for key=%s", key, exc_info=True)
+        return _UNAVAILABLE
+    if data is None or len(data) < _ENVELOPE.size:
+        return None
+    try:
+        expires_at, delta = _ENVELOPE.unpack_from(data)
+        return codec.decode(data[_ENVELOPE.size :]), expires_at, delta
+    except Exception:
+        logger.warning("Cache decode failed for key=%s (codec=%s)", key, codec.name)
+        return None
+
+
+def _store_entry(
+    key: str, value: Any, ttl: int, delta: float, tag_keys: list[str], codec: CacheCodec
+) -> None:
+    """Store an entry and register it under its tags. Silently ignores errors."""
+    try:
+        data = _ENVELOPE.pack(time.time() + ttl, delta) + codec.encode(value)
+        r = get_redis_binary()
+        pipe = r.pipeline(transaction=True)
+        pipe.set(key, data, ex=ttl)
+        for tag_key in tag_keys:
+            pipe.sadd(tag_key, key)
+            pipe.ttl(tag_key)
+        results = pipe.execute()
+        # Tag sets must outlive their longest-lived member
+        short_lived = [
+            tag_key
+            for tag_key, tag_ttl in zip(tag_keys, results[2::2])
+            if tag_ttl is not None and tag_ttl < ttl
+        ]
+        if short_lived:
+            pipe = r.pipeline(transaction=False)
+            for tag_key in short_lived:
+                pipe.expire(tag_key, ttl)
+            pipe.execute()
+    except Exception:
+        logger.warning("Redis cached store failed for key=%s", key, exc_info=True)
+
+
+def _acquire_lock(key: str, timeout: float) -> Optional[str]:
+    """Try to take the recompute lock for a key. Returns a token, or None if held/failed."""
+    token = uuid.uuid4().hex
+    try:
+        if get_redis_binary().set(
+            f"{_LOCK_PREFIX}{key}", token, nx=True, px=max(1, int(timeout * 1000))
+        ):
+            return token
+    except Exception:
+        logger.warning("Redis lock acquisition failed for key=%s", key, exc_info=True)
+    return None
+
+
+# Compare-and-delete: a lock that expired and was taken by another caller is left alone
+_RELEASE_LOCK_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+
+def _release_lock(key: str, token: str) -> None:
+    try:
+        release = get_redis_binary().register_script(_RELEASE_LOCK_SCRIPT)
+        release(keys=[f"{_LOCK_PREFIX}{key}"], args=[token])
+    except Exception:
+        logger.warning("Redis lock release failed for key=%s", key, exc_info=True)
+
+
+def _should_refresh_early(expires_at: float, delta: float, beta: float) -> bool:
+    """
+    Probabilistic early expiration (XFetch): the closer an entry is to expiry and
+    the longer it took to compute, the likelier a reader is to refresh it early.
+    """
+    if beta <= 0 or delta <= 0:
+        return False
+    return time.time() - delta * beta * math.log(1.0 - random.random()) >= expires_at
+
+
+# Outcomes of a cached lookup: use the value, compute it (holding the lock
+# token, if any), or wait for the caller holding the lock
+_HIT = "hit"
+_COMPUTE = "compute"
+_WAIT = "wait"
+
+
+def _lookup(key: str, codec: CacheCodec, lock_timeout: float, beta: float) -> tuple[str, Any]:
+    """First lookup of a cached call: (_HIT, value), (_COMPUTE, token) or (_WAIT, None)."""
+    entry = _load_entry(key, codec)
+    if entry is _UNAVAILABLE:
+        return _COMPUTE, None
+    if entry is not None:
+        value, expires_at, delta = entry
+        if _should_refresh_early(expires_at, delta, beta):
+            token = _acquire_lock(key, lock_timeout)
+            if token:
+                return _COMPUTE, token
+        return _HIT, value
+
+    token = _acquire_lock(key, lock_timeout)
+    if token is None:
+        return _WAIT, None
+    # Another worker may have filled the entry between our miss and the lock
+    entry = _load_entry(key, codec)
+    if entry is not None and entry is not _UNAVAILABLE:
+        _release_lock(key, token)
+        return _HIT, entry[0]
+    return _COMPUTE, token
+
+
+def _poll(key: str, codec: CacheCodec, lock_timeout: float) -> tuple[str, Any]:
+    """Check again while another caller recomputes: same outcomes as _lookup()."""
+    entry = _load_entry(key, codec)
+    if entry is _UNAVAILABLE:
+        return _COMPUTE, None
+    if entry is not None:
+        return _HIT, entry[0]
+    token = _acquire_lock(key, lock_timeout)
+    return (_COMPUTE, token) if token else (_WAIT, None)
+
+
+def cached(
+    key: Union[str, Callable[..., str]],
+    ttl: int,
+    tags: Iterable[Union[str, Callable[..., str]]] = (),
+    codec: Optional[CacheCodec] = None,
+    lock_timeout: float = 10.0,
+    beta: float = 1.0,
+):
+    """
+    Memoize a function (sync or async) in Redis.
+
+    Args:
+        key: Cache key. Either a format string over the function's arguments
+            (e.g. "price_analysis_full:{property_obj.id}") or a callable that
+            receives the arguments as keyword arguments and returns the key.
+        ttl: Time to live in seconds.
+        tags: Tags to register the entry under (same format as key), e.g.
+            "property:{property_id}". Use invalidate_tags() to drop them.
+        codec: Codec for the value. Defaults to the CACHE_CODEC codec; use
+            get_bytes_codec() for pre-encoded response bodies.
+        lock_timeout: How long a recompute may hold the lock. Concurrent async
+            callers missing the same key wait up to this long for the result
+            instead of recomputing it themselves.
+        beta: Early refresh aggressiveness (0 disables early refresh).
+
+    Sync functions never wait for the lock, since they may be called from the
+    event loop: on contention they compute the value themselves.
+
+    None results are not cached. Redis failures degrade to calling the function.
+    """
+    tag_templates = list(tags)
+
+    def _render(template: Union[str, Callable[..., str]], arguments: dict) -> str:
+        return template(**arguments) if callable(template) else template.format(**arguments)
+
+    def decorator(func):
+        signature = inspect.signature(func)
+
+        def _resolve(args, kwargs) -> tuple[str, list[str]]:
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            arguments = dict(bound.arguments)
+            cache_key = _render(key, arguments)
+            tag_keys = [_tag_key(_render(tag, arguments)) for tag in tag_templates]
+            return cache_key, tag_keys
+
+        def _store(cache_key, tag_keys, value, started):
+            if value is not None:
+                delta = time.perf_counter() - started
+                _store_entry(cache_key, value, ttl, delta, tag_keys, codec or get_default_codec())
+
+        if inspect.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                cache_key, tag_keys = _resolve(args, kwargs)
+                entry_codec = codec or get_default_codec()
+
+                outcome, result = _lookup(cache_key, entry_codec, lock_timeout, beta)
+                deadline = time.monotonic() + lock_timeout
+                while outcome == _WAIT and time.monotonic() < deadline:
+                    await asyncio.sleep(_LOCK_POLL_INTERVAL)
+                    outcome, result = _poll(cache_key, entry_codec, lock_timeout)
+                if outcome == _HIT:
+                    return result
+
+                # Compute, holding the lock token if we got one
+                try:
+                    started = time.perf_counter()
+                    value = await func(*args, **kwargs)
+                    _store(cache_key, tag_keys, value, started)
+                    return value
+                finally:
+                    if result:
+                        _release_lock(cache_key, result)
+
+            return async_wrapper
+
+        @functools.wraps(func)
+        def sync_wrapper(*args, **kwargs):
+            cache_key, tag_keys = _resolve(args, kwargs)
+
+            outcome, result = _lookup(cache_key, codec or get_default_codec(), lock_timeout, beta)
+            if outcome == _HIT:
+                return result
+
+            # On contention (_WAIT) compute without the lock rather than block
+            try:
+                started = time.perf_counter()
+                value = func(*args, **kwargs)
+                _store(cache_key, tag_keys, value, started)
+                return value
+            finally:
+                if result:
+                    _release_lock(cache_key, result)
+
+        return sync_wrapper
+
+    return decorator
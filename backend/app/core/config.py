@@ -56,6 +56,37 @@ class Settings(BaseSettings):
         "GEMINI_IMAGE_MODEL", "gemini-2.5-flash-image"
     )  # For image generation
 
+    # LLM rate limiting, shared by every Gemini call (0 disables a limit)
+    LLM_RPM_LIMIT: int = int(os.getenv("LLM_RPM_LIMIT", "60"))
+    LLM_TPM_LIMIT: int = int(os.getenv("LLM_TPM_LIMIT", "1000000"))
+    LLM_MAX_CONCURRENCY: int = int(os.getenv("LLM_MAX_CONCURRENCY", "6"))
+    # local (per process) | redis (shared by all processes and instances)
+    LLM_RATE_LIMIT_BACKEND: str = os.getenv("LLM_RATE_LIMIT_BACKEND", "local")
+    # Seconds before one Gemini call is abandoned (then retried like a 503)
+    LLM_CALL_TIMEOUT: float = float(os.getenv("LLM_CALL_TIMEOUT", "180"))
+    # Keep-alive HTTP connections to Gemini per event loop
+    LLM_HTTP_POOL_SIZE: int = int(os.getenv("LLM_HTTP_POOL_SIZE", "10"))
+    # Seconds a whole Gemini call may take, retries and backoff included (0 = no deadline)
+    LLM_CALL_DEADLINE: float = float(os.getenv("LLM_CALL_DEADLINE", "300"))
+    # Duplicate small calls (classification, merges) still running past their p95 latency
+    LLM_HEDGING_ENABLED: bool = os.getenv("LLM_HEDGING_ENABLED", "true").lower() == "true"
+    LLM_HEDGE_MIN_SAMPLES: int = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+    # Consecutive transient failures opening a model's circuit breaker (0 = disabled),
+    # and seconds it stays open before a probe call
+    LLM_BREAKER_THRESHOLD: int = int(os.getenv("LLM_BREAKER_THRESHOLD", "5"))
+    LLM_BREAKER_COOLDOWN: float = float(os.getenv("LLM_BREAKER_COOLDOWN", "30"))
+    # Where PDFs are uploaded once and referenced by URI: auto | gemini | gcs | inline | local,
+    # and the size below which they are sent inline
+    LLM_FILE_BACKEND: str = os.getenv("LLM_FILE_BACKEND", "auto")
+    LLM_FILE_MIN_BYTES: int = int(os.getenv("LLM_FILE_MIN_BYTES", str(256 * 1024)))
+    # Batch mode for non-urgent requests: auto | gemini | local | none
+    LLM_BATCH_BACKEND: str = os.getenv("LLM_BATCH_BACKEND", "auto")
+    # Keyword classification is trusted from this confidence; otherwise Gemini sees the first pages
+    CLASSIFIER_MIN_CONFIDENCE: float = float(os.getenv("CLASSIFIER_MIN_CONFIDENCE", "0.6"))
+    CLASSIFIER_LLM_PAGES: int = int(os.getenv("CLASSIFIER_LLM_PAGES", "3"))
+    # Reuse analyses of identical files (keyed by SHA-256, prompt version, model, language)
+    LLM_ANALYSIS_CACHE_TTL: int = int(os.getenv("LLM_ANALYSIS_CACHE_TTL", str(30 * 24 * 3600)))
+
     # Anthropic (DEPRECATED - kept for backward compatibility)
     ANTHROPIC_API_KEY: str = os.getenv("ANTHROPIC_API_KEY", "")
     ANTHROPIC_MODEL: str = "claude-3-haiku-20240307"  # Deprecated
@@ -65,7 +96,15 @@ class Settings(BaseSettings):
     MAX_UPLOAD_SIZE: int = 30 * 1024 * 1024  # 30MB
     PDF_CHUNK_SIZE: int = (
         5 * 1024 * 1024
-    )  # 5MB — PDFs larger than this are split into page-based chunks
+    )  # 5MB — native PDF chunks sent to the LLM stay under this size
+    # Estimated input tokens per LLM call; larger documents are split into chunks
+    LLM_CHUNK_TOKEN_BUDGET: int = int(os.getenv("LLM_CHUNK_TOKEN_BUDGET", "60000"))
+    # Chunk results are merged as a tree: at most this many results and tokens per merge call
+    LLM_MERGE_FAN_IN: int = int(os.getenv("LLM_MERGE_FAN_IN", "4"))
+    LLM_MERGE_TOKEN_BUDGET: int = int(os.getenv("LLM_MERGE_TOKEN_BUDGET", "24000"))
+    # Worker processes for PyMuPDF work (text extraction, splitting, rendering); 0 = threads
+    PDF_POOL_WORKERS: int = int(os.getenv("PDF_POOL_WORKERS", str(min(4, os.cpu_count() or 1))))
+    PDF_POOL_MAX_TASKS_PER_CHILD: int = int(os.getenv("PDF_POOL_MAX_TASKS_PER_CHILD", "200"))
     ALLOWED_EXTENSIONS: List[str] = [
         ".pdf",
         ".png",
@@ -94,6 +133,30 @@ class Settings(BaseSettings):
     REDIS_PORT: int = int(os.getenv("REDIS_PORT", "6379"))
     REDIS_DB: int = int(os.getenv("REDIS_DB", "0"))
     CACHE_TTL: int = 3600  # 1 hour cache TTL
+    # Codec for binary cache entries: json | orjson | msgpack, "+zstd" enables compression
+    CACHE_CODEC: str = os.getenv("CACHE_CODEC", "orjson+zstd")
+    CACHE_COMPRESS_MIN_BYTES: int = int(os.getenv("CACHE_COMPRESS_MIN_BYTES", "1024"))
+
+    # Background job queue (processing_jobs table)
+    # Run a worker inside each API process; disable when using scripts/run_worker.py only
+    JOB_WORKER_ENABLED: bool = os.getenv("JOB_WORKER_ENABLED", "true").lower() == "true"
+    JOB_WORKER_CONCURRENCY: int = int(os.getenv("JOB_WORKER_CONCURRENCY", "2"))
+    JOB_LEASE_SECONDS: int = int(os.getenv("JOB_LEASE_SECONDS", "120"))  # Visibility timeout
+    JOB_MAX_ATTEMPTS: int = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+    JOB_RETRY_BACKOFF_SECONDS: int = int(os.getenv("JOB_RETRY_BACKOFF_SECONDS", "30"))
+    JOB_POLL_INTERVAL: float = float(os.getenv("JOB_POLL_INTERVAL", "2"))
+    # Overall synthesis runs once changes stop arriving for this long (at most the max delay)
+    SYNTHESIS_DEBOUNCE_SECONDS: int = int(os.getenv("SYNTHESIS_DEBOUNCE_SECONDS", "10"))
+    SYNTHESIS_MAX_DELAY_SECONDS: int = int(os.getenv("SYNTHESIS_MAX_DELAY_SECONDS", "60"))
+    # Bulk progress events (Redis pub/sub): replay log lifetime and SSE keepalive interval
+    BULK_EVENTS_TTL: int = int(os.getenv("BULK_EVENTS_TTL", str(6 * 3600)))
+    BULK_EVENTS_KEEPALIVE: float = float(os.getenv("BULK_EVENTS_KEEPALIVE", "15"))
+    # Bulk uploads of at least this many documents are analyzed by a low-priority LLM batch
+    # job instead of interactive calls (0 = never), polled every BULK_BATCH_POLL_SECONDS
+    BULK_BATCH_MIN_DOCUMENTS: int = int(os.getenv("BULK_BATCH_MIN_DOCUMENTS", "0"))
+    BULK_BATCH_POLL_SECONDS: int = int(os.getenv("BULK_BATCH_POLL_SECONDS", "60"))
+    # Files of a bulk upload streamed to storage at once
+    BULK_UPLOAD_CONCURRENCY: int = int(os.getenv("BULK_UPLOAD_CONCURRENCY", "4"))
 
     # Storage Backend Configuration
     # Options: 'minio' (default for local), 'gcs' (for GCP production)
@@ -0,0 +1,86 @@
+"""
+HTTP conditional request helpers (ETag / Last-Modified / 304 Not Modified).
+
+Endpoints derive a validator from a cheap version marker (a row's updated_at,
+a dataset generation) and check it before loading or serializing the payload:
+
+    etag = make_etag("price-analysis", property_id, pa_updated_at)
+    if is_not_modified(request, etag, pa_updated_at):
+        return not_modified_response(etag, pa_updated_at)
+    ...
+    return Response(content=body, headers=validator_headers(etag, pa_updated_at))
+"""
+
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Optional
+
+from fastapi import Request, Response, status
+
+# Clients may store responses but must revalidate them on every use
+CACHE_CONTROL = "private, no-cache"
+
+
+def make_etag(*parts: Any) -> str:
+    """Build a weak ETag from version markers (ids, timestamps, generations)."""
+    raw = "|".join(p.isoformat() if isinstance(p, datetime) else str(p) for p in parts)
+    return f'W/"{hashlib.sha1(raw.encode()).hexdigest()[:20]}"'
+
+
+def _as_utc(dt: datetime) -> datetime:
+    """Database timestamps are naive UTC; make them timezone-aware."""
+    if dt.tzinfo is None:
+        return dt.replace(tzinfo=timezone.utc)
+    return dt.astimezone(timezone.utc)
+
+
+def format_http_date(dt: datetime) -> str:
+    """Format a datetime as an RFC 7231 HTTP date."""
+    return format_datetime(_as_utc(dt), usegmt=True)
+
+
+def _opaque_tag(etag: str) -> str:
+    """Strip the weak prefix — If-None-Match uses weak comparison."""
+    etag = etag.strip()
+    return etag[2:] if etag.startswith("W/") else etag
+
+
+def is_not_modified(request: Request, etag: str, last_modified: Optional[datetime] = None) -> bool:
+    """
+    Check conditional request headers against the current validators.
+
+    If-None-Match takes precedence over If-Modified-Since (RFC 7232 §6).
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        candidates = [c.strip() for c in if_none_match.split(",")]
+        return "*" in candidates or _opaque_tag(etag) in {_opaque_tag(c) for c in candidates}
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if last_modified is None or not if_modified_since:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    # HTTP dates have second precision
+    return _as_utc(last_modified).replace(microsecond=0) <= since
+
+
+def validator_headers(etag: str, last_modified: Optional[datetime] = None) -> dict[str, str]:
+    """Response headers carrying the validators for a cacheable response."""
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    if last_modified is not None:
+        headers["Last-Modified"] = format_http_date(last_modified)
+    return headers
+
+
+def not_modified_response(etag: str, last_modified: Optional[datetime] = None) -> Response:
+    """Empty 304 response repeating the validators."""
+    return Response(
+        status_code=status.HTTP_304_NOT_MODIFIED,
+        headers=validator_headers(etag, last_modified),
+    )
@@ -0,0 +1,55 @@
+"""
+Fast JSON responses.
+
+FastJSONResponse serializes with orjson and is the application's default
+response class. raw_json() embeds JSON the server already produced and stored
+(e.g. a JSON column read as text) without parsing and re-encoding it.
+"""
+
+import datetime
+import decimal
+from typing import Any
+
+import orjson
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+
+def _default(obj: Any) -> Any:
+    """Serialize types orjson does not handle natively."""
+    if isinstance(obj, BaseModel):
+        return obj.model_dump(mode="json")
+    if isinstance(obj, decimal.Decimal):
+        return float(obj)
+    if isinstance(obj, (datetime.datetime, datetime.date, datetime.time)):
+        return obj.isoformat()
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def json_dumps(content: Any) -> bytes:
+    """Encode content to compact UTF-8 JSON bytes."""
+    return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+def raw_json(text: Any) -> Any:
+    """
+    Wrap already-serialized JSON for embedding in a FastJSONResponse.
+
+    The text is copied into the output as-is (orjson.Fragment). SQL NULL,
+    empty text and JSON null all become None; already-decoded values are
+    returned unchanged.
+    """
+    if not isinstance(text, (str, bytes)):
+        return text
+    if not text or text in ("null", b"null"):
+        return None
+    return orjson.Fragment(text)
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson."""
+
+    def render(self, content: Any) -> bytes:
+        return json_dumps(content)
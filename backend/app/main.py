@@ -2,16 +2,30 @@
 Main FastAPI application entry point for AppArt Agent.
 """
 
+import asyncio
 import logging
 import os
+from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 
-from app.api import analysis, documents, feedback, photos, properties, reports, users, webhooks
+from app.api import (
+    admin,
+    analysis,
+    documents,
+    feedback,
+    photos,
+    properties,
+    reports,
+    users,
+    webhooks,
+)
 from app.core.config import settings
 from app.core.logging import instrument_fastapi, setup_logfire, setup_logging
+from app.core.responses import FastJSONResponse
+from app.prompts import load_prompts
 
 # Initialize logging
 setup_logging(settings.LOG_LEVEL)
@@ -22,6 +36,33 @@ setup_logfire(
     service_name="appart-agent-backend", environment=settings.ENVIRONMENT, enable_console=True
 )
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start the embedded job worker with the app; stop it, the PDF pool and LLM connections on shutdown."""
+    # A malformed prompt template stops the app here rather than on its first use
+    load_prompts()
+
+    worker = None
+    if settings.JOB_WORKER_ENABLED:
+        from app.services.jobs import get_job_worker
+
+        worker = get_job_worker()
+        worker.start_in_background()
+    yield
+    if worker is not None:
+        # Jobs still running after the grace period are released to other workers
+        await asyncio.to_thread(worker.shutdown)
+
+    from app.services.documents.pdf_pool import shutdown_pdf_pool
+
+    await asyncio.to_thread(shutdown_pdf_pool)
+
+    from app.services.ai.llm_gateway import get_llm_gateway
+
+    await get_llm_gateway().aclose()
+
+
 # Create FastAPI app
 app = FastAPI(
     title="AppArt Agent API",
@@ -29,6 +70,8 @@ app = FastAPI(
     version="2.0.0",
     docs_url="/docs",
     redoc_url="/redoc",
+    default_response_class=FastJSONResponse,
+    lifespan=lifespan,
 )
 
 # Instrument FastAPI app with Logfire
@@ -77,6 +120,7 @@ app.include_router(photos.router, prefix="/api/photos", tags=["photos"])
 app.include_router(webhooks.router, prefix="/api/webhooks", tags=["webhooks"])
 app.include_router(feedback.router, prefix="/api/feedback", tags=["feedback"])
 app.include_router(reports.router, prefix="/api/properties", tags=["reports"])
+app.include_router(admin.router, prefix="/api/admin", tags=["admin"])
 
 
 @app.get("/")
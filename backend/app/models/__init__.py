@@ -2,8 +2,22 @@
 
 from app.models.analysis import Analysis
 from app.models.document import Document
-from app.models.price_analysis import PriceAnalysis
-from app.models.property import DVFSale, DVFSaleLot, Property
+from app.models.job import ProcessingJob
+from app.models.llm_usage import LLMCallRecord
+from app.models.price_analysis import PriceAnalysis, PriceAnalysisSale
+from app.models.property import DatasetGeneration, DVFSale, DVFSaleLot, Property
 from app.models.user import User
 
-__all__ = ["User", "Property", "DVFSale", "DVFSaleLot", "Document", "Analysis", "PriceAnalysis"]
+__all__ = [
+    "User",
+    "Property",
+    "DVFSale",
+    "DVFSaleLot",
+    "DatasetGeneration",
+    "Document",
+    "Analysis",
+    "PriceAnalysis",
+    "PriceAnalysisSale",
+    "ProcessingJob",
+    "LLMCallRecord",
+]
@@ -110,6 +110,8 @@ class DocumentSummary(Base):
 
     # Full synthesis data from AI analysis
     synthesis_data = Column(JSON, nullable=True)
+    # Documents the synthesis covers, for incremental updates (see documents/synthesis.py)
+    synthesis_state = Column(JSON, nullable=True)
 
     # Timestamps
     created_at = Column(DateTime, default=datetime.utcnow)
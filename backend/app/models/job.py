@@ -0,0 +1,40 @@
+"""Background job queue model."""
+
+from datetime import datetime
+
+from sqlalchemy import JSON, Column, DateTime, Index, Integer, String, Text
+
+from app.core.database import Base
+
+
+class ProcessingJob(Base):
+    """
+    A unit of background work stored in Postgres.
+
+    Workers claim jobs with SELECT ... FOR UPDATE SKIP LOCKED and hold a lease
+    (locked_until) that they extend while the job runs. A running job whose
+    lease expired belongs to a dead worker and is claimed again.
+    """
+
+    __tablename__ = "processing_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String(50), nullable=False)  # Handler name, e.g. "bulk_upload"
+    payload = Column(JSON, nullable=False)
+    # queued | running | succeeded | failed
+    status = Column(String(20), nullable=False, default="queued")
+    priority = Column(Integer, nullable=False, default=0)  # Higher runs first
+
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=3)
+    run_at = Column(DateTime, nullable=False, default=datetime.utcnow)  # Not before
+
+    locked_by = Column(String(100), nullable=True)  # Worker id holding the lease
+    locked_until = Column(DateTime, nullable=True)  # Lease expiry (visibility timeout)
+    last_error = Column(Text, nullable=True)
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (Index("ix_processing_jobs_claim", "status", "run_at"),)
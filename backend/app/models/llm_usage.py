@@ -0,0 +1,37 @@
+"""LLM call usage model."""
+
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Float, ForeignKey, Integer, String
+
+from app.core.database import Base
+
+
+class LLMCallRecord(Base):
+    """
+    One Gemini call of the document pipeline: tokens, latency, retries and
+    estimated cost, for aggregation by document, workflow, operation
+    (prompt) and document category.
+    """
+
+    __tablename__ = "llm_calls"
+
+    id = Column(Integer, primary_key=True, index=True)
+    document_id = Column(
+        Integer, ForeignKey("documents.id", ondelete="SET NULL"), nullable=True, index=True
+    )  # None for workflow-level calls (synthesis)
+    workflow_id = Column(String, nullable=True, index=True)
+    document_category = Column(String, nullable=True)
+
+    operation = Column(String(50), nullable=False)  # classify, analyze, merge, synthesis, parse...
+    model = Column(String, nullable=False)
+    input_tokens = Column(Integer, nullable=False, default=0)
+    output_tokens = Column(Integer, nullable=False, default=0)
+    thinking_tokens = Column(Integer, nullable=False, default=0)
+    latency_ms = Column(Integer, nullable=False, default=0)
+    attempts = Column(Integer, nullable=False, default=1)
+    hedged = Column(Integer, nullable=False, default=0)
+    cost_usd = Column(Float, nullable=False, default=0.0)
+    error = Column(String(100), nullable=True)
+
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
@@ -2,7 +2,17 @@
 
 from datetime import datetime
 
-from sqlalchemy import Column, DateTime, Float, ForeignKey, Integer, String
+from sqlalchemy import (
+    Boolean,
+    Column,
+    DateTime,
+    Float,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    UniqueConstraint,
+)
 from sqlalchemy.dialects.postgresql import JSON
 from sqlalchemy.orm import relationship
 
@@ -39,18 +49,54 @@ class PriceAnalysis(Base):
     trend_source = Column(String)
     trend_sample_size = Column(Integer)
 
-    # JSON blobs for full data
-    comparable_sales_json = Column(JSON)
+    # JSON blobs for full data (comparable / neighboring sales live in price_analysis_sales)
     trend_projection_json = Column(JSON)
     market_trend_json = Column(JSON)
 
-    # User exclusions
-    excluded_sale_ids = Column(JSON, default=list)
-    excluded_neighboring_sale_ids = Column(JSON, default=list)
+    # User exclusions, as DVF id_mutation (dvf_sales.id changes on every re-import)
+    excluded_sale_mutations = Column(JSON, default=list)
+    excluded_neighboring_sale_mutations = Column(JSON, default=list)
+
+    # DVF cache generation the analysis was computed against (stale once re-imported)
+    dvf_generation = Column(Integer, nullable=False, default=0, server_default="0")
 
     # Timestamps
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
-    # Relationship
+    # Relationships
     property = relationship("Property", back_populates="price_analysis")
+    sales = relationship(
+        "PriceAnalysisSale",
+        back_populates="price_analysis",
+        cascade="all, delete-orphan",
+        passive_deletes=True,
+    )
+
+
+class PriceAnalysisSale(Base):
+    """
+    A DVF sale used by a price analysis, stored as a reference plus its flags.
+
+    kind is "comparable" (sales priced against the property) or "neighboring"
+    (sales used for the postal code trend). Sale details are read from dvf_sales
+    by id_mutation, which survives DVF re-imports (dvf_sales.id does not).
+    """
+
+    __tablename__ = "price_analysis_sales"
+    __table_args__ = (
+        UniqueConstraint("price_analysis_id", "kind", "id_mutation", name="uq_price_analysis_sale"),
+        Index("ix_price_analysis_sales_analysis_kind", "price_analysis_id", "kind", "position"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    price_analysis_id = Column(
+        Integer, ForeignKey("price_analyses.id", ondelete="CASCADE"), nullable=False
+    )
+    # No FK: dvf_sales is truncated and reloaded by the DVF import
+    id_mutation = Column(String, nullable=False)
+    kind = Column(String(20), nullable=False)
+    position = Column(Integer, nullable=False)  # Order returned by the DVF query
+    is_outlier = Column(Boolean, nullable=False, default=False)
+
+    price_analysis = relationship("PriceAnalysis", back_populates="sales")
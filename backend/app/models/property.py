@@ -170,3 +170,17 @@ class DVFSaleLot(Base):
 
     # Relationship
     sale = relationship("DVFSale", back_populates="lots")
+
+
+class DatasetGeneration(Base):
+    """
+    Import counter of a dataset (e.g. "dvf"), bumped by its import script in
+    the same transaction as the data. Analyses computed against an older
+    generation are stale. Redis only caches the value.
+    """
+
+    __tablename__ = "dataset_generations"
+
+    name = Column(String(50), primary_key=True)
+    generation = Column(Integer, nullable=False, default=0)
+    imported_at = Column(DateTime, default=datetime.utcnow)
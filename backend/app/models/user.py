@@ -3,8 +3,8 @@
 import uuid as uuid_lib
 from datetime import datetime
 
-from sqlalchemy import Boolean, Column, DateTime, ForeignKey, Integer, String, Table
-from sqlalchemy.orm import relationship
+from sqlalchemy import Boolean, Column, DateTime, ForeignKey, Integer, String, Table, func
+from sqlalchemy.orm import Session, relationship
 
 from app.core.database import Base
 
@@ -45,3 +45,16 @@ class User(Base):
     # Relationships
     properties = relationship("Property", back_populates="user", cascade="all, delete-orphan")
     documents = relationship("Document", back_populates="user", cascade="all, delete-orphan")
+
+
+def increment_documents_analyzed(db: Session, user_id: int, count: int = 1) -> None:
+    """
+    Add to a user's analyzed documents count in one UPDATE.
+
+    The increment runs in the database, so concurrent sessions (documents of
+    a bulk upload saved in parallel) never overwrite each other's count.
+    """
+    db.query(User).filter(User.id == user_id).update(
+        {User.documents_analyzed_count: func.coalesce(User.documents_analyzed_count, 0) + count},
+        synchronize_session=False,
+    )
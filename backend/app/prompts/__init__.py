@@ -4,18 +4,29 @@ Prompts management module for the AppArt Agent.
 This module provides versioned prompts for all LLM interactions.
 Each prompt is stored as a markdown file for better readability and maintainability.
 
+Templates are loaded once into a registry: front matter stripped, placeholders
+parsed and checked, and a version hash computed from the file (used to key
+cached LLM results). Rendering joins the precompiled pieces; a missing
+variable raises PromptError instead of sending a placeholder to the model.
+load_prompts() validates every template at startup.
+
 Usage:
     from app.prompts import get_prompt, get_system_prompt
 
     # Get a specific prompt
-    prompt = get_prompt("analyze_pvag", version="v1")
+    prompt = get_prompt("analyze_pvag", version="v1", document_text="...")
 
     # Get system prompt for a task
-    system_prompt = get_system_prompt("document_classifier", version="v1")
+    system_prompt = get_system_prompt("synthesis", output_language="French")
 """
 
+import hashlib
 import logging
+import threading
+from dataclasses import dataclass
 from pathlib import Path
+from string import Formatter
+from typing import Dict, FrozenSet, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
@@ -23,9 +34,130 @@ PROMPTS_DIR = Path(__file__).parent
 DEFAULT_VERSION = "v1"
 
 
+class PromptError(ValueError):
+    """A malformed prompt template, or a prompt rendered without its variables."""
+
+
+@dataclass(frozen=True)
+class PromptTemplate:
+    """A parsed prompt template."""
+
+    name: str
+    version: str  # e.g. "v1:3f2a9c1b7e04", changes when the file is edited
+    text: str  # Template body, front matter removed
+    variables: FrozenSet[str]
+    # (literal text, variable or None) pairs, rendered in order
+    segments: Tuple[Tuple[str, Optional[str]], ...]
+
+    @classmethod
+    def parse(cls, name: str, content: str, version: str) -> "PromptTemplate":
+        # Remove front matter if present (lines between --- markers)
+        text = content
+        if text.startswith("---"):
+            parts = text.split("---", 2)
+            if len(parts) >= 3:
+                text = parts[2].strip()
+
+        try:
+            parsed = list(Formatter().parse(text))
+        except ValueError as e:
+            raise PromptError(f"Malformed prompt {name}: {e}") from e
+        segments = []
+        for literal, field, format_spec, conversion in parsed:
+            if field is not None and (
+                not field.isidentifier() or format_spec or conversion is not None
+            ):
+                raise PromptError(
+                    f"Malformed placeholder {{{field}}} in prompt {name} "
+                    "(escape literal braces as {{ and }})"
+                )
+            segments.append((literal, field))
+        variables = frozenset(field for _, field in segments if field is not None)
+        return cls(name, version, text, variables, tuple(segments))
+
+    def render(self, **kwargs) -> str:
+        """The prompt with its variables filled in (extra ones are ignored)."""
+        missing = self.variables.difference(kwargs)
+        if missing:
+            raise PromptError(f"Missing variables for prompt {self.name}: {sorted(missing)}")
+        return "".join(
+            literal if field is None else f"{literal}{kwargs[field]}"
+            for literal, field in self.segments
+        )
+
+
+class PromptRegistry:
+    """Parsed templates by version and name, each file read once (thread-safe)."""
+
+    def __init__(self, prompts_dir: Path = PROMPTS_DIR):
+        self.prompts_dir = prompts_dir
+        self._templates: Dict[Tuple[str, str], PromptTemplate] = {}
+        self._lock = threading.Lock()
+
+    def _path(self, prompt_name: str, version: str) -> Path:
+        """Resolve a prompt file, falling back to shared prompts."""
+        prompt_path = self.prompts_dir / version / f"{prompt_name}.md"
+
+        if not prompt_path.exists():
+            # Try shared prompts
+            prompt_path = self.prompts_dir / "shared" / f"{prompt_name}.md"
+
+        if not prompt_path.exists():
+            raise FileNotFoundError(f"Prompt not found: {prompt_name} (version: {version})")
+
+        return prompt_path
+
+    def _load(self, prompt_name: str, path: Path, version: str) -> PromptTemplate:
+        content = path.read_bytes()
+        template = PromptTemplate.parse(
+            prompt_name,
+            content.decode("utf-8"),
+            f"{version}:{hashlib.sha256(content).hexdigest()[:12]}",
+        )
+        with self._lock:
+            return self._templates.setdefault((version, prompt_name), template)
+
+    def get(self, prompt_name: str, version: str = DEFAULT_VERSION) -> PromptTemplate:
+        template = self._templates.get((version, prompt_name))
+        if template is None:
+            template = self._load(prompt_name, self._path(prompt_name, version), version)
+        return template
+
+    def load_all(self, version: str = DEFAULT_VERSION) -> Dict[str, PromptTemplate]:
+        """Parse every template of a version (and the shared ones)."""
+        templates = {}
+        for directory in (self.prompts_dir / "shared", self.prompts_dir / version):
+            for path in sorted(directory.glob("*.md")):
+                if not path.name.startswith("_"):
+                    templates[path.stem] = self._load(path.stem, path, version)
+        if not templates:
+            raise PromptError(f"No prompts found for version {version}")
+        return templates
+
+
+_registry = PromptRegistry()
+
+
+def load_prompts(version: str = DEFAULT_VERSION) -> Dict[str, PromptTemplate]:
+    """
+    Load and validate every prompt of a version at startup.
+
+    Raises PromptError on a malformed template, so a bad edit stops the
+    process before any LLM call.
+    """
+    templates = _registry.load_all(version)
+    logger.info(f"Loaded {len(templates)} prompts ({version})")
+    return templates
+
+
+def get_template(prompt_name: str, version: str = DEFAULT_VERSION) -> PromptTemplate:
+    """The parsed template of a prompt."""
+    return _registry.get(prompt_name, version)
+
+
 def get_prompt(prompt_name: str, version: str = DEFAULT_VERSION, **kwargs) -> str:
     """
-    Load and format a prompt from the prompts directory.
+    Render a prompt from the prompts directory.
 
     Args:
         prompt_name: Name of the prompt file (without extension)
@@ -35,51 +167,40 @@ def get_prompt(prompt_name: str, version: str = DEFAULT_VERSION, **kwargs) -> st
     Returns:
         Formatted prompt string
 
+    Raises:
+        PromptError: If a variable of the template is missing
+
     Example:
         prompt = get_prompt("analyze_pvag", version="v1", document_text="...")
     """
-    prompt_path = PROMPTS_DIR / version / f"{prompt_name}.md"
-
-    if not prompt_path.exists():
-        # Try shared prompts
-        prompt_path = PROMPTS_DIR / "shared" / f"{prompt_name}.md"
-
-    if not prompt_path.exists():
-        raise FileNotFoundError(f"Prompt not found: {prompt_name} (version: {version})")
+    return _registry.get(prompt_name, version).render(**kwargs)
 
-    with open(prompt_path, "r", encoding="utf-8") as f:
-        prompt_content = f.read()
 
-    # Remove front matter if present (lines between --- markers)
-    if prompt_content.startswith("---"):
-        parts = prompt_content.split("---", 2)
-        if len(parts) >= 3:
-            prompt_content = parts[2].strip()
-
-    # Format with provided variables
-    if kwargs:
-        try:
-            prompt_content = prompt_content.format(**kwargs)
-        except KeyError as e:
-            logger.warning(f"Missing variable in prompt {prompt_name}: {e}")
+def get_prompt_version(prompt_name: str, version: str = DEFAULT_VERSION) -> str:
+    """
+    Identify the exact template of a prompt, e.g. "v1:3f2a9c1b7e04".
 
-    return prompt_content
+    Combines the version folder with a hash of the file, so editing a prompt
+    in place changes its version (used to key cached LLM results).
+    """
+    return _registry.get(prompt_name, version).version
 
 
-def get_system_prompt(prompt_name: str, version: str = DEFAULT_VERSION) -> str:
+def get_system_prompt(prompt_name: str, version: str = DEFAULT_VERSION, **kwargs) -> str:
     """
-    Load a system prompt from the prompts directory.
+    Render a system prompt from the prompts directory.
 
     System prompts are prefixed with 'system_' in the filename.
 
     Args:
         prompt_name: Name of the system prompt (without 'system_' prefix)
         version: Version folder
+        **kwargs: Variables to format into the prompt
 
     Returns:
         System prompt string
     """
-    return get_prompt(f"system_{prompt_name}", version=version)
+    return get_prompt(f"system_{prompt_name}", version=version, **kwargs)
 
 
 def list_prompts(version: str = DEFAULT_VERSION) -> list[str]:
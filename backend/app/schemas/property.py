@@ -204,11 +204,23 @@ class PriceAnalysisFullResponse(PriceAnalysisSummaryResponse):
     projected_price_per_sqm: Optional[float] = None
     trend_source: Optional[str] = None
     trend_sample_size: Optional[int] = None
-    comparable_sales: Optional[list] = None
     trend_projection: Optional[dict] = None
     market_trend: Optional[dict] = None
     excluded_sale_ids: List[int] = []
     excluded_neighboring_sale_ids: List[int] = []
+    # Sale details are paginated by /price-analysis/sales
+    comparable_sales_count: int = 0
+    neighboring_sales_count: int = 0
 
     class Config:
         from_attributes = True
+
+
+class PriceAnalysisSalesPageResponse(BaseModel):
+    """One page of comparable or neighboring sales of a price analysis."""
+
+    kind: str
+    items: list[dict] = []
+    total: int = 0
+    page: int = 1
+    page_size: int = 50
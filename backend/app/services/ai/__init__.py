@@ -5,6 +5,7 @@ Provides AI-powered functionality using Google Gemini:
 - Document analysis and classification
 - Image generation and redesign
 - Document processing and synthesis
+- Shared LLM gateway: pooled clients, retries, rate limiting and metrics
 """
 
 from app.services.ai.document_analyzer import (
@@ -19,6 +20,16 @@ from app.services.ai.image_generator import (
     ImageGenerator,
     get_image_generator,
 )
+from app.services.ai.llm_gateway import (
+    LLMGateway,
+    LLMTimeoutError,
+    LLMUnavailableError,
+    get_llm_gateway,
+)
+from app.services.ai.rate_limiter import (
+    LLMRateLimiter,
+    get_rate_limiter,
+)
 
 __all__ = [
     "DocumentAnalyzer",
@@ -27,4 +38,10 @@ __all__ = [
     "get_image_generator",
     "DocumentProcessor",
     "get_document_processor",
+    "LLMGateway",
+    "LLMTimeoutError",
+    "LLMUnavailableError",
+    "get_llm_gateway",
+    "LLMRateLimiter",
+    "get_rate_limiter",
 ]
@@ -0,0 +1,96 @@
+"""
+Analysis cache - LLM results keyed by document content.
+
+The same PV d'AG or diagnostic is often uploaded for several properties of a
+copropriété. Results are cached in Redis under the document's SHA-256
+(Document.file_hash) together with everything that shapes the LLM output:
+
+- classification: (file_hash, classification prompt version, model)
+- analysis: (file_hash, prompt name + version, model, output language,
+  prompt variant such as the diagnostic type)
+
+Prompt versions include a hash of the template (get_prompt_version), so
+editing a prompt invalidates its entries. Like every cache helper, a Redis
+outage only means a miss.
+"""
+
+import logging
+from typing import Any, Dict, Optional
+
+from app.core.cache import cache_get_obj, cache_set_obj
+from app.core.config import settings
+from app.prompts import get_prompt_version
+
+logger = logging.getLogger(__name__)
+
+_PREFIX = "llm_analysis"
+
+
+def classification_key(file_hash: str, prompt_name: str, model: str) -> str:
+    """Cache key for the category of a document."""
+    return f"{_PREFIX}:classify:{file_hash}:{prompt_name}@{get_prompt_version(prompt_name)}:{model}"
+
+
+def analysis_key(
+    file_hash: str,
+    prompt_name: str,
+    model: str,
+    output_language: str,
+    variant: str = "",
+) -> str:
+    """Cache key for the structured analysis of a document."""
+    return (
+        f"{_PREFIX}:analysis:{file_hash}:{prompt_name}@{get_prompt_version(prompt_name)}"
+        f":{model}:{output_language}:{variant}"
+    )
+
+
+def get_cached_classification(file_hash: Optional[str], prompt_name: str, model: str):
+    """Previously computed category for this content, or None."""
+    if not file_hash:
+        return None
+    category = cache_get_obj(classification_key(file_hash, prompt_name, model))
+    if category is not None:
+        logger.info(f"Classification cache hit for {file_hash[:12]}: {category}")
+    return category
+
+
+def store_classification(file_hash: Optional[str], prompt_name: str, model: str, category: str):
+    if file_hash:
+        cache_set_obj(
+            classification_key(file_hash, prompt_name, model),
+            category,
+            settings.LLM_ANALYSIS_CACHE_TTL,
+        )
+
+
+def get_cached_analysis(
+    file_hash: Optional[str],
+    prompt_name: str,
+    model: str,
+    output_language: str,
+    variant: str = "",
+) -> Optional[Dict[str, Any]]:
+    """Previously computed analysis for this content, or None."""
+    if not file_hash:
+        return None
+    analysis = cache_get_obj(analysis_key(file_hash, prompt_name, model, output_language, variant))
+    if analysis is not None:
+        logger.info(f"Analysis cache hit for {file_hash[:12]} ({prompt_name})")
+    return analysis
+
+
+def store_analysis(
+    file_hash: Optional[str],
+    prompt_name: str,
+    model: str,
+    output_language: str,
+    analysis: Dict[str, Any],
+    variant: str = "",
+) -> None:
+    if file_hash and analysis:
+        cache_set_obj(
+            analysis_key(file_hash, prompt_name, model, output_language, variant),
+            analysis,
+            settings.LLM_ANALYSIS_CACHE_TTL,
+        )
@@ -11,11 +11,16 @@ import logging
 import time
 from typing import Any, Dict, List, Optional
 
-from google import genai
 from google.genai import types
 
 from app.core.config import settings
 from app.prompts import get_prompt, get_system_prompt
+from app.services.ai.json_parse import parse_json
+from app.services.ai.llm_gateway import (
+    extract_text,
+    generation_config,
+    get_llm_gateway,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -33,54 +38,17 @@ class DocumentAnalyzer:
     """
 
     def __init__(self):
-        """Initialize Gemini client."""
+        """Use the shared LLM gateway."""
         logger.info("Initializing DocumentAnalyzer")
 
-        self.use_vertexai = settings.GEMINI_USE_VERTEXAI
+        self.gateway = get_llm_gateway()
         self.model = settings.GEMINI_LLM_MODEL
-        self.project = settings.GOOGLE_CLOUD_PROJECT
-        self.location = settings.GOOGLE_CLOUD_LOCATION
-
-        if self.use_vertexai:
-            if not self.project:
-                raise RuntimeError("GOOGLE_CLOUD_PROJECT required for Vertex AI")
-            self.client = genai.Client(vertexai=True, project=self.project, location=self.location)
-        else:
-            api_key = settings.GOOGLE_CLOUD_API_KEY
-            if not api_key:
-                raise RuntimeError("GOOGLE_CLOUD_API_KEY required for Gemini API")
-            self.client = genai.Client(api_key=api_key)
 
         logger.info(f"Using model: {self.model}")
 
-    def _extract_text(self, response) -> str:
-        """Extract text from Gemini response."""
-        candidates = getattr(response, "candidates", None) or []
-        if not candidates:
-            return ""
-        content = getattr(candidates[0], "content", None)
-        parts = getattr(content, "parts", None) or []
-        return "\n".join(p.text for p in parts if getattr(p, "text", None)).strip()
-
     def _parse_json_response(self, response_text: str) -> Dict[str, Any]:
         """Parse JSON from LLM response, handling markdown code blocks."""
-        if "```json" in response_text:
-            json_str = response_text.split("```json")[1].split("```")[0].strip()
-        elif "```" in response_text:
-            json_str = response_text.split("```")[1].split("```")[0].strip()
-        else:
-            json_str = response_text.strip()
-        return json.loads(json_str)
-
-    def _get_config(
-        self, max_tokens: int = 4096, temperature: float = 0.1
-    ) -> types.GenerateContentConfig:
-        """Get generation configuration."""
-        return types.GenerateContentConfig(
-            temperature=temperature,
-            top_p=0.95,
-            max_output_tokens=max_tokens,
-        )
+        return parse_json(response_text)
 
     async def generate_text(
         self,
@@ -96,13 +64,14 @@ class DocumentAnalyzer:
             full_prompt = f"System: {system_prompt}\n\nUser: {prompt}" if system_prompt else prompt
             contents = [types.Content(role="user", parts=[types.Part.from_text(text=full_prompt)])]
 
-            response = self.client.models.generate_content(
+            response = await self.gateway.generate(
                 model=self.model,
                 contents=contents,
-                config=self._get_config(max_tokens, temperature),
+                config=generation_config(max_tokens, temperature),
+                operation="analyze",
             )
 
-            result = self._extract_text(response)
+            result = extract_text(response)
             logger.debug(f"Generated response in {int((time.time() - start_time) * 1000)}ms")
             return result
 
@@ -129,13 +98,14 @@ class DocumentAnalyzer:
             full_prompt = f"{system_prompt}\n\n{prompt}" if system_prompt else prompt
             parts.append(types.Part.from_text(text=full_prompt))
 
-            response = self.client.models.generate_content(
+            response = await self.gateway.generate(
                 model=self.model,
                 contents=[types.Content(role="user", parts=parts)],
-                config=self._get_config(max_tokens),
+                config=generation_config(max_tokens),
+                operation="analyze",
             )
 
-            result = self._parse_json_response(self._extract_text(response))
+            result = self._parse_json_response(extract_text(response))
             logger.debug(f"Vision analysis completed in {int((time.time() - start_time) * 1000)}ms")
             return result
 
@@ -197,14 +167,15 @@ class DocumentAnalyzer:
             types.Part.from_text(text=prompt),
         ]
 
-        response = self.client.models.generate_content(
+        response = await self.gateway.generate(
             model=self.model,
             contents=[types.Content(role="user", parts=parts)],
-            config=self._get_config(),
+            config=generation_config(),
+            operation="analyze",
         )
 
         return {
-            "analysis": self._extract_text(response),
+            "analysis": extract_text(response),
             "transformation_request": transformation_request,
         }
 
@@ -251,7 +222,7 @@ class DocumentAnalyzer:
                     documents_json=json.dumps(documents_results, indent=2),
                     output_language=output_language,
                 ),
-                system_prompt=get_system_prompt("synthesis"),
+                system_prompt=get_system_prompt("synthesis", output_language=output_language),
             )
             return self._parse_json_response(response_text)
         except json.JSONDecodeError:
@@ -285,7 +256,7 @@ class DocumentAnalyzer:
             prompt=get_prompt(
                 prompt_map.get(document_type, "process_diagnostic"), output_language=output_language
             ),
-            system_prompt=get_system_prompt("document_analyzer"),
+            system_prompt=get_system_prompt("document_analyzer", output_language=output_language),
         )
         return {"parsed_data": result, "model": self.model}
 
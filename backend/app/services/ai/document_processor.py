@@ -1,89 +1,168 @@
 """
 Document Processor - Sequential document classification and analysis.
 
-Processes documents individually using Gemini for classification
-and type-specific analysis. Handles PV AG, diagnostics, taxes, and charges.
+Processes documents individually: keyword heuristics (Gemini as fallback)
+for classification, Gemini for type-specific analysis. Handles PV AG, diagnostics, taxes, and charges.
 Uses native PDF input and thinking capabilities for deep analysis.
 """
 
 import asyncio
 import json
 import logging
-import re
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
-from google import genai
 from google.genai import types
 
 from app.core.config import settings
 from app.prompts import get_prompt
+from app.services.ai import analysis_cache
+from app.services.ai.json_parse import parse_json
+from app.services.ai.keyword_classifier import classify_text
+from app.services.ai.llm_files import get_llm_file_store
+from app.services.ai.llm_gateway import (
+    extract_text,
+    generation_config,
+    get_llm_gateway,
+)
+from app.services.ai.rate_limiter import CHARS_PER_TOKEN
 
 logger = logging.getLogger(__name__)
 
-# Retry configuration for transient Vertex AI errors
-MAX_RETRIES = 3
-RETRY_BASE_DELAY = 5  # seconds
-RETRYABLE_PATTERNS = {"429", "503", "RESOURCE_EXHAUSTED", "SERVICE_UNAVAILABLE"}
-
-
-def _is_retryable(error: Exception) -> bool:
-    """Check if an error is a transient Vertex AI error worth retrying."""
-    error_str = str(error)
-    return any(pattern in error_str for pattern in RETRYABLE_PATTERNS)
-
-
-def _repair_json(json_str: str) -> str:
-    """Attempt to repair truncated or malformed JSON from LLM responses."""
-    # Count brackets to find imbalance
-    open_braces = json_str.count("{") - json_str.count("}")
-    open_brackets = json_str.count("[") - json_str.count("]")
-
-    # Check for unterminated string (odd number of unescaped quotes)
-    in_string = False
-    i = 0
-    while i < len(json_str):
-        if json_str[i] == '"' and (i == 0 or json_str[i - 1] != "\\"):
-            in_string = not in_string
-        i += 1
-
-    # If we're inside a string, close it
-    if in_string:
-        json_str += '"'
-
-    # Close any trailing comma before adding brackets
-    json_str = re.sub(r",\s*$", "", json_str)
-
-    # Close open brackets/braces
-    json_str += "]" * open_brackets + "}" * open_braces
-
-    return json_str
+CLASSIFY_PROMPT = "dp_classify_document"
+# PDFs this small are classified whole when their page count is unknown
+SMALL_PDF_BYTES = 512 * 1024
+# Analysis prompt used for each document category
+PROMPTS_BY_CATEGORY = {
+    "pv_ag": "dp_process_pv_ag",
+    "diags": "dp_process_diagnostic",
+    "diagnostic": "dp_process_diagnostic",
+    "taxe_fonciere": "dp_process_tax",
+    "charges": "dp_process_charges",
+    "other": "dp_process_other",
+}
+
+
+def _compact_json(result: Dict[str, Any]) -> str:
+    """JSON for prompts: no indentation or spaces, which only cost tokens."""
+    return json.dumps(result, ensure_ascii=False, separators=(",", ":"))
+
+
+def _document_results(results: List[Dict[str, Any]]) -> str:
+    """Document results (filename, document_type, result) as prompt sections."""
+    return "\n\n---\n\n".join(
+        f"**Document: {r.get('filename', 'unknown')}** (type: {r.get('document_type', 'unknown')})\n"
+        f"{_compact_json(r.get('result', {}))}"
+        for r in results
+    )
 
 
-def _extract_json(response_text: str) -> str:
-    """Extract and clean JSON from LLM response."""
-    # Find JSON start
-    json_start = min(
-        response_text.find("{") if response_text.find("{") != -1 else len(response_text),
-        response_text.find("[") if response_text.find("[") != -1 else len(response_text),
+def _document_index(documents: List[Dict[str, Any]]) -> str:
+    """One line per document: filename and type."""
+    return "\n".join(
+        f"- {d.get('filename', 'unknown')} (type: {d.get('document_type', 'unknown')})"
+        for d in documents
     )
-    if json_start > 0:
-        response_text = response_text[json_start:]
 
-    # Remove markdown blocks
-    if "```" in response_text:
-        response_text = re.sub(r"```(?:json)?\s*", "", response_text)
 
-    # Fix number formatting
-    response_text = re.sub(r":\s*(\d+),(\d+\.?\d*)", r": \1\2", response_text)
-    response_text = re.sub(r":\s*(\d+),(\d+),(\d+\.?\d*)", r": \1\2\3", response_text)
+def _merge_groups(serialized: List[str], fan_in: int, token_budget: int) -> List[Tuple[int, int]]:
+    """Split results into consecutive [start, end) groups for one merge round.
 
-    # Remove trailing commas
-    response_text = re.sub(r",(\s*[}\]])", r"\1", response_text)
+    A group holds at most fan_in results and token_budget estimated tokens,
+    but always two results when it can, so each round shrinks the level even
+    when single results are close to the budget.
+    """
+    groups: List[Tuple[int, int]] = []
+    start, tokens = 0, 0
+    for i, text in enumerate(serialized):
+        text_tokens = len(text) // CHARS_PER_TOKEN
+        size = i - start
+        if size >= max(2, fan_in) or (size >= 2 and tokens + text_tokens > token_budget):
+            groups.append((start, i))
+            start, tokens = i, 0
+        tokens += text_tokens
+    groups.append((start, len(serialized)))
+    return groups
+
+
+def _object(nullable: bool = False, **properties: types.Schema) -> types.Schema:
+    """Object schema: every property required, generated in the order given."""
+    return types.Schema(
+        type=types.Type.OBJECT,
+        properties=properties,
+        required=list(properties),
+        property_ordering=list(properties),
+        nullable=nullable or None,
+    )
 
-    # Attempt to repair truncated JSON
-    response_text = _repair_json(response_text.strip())
 
-    return response_text
+def _array(items: types.Schema) -> types.Schema:
+    return types.Schema(type=types.Type.ARRAY, items=items)
+
+
+def _scalar(kind: types.Type, *enum: str, nullable: bool = False) -> types.Schema:
+    return types.Schema(type=kind, enum=list(enum) or None, nullable=nullable or None)
+
+
+_STRING = _scalar(types.Type.STRING)
+_NUMBER = _scalar(types.Type.NUMBER)
+_INTEGER = _scalar(types.Type.INTEGER)
+_OPTIONAL_STRING = _scalar(types.Type.STRING, nullable=True)
+_OPTIONAL_NUMBER = _scalar(types.Type.NUMBER, nullable=True)
+_ANNUAL_COST = _object(amount=_NUMBER, source=_OPTIONAL_STRING, note=_OPTIONAL_STRING)
+
+# Structure of the dp_synthesize_results answer (dp_update_synthesis keeps it).
+# With it Gemini answers bare JSON that parse_json decodes in one C pass.
+SYNTHESIS_SCHEMA = _object(
+    summary=_STRING,
+    total_annual_costs=_NUMBER,
+    annual_cost_breakdown=_object(
+        charges_copropriete=_ANNUAL_COST,
+        taxe_fonciere=_ANNUAL_COST,
+        estimated_energy=_ANNUAL_COST,
+        fonds_travaux=_ANNUAL_COST,
+        other_recurring=_ANNUAL_COST,
+    ),
+    total_one_time_costs=_NUMBER,
+    one_time_cost_breakdown=_array(
+        _object(
+            description=_STRING,
+            amount=_NUMBER,
+            year=_INTEGER,
+            cost_type=_scalar(types.Type.STRING, "copro", "direct"),
+            payment_status=_scalar(types.Type.STRING, "paid", "partially_paid", "unpaid"),
+            source=_STRING,
+            status=_scalar(types.Type.STRING, "voted", "estimated", "upcoming"),
+        )
+    ),
+    risk_level=_scalar(types.Type.STRING, "low", "medium", "high"),
+    risk_factors=_array(_STRING),
+    cross_document_themes=_array(
+        _object(
+            theme=_STRING,
+            documents_involved=_array(_STRING),
+            evolution=_STRING,
+            current_status=_STRING,
+        )
+    ),
+    key_findings=_array(_STRING),
+    buyer_action_items=_array(
+        _object(
+            priority=_INTEGER,
+            action=_STRING,
+            urgency=_scalar(types.Type.STRING, "immediate", "short_term", "medium_term"),
+            estimated_cost=_NUMBER,
+        )
+    ),
+    recommendations=_array(_STRING),
+    confidence_score=_NUMBER,
+    confidence_reasoning=_STRING,
+    tantiemes_info=_object(
+        lot_tantiemes=_OPTIONAL_NUMBER,
+        total_tantiemes=_OPTIONAL_NUMBER,
+        share_percentage=_OPTIONAL_NUMBER,
+        cost_share_note=_OPTIONAL_STRING,
+    ),
+)
 
 
 class DocumentProcessor:
@@ -97,65 +176,58 @@ class DocumentProcessor:
     """
 
     def __init__(self):
-        """Initialize Gemini client."""
+        """Use the shared LLM gateway and file store."""
         logger.info("Initializing DocumentProcessor")
 
-        self.use_vertexai = settings.GEMINI_USE_VERTEXAI
+        self.gateway = get_llm_gateway()
+        self.files = get_llm_file_store()
         self.model = settings.GEMINI_LLM_MODEL
-        self.project = settings.GOOGLE_CLOUD_PROJECT
-        self.location = settings.GOOGLE_CLOUD_LOCATION
-
-        if self.use_vertexai:
-            if not self.project:
-                raise RuntimeError("GOOGLE_CLOUD_PROJECT required for Vertex AI")
-            self.client = genai.Client(vertexai=True, project=self.project, location=self.location)
-        else:
-            api_key = settings.GOOGLE_CLOUD_API_KEY
-            if not api_key:
-                raise RuntimeError("GOOGLE_CLOUD_API_KEY required")
-            self.client = genai.Client(api_key=api_key)
 
         logger.info(f"Using model: {self.model}")
 
-    def _extract_text(self, response) -> str:
-        """Extract text from Gemini response, skipping thinking parts."""
-        candidates = getattr(response, "candidates", None) or []
-        if not candidates:
-            return ""
-        content = getattr(candidates[0], "content", None)
-        parts = getattr(content, "parts", None) or []
-        # Skip thought parts — only collect text parts
-        return "\n".join(
-            p.text for p in parts if getattr(p, "text", None) and not getattr(p, "thought", False)
-        ).strip()
-
     def _get_config(
-        self, max_tokens: int = 8192, temperature: float = 0.1, use_thinking: bool = False
+        self,
+        max_tokens: int = 8192,
+        temperature: float = 0.1,
+        use_thinking: bool = False,
+        response_schema: Optional[types.Schema] = None,
     ) -> types.GenerateContentConfig:
         """Get generation config with explicit thinking control.
 
         gemini-2.5-flash thinks by default — we must explicitly set thinking_budget=0
         to disable it, otherwise thinking tokens consume from max_output_tokens.
+        With response_schema, Gemini answers JSON of that structure (no prose
+        or fences).
+        """
+        structured = {}
+        if response_schema is not None:
+            structured = {
+                "response_mime_type": "application/json",
+                "response_schema": response_schema,
+            }
+        return generation_config(
+            max_tokens, temperature, thinking_budget=8192 if use_thinking else 0, **structured
+        )
+
+    async def _build_document_parts(self, document: Dict[str, Any]) -> List[types.Part]:
+        """Build Gemini content parts from a document with native PDF support.
+
+        Documents planned as text only (see PreparedPdf.plan_chunks) are sent
+        as their page-marked text, without the PDF. The PDF goes through the
+        file store: uploaded once, then referenced by URI.
         """
-        config_kwargs = {
-            "temperature": temperature,
-            "top_p": 0.95,
-            "max_output_tokens": max_tokens,
-        }
-        if use_thinking:
-            config_kwargs["thinking_config"] = types.ThinkingConfig(thinking_budget=8192)
-        else:
-            # Explicitly disable thinking to prevent it from consuming output tokens
-            config_kwargs["thinking_config"] = types.ThinkingConfig(thinking_budget=0)
-        return types.GenerateContentConfig(**config_kwargs)
-
-    def _build_document_parts(self, document: Dict[str, Any]) -> List[types.Part]:
-        """Build Gemini content parts from a document with native PDF support."""
         parts = []
         pdf_data = document.get("pdf_data")
         extracted_text = document.get("extracted_text", "")
         text_extractable = document.get("text_extractable", False)
 
+        if document.get("text_only") and extracted_text:
+            return [
+                types.Part.from_text(
+                    text=f"[Text of the PDF document, extracted page by page]\n\n{extracted_text}"
+                )
+            ]
+
         # If text was extracted, prepend it for redundancy
         if text_extractable and extracted_text:
             parts.append(
@@ -166,79 +238,123 @@ class DocumentProcessor:
 
         # Always include the native PDF
         if pdf_data:
-            parts.append(types.Part.from_bytes(data=pdf_data, mime_type="application/pdf"))
+            parts.append(await self.files.part(pdf_data))
 
         return parts
 
     async def _call_gemini_with_retry(
-        self, parts: List[types.Part], config: types.GenerateContentConfig, context: str = ""
+        self,
+        parts: List[types.Part],
+        config: types.GenerateContentConfig,
+        operation: str,
+        context: str = "",
+        hedge: bool = False,
     ):
-        """Call Gemini with retry on transient errors (429, 503)."""
-        last_error = None
-        for attempt in range(MAX_RETRIES + 1):
-            try:
-                return await asyncio.to_thread(
-                    self.client.models.generate_content,
-                    model=self.model,
-                    contents=[types.Content(role="user", parts=parts)],
-                    config=config,
-                )
-            except Exception as e:
-                last_error = e
-                if _is_retryable(e) and attempt < MAX_RETRIES:
-                    delay = RETRY_BASE_DELAY * (2**attempt)
-                    logger.warning(
-                        f"Retryable error for {context} (attempt {attempt + 1}/{MAX_RETRIES}), "
-                        f"retrying in {delay}s: {e}"
-                    )
-                    await asyncio.sleep(delay)
-                    continue
-                raise
-        raise last_error  # Should not reach here, but safety net
+        """
+        Call Gemini with retry on transient errors (429, 503, timeouts).
 
-    async def classify_document(self, document: Dict[str, Any]) -> str:
-        """Classify document type from the PDF.
+        hedge duplicates the request once it runs past its p95 latency: set
+        for the small calls (classification, merges) where that is cheap.
+        """
+        return await self.gateway.generate(
+            model=self.model,
+            contents=[types.Content(role="user", parts=parts)],
+            config=config,
+            operation=operation,
+            context=context or None,
+            hedge=hedge,
+        )
+
+    async def _classification_pdf(self, document: Dict[str, Any]) -> bytes:
+        """The first CLASSIFIER_LLM_PAGES pages of the PDF (the whole file if short)."""
+        from app.services.documents.pdf_pool import get_pdf_pool
+
+        pdf_data = document["pdf_data"]
+        max_pages = settings.CLASSIFIER_LLM_PAGES
+        page_count = document.get("page_count")
+        if page_count is not None and page_count <= max_pages:
+            return pdf_data
+        if page_count is None and len(pdf_data) <= SMALL_PDF_BYTES:
+            return pdf_data
+        try:
+            (leading,) = await get_pdf_pool().extract_page_ranges(pdf_data, [(0, max_pages)])
+            return leading
+        except Exception as e:
+            logger.warning(f"Could not extract leading pages, classifying whole PDF: {e}")
+            return pdf_data
 
-        Only sends the native PDF (no extracted text) to keep classification fast and light.
-        Thinking is explicitly disabled for this simple categorization task.
-        Retries on transient Vertex AI errors (429, 503).
+    async def classify_document(self, document: Dict[str, Any]) -> str:
+        """Classify document type, cheapest tier first.
+
+        1. Keywords over the text of the first pages (classification_text, or
+           extracted_text): accepted above CLASSIFIER_MIN_CONFIDENCE.
+        2. Gemini on the first CLASSIFIER_LLM_PAGES pages of the native PDF,
+           with thinking disabled. Retries on transient Vertex AI errors
+           (429, 503); categories are cached by file_hash when the document
+           carries one. If the call fails the keyword guess, if any, is used.
         """
         filename = document.get("filename", "")
         pdf_data = document.get("pdf_data")
+        file_hash = document.get("file_hash")
+
+        text = document.get("classification_text") or document.get("extracted_text", "")
+        guess = classify_text(text, filename)
+        if guess.category and guess.confidence >= settings.CLASSIFIER_MIN_CONFIDENCE:
+            logger.info(
+                f"Classified {filename} as: {guess.category} "
+                f"(keywords, confidence={guess.confidence:.2f}, scores={guess.scores})"
+            )
+            return guess.category
+
+        cached = analysis_cache.get_cached_classification(file_hash, CLASSIFY_PROMPT, self.model)
+        if cached:
+            return cached
 
         if not pdf_data:
             logger.warning(f"No PDF data for: {filename}")
-            return "other"
+            return guess.category or "other"
 
+        # A short PDF is classified whole: its upload is reused by the analysis
         parts = [
-            types.Part.from_bytes(data=pdf_data, mime_type="application/pdf"),
-            types.Part.from_text(text=get_prompt("dp_classify_document", filename=filename)),
+            await self.files.part(await self._classification_pdf(document)),
+            types.Part.from_text(text=get_prompt(CLASSIFY_PROMPT, filename=filename)),
         ]
 
         try:
             response = await self._call_gemini_with_retry(
                 parts=parts,
                 config=self._get_config(max_tokens=100, use_thinking=False),
+                operation="classify",
                 context=f"classification of {filename}",
+                hedge=True,
             )
-            raw_text = self._extract_text(response)
+            raw_text = extract_text(response)
             category = raw_text.strip().lower()
             logger.info(f"Classification raw response for {filename}: '{raw_text}'")
 
             valid = {"pv_ag", "diagnostic", "diags", "taxe_fonciere", "charges", "other"}
             if category not in valid:
                 logger.warning(f"Invalid category '{category}' for {filename}, mapping to 'other'")
-                return "other"
+                category = "other"
 
             if category == "diagnostic":
                 category = "diags"
 
-            logger.info(f"Classified {filename} as: {category}")
+            analysis_cache.store_classification(file_hash, CLASSIFY_PROMPT, self.model, category)
+            logger.info(
+                f"Classified {filename} as: {category} "
+                f"(llm, keyword guess={guess.category} confidence={guess.confidence:.2f})"
+            )
             return category
 
         except Exception as e:
             logger.error(f"Classification error for {filename}: {e}")
-            return "other"
+            if guess.category:
+                logger.info(
+                    f"Falling back to keyword guess for {filename}: {guess.category} "
+                    f"(confidence={guess.confidence:.2f})"
+                )
+            return guess.category or "other"
 
     async def _process_with_prompt(self, document: Dict[str, Any], prompt: str) -> Dict[str, Any]:
         """Generic processing with custom prompt and thinking enabled.
@@ -248,40 +364,51 @@ class DocumentProcessor:
         """
         filename = document.get("filename", "")
 
-        parts = self._build_document_parts(document)
+        parts = await self._build_document_parts(document)
         parts.append(types.Part.from_text(text=prompt))
 
         response = await self._call_gemini_with_retry(
             parts=parts,
-            config=self._get_config(max_tokens=16384, use_thinking=True),
+            config=self._analysis_config(),
+            operation="analyze",
             context=f"processing of {filename}",
         )
-        raw_text = self._extract_text(response)
-        logger.info(f"Raw response for {filename}: {len(raw_text)} chars")
-        response_text = _extract_json(raw_text)
-        if not response_text:
-            raise ValueError(f"Empty response for {filename}")
+        return self.parse_analysis(response, filename)
 
-        try:
-            return json.loads(response_text)
-        except json.JSONDecodeError as je:
-            pos = je.pos if hasattr(je, "pos") else 0
-            context_start = max(0, pos - 100)
-            context_end = min(len(response_text), pos + 100)
-            logger.warning(
-                f"JSON parse error for {filename} at pos {pos}: {je.msg}\n"
-                f"Context: ...{response_text[context_start:context_end]}..."
-            )
+    def _analysis_config(self) -> types.GenerateContentConfig:
+        return self._get_config(max_tokens=16384, use_thinking=True)
 
-            # "Extra data" means valid JSON followed by trailing text — parse just the first object
-            if "Extra data" in je.msg:
-                decoder = json.JSONDecoder()
-                obj, _ = decoder.raw_decode(response_text)
-                return obj
+    async def analysis_request(
+        self, document: Dict[str, Any], category: str, output_language: str = "French"
+    ) -> types.InlinedRequest:
+        """The analysis of a document (or chunk) as a batch request (see llm_batch.py).
+
+        Same prompt, parts and config as the interactive call; parse the
+        answer with parse_analysis.
+        """
+        prompt = get_prompt(
+            PROMPTS_BY_CATEGORY.get(category, PROMPTS_BY_CATEGORY["other"]),
+            filename=document.get("filename", ""),
+            output_language=output_language,
+        )
+        parts = await self._build_document_parts(document)
+        parts.append(types.Part.from_text(text=prompt))
+        return types.InlinedRequest(
+            contents=[types.Content(role="user", parts=parts)],
+            config=self._analysis_config(),
+        )
 
-            # Truncated JSON — try to repair
-            response_text = _repair_json(response_text)
-            return json.loads(response_text)
+    def parse_analysis(self, response: Any, filename: str = "") -> Dict[str, Any]:
+        """The JSON analysis in a response. Raises on an empty answer or no JSON."""
+        raw_text = extract_text(response)
+        logger.info(f"Raw response for {filename}: {len(raw_text)} chars")
+        if not raw_text:
+            raise ValueError(f"Empty response for {filename}")
+        try:
+            return parse_json(raw_text)
+        except json.JSONDecodeError:
+            logger.warning(f"No JSON in response for {filename}: {raw_text[:200]}")
+            raise
 
     async def process_pv_ag(
         self, document: Dict[str, Any], output_language: str = "French"
@@ -336,16 +463,55 @@ class DocumentProcessor:
         )
         return await self._process_with_prompt(document, prompt)
 
+    def get_cached_analysis(
+        self, file_hash: Optional[str], category: str, output_language: str
+    ) -> Optional[Dict[str, Any]]:
+        """Analysis of identical content made with the current prompt and model, if any."""
+        prompt_name = PROMPTS_BY_CATEGORY.get(category, PROMPTS_BY_CATEGORY["other"])
+        return analysis_cache.get_cached_analysis(
+            file_hash, prompt_name, self.model, output_language
+        )
+
+    def cache_analysis(
+        self,
+        file_hash: Optional[str],
+        category: str,
+        output_language: str,
+        analysis: Dict[str, Any],
+    ) -> None:
+        """Remember an analysis for later uploads of the same content."""
+        prompt_name = PROMPTS_BY_CATEGORY.get(category, PROMPTS_BY_CATEGORY["other"])
+        analysis_cache.store_analysis(file_hash, prompt_name, self.model, output_language, analysis)
+
     async def process_document(
-        self, document: Dict[str, Any], output_language: str = "French"
+        self,
+        document: Dict[str, Any],
+        output_language: str = "French",
+        on_classified: Optional[Callable[[str], None]] = None,
     ) -> Dict[str, Any]:
-        """Process a single document: classify and analyze."""
+        """Process a single document: classify and analyze.
+
+        Previously seen content (same file_hash) is served from the analysis
+        cache without calling Gemini. on_classified is called with the
+        category before the analysis starts.
+        """
         filename = document.get("filename", "")
         document_id = document.get("document_id")
+        file_hash = document.get("file_hash")
 
         logger.info(f"Processing: {filename} (ID: {document_id})")
 
         category = await self.classify_document(document)
+        if on_classified is not None:
+            on_classified(category)
+        analysis = self.get_cached_analysis(file_hash, category, output_language)
+        if analysis is not None:
+            return {
+                "filename": filename,
+                "document_type": category,
+                "result": analysis,
+                "document_id": document_id,
+            }
 
         processors = {
             "pv_ag": self.process_pv_ag,
@@ -358,6 +524,7 @@ class DocumentProcessor:
 
         processor = processors.get(category, self.process_other)
         analysis = await processor(document, output_language=output_language)
+        self.cache_analysis(file_hash, category, output_language, analysis)
 
         return {
             "filename": filename,
@@ -372,17 +539,46 @@ class DocumentProcessor:
         document_type: str,
         output_language: str = "French",
     ) -> Dict[str, Any]:
-        """Merge analysis results from multiple chunks of a single document."""
+        """Merge analysis results from multiple chunks of a single document.
+
+        Tree reduce: adjacent results are merged in groups (see _merge_groups),
+        all groups of a level in parallel under the global rate limiter, until
+        a single result is left. A 20-chunk document takes a few small merge
+        rounds instead of one prompt holding every chunk.
+        """
         logger.info(f"Merging {len(chunk_results)} chunk results for type: {document_type}")
 
+        level, depth = list(chunk_results), 0
+        while len(level) > 1:
+            depth += 1
+            groups = _merge_groups(
+                [_compact_json(r) for r in level],
+                settings.LLM_MERGE_FAN_IN,
+                settings.LLM_MERGE_TOKEN_BUDGET,
+            )
+            logger.info(f"Merge level {depth}: {len(level)} results in {len(groups)} groups")
+            level = await asyncio.gather(
+                *(
+                    self._merge_group(level[start:end], document_type, output_language)
+                    for start, end in groups
+                )
+            )
+        return level[0]
+
+    async def _merge_group(
+        self, results: List[Dict[str, Any]], document_type: str, output_language: str
+    ) -> Dict[str, Any]:
+        """One merge call over consecutive results; a lone result is passed up as is."""
+        if len(results) == 1:
+            return results[0]
+
         chunk_summaries = "\n\n---\n\n".join(
-            f"**Chunk {i + 1}:**\n{json.dumps(r, ensure_ascii=False, indent=2)}"
-            for i, r in enumerate(chunk_results)
+            f"**Chunk {i + 1}:**\n{_compact_json(r)}" for i, r in enumerate(results)
         )
 
         prompt = get_prompt(
             "dp_merge_chunks",
-            chunk_count=len(chunk_results),
+            chunk_count=len(results),
             document_type=document_type,
             chunk_results=chunk_summaries,
             output_language=output_language,
@@ -391,65 +587,39 @@ class DocumentProcessor:
         response = await self._call_gemini_with_retry(
             parts=[types.Part.from_text(text=prompt)],
             config=self._get_config(max_tokens=16384, use_thinking=True),
-            context=f"merging {len(chunk_results)} chunks",
+            operation="merge",
+            context=f"merging {len(results)} chunks",
+            hedge=True,
         )
-        raw_text = self._extract_text(response)
-        cleaned = _extract_json(raw_text)
-        logger.info(f"Merge response: {len(raw_text)} chars raw, {len(cleaned)} chars cleaned")
-        return json.loads(cleaned)
+        raw_text = extract_text(response)
+        logger.info(f"Merge response: {len(raw_text)} chars")
+        return parse_json(raw_text)
 
     async def synthesize_results(
-        self, results: List[Dict[str, Any]], output_language: str = "French"
+        self,
+        results: List[Dict[str, Any]],
+        output_language: str = "French",
+        raise_errors: bool = False,
     ) -> Dict[str, Any]:
-        """Synthesize all results into overall summary with cross-document analysis."""
+        """Synthesize all results into overall summary with cross-document analysis.
+
+        On failure a placeholder synthesis is returned, unless raise_errors.
+        """
         logger.info(f"Synthesizing {len(results)} documents")
 
         # Pass full document results (not just summaries) for cross-referencing
-        summaries = "\n\n---\n\n".join(
-            f"**Document: {r.get('filename', 'unknown')}** (type: {r.get('document_type', 'unknown')})\n"
-            f"{json.dumps(r.get('result', {}), ensure_ascii=False, indent=2)}"
-            for r in results
-        )
-
         prompt = get_prompt(
-            "dp_synthesize_results", summaries=summaries, output_language=output_language
+            "dp_synthesize_results",
+            summaries=_document_results(results),
+            output_language=output_language,
         )
 
         try:
-            response = await asyncio.to_thread(
-                self.client.models.generate_content,
-                model=self.model,
-                contents=[types.Content(role="user", parts=[types.Part.from_text(text=prompt)])],
-                config=self._get_config(max_tokens=32768, use_thinking=True),
-            )
-            raw_text = self._extract_text(response)
-            cleaned = _extract_json(raw_text)
-            logger.info(
-                f"Synthesis raw response length: {len(raw_text)}, cleaned length: {len(cleaned)}"
-            )
-            result = json.loads(cleaned)
-
-            # Validate critical fields exist (truncation detection)
-            critical_fields = [
-                "risk_level",
-                "key_findings",
-                "recommendations",
-                "one_time_cost_breakdown",
-                "annual_cost_breakdown",
-                "buyer_action_items",
-                "cross_document_themes",
-            ]
-            missing = [f for f in critical_fields if f not in result]
-            if missing:
-                logger.warning(
-                    f"Synthesis JSON missing critical fields (possible truncation): {missing}. "
-                    f"Response length: {len(raw_text)} chars"
-                )
-
-            return result
-
+            return await self._generate_synthesis(prompt)
         except Exception as e:
             logger.error(f"Synthesis error: {e}", exc_info=True)
+            if raise_errors:
+                raise
             return {
                 "summary": "Documents processed. Synthesis unavailable.",
                 "total_annual_costs": 0.0,
@@ -461,6 +631,66 @@ class DocumentProcessor:
                 "confidence_reasoning": "Synthesis failed — review individual documents.",
             }
 
+    async def update_synthesis(
+        self,
+        previous: Dict[str, Any],
+        changed: List[Dict[str, Any]],
+        removed: List[Dict[str, Any]],
+        documents: List[Dict[str, Any]],
+        output_language: str = "French",
+    ) -> Dict[str, Any]:
+        """Fold changed and removed documents into a previous synthesis.
+
+        changed holds full results like synthesize_results; removed and
+        documents (all current documents) only need filename and document_type.
+        """
+        logger.info(
+            f"Updating synthesis of {len(documents)} documents: "
+            f"{len(changed)} added or changed, {len(removed)} removed"
+        )
+
+        prompt = get_prompt(
+            "dp_update_synthesis",
+            document_index=_document_index(documents),
+            previous_synthesis=_compact_json(previous),
+            changed_documents=_document_results(changed) or "(none)",
+            removed_documents=_document_index(removed) or "(none)",
+            output_language=output_language,
+        )
+        return await self._generate_synthesis(prompt)
+
+    async def _generate_synthesis(self, prompt: str) -> Dict[str, Any]:
+        response = await self.gateway.generate(
+            model=self.model,
+            contents=[types.Content(role="user", parts=[types.Part.from_text(text=prompt)])],
+            config=self._get_config(
+                max_tokens=32768, use_thinking=True, response_schema=SYNTHESIS_SCHEMA
+            ),
+            operation="synthesis",
+        )
+        raw_text = extract_text(response)
+        logger.info(f"Synthesis raw response length: {len(raw_text)}")
+        result = parse_json(raw_text)
+
+        # Validate critical fields exist (truncation detection)
+        critical_fields = [
+            "risk_level",
+            "key_findings",
+            "recommendations",
+            "one_time_cost_breakdown",
+            "annual_cost_breakdown",
+            "buyer_action_items",
+            "cross_document_themes",
+        ]
+        missing = [f for f in critical_fields if f not in result]
+        if missing:
+            logger.warning(
+                f"Synthesis JSON missing critical fields (possible truncation): {missing}. "
+                f"Response length: {len(raw_text)} chars"
+            )
+
+        return result
+
     async def process_bulk_upload(
         self, documents: List[Dict[str, Any]], property_id: int, output_language: str = "French"
     ) -> Dict[str, Any]:
@@ -9,11 +9,11 @@ import logging
 import time
 from typing import Any, Dict, List, Optional
 
-from google import genai
 from google.genai import types
 
 from app.core.config import settings
 from app.prompts import get_prompt
+from app.services.ai.llm_gateway import extract_image, extract_text, get_llm_gateway
 
 logger = logging.getLogger(__name__)
 
@@ -29,48 +29,12 @@ class ImageGenerator:
     """
 
     def __init__(self):
-        """Initialize Gemini client for image generation."""
-        self.use_vertexai = settings.GEMINI_USE_VERTEXAI
+        """Use the shared LLM gateway with the image generation model."""
+        self.gateway = get_llm_gateway()
         self.model = settings.GEMINI_IMAGE_MODEL  # Image generation model
-        self.project = settings.GOOGLE_CLOUD_PROJECT
-        self.location = settings.GOOGLE_CLOUD_LOCATION
-
-        if self.use_vertexai:
-            if not self.project or not self.location:
-                raise RuntimeError("GOOGLE_CLOUD_PROJECT and LOCATION required for Vertex AI")
-            self.client = genai.Client(vertexai=True, project=self.project, location=self.location)
-        else:
-            api_key = settings.GOOGLE_CLOUD_API_KEY
-            if not api_key:
-                raise RuntimeError("GOOGLE_CLOUD_API_KEY required for Gemini API")
-            self.client = genai.Client(api_key=api_key)
 
         logger.info(f"ImageGenerator initialized with model: {self.model}")
 
-    def _extract_image_part(self, response) -> Optional[types.Part]:
-        """Extract first image output from response."""
-        candidates = getattr(response, "candidates", None) or []
-        if not candidates:
-            return None
-
-        content = getattr(candidates[0], "content", None)
-        parts = getattr(content, "parts", None) or []
-
-        for p in parts:
-            inline = getattr(p, "inline_data", None)
-            if inline and getattr(inline, "data", None):
-                return types.Part.from_bytes(data=inline.data, mime_type=inline.mime_type)
-        return None
-
-    def _extract_text(self, response) -> str:
-        """Extract text from response."""
-        candidates = getattr(response, "candidates", None) or []
-        if not candidates:
-            return ""
-        content = getattr(candidates[0], "content", None)
-        parts = getattr(content, "parts", None) or []
-        return "\n".join(p.text for p in parts if getattr(p, "text", None)).strip()
-
     async def redesign_apartment(
         self,
         image_data: bytes,
@@ -127,14 +91,15 @@ class ImageGenerator:
 
             logger.info(f"Generating redesign: {prompt[:100]}...")
 
-            response = self.client.models.generate_content(
+            response = await self.gateway.generate(
                 model=self.model,
                 contents=contents,
                 config=config,
+                operation="redesign",
             )
 
-            text_response = self._extract_text(response)
-            image_result = self._extract_image_part(response)
+            text_response = extract_text(response)
+            image_result = extract_image(response)
 
             if image_result is None:
                 raise RuntimeError(f"No image returned. Response: {text_response}")
@@ -0,0 +1,187 @@
+"""
+JSON Parse - Tolerant parsing of LLM JSON output.
+
+Gemini answers with a JSON object, sometimes wrapped in prose or markdown
+fences, followed by trailing text, written with French thousands separators
+("amount": 12,500.50), or cut short by max_output_tokens. parse_json() reads
+all of these:
+
+1. The stdlib C decoder is tried once from the first { or [, which already
+   skips leading prose and fences and ignores trailing text.
+2. Only if that fails, a single tolerant pass reads the rest, in which
+   complete nested objects and arrays still go through the C decoder.
+
+The tolerant pass keeps what a truncation left behind: an unterminated
+string is kept, while a dangling key or a partial literal is dropped. It
+never raises on malformed input. Stray characters are skipped, a trailing
+comma is ignored, and parsing stops when the top-level value closes.
+"""
+
+import json
+import re
+from typing import Any, List, Optional
+
+_START = re.compile(r"[{\[]")
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+# A complete string (unrolled loop: no per-character alternation)
+_STRING = re.compile(r'"([^"\\]*(?:\\.[^"\\]*)*)"', re.DOTALL)
+_NUMBER = re.compile(r"-?\d+(?:\.\d+)?(?:[eE][+-]?\d+)?")
+# Thousands groups after a number inside an object: 12,500.50
+_THOUSANDS = re.compile(r"(?:,\d+)+(?:\.\d+)?")
+_WORD = re.compile(r"[a-zA-Z]+")
+_LITERALS = {"true": True, "false": False, "null": None}
+# Backslashes (and \u digits) ending a truncated string
+_TRAILING_ESCAPE = re.compile(r"(\\+)(u[0-9a-fA-F]{0,3})?$")
+_ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+_ESCAPE = re.compile(r"\\(u[0-9a-fA-F]{4}|.)", re.DOTALL)
+
+_decoder = json.JSONDecoder(strict=False)
+
+
+def _unescape(body: str) -> str:
+    """Decode the escapes of a string body, keeping invalid ones as-is."""
+    if "\\" not in body:
+        return body
+
+    def replace(match: "re.Match[str]") -> str:
+        escape = match.group(1)
+        if len(escape) == 5:
+            return chr(int(escape[1:], 16))
+        return _ESCAPES.get(escape, escape)
+
+    # Surrogate pairs (😀) come out as two halves: join them
+    text = _ESCAPE.sub(replace, body)
+    return text.encode("utf-16", "surrogatepass").decode("utf-16", "replace")
+
+
+class _Frame:
+    """An open object or array."""
+
+    __slots__ = ("container", "key")
+
+    def __init__(self, container: Any):
+        self.container = container
+        self.key: Optional[str] = None  # Object key waiting for its value
+
+
+class _TolerantParser:
+    """One tolerant pass over the first JSON object or array of a text."""
+
+    def __init__(self):
+        self._stack: List[_Frame] = []
+        self._root: Any = None
+
+    def parse(self, text: str, pos: int) -> Any:
+        """Parse from pos (a { or [) to the end of the top-level value or text."""
+        self._parse(text, pos)
+        if self._root is None:
+            raise json.JSONDecodeError("No JSON object or array found", text, pos)
+        return self._root
+
+    def _add(self, value: Any, is_string: bool = False) -> None:
+        if not self._stack:
+            return
+        frame = self._stack[-1]
+        if isinstance(frame.container, list):
+            frame.container.append(value)
+        elif frame.key is not None:
+            frame.container[frame.key] = value
+            frame.key = None
+        elif is_string:
+            frame.key = value
+        # Anything else in key position is malformed: dropped
+
+    def _open(self, container: Any) -> None:
+        if self._root is None:
+            self._root = container
+        else:
+            self._add(container)
+        self._stack.append(_Frame(container))
+
+    def _parse(self, text: str, pos: int) -> None:
+        end = len(text)
+        while pos < end:
+            pos = _WHITESPACE.match(text, pos).end()
+            if pos >= end:
+                break
+            char = text[pos]
+
+            if char == '"':
+                match = _STRING.match(text, pos)
+                if match is None:
+                    # Unterminated string: keep it (a lone key is dropped)
+                    body = text[pos + 1 :]
+                    escape = _TRAILING_ESCAPE.search(body)
+                    if escape is not None and len(escape.group(1)) % 2:
+                        body = body[: escape.end(1) - 1]
+                    frame = self._stack[-1]
+                    if isinstance(frame.container, list) or frame.key is not None:
+                        self._add(_unescape(body))
+                    return
+                self._add(_unescape(match.group(1)), is_string=True)
+                pos = match.end()
+
+            elif char == "{" or char == "[":
+                if self._root is not None:
+                    # Complete nested values are read by the C decoder
+                    try:
+                        value, pos = _decoder.raw_decode(text, pos)
+                        self._add(value)
+                        continue
+                    except json.JSONDecodeError:
+                        pass
+                self._open({} if char == "{" else [])
+                pos += 1
+
+            elif char == "}" or char == "]":
+                self._stack.pop()
+                pos += 1
+                if not self._stack:
+                    return
+
+            elif char == "-" or char.isdigit():
+                match = _NUMBER.match(text, pos)
+                if match is None:
+                    pos += 1  # A lone "-"
+                    continue
+                number_end = match.end()
+                if isinstance(self._stack[-1].container, dict):
+                    thousands = _THOUSANDS.match(text, number_end)
+                    if thousands is not None:
+                        number_end = thousands.end()
+                self._add(self._number(text[pos:number_end]))
+                pos = number_end
+
+            elif char.isascii() and char.isalpha():
+                word_end = _WORD.match(text, pos).end()
+                word = text[pos:word_end]
+                if word in _LITERALS:
+                    self._add(_LITERALS[word])
+                pos = word_end
+
+            else:
+                # , and : only separate; anything else is stray
+                pos += 1
+
+    @staticmethod
+    def _number(text: str) -> Any:
+        text = text.replace(",", "")
+        if "." in text or "e" in text or "E" in text:
+            return float(text)
+        return int(text)
+
+
+def parse_json(text: str) -> Any:
+    """
+    The first JSON object or array in an LLM response.
+
+    Raises json.JSONDecodeError if the text holds none.
+    """
+    match = _START.search(text)
+    if match is None:
+        raise json.JSONDecodeError("No JSON object or array found", text, 0)
+    try:
+        return _decoder.raw_decode(text, match.start())[0]
+    except json.JSONDecodeError:
+        pass
+    return _TolerantParser().parse(text, match.start())
@@ -0,0 +1,134 @@
+"""
+Keyword classifier - First tier of document classification.
+
+PV d'AG, diagnostics, avis de taxe foncière and appels de charges each use a
+very distinctive vocabulary. Scoring that vocabulary over the text already
+extracted from the first pages identifies most text PDFs without an LLM
+call. DocumentProcessor.classify_document only falls back to Gemini (on the
+first pages of the PDF) when the keyword confidence is too low, e.g. for
+scans without a text layer or documents of the "other" category.
+"""
+
+import re
+import unicodedata
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+# Pages whose text is scored: titles and headers identify the document
+LEADING_PAGES = 10
+# Score at which a clear winner is fully trusted
+STRONG_EVIDENCE = 12.0
+# Occurrences of a pattern counted at most
+MAX_OCCURRENCES = 3
+
+# (pattern, weight) per category, matched on lowercase text without accents
+_KEYWORDS: Dict[str, List[Tuple[str, float]]] = {
+    "pv_ag": [
+        (r"proces[- ]verbal", 3),
+        (r"assemblee generale", 3),
+        (r"feuille de presence", 3),
+        (r"secretaire de seance", 3),
+        (r"scrutateur", 3),
+        (r"(?:majorite|conditions) de l'article 2[456]", 3),
+        (r"resolution n", 2),
+        (r"ont vote (?:pour|contre)", 2),
+        (r"abstentions?", 1),
+        (r"ordre du jour", 1),
+        (r"quorum", 1),
+    ],
+    "diags": [
+        (r"diagnostic de performance energetique", 4),
+        (r"dossier de diagnostic technique", 4),
+        (r"\bdpe\b", 2),
+        (r"classe (?:energie|climat)", 2),
+        (r"kwh(?:ep)?/m", 2),
+        (r"amiante", 2),
+        (r"constat de risque d'exposition au plomb|\bcrep\b", 2),
+        (r"termites", 2),
+        (r"etat de l'installation interieure", 3),
+        (r"etat des risques", 2),
+        (r"loi carrez|superficie privative", 2),
+        (r"diagnostiqueur|operateur de diagnostic", 2),
+    ],
+    "taxe_fonciere": [
+        (r"taxe fonciere", 4),
+        (r"avis d'impot", 3),
+        (r"proprietes baties", 3),
+        (r"base d'imposition", 2),
+        (r"finances publiques", 2),
+        (r"enlevement des ordures menageres|\bteom\b", 2),
+        (r"numero fiscal|reference de l'avis", 2),
+        (r"impots\.gouv", 2),
+        (r"cotisations?", 1),
+    ],
+    "charges": [
+        (r"appel de (?:fonds|charges|provisions?)", 4),
+        (r"releve (?:general )?de (?:charges|depenses)", 3),
+        (r"decompte (?:individuel )?de charges", 3),
+        (r"regularisation (?:des )?charges", 3),
+        (r"budget previsionnel", 2),
+        (r"quote[- ]part", 2),
+        (r"fonds (?:de )?travaux", 1),
+        (r"tantiemes", 1),
+        (r"solde (?:debiteur|crediteur)", 2),
+    ],
+}
+
+_FILENAME_HINTS: Dict[str, str] = {
+    "pv_ag": r"\b(?:pv|ag|age|assemblee|proces verbal)\b",
+    "diags": r"\b(?:dpe|ddt|diag\w*|amiante|plomb|termites|carrez|erp|electricite|gaz)\b",
+    "taxe_fonciere": r"\b(?:taxe|fonciere|tf|impot\w*)\b",
+    "charges": r"\b(?:charges|appel\w*|fonds)\b",
+}
+_FILENAME_WEIGHT = 3.0
+
+_COMPILED = {
+    category: [(re.compile(pattern), weight) for pattern, weight in patterns]
+    for category, patterns in _KEYWORDS.items()
+}
+_COMPILED_HINTS = {category: re.compile(hint) for category, hint in _FILENAME_HINTS.items()}
+
+
+@dataclass
+class KeywordClassification:
+    """Best category (None when nothing matched) and how much to trust it."""
+
+    category: Optional[str]
+    confidence: float
+    scores: Dict[str, float] = field(default_factory=dict)
+
+
+def _normalize(text: str) -> str:
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return re.sub(r"\s+", " ", text.replace("’", "'"))
+
+
+def classify_text(text: str, filename: str = "") -> KeywordClassification:
+    """Score each category's vocabulary in text (and hints in the filename).
+
+    Confidence combines the margin over the runner-up with the amount of
+    evidence: one stray "amiante" is not enough, twenty votes are.
+    """
+    text = _normalize(text)
+    name = re.sub(r"[_\-.]+", " ", _normalize(filename))
+
+    scores: Dict[str, float] = {}
+    for category, patterns in _COMPILED.items():
+        score = sum(
+            weight * min(len(pattern.findall(text)), MAX_OCCURRENCES)
+            for pattern, weight in patterns
+        )
+        if _COMPILED_HINTS[category].search(name):
+            score += _FILENAME_WEIGHT
+        if score:
+            scores[category] = score
+
+    if not scores:
+        return KeywordClassification(category=None, confidence=0.0)
+
+    ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+    category, top = ranked[0]
+    runner_up = ranked[1][1] if len(ranked) > 1 else 0.0
+    confidence = (top - runner_up) / top * min(1.0, top / STRONG_EVIDENCE)
+    return KeywordClassification(category=category, confidence=round(confidence, 3), scores=scores)
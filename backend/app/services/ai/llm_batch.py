@@ -0,0 +1,259 @@
+"""
+LLM Batch - Low-priority batch jobs for non-urgent Gemini requests.
+
+Interactive generate_content calls share the RPM/TPM quota and the
+concurrency slots with live user traffic. A batch job is submitted once
+with all its requests, runs on the provider's spare capacity (within 24h,
+usually minutes) at half the price, and is polled until it completes.
+BulkProcessor packs the analyses of large bulk uploads into one (see
+BULK_BATCH_MIN_DOCUMENTS).
+
+Requests are keyed: submit() takes them by key and BatchStatus.response()
+returns each answer by key, recording it as a call in the current
+track_llm_usage() scope with the batch discount applied.
+
+Backends (LLM_BATCH_BACKEND):
+- gemini: Gemini API batch mode with inlined requests
+- local: in-process stand-in running the requests through the gateway's
+  client when first polled; single process only, meant for tests and dev
+- none: no batch mode, bulk uploads always run interactively
+- auto (default): gemini on the Gemini API, none on Vertex AI (its batch
+  prediction reads requests from GCS or BigQuery, not inline)
+"""
+
+import itertools
+import logging
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from google.genai import types
+
+from app.core.config import settings
+from app.services.ai.llm_gateway import (
+    LLMCallMetrics,
+    LLMGateway,
+    estimate_cost,
+    get_llm_gateway,
+    token_usage,
+)
+
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+# Batch requests are billed at half the interactive price
+BATCH_PRICE_RATIO = 0.5
+
+_DONE_STATES = {
+    types.JobState.JOB_STATE_SUCCEEDED: SUCCEEDED,
+    types.JobState.JOB_STATE_PARTIALLY_SUCCEEDED: SUCCEEDED,
+    types.JobState.JOB_STATE_FAILED: FAILED,
+    types.JobState.JOB_STATE_CANCELLED: FAILED,
+    types.JobState.JOB_STATE_EXPIRED: FAILED,
+}
+
+
+class BatchRequestError(RuntimeError):
+    """One request of a batch failed (or the whole batch did)."""
+
+
+@dataclass
+class BatchStatus:
+    """State of a batch job and, once it is done, its answers by key."""
+
+    name: str
+    model: str
+    state: str
+    responses: Dict[str, Any] = field(default_factory=dict)
+    errors: Dict[str, str] = field(default_factory=dict)
+    error: Optional[str] = None
+    latency_ms: int = 0  # From submission to completion
+
+    def response(self, key: str, operation: str = "batch_analyze") -> Any:
+        """
+        The answer to one request, counted as a call in the metrics and the
+        current usage scope. Raises BatchRequestError if it has none.
+        """
+        response = self.responses.get(key)
+        call = LLMCallMetrics(
+            model=self.model, operation=operation, latency_ms=self.latency_ms, attempts=1
+        )
+        if response is None:
+            call.error = "BatchRequestError"
+        else:
+            _, call.input_tokens, call.output_tokens, call.thinking_tokens = token_usage(response)
+            call.cost_usd = BATCH_PRICE_RATIO * estimate_cost(
+                self.model, call.input_tokens, call.output_tokens, call.thinking_tokens
+            )
+        get_llm_gateway().record_call(call, f"{self.name} request {key}")
+        if response is None:
+            raise BatchRequestError(
+                self.errors.get(key) or self.error or f"No answer for {key} in {self.name}"
+            )
+        return response
+
+
+class LLMBatchBackend(ABC):
+    """Submits keyed generate_content requests as one batch job and polls it."""
+
+    name = ""
+
+    @abstractmethod
+    async def submit(
+        self, model: str, requests: Dict[str, types.InlinedRequest], display_name: str = ""
+    ) -> str:
+        """Submit the requests; returns the batch name to poll."""
+
+    @abstractmethod
+    async def poll(self, name: str, model: str, keys: List[str]) -> BatchStatus:
+        """
+        State of a submitted batch. keys are those given to submit(), in the
+        same order (answers are matched by position when the backend does not
+        echo them).
+        """
+
+
+class GeminiBatchBackend(LLMBatchBackend):
+    """Gemini API batch mode with inlined requests."""
+
+    name = "gemini"
+
+    def __init__(self, gateway: Optional[LLMGateway] = None):
+        self.gateway = gateway or get_llm_gateway()
+
+    async def submit(
+        self, model: str, requests: Dict[str, types.InlinedRequest], display_name: str = ""
+    ) -> str:
+        src = [
+            request.model_copy(update={"metadata": {**(request.metadata or {}), "key": key}})
+            for key, request in requests.items()
+        ]
+        job = await self.gateway.client.aio.batches.create(
+            model=model,
+            src=src,
+            config=types.CreateBatchJobConfig(display_name=display_name or None),
+        )
+        logger.info(f"Submitted batch {job.name} ({len(src)} requests to {model})")
+        return job.name
+
+    async def poll(self, name: str, model: str, keys: List[str]) -> BatchStatus:
+        job = await self.gateway.client.aio.batches.get(name=name)
+        state = _DONE_STATES.get(job.state, PENDING)
+        status = BatchStatus(name=name, model=model, state=state)
+        if job.error is not None:
+            status.error = job.error.message or str(job.error)
+        if state == PENDING:
+            return status
+        if job.create_time is not None and job.end_time is not None:
+            status.latency_ms = int((job.end_time - job.create_time).total_seconds() * 1000)
+
+        answers = (job.dest.inlined_responses or []) if job.dest is not None else []
+        for position, answer in enumerate(answers):
+            key = (answer.metadata or {}).get("key")
+            if key is None and position < len(keys):
+                key = keys[position]
+            if key is None:
+                continue
+            if answer.error is not None:
+                status.errors[key] = answer.error.message or str(answer.error)
+            elif answer.response is not None:
+                status.responses[key] = answer.response
+        return status
+
+
+@dataclass
+class _LocalJob:
+    model: str
+    requests: Dict[str, types.InlinedRequest]
+    submitted_at: float
+    status: Optional[BatchStatus] = None
+
+
+Responder = Callable[[str, types.InlinedRequest], Awaitable[Any]]
+
+
+class LocalBatchServer(LLMBatchBackend):
+    """
+    In-memory stand-in for a batch service.
+
+    A job stays pending until run() (or, with run_on_poll, its first poll)
+    answers each request with respond(model, request); by default through
+    the gateway's client. A failing request only fails its own answer.
+    """
+
+    name = "local"
+
+    def __init__(self, respond: Optional[Responder] = None, run_on_poll: bool = True):
+        self.respond = respond or self._generate
+        self.run_on_poll = run_on_poll
+        self.jobs: Dict[str, _LocalJob] = {}
+        self._ids = itertools.count(1)
+
+    @staticmethod
+    async def _generate(model: str, request: types.InlinedRequest) -> Any:
+        return await get_llm_gateway().client.aio.models.generate_content(
+            model=model, contents=request.contents, config=request.config
+        )
+
+    async def submit(
+        self, model: str, requests: Dict[str, types.InlinedRequest], display_name: str = ""
+    ) -> str:
+        name = f"batches/local-{next(self._ids)}"
+        self.jobs[name] = _LocalJob(model, dict(requests), time.monotonic())
+        return name
+
+    async def run(self, name: Optional[str] = None) -> None:
+        """Answer the pending jobs (or only the named one)."""
+        for job_name, job in list(self.jobs.items()):
+            if job.status is not None or name not in (None, job_name):
+                continue
+            status = BatchStatus(name=job_name, model=job.model, state=SUCCEEDED)
+            for key, request in job.requests.items():
+                try:
+                    status.responses[key] = await self.respond(job.model, request)
+                except Exception as e:
+                    status.errors[key] = f"{type(e).__name__}: {e}"
+            status.latency_ms = int((time.monotonic() - job.submitted_at) * 1000)
+            job.status = status
+
+    async def poll(self, name: str, model: str, keys: List[str]) -> BatchStatus:
+        job = self.jobs.get(name)
+        if job is None:
+            return BatchStatus(name=name, model=model, state=FAILED, error=f"Unknown batch {name}")
+        if job.status is None and self.run_on_poll:
+            await self.run(name)
+        return job.status or BatchStatus(name=name, model=model, state=PENDING)
+
+
+def _backend() -> str:
+    backend = settings.LLM_BATCH_BACKEND.lower()
+    if backend != "auto":
+        return backend
+    return "none" if settings.GEMINI_USE_VERTEXAI else "gemini"
+
+
+# =============================================================================
+# Singleton
+# =============================================================================
+
+_instance: Optional[LLMBatchBackend] = None
+_resolved = False
+
+
+def get_llm_batch_backend() -> Optional[LLMBatchBackend]:
+    """Get or create the process-wide batch backend (None when batch mode is off)."""
+    global _instance, _resolved
+    if not _resolved:
+        backend = _backend()
+        if backend == "gemini":
+            _instance = GeminiBatchBackend()
+        elif backend == "local":
+            _instance = LocalBatchServer()
+        elif backend != "none":
+            logger.warning(f"Unknown LLM_BATCH_BACKEND '{backend}', batch mode disabled")
+        _resolved = True
+    return _instance
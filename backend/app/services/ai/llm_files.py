@@ -0,0 +1,262 @@
+"""
+LLM Files - Upload document bytes once, reference them in every Gemini call.
+
+A PDF sent inline travels with each request that uses it: the classification
+and the analysis of a short document, and every retry or hedged duplicate of
+either. LLMFileStore.part() turns bytes into a request part; the uploading
+stores (UploadingFileStore) upload the bytes once and return a part holding
+only their URI, so later requests carry a few bytes instead of megabytes.
+
+Files are keyed by SHA-256: the same content (a short document classified
+then analyzed, a file uploaded twice) maps to one upload for as long as the
+handle is valid, and concurrent requests for the same content share one
+upload. Files under LLM_FILE_MIN_BYTES stay inline (an upload round trip
+costs more than it saves), and a failed upload falls back to inline bytes.
+
+Backends (LLM_FILE_BACKEND):
+- gemini: Gemini API Files API (the service deletes files after 48h)
+- gcs: objects under llm-files/ in the documents bucket, read by Vertex AI
+  (expire them with a bucket lifecycle rule)
+- inline: no upload, every part carries its bytes
+- local: in-memory fake for tests
+- auto (default): gcs on Vertex AI with GCS storage, gemini on the Gemini
+  API, inline otherwise
+"""
+
+import asyncio
+import hashlib
+import io
+import logging
+import threading
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+from google.genai import types
+
+from app.core.config import settings
+from app.services.ai.llm_gateway import LLMGateway, get_llm_gateway
+from app.services.ai.rate_limiter import forget_file_size, register_file_size
+
+logger = logging.getLogger(__name__)
+
+# Gemini API files live 48h; handles are reused for a little less
+GEMINI_FILE_TTL = 46 * 3600
+# Storage objects stay until the lifecycle rule removes them: checked again daily
+STORAGE_FILE_TTL = 24 * 3600
+# A handle this close to its expiry is not handed out (the call may outlive it)
+EXPIRY_MARGIN = 3600
+# Seconds between state checks of a Gemini file still being processed, and at most
+_POLL_INTERVAL = 1.0
+_POLL_TIMEOUT = 120.0
+STORAGE_PREFIX = "llm-files/"
+
+
+@dataclass(frozen=True)
+class LLMFile:
+    """An uploaded file usable in Gemini requests until expires_at (epoch seconds)."""
+
+    uri: str
+    mime_type: str
+    size: int
+    expires_at: float
+
+    def part(self) -> types.Part:
+        return types.Part.from_uri(file_uri=self.uri, mime_type=self.mime_type)
+
+
+class LLMFileStore(ABC):
+    """Turns the bytes sent to Gemini into request parts."""
+
+    name = ""
+
+    @abstractmethod
+    async def part(self, data: bytes, mime_type: str = "application/pdf") -> types.Part:
+        """A part carrying or referencing the bytes."""
+
+
+class InlineFileStore(LLMFileStore):
+    """No uploads: every part carries its bytes."""
+
+    name = "inline"
+
+    async def part(self, data: bytes, mime_type: str = "application/pdf") -> types.Part:
+        return types.Part.from_bytes(data=data, mime_type=mime_type)
+
+
+class UploadingFileStore(LLMFileStore):
+    """Content-addressed uploads of the bytes sent to Gemini."""
+
+    def __init__(self, min_bytes: Optional[int] = None):
+        self.min_bytes = settings.LLM_FILE_MIN_BYTES if min_bytes is None else min_bytes
+        self.uploads = 0
+        self._files: Dict[str, LLMFile] = {}
+        self._lock = threading.Lock()
+        # Uploads in flight, per event loop and content hash
+        self._pending: Dict[Tuple[int, str], asyncio.Future] = {}
+
+    async def part(self, data: bytes, mime_type: str = "application/pdf") -> types.Part:
+        """A part referencing the uploaded bytes (inline when small or on failure)."""
+        if len(data) < self.min_bytes:
+            return types.Part.from_bytes(data=data, mime_type=mime_type)
+        try:
+            file = await self.get(data, mime_type)
+        except Exception as e:
+            logger.warning(f"File upload failed, sending {len(data)} bytes inline: {e}")
+            return types.Part.from_bytes(data=data, mime_type=mime_type)
+        return file.part()
+
+    async def get(self, data: bytes, mime_type: str = "application/pdf") -> LLMFile:
+        """The file holding these bytes, uploaded unless a valid handle exists."""
+        key = hashlib.sha256(data).hexdigest()
+        file = self._cached(key)
+        if file is not None:
+            return file
+
+        pending_key = (id(asyncio.get_running_loop()), key)
+        pending = self._pending.get(pending_key)
+        if pending is not None:
+            return await asyncio.shield(pending)
+
+        task = asyncio.ensure_future(self._upload(key, data, mime_type))
+        self._pending[pending_key] = task
+        try:
+            file = await asyncio.shield(task)
+        finally:
+            self._pending.pop(pending_key, None)
+
+        self.uploads += 1
+        register_file_size(file.uri, file.size)
+        with self._lock:
+            self._files[key] = file
+        logger.info(f"Uploaded {file.size} bytes for Gemini: {file.uri}")
+        return file
+
+    def _cached(self, key: str) -> Optional[LLMFile]:
+        now = time.time()
+        with self._lock:
+            # Drop expired handles on the way
+            for stale in [k for k, f in self._files.items() if f.expires_at - EXPIRY_MARGIN <= now]:
+                forget_file_size(self._files.pop(stale).uri)
+            return self._files.get(key)
+
+    @abstractmethod
+    async def _upload(self, key: str, data: bytes, mime_type: str) -> LLMFile:
+        """Upload data (whose SHA-256 is key)."""
+
+
+class GeminiFileStore(UploadingFileStore):
+    """Gemini API Files API."""
+
+    name = "gemini"
+
+    def __init__(self, gateway: Optional[LLMGateway] = None, min_bytes: Optional[int] = None):
+        super().__init__(min_bytes)
+        self.gateway = gateway or get_llm_gateway()
+
+    async def _upload(self, key: str, data: bytes, mime_type: str) -> LLMFile:
+        client = self.gateway.client
+        file = await client.aio.files.upload(
+            file=io.BytesIO(data),
+            config=types.UploadFileConfig(mime_type=mime_type, display_name=key),
+        )
+        # PDFs are usually ACTIVE at once; wait for the others
+        waited = 0.0
+        while file.state == types.FileState.PROCESSING:
+            if waited >= _POLL_TIMEOUT:
+                raise TimeoutError(f"{file.name} still processing after {waited:.0f}s")
+            await asyncio.sleep(_POLL_INTERVAL)
+            waited += _POLL_INTERVAL
+            file = await client.aio.files.get(name=file.name)
+        if file.state == types.FileState.FAILED:
+            raise RuntimeError(f"{file.name} processing failed: {file.error}")
+
+        expires_at = time.time() + GEMINI_FILE_TTL
+        if file.expiration_time is not None:
+            expires_at = min(expires_at, file.expiration_time.timestamp())
+        return LLMFile(uri=file.uri, mime_type=mime_type, size=len(data), expires_at=expires_at)
+
+
+class StorageFileStore(UploadingFileStore):
+    """Objects in the documents bucket, referenced by gs:// URI (Vertex AI)."""
+
+    name = "gcs"
+
+    def __init__(self, storage=None, min_bytes: Optional[int] = None):
+        super().__init__(min_bytes)
+        if storage is None:
+            from app.services.storage import get_storage_service
+
+            storage = get_storage_service()
+        self.storage = storage
+
+    async def _upload(self, key: str, data: bytes, mime_type: str) -> LLMFile:
+        object_name = f"{STORAGE_PREFIX}{key}"
+        # Content-addressed: another process may have uploaded it already
+        if not await asyncio.to_thread(self.storage.file_exists, object_name):
+            await asyncio.to_thread(self.storage.upload_file, data, object_name, None, mime_type)
+        return LLMFile(
+            uri=f"gs://{self.storage.bucket}/{object_name}",
+            mime_type=mime_type,
+            size=len(data),
+            expires_at=time.time() + STORAGE_FILE_TTL,
+        )
+
+
+class LocalFileStore(UploadingFileStore):
+    """In-memory uploads for tests: objects keeps the bytes by URI."""
+
+    name = "local"
+
+    def __init__(self, min_bytes: Optional[int] = None, ttl: float = GEMINI_FILE_TTL):
+        super().__init__(min_bytes)
+        self.ttl = ttl
+        self.objects: Dict[str, bytes] = {}
+
+    async def _upload(self, key: str, data: bytes, mime_type: str) -> LLMFile:
+        uri = f"local://{STORAGE_PREFIX}{key}"
+        self.objects[uri] = data
+        return LLMFile(
+            uri=uri, mime_type=mime_type, size=len(data), expires_at=time.time() + self.ttl
+        )
+
+
+def _backend() -> str:
+    backend = settings.LLM_FILE_BACKEND.lower()
+    if backend != "auto":
+        return backend
+    if not settings.GEMINI_USE_VERTEXAI:
+        return "gemini"
+    # Vertex AI reads gs:// URIs only
+    return "gcs" if settings.STORAGE_BACKEND.lower() == "gcs" else "inline"
+
+
+def create_llm_file_store(backend: Optional[str] = None) -> LLMFileStore:
+    """A file store for the given (or configured) backend."""
+    backend = backend or _backend()
+    if backend == "gemini":
+        return GeminiFileStore()
+    if backend == "gcs":
+        return StorageFileStore()
+    if backend == "local":
+        return LocalFileStore()
+    if backend != "inline":
+        logger.warning(f"Unknown LLM_FILE_BACKEND '{backend}', sending files inline")
+    return InlineFileStore()
+
+
+# =============================================================================
+# Singleton
+# =============================================================================
+
+_instance: Optional[LLMFileStore] = None
+
+
+def get_llm_file_store() -> LLMFileStore:
+    """Get or create the process-wide LLMFileStore."""
+    global _instance
+    if _instance is None:
+        _instance = create_llm_file_store()
+        logger.info(f"LLM file backend: {_instance.name}")
+    return _instance
@@ -0,0 +1,630 @@
+"""
+LLM Gateway - Single entry point for every Gemini call of the app.
+
+DocumentProcessor, DocumentParser, DocumentAnalyzer and ImageGenerator call
+LLMGateway.generate() instead of owning a genai.Client, so that:
+- HTTP connections are pooled: one client per event loop (the API and the
+  job worker run separate loops) with LLM_HTTP_POOL_SIZE keep-alive
+  connections, shared by all services.
+- Calls use the SDK's native async API (client.aio): they neither block
+  the event loop nor hold a worker thread, and are cancelled with the task
+  awaiting them, which frees their rate limiter slot at once.
+- Each attempt takes a slot from the shared rate limiter (concurrency,
+  RPM and TPM budgets, see rate_limiter.py) and is abandoned after
+  LLM_CALL_TIMEOUT seconds.
+- Transient errors (429, 503, timeouts) are retried MAX_RETRIES times with
+  jittered exponential backoff, so concurrent callers do not retry in step,
+  within a deadline for the whole call (LLM_CALL_DEADLINE).
+- Small calls can be hedged: an attempt still running past the p95 latency
+  of its operation gets a duplicate request, the first answer wins.
+- A circuit breaker per model fails calls fast (LLMUnavailableError) after
+  LLM_BREAKER_THRESHOLD consecutive transient failures, until a probe call
+  succeeds.
+- Every call records its latency, attempts, token usage and estimated
+  cost (LLMMetrics, Logfire), and every attempt its latency, from which the
+  p95 is taken. Calls made inside track_llm_usage() are also collected so
+  the caller can persist them per document (see llm_usage.py).
+
+The response helpers (extract_text, extract_image, generation_config) are
+shared by all services too; JSON answers are read with parse_json (see
+json_parse.py).
+"""
+
+import asyncio
+import logging
+import random
+import threading
+import time
+import weakref
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
+
+import httpx
+from google import genai
+from google.genai import types
+
+from app.core.config import settings
+from app.core.logging import log_llm_metrics
+from app.services.ai.rate_limiter import estimate_tokens, get_rate_limiter
+
+logger = logging.getLogger(__name__)
+
+# Retry configuration for transient Vertex AI errors
+MAX_RETRIES = 3
+RETRY_BASE_DELAY = 5  # seconds, doubled on each attempt
+RETRYABLE_PATTERNS = {"429", "503", "RESOURCE_EXHAUSTED", "SERVICE_UNAVAILABLE"}
+
+
+class LLMTimeoutError(TimeoutError):
+    """A Gemini call did not answer within its timeout."""
+
+
+class LLMUnavailableError(RuntimeError):
+    """The model's circuit breaker is open: the call was not attempted."""
+
+
+def is_retryable(error: Exception) -> bool:
+    """Check if an error is a transient Vertex AI error worth retrying."""
+    if isinstance(error, LLMTimeoutError):
+        return True
+    error_str = str(error)
+    return any(pattern in error_str for pattern in RETRYABLE_PATTERNS)
+
+
+def retry_delay(attempt: int) -> float:
+    """Backoff before retry `attempt` (0-based): equal jitter over base * 2**attempt."""
+    delay = RETRY_BASE_DELAY * (2**attempt)
+    return random.uniform(delay / 2, delay)
+
+
+# ---------------------------------------------------------------------------
+# Response helpers
+# ---------------------------------------------------------------------------
+
+
+def generation_config(
+    max_tokens: int = 4096,
+    temperature: float = 0.1,
+    thinking_budget: Optional[int] = None,
+    **kwargs: Any,
+) -> types.GenerateContentConfig:
+    """
+    Generation config shared by the services.
+
+    thinking_budget=None keeps the model default; gemini-2.5-flash thinks by
+    default, so pass 0 to stop thinking tokens consuming max_output_tokens.
+    """
+    if thinking_budget is not None:
+        kwargs["thinking_config"] = types.ThinkingConfig(thinking_budget=thinking_budget)
+    return types.GenerateContentConfig(
+        temperature=temperature, top_p=0.95, max_output_tokens=max_tokens, **kwargs
+    )
+
+
+def _response_parts(response: Any) -> list:
+    candidates = getattr(response, "candidates", None) or []
+    if not candidates:
+        return []
+    content = getattr(candidates[0], "content", None)
+    return getattr(content, "parts", None) or []
+
+
+def extract_text(response: Any) -> str:
+    """Text of a Gemini response, skipping thinking parts."""
+    return "\n".join(
+        p.text
+        for p in _response_parts(response)
+        if getattr(p, "text", None) and not getattr(p, "thought", False)
+    ).strip()
+
+
+def extract_image(response: Any) -> Optional[types.Part]:
+    """First image output of a Gemini response."""
+    for p in _response_parts(response):
+        inline = getattr(p, "inline_data", None)
+        if inline and getattr(inline, "data", None):
+            return types.Part.from_bytes(data=inline.data, mime_type=inline.mime_type)
+    return None
+
+
+# ---------------------------------------------------------------------------
+# Metrics
+# ---------------------------------------------------------------------------
+
+# Attempt latencies kept per model and operation for the percentiles
+LATENCY_WINDOW = 200
+
+# USD per million tokens (input, output), matched by model name prefix;
+# thinking tokens are billed as output
+MODEL_PRICES: Dict[str, Tuple[float, float]] = {
+    "gemini-2.5-flash-lite": (0.10, 0.40),
+    "gemini-2.5-flash-image": (0.30, 30.0),
+    "gemini-2.5-flash": (0.30, 2.50),
+    "gemini-2.5-pro": (1.25, 10.0),
+    "gemini-2.0-flash": (0.10, 0.40),
+}
+
+
+def estimate_cost(model: str, input_tokens: int, output_tokens: int, thinking_tokens: int) -> float:
+    """Estimated cost of a call in USD (0 for unknown models)."""
+    prefix = max((p for p in MODEL_PRICES if model.startswith(p)), key=len, default=None)
+    if prefix is None:
+        return 0.0
+    input_price, output_price = MODEL_PRICES[prefix]
+    return (input_tokens * input_price + (output_tokens + thinking_tokens) * output_price) / 1e6
+
+
+@dataclass
+class LLMCallMetrics:
+    """Measurements of one generate() call, retries included."""
+
+    model: str
+    operation: str
+    latency_ms: int = 0
+    attempts: int = 0
+    hedged: int = 0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    thinking_tokens: int = 0
+    cost_usd: float = 0.0
+    error: Optional[str] = None
+
+
+@dataclass
+class _Totals:
+    calls: int = 0
+    errors: int = 0
+    retries: int = 0
+    hedged: int = 0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    thinking_tokens: int = 0
+    cost_usd: float = 0.0
+    latency_ms: int = 0
+
+
+class LLMMetrics:
+    """
+    Per-process call totals and recent attempt latencies by model and
+    operation (thread-safe).
+    """
+
+    def __init__(self):
+        self._totals: Dict[Tuple[str, str], _Totals] = {}
+        self._latencies: Dict[Tuple[str, str], Deque[float]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, call: LLMCallMetrics) -> None:
+        with self._lock:
+            totals = self._totals.setdefault((call.model, call.operation), _Totals())
+            totals.calls += 1
+            totals.errors += call.error is not None
+            totals.retries += max(call.attempts - 1, 0)
+            totals.hedged += call.hedged
+            totals.input_tokens += call.input_tokens
+            totals.output_tokens += call.output_tokens
+            totals.thinking_tokens += call.thinking_tokens
+            totals.cost_usd += call.cost_usd
+            totals.latency_ms += call.latency_ms
+
+    def record_latency(self, model: str, operation: str, seconds: float) -> None:
+        """Duration of one attempt (request only, timeouts included)."""
+        with self._lock:
+            window = self._latencies.setdefault((model, operation), deque(maxlen=LATENCY_WINDOW))
+            window.append(seconds)
+
+    def latency_quantile(
+        self, model: str, operation: str, q: float, min_samples: int = 1
+    ) -> Optional[float]:
+        """Quantile q of the recent attempt latencies, None below min_samples."""
+        with self._lock:
+            samples = sorted(self._latencies.get((model, operation), ()))
+        if len(samples) < max(min_samples, 1):
+            return None
+        return samples[min(int(q * len(samples)), len(samples) - 1)]
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Totals keyed by "model/operation", with the mean and p95 latencies."""
+        with self._lock:
+            keys = list(self._totals.items())
+        return {
+            f"{model}/{operation}": {
+                **vars(totals),
+                "mean_latency_ms": totals.latency_ms // totals.calls,
+                "p95_latency_ms": int((self.latency_quantile(model, operation, 0.95) or 0) * 1000),
+            }
+            for (model, operation), totals in keys
+        }
+
+
+def token_usage(response: Any) -> Tuple[Optional[int], int, int, int]:
+    """Total, input, output and thinking token counts of a response."""
+    usage = getattr(response, "usage_metadata", None)
+    total = getattr(usage, "total_token_count", None)
+    counts = [
+        getattr(usage, name, None)
+        for name in ("prompt_token_count", "candidates_token_count", "thoughts_token_count")
+    ]
+    return (
+        total if isinstance(total, int) else None,
+        *(count if isinstance(count, int) else 0 for count in counts),
+    )
+
+
+@dataclass
+class LLMUsage:
+    """The calls made inside a track_llm_usage() block."""
+
+    calls: List[LLMCallMetrics] = field(default_factory=list)
+
+    @property
+    def model(self) -> Optional[str]:
+        """Model of the most tokens."""
+        tokens: Dict[str, int] = {}
+        for call in self.calls:
+            tokens[call.model] = tokens.get(call.model, 0) + self._tokens(call)
+        return max(tokens, key=tokens.get, default=None)
+
+    @property
+    def total_tokens(self) -> int:
+        return sum(self._tokens(call) for call in self.calls)
+
+    @property
+    def cost_usd(self) -> float:
+        return sum(call.cost_usd for call in self.calls)
+
+    @staticmethod
+    def _tokens(call: LLMCallMetrics) -> int:
+        return call.input_tokens + call.output_tokens + call.thinking_tokens
+
+
+_usage_scope: ContextVar[Optional[LLMUsage]] = ContextVar("llm_usage", default=None)
+
+
+@contextmanager
+def track_llm_usage() -> Iterator[LLMUsage]:
+    """
+    Collect the gateway calls made in this block, including those of the
+    tasks it starts (they inherit the context).
+    """
+    usage = LLMUsage()
+    token = _usage_scope.set(usage)
+    try:
+        yield usage
+    finally:
+        _usage_scope.reset(token)
+
+
+# ---------------------------------------------------------------------------
+# Circuit breaker
+# ---------------------------------------------------------------------------
+
+
+class CircuitBreaker:
+    """
+    Fails calls fast while a model looks down (thread-safe).
+
+    After `threshold` consecutive transient failures (429, 503, timeouts) the
+    breaker opens: calls raise LLMUnavailableError without reaching Gemini.
+    After `cooldown` seconds one probe call goes through; its success closes
+    the breaker, its failure opens it for another cooldown.
+    """
+
+    def __init__(self, name: str, threshold: int, cooldown: float):
+        self.name = name
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        with self._lock:
+            return self._opened_at is not None
+
+    def allow(self) -> bool:
+        """Whether a call may go through now (claims the probe when half-open)."""
+        if self.threshold <= 0:
+            return True
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if self._probing or time.monotonic() - self._opened_at < self.cooldown:
+                return False
+            self._probing = True
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self._opened_at is not None:
+                logger.info(f"Circuit breaker for {self.name} closed")
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._probing or (self._opened_at is None and self._failures >= self.threshold):
+                if self._opened_at is None:
+                    logger.warning(
+                        f"Circuit breaker for {self.name} opened after "
+                        f"{self._failures} consecutive failures"
+                    )
+                self._opened_at = time.monotonic()
+            self._probing = False
+
+    def release_probe(self) -> None:
+        """The probe ended without an answer (cancelled): let another one through."""
+        with self._lock:
+            self._probing = False
+
+
+# ---------------------------------------------------------------------------
+# Gateway
+# ---------------------------------------------------------------------------
+
+
+def _create_client() -> genai.Client:
+    http_options = types.HttpOptions(
+        async_client_args={
+            "limits": httpx.Limits(
+                max_connections=settings.LLM_HTTP_POOL_SIZE,
+                max_keepalive_connections=settings.LLM_HTTP_POOL_SIZE,
+            )
+        }
+    )
+    if settings.GEMINI_USE_VERTEXAI:
+        if not settings.GOOGLE_CLOUD_PROJECT:
+            raise RuntimeError("GOOGLE_CLOUD_PROJECT required for Vertex AI")
+        return genai.Client(
+            vertexai=True,
+            project=settings.GOOGLE_CLOUD_PROJECT,
+            location=settings.GOOGLE_CLOUD_LOCATION,
+            http_options=http_options,
+        )
+    if not settings.GOOGLE_CLOUD_API_KEY:
+        raise RuntimeError("GOOGLE_CLOUD_API_KEY required for Gemini API")
+    return genai.Client(api_key=settings.GOOGLE_CLOUD_API_KEY, http_options=http_options)
+
+
+class LLMGateway:
+    """Pooled, rate-limited, retried, hedged and measured Gemini calls."""
+
+    def __init__(self, client: Any = None):
+        # A fixed client (tests, scripts) replaces the per-loop pool
+        self._fixed_client = client
+        self._clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, genai.Client]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+        self.metrics = LLMMetrics()
+
+    @property
+    def client(self) -> genai.Client:
+        """The client of the running event loop (its connections belong to that loop)."""
+        if self._fixed_client is not None:
+            return self._fixed_client
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            client = self._clients.get(loop)
+            if client is None:
+                client = self._clients[loop] = _create_client()
+        return client
+
+    def breaker(self, model: str) -> CircuitBreaker:
+        """The circuit breaker of a model."""
+        with self._lock:
+            breaker = self._breakers.get(model)
+            if breaker is None:
+                breaker = self._breakers[model] = CircuitBreaker(
+                    model, settings.LLM_BREAKER_THRESHOLD, settings.LLM_BREAKER_COOLDOWN
+                )
+        return breaker
+
+    async def aclose(self) -> None:
+        """Close the pooled connections of the running event loop."""
+        with self._lock:
+            client = self._clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.aio.aclose()
+
+    async def _generate_once(
+        self, call: LLMCallMetrics, contents: Any, config: Any, timeout: float
+    ) -> Any:
+        breaker = self.breaker(call.model)
+        if not breaker.allow():
+            raise LLMUnavailableError(f"{call.model} is failing, not calling it for now")
+
+        limiter = get_rate_limiter()
+        estimated = estimate_tokens(contents)
+        try:
+            await limiter.acquire(estimated)
+        except BaseException:
+            breaker.release_probe()
+            raise
+        actual = None
+        start = time.monotonic()
+        try:
+            response = await asyncio.wait_for(
+                self.client.aio.models.generate_content(
+                    model=call.model, contents=contents, config=config
+                ),
+                timeout=timeout or None,
+            )
+            actual, call.input_tokens, call.output_tokens, call.thinking_tokens = token_usage(
+                response
+            )
+            breaker.record_success()
+            return response
+        except asyncio.TimeoutError as e:
+            breaker.record_failure()
+            raise LLMTimeoutError(f"Gemini call timed out after {timeout:.0f}s") from e
+        except Exception as e:
+            # Other errors (bad request, safety...) show the model is up
+            if is_retryable(e):
+                breaker.record_failure()
+            else:
+                breaker.record_success()
+            raise
+        except BaseException:
+            breaker.release_probe()
+            raise
+        finally:
+            self.metrics.record_latency(call.model, call.operation, time.monotonic() - start)
+            await limiter.release(estimated, actual)
+
+    def _hedge_delay(self, call: LLMCallMetrics, timeout: float) -> Optional[float]:
+        """Seconds after which a duplicate request is sent, None to not hedge."""
+        if not settings.LLM_HEDGING_ENABLED:
+            return None
+        p95 = self.metrics.latency_quantile(
+            call.model, call.operation, 0.95, min_samples=settings.LLM_HEDGE_MIN_SAMPLES
+        )
+        if p95 is None or (timeout and p95 >= timeout):
+            return None
+        return p95
+
+    async def _attempt(
+        self, call: LLMCallMetrics, contents: Any, config: Any, timeout: float, hedge: bool
+    ) -> Any:
+        """One attempt, duplicated once it runs past the p95 latency if hedge is set."""
+        delay = self._hedge_delay(call, timeout) if hedge else None
+        if delay is None:
+            return await self._generate_once(call, contents, config, timeout)
+
+        first = asyncio.ensure_future(self._generate_once(call, contents, config, timeout))
+        pending = {first}
+        try:
+            done, _ = await asyncio.wait(pending, timeout=delay)
+            if not done:
+                call.hedged += 1
+                logger.info(
+                    f"Hedging {call.operation} call to {call.model} after {delay:.1f}s (p95)"
+                )
+                remaining = max(timeout - delay, 0.001) if timeout else 0
+                pending.add(
+                    asyncio.ensure_future(self._generate_once(call, contents, config, remaining))
+                )
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            # Wait for the losers so their rate limiter slots are free on return
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    async def generate(
+        self,
+        *,
+        model: str,
+        contents: Any,
+        config: Any = None,
+        timeout: Optional[float] = None,
+        deadline: Optional[float] = None,
+        retries: int = MAX_RETRIES,
+        hedge: bool = False,
+        operation: str = "generate",
+        context: Optional[str] = None,
+    ) -> Any:
+        """
+        Rate-limited generate_content with timeouts, retries and hedging.
+
+        timeout bounds each attempt (LLM_CALL_TIMEOUT by default) and
+        deadline the whole call, retries and backoff included
+        (LLM_CALL_DEADLINE by default); 0 disables either. With hedge set, an
+        attempt still running past the p95 latency of this operation gets a
+        duplicate request and the first answer wins: meant for small calls
+        (classification, merges) where a duplicate is cheap.
+
+        operation groups calls in the metrics (classify, merge, ...); context
+        describes this call in logs and defaults to the operation.
+        """
+        timeout = settings.LLM_CALL_TIMEOUT if timeout is None else timeout
+        deadline = settings.LLM_CALL_DEADLINE if deadline is None else deadline
+        context = context or operation
+        call = LLMCallMetrics(model=model, operation=operation)
+        start = time.monotonic()
+        deadline_at = start + deadline if deadline else None
+        try:
+            for attempt in range(retries + 1):
+                call.attempts = attempt + 1
+                attempt_timeout = timeout
+                if deadline_at is not None:
+                    remaining = deadline_at - time.monotonic()
+                    attempt_timeout = min(timeout, remaining) if timeout else remaining
+                try:
+                    return await self._attempt(call, contents, config, attempt_timeout, hedge)
+                except Exception as e:
+                    if not is_retryable(e) or attempt >= retries:
+                        call.error = type(e).__name__
+                        raise
+                    delay = retry_delay(attempt)
+                    if deadline_at is not None and time.monotonic() + delay >= deadline_at:
+                        call.error = type(e).__name__
+                        logger.warning(f"No time left to retry {context} before its deadline")
+                        raise
+                    logger.warning(
+                        f"Retryable error for {context} (attempt {attempt + 1}/{retries}), "
+                        f"retrying in {delay:.1f}s: {e}"
+                    )
+                    await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            call.error = "cancelled"
+            raise
+        finally:
+            call.latency_ms = int((time.monotonic() - start) * 1000)
+            call.cost_usd = estimate_cost(
+                model, call.input_tokens, call.output_tokens, call.thinking_tokens
+            )
+            self.record_call(call, context)
+
+    def record_call(self, call: LLMCallMetrics, context: Optional[str] = None) -> None:
+        """Count a finished call in the metrics, the usage scope and the logs."""
+        self.metrics.record(call)
+        scope = _usage_scope.get()
+        if scope is not None:
+            scope.calls.append(call)
+        log_llm_metrics(
+            call.model,
+            "gemini",
+            input_tokens=call.input_tokens,
+            output_tokens=call.output_tokens,
+            latency_ms=call.latency_ms,
+            operation=call.operation,
+            thinking_tokens=call.thinking_tokens,
+            attempts=call.attempts,
+            hedged=call.hedged,
+            cost_usd=call.cost_usd,
+            error=call.error or "",
+        )
+        logger.debug(
+            f"LLM call {context or call.operation} ({call.model}): {call.latency_ms}ms, "
+            f"{call.attempts} attempt(s), {call.hedged} hedged, {call.input_tokens}"
+            f"+{call.output_tokens}+{call.thinking_tokens} tokens, ${call.cost_usd:.4f}"
+            + (f", failed: {call.error}" if call.error else "")
+        )
+
+
+# Singleton
+_instance: Optional[LLMGateway] = None
+
+
+def get_llm_gateway() -> LLMGateway:
+    """Get or create the process-wide LLMGateway."""
+    global _instance
+    if _instance is None:
+        _instance = LLMGateway()
+    return _instance
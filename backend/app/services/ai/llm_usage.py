@@ -0,0 +1,122 @@
+"""
+LLM usage - Persisted token usage, latency and cost of Gemini calls.
+
+The document pipeline wraps each document (and the workflow synthesis) in
+track_llm_usage() and hands the collected calls to record_llm_usage(), which
+stores one LLMCallRecord per call and adds the document's totals to its
+langchain_model / langchain_tokens_used / langchain_cost columns.
+llm_usage_stats() aggregates the records for the admin stats endpoint, so
+the prompts (operations) and document types that dominate cost and latency
+stand out.
+"""
+
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.models.document import Document
+from app.models.llm_usage import LLMCallRecord
+from app.services.ai.llm_gateway import LLMUsage
+
+logger = logging.getLogger(__name__)
+
+
+def record_llm_usage(
+    db: Session,
+    usage: LLMUsage,
+    document: Optional[Document] = None,
+    workflow_id: Optional[str] = None,
+    document_category: Optional[str] = None,
+) -> None:
+    """Add the calls of usage to the session (the caller commits)."""
+    if not usage.calls:
+        return
+    if document is not None:
+        workflow_id = workflow_id or document.workflow_id
+        document_category = document_category or document.document_category
+        document.langchain_model = usage.model
+        document.langchain_tokens_used = (document.langchain_tokens_used or 0) + (
+            usage.total_tokens
+        )
+        document.langchain_cost = (document.langchain_cost or 0.0) + usage.cost_usd
+
+    db.add_all(
+        LLMCallRecord(
+            document_id=document.id if document is not None else None,
+            workflow_id=workflow_id,
+            document_category=document_category,
+            operation=call.operation,
+            model=call.model,
+            input_tokens=call.input_tokens,
+            output_tokens=call.output_tokens,
+            thinking_tokens=call.thinking_tokens,
+            latency_ms=call.latency_ms,
+            attempts=call.attempts,
+            hedged=call.hedged,
+            cost_usd=call.cost_usd,
+            error=call.error,
+        )
+        for call in usage.calls
+    )
+
+
+def _aggregates():
+    return (
+        func.count(LLMCallRecord.id).label("calls"),
+        func.coalesce(func.sum(LLMCallRecord.input_tokens), 0).label("input_tokens"),
+        func.coalesce(func.sum(LLMCallRecord.output_tokens), 0).label("output_tokens"),
+        func.coalesce(func.sum(LLMCallRecord.thinking_tokens), 0).label("thinking_tokens"),
+        func.coalesce(func.sum(LLMCallRecord.cost_usd), 0.0).label("cost_usd"),
+        func.coalesce(func.avg(LLMCallRecord.latency_ms), 0).label("mean_latency_ms"),
+        func.coalesce(func.max(LLMCallRecord.latency_ms), 0).label("max_latency_ms"),
+        func.coalesce(func.sum(LLMCallRecord.attempts - 1), 0).label("retries"),
+        func.count(LLMCallRecord.error).label("errors"),
+    )
+
+
+def _row(row: Any, keys: List[str]) -> Dict[str, Any]:
+    data = dict(row._mapping)
+    data["cost_usd"] = round(float(data["cost_usd"]), 6)
+    data["mean_latency_ms"] = int(data["mean_latency_ms"])
+    return {**{key: data.pop(key) for key in keys}, **data}
+
+
+def llm_usage_stats(
+    db: Session,
+    since: Optional[datetime] = None,
+    workflow_id: Optional[str] = None,
+    limit: int = 20,
+) -> Dict[str, Any]:
+    """
+    Usage totals, by operation, document category and model, and the
+    documents and workflows that cost the most.
+    """
+
+    def query(*columns):
+        q = db.query(*columns, *_aggregates())
+        if since is not None:
+            q = q.filter(LLMCallRecord.created_at >= since)
+        if workflow_id is not None:
+            q = q.filter(LLMCallRecord.workflow_id == workflow_id)
+        return q
+
+    def grouped(*columns, top: bool = False):
+        """Aggregates per value of columns, most expensive first."""
+        q = query(*columns)
+        if top:
+            q = q.filter(columns[0].isnot(None))
+        q = q.group_by(*columns).order_by(func.sum(LLMCallRecord.cost_usd).desc())
+        if top:
+            q = q.limit(limit)
+        return [_row(row, [c.key for c in columns]) for row in q.all()]
+
+    return {
+        "totals": _row(query().one(), []),
+        "by_operation": grouped(LLMCallRecord.model, LLMCallRecord.operation),
+        "by_document_category": grouped(LLMCallRecord.document_category),
+        "top_documents": grouped(LLMCallRecord.document_id, top=True),
+        "top_workflows": grouped(LLMCallRecord.workflow_id, top=True),
+    }
@@ -0,0 +1,281 @@
+"""
+LLM rate limiter - Process-wide request/token budget for Gemini calls.
+
+Every Gemini call made through LLMGateway.generate() (llm_gateway.py)
+first waits for:
+- a concurrency slot (LLM_MAX_CONCURRENCY in-flight calls per process,
+  shared by all event loops: API requests and the job worker),
+- a requests-per-minute budget (LLM_RPM_LIMIT),
+- a tokens-per-minute budget (LLM_TPM_LIMIT). Input tokens are estimated
+  before the call and corrected from the response's usage metadata.
+
+The budgets are token buckets implemented with GCRA (one timestamp per
+bucket). With LLM_RATE_LIMIT_BACKEND=redis the bucket state lives in Redis
+so every process and instance shares the same budget: one Lua script
+updates it atomically against the Redis clock, run in a thread so the event
+loop never blocks on the round trip. If Redis is unreachable the limiter
+falls back to the local buckets.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+import redis
+
+from app.core.cache import get_redis
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_REDIS_PREFIX = "llm:ratelimit:"
+
+# GCRA step of TokenBucket._advance, atomically on the server.
+# ARGV: amount, interval, burst, per_minute. Returns the wait in seconds.
+_GCRA_SCRIPT = """
+local time = redis.call("TIME")
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+local tat = tonumber(redis.call("GET", KEYS[1]) or "0")
+local amount = tonumber(ARGV[1])
+local interval = tonumber(ARGV[2])
+local burst = tonumber(ARGV[3])
+local wait = 0
+if amount < 0 then
+    tat = math.max(now, tat + amount * interval)
+else
+    amount = math.min(amount, tonumber(ARGV[4]))
+    tat = math.max(tat, now) + amount * interval
+    wait = math.max(0, tat - burst - now)
+end
+local ttl = math.ceil((tat - now + burst) * 1000)
+redis.call("SET", KEYS[1], string.format("%.6f", tat), "PX", ttl)
+return string.format("%.6f", wait)
+"""
+
+# Token estimates for inline media (corrected after the call)
+CHARS_PER_TOKEN = 4
+_TOKENS_PER_IMAGE = 258
+TOKENS_PER_PDF_PAGE = 258
+_PDF_BYTES_PER_PAGE = 50 * 1024
+
+# Sizes of uploaded files, by URI, for parts referencing them (see llm_files.py)
+_file_sizes: Dict[str, int] = {}
+
+
+def register_file_size(uri: str, size: int) -> None:
+    _file_sizes[uri] = size
+
+
+def forget_file_size(uri: str) -> None:
+    _file_sizes.pop(uri, None)
+
+
+def _media_tokens(mime_type: str, size: int) -> int:
+    if mime_type == "application/pdf":
+        return (size // _PDF_BYTES_PER_PAGE + 1) * TOKENS_PER_PDF_PAGE
+    return _TOKENS_PER_IMAGE
+
+
+class TokenBucket:
+    """
+    Token bucket as a generic cell rate algorithm (GCRA).
+
+    The bucket refills `per_minute` tokens per minute and holds at most one
+    minute of burst. reserve() always succeeds and returns how long the
+    caller must wait before using its tokens, so waiters are served in order.
+    """
+
+    def __init__(self, name: str, per_minute: int, use_redis: bool = False):
+        self.name = name
+        self.per_minute = per_minute
+        self.use_redis = use_redis
+        self._interval = 60.0 / per_minute  # seconds per token
+        self._burst = 60.0  # seconds of tolerance = one minute of tokens
+        self._tat = 0.0  # theoretical arrival time (local state)
+        self._lock = threading.Lock()
+
+    def _advance(self, tat: float, amount: float, now: float) -> Tuple[float, float]:
+        """Return (new_tat, wait) for reserving amount tokens (negative = refund)."""
+        if amount < 0:
+            return max(now, tat + amount * self._interval), 0.0
+        amount = min(amount, self.per_minute)  # one call can't exceed a full bucket
+        new_tat = max(tat, now) + amount * self._interval
+        return new_tat, max(0.0, new_tat - self._burst - now)
+
+    def _reserve_local(self, amount: float, now: float) -> float:
+        with self._lock:
+            self._tat, wait = self._advance(self._tat, amount, now)
+            return wait
+
+    def _reserve_redis(self, amount: float) -> float:
+        gcra = get_redis().register_script(_GCRA_SCRIPT)
+        wait = gcra(
+            keys=[f"{_REDIS_PREFIX}{self.name}"],
+            args=[amount, self._interval, self._burst, self.per_minute],
+        )
+        return float(wait)
+
+    def reserve(self, amount: float) -> float:
+        """Take amount tokens; return the seconds to wait before they are available."""
+        if not amount:
+            return 0.0
+        if self.use_redis:
+            try:
+                return self._reserve_redis(amount)
+            except redis.RedisError as e:
+                logger.warning(f"Redis rate limiter unavailable ({e}), using local bucket")
+        return self._reserve_local(amount, time.time())
+
+    async def areserve(self, amount: float) -> float:
+        """reserve() from the event loop: the Redis round trip runs in a thread."""
+        if self.use_redis and amount:
+            return await asyncio.to_thread(self.reserve, amount)
+        return self.reserve(amount)
+
+    def adjust(self, amount: float) -> None:
+        """Charge (positive) or refund (negative) tokens after the fact."""
+        self.reserve(amount)
+
+    async def aadjust(self, amount: float) -> None:
+        """adjust() from the event loop."""
+        await self.areserve(amount)
+
+
+class SharedSemaphore:
+    """
+    Semaphore usable from several event loops (and threads) at once.
+
+    asyncio.Semaphore is bound to one loop; API requests and the job worker
+    run on different loops but must share the same concurrency budget.
+    """
+
+    def __init__(self, value: int):
+        self._value = value
+        self._lock = threading.Lock()
+        self._waiters: Deque[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = deque()
+
+    async def acquire(self) -> None:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._value > 0 and not self._waiters:
+                self._value -= 1
+                return
+            future = loop.create_future()
+            self._waiters.append((loop, future))
+        try:
+            await future
+        except asyncio.CancelledError:
+            with self._lock:
+                try:
+                    self._waiters.remove((loop, future))
+                    granted = False
+                except ValueError:
+                    granted = True  # release() handed us the slot concurrently
+            if granted:
+                self.release()
+            raise
+
+    def release(self) -> None:
+        with self._lock:
+            while self._waiters:
+                loop, future = self._waiters.popleft()
+                if loop.is_closed():
+                    continue
+                # The slot passes straight to the waiter
+                loop.call_soon_threadsafe(_resolve, future)
+                return
+            self._value += 1
+
+
+def _resolve(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+def estimate_tokens(contents: Any) -> int:
+    """Rough input token count of generate_content contents."""
+    parts: List[Any] = []
+    for content in contents if isinstance(contents, list) else [contents]:
+        if isinstance(content, str):
+            parts.append(content)
+        else:
+            parts.extend(getattr(content, "parts", None) or [content])
+
+    tokens = 0
+    for part in parts:
+        if isinstance(part, str):
+            tokens += len(part) // CHARS_PER_TOKEN
+            continue
+        text = getattr(part, "text", None)
+        if text:
+            tokens += len(text) // CHARS_PER_TOKEN
+        inline = getattr(part, "inline_data", None)
+        if inline is not None and getattr(inline, "data", None):
+            tokens += _media_tokens(getattr(inline, "mime_type", ""), len(inline.data))
+        file_data = getattr(part, "file_data", None)
+        uri = getattr(file_data, "file_uri", None)
+        if isinstance(uri, str):
+            size = _file_sizes.get(uri, _PDF_BYTES_PER_PAGE)
+            tokens += _media_tokens(getattr(file_data, "mime_type", ""), size)
+    return max(tokens, 1)
+
+
+class LLMRateLimiter:
+    """Concurrency slots plus RPM/TPM buckets in front of LLM calls."""
+
+    def __init__(
+        self,
+        rpm: int = 0,
+        tpm: int = 0,
+        max_concurrency: int = 0,
+        backend: str = "local",
+    ):
+        use_redis = backend == "redis"
+        self.requests = TokenBucket("rpm", rpm, use_redis) if rpm > 0 else None
+        self.tokens = TokenBucket("tpm", tpm, use_redis) if tpm > 0 else None
+        self._slots = SharedSemaphore(max_concurrency) if max_concurrency > 0 else None
+
+    async def acquire(self, estimated_tokens: int) -> None:
+        """Wait for a concurrency slot and for the request/token budgets."""
+        if self._slots is not None:
+            await self._slots.acquire()
+        try:
+            wait = 0.0
+            if self.requests is not None:
+                wait = max(wait, await self.requests.areserve(1))
+            if self.tokens is not None:
+                wait = max(wait, await self.tokens.areserve(estimated_tokens))
+            if wait > 0:
+                logger.info(f"LLM rate limit reached, waiting {wait:.1f}s")
+                await asyncio.sleep(wait)
+        except BaseException:
+            if self._slots is not None:
+                self._slots.release()
+            raise
+
+    async def release(self, estimated_tokens: int = 0, actual_tokens: Optional[int] = None) -> None:
+        """Free the slot and correct the token budget with the real usage."""
+        if self._slots is not None:
+            self._slots.release()
+        if self.tokens is not None and actual_tokens is not None:
+            await self.tokens.aadjust(actual_tokens - estimated_tokens)
+
+
+# Singleton
+_instance: Optional[LLMRateLimiter] = None
+
+
+def get_rate_limiter() -> LLMRateLimiter:
+    """Get or create the process-wide LLMRateLimiter."""
+    global _instance
+    if _instance is None:
+        _instance = LLMRateLimiter(
+            rpm=settings.LLM_RPM_LIMIT,
+            tpm=settings.LLM_TPM_LIMIT,
+            max_concurrency=settings.LLM_MAX_CONCURRENCY,
+            backend=settings.LLM_RATE_LIMIT_BACKEND,
+        )
+    return _instance
@@ -1,7 +1,8 @@
 """
 Document Services package.
 
-Provides document parsing and bulk processing functionality.
+Provides document parsing, bulk processing and the incremental property
+synthesis, with PyMuPDF work running in a shared process pool.
 """
 
 from app.services.documents.bulk_processor import (
@@ -12,10 +13,24 @@ from app.services.documents.parser import (
     DocumentParser,
     get_document_parser,
 )
+from app.services.documents.pdf_pool import (
+    PdfProcessPool,
+    get_pdf_pool,
+)
+from app.services.documents.prepared_pdf import PreparedPdf
+from app.services.documents.synthesis import (
+    PropertySynthesizer,
+    get_property_synthesizer,
+)
 
 __all__ = [
     "DocumentParser",
     "get_document_parser",
     "BulkProcessor",
     "get_bulk_processor",
+    "PdfProcessPool",
+    "get_pdf_pool",
+    "PreparedPdf",
+    "PropertySynthesizer",
+    "get_property_synthesizer",
 ]
@@ -5,66 +5,60 @@ Handles bulk document uploads with parallel processing and synthesis.
 """
 
 import asyncio
-import json
 import logging
-import math
-import threading
-from datetime import datetime
-from typing import Any, Dict, List, Optional
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
-import fitz  # PyMuPDF
+from google.genai import types
 from sqlalchemy.orm import Session
 
 from app.core.config import settings
 from app.core.database import SessionLocal
-from app.models.document import Document, DocumentSummary
-from app.models.user import User
+from app.models.document import Document
+from app.models.user import increment_documents_analyzed
 from app.services.ai.document_processor import get_document_processor
+from app.services.ai.keyword_classifier import LEADING_PAGES
+from app.services.ai.llm_batch import PENDING as BATCH_PENDING
+from app.services.ai.llm_batch import BatchStatus, get_llm_batch_backend
+from app.services.ai.llm_gateway import LLMUsage, track_llm_usage
+from app.services.ai.llm_usage import record_llm_usage
+from app.services.documents.prepared_pdf import ChunkPlan, PreparedPdf
+from app.services.documents.progress import (
+    BATCH_SUBMITTED,
+    CHUNK_DONE,
+    CLASSIFIED,
+    DOCUMENT_FAILED,
+    DOCUMENT_SAVED,
+    SYNTHESIS_DONE,
+    WORKFLOW_DONE,
+    publish_progress,
+)
+from app.services.documents.synthesis import document_digest, save_synthesis, synthesis_status
+from app.services.jobs import JobContext, JobNotReadyError, enqueue
 from app.services.storage import get_storage_service
 
 logger = logging.getLogger(__name__)
 
+# Job kinds for queued bulk uploads and for polling their batch (processing_jobs.kind)
+BULK_UPLOAD_JOB = "bulk_upload"
+BULK_BATCH_JOB = "bulk_batch"
+# Batch polls yield to interactive jobs
+BATCH_JOB_PRIORITY = -10
 
-def prepare_pdf(pdf_bytes: bytes) -> Dict[str, Any]:
-    """Prepare a PDF for processing: extract text and metadata using PyMuPDF."""
-    try:
-        doc = fitz.open(stream=pdf_bytes, filetype="pdf")
-        page_count = len(doc)
-
-        # Extract text from all pages
-        text_parts = []
-        for page_num in range(page_count):
-            page = doc[page_num]
-            text = page.get_text("text")
-            if text.strip():
-                text_parts.append(text)
-
-        doc.close()
 
-        extracted_text = "\n\n".join(text_parts)
-        text_extractable = len(extracted_text) > 500
+def _batch_key(document_id: int, chunk: int) -> str:
+    return f"{document_id}/{chunk}"
 
-        logger.info(
-            f"PDF prepared: {page_count} pages, "
-            f"{len(extracted_text)} chars extracted, "
-            f"text_extractable={text_extractable}"
-        )
 
-        return {
-            "pdf_data": pdf_bytes,
-            "text_extractable": text_extractable,
-            "extracted_text": extracted_text if text_extractable else "",
-            "page_count": page_count,
-        }
-
-    except Exception as e:
-        logger.error(f"PDF preparation error: {e}")
-        return {
-            "pdf_data": pdf_bytes,
-            "text_extractable": False,
-            "extracted_text": "",
-            "page_count": 0,
-        }
+@contextmanager
+def _session() -> Iterator[Session]:
+    """A short-lived session for one unit of work (never held across LLM calls)."""
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
 
 
 def chunk_pdf(pdf_bytes: bytes, chunk_size: int) -> List[bytes]:
@@ -79,31 +73,8 @@ def chunk_pdf(pdf_bytes: bytes, chunk_size: int) -> List[bytes]:
     """
     if len(pdf_bytes) <= chunk_size:
         return [pdf_bytes]
-
-    doc = fitz.open(stream=pdf_bytes, filetype="pdf")
-    page_count = len(doc)
-
-    if page_count == 0:
-        doc.close()
-        return [pdf_bytes]
-
-    bytes_per_page = len(pdf_bytes) / page_count
-    pages_per_chunk = max(math.floor(chunk_size / bytes_per_page), 10)
-
-    chunks = []
-    for start in range(0, page_count, pages_per_chunk):
-        end = min(start + pages_per_chunk, page_count)
-        sub_doc = fitz.open()
-        sub_doc.insert_pdf(doc, from_page=start, to_page=end - 1)
-        chunks.append(sub_doc.tobytes())
-        sub_doc.close()
-
-    doc.close()
-    logger.info(
-        f"Split {page_count}-page PDF ({len(pdf_bytes)} bytes) into "
-        f"{len(chunks)} chunks of ~{pages_per_chunk} pages each"
-    )
-    return chunks
+    prepared = PreparedPdf.prepare(pdf_bytes)
+    return prepared.chunk_bytes(prepared.chunk_ranges(chunk_size))
 
 
 class BulkProcessor:
@@ -112,14 +83,22 @@ class BulkProcessor:
 
     Flow:
     1. Download files from storage
-    2. Prepare PDFs (extract text + metadata)
+    2. Prepare PDFs (one PyMuPDF pass, see PreparedPdf)
     3. Process each document with AI (native PDF)
     4. Save results incrementally
     5. Synthesize all results
-    """
 
-    def __init__(self):
-        self.active_tasks: Dict[str, threading.Thread] = {}
+    Progress is published as events along the way (see progress.py).
+
+    Uploads are queued as durable jobs (see app.services.jobs) and run by
+    whichever worker claims them. Large uploads send their analyses to a
+    low-priority LLM batch job instead (see _submit_batch and llm_batch.py).
+
+    Documents are processed concurrently, so no session is shared between
+    them: each write (a document saved or failed, the synthesis) opens its
+    own short-lived session, and status transitions common to the whole
+    upload are a single UPDATE.
+    """
 
     async def process_bulk_upload(
         self,
@@ -127,19 +106,34 @@ class BulkProcessor:
         property_id: int,
         document_uploads: List[Dict[str, Any]],
         output_language: str = "French",
+        final_attempt: bool = True,
+        completed: Optional[List[Dict[str, Any]]] = None,
     ) -> None:
-        """Process bulk document upload asynchronously."""
+        """
+        Process bulk document upload asynchronously.
+
+        Workflow-level errors are re-raised so the job queue can retry. Until
+        the final attempt the documents stay in processing. completed holds
+        the synthesis inputs of documents a previous attempt already saved:
+        they are not analysed again, only synthesized with the others.
+        """
         logger.info(f"Starting bulk processing: {workflow_id}, {len(document_uploads)} documents")
 
-        db = SessionLocal()
-        semaphore = asyncio.Semaphore(3)
+        completed = completed or []
+        if not document_uploads:
+            await self._finish_workflow(
+                workflow_id, property_id, completed, len(completed), output_language
+            )
+            return
+
+        document_ids = [upload["document_id"] for upload in document_uploads]
         try:
-            # Update all documents to processing status
-            for upload in document_uploads:
-                doc = db.query(Document).filter(Document.id == upload["document_id"]).first()
-                if doc:
-                    doc.processing_status = "processing"
-            db.commit()
+            # Move all documents to processing status at once
+            with _session() as db:
+                db.query(Document).filter(Document.id.in_(document_ids)).update(
+                    {Document.processing_status: "processing"}, synchronize_session=False
+                )
+                db.commit()
 
             # Step 1: Download files
             logger.info("Downloading files from storage...")
@@ -149,141 +143,478 @@ class BulkProcessor:
             logger.info("Preparing PDF documents...")
             prepared_docs = await self._prepare_documents(file_data_list)
 
+            if self._use_batch(len(document_uploads)):
+                # Low priority: analyses go to a batch job, finished by run_batch_job
+                await self._submit_batch(
+                    workflow_id,
+                    property_id,
+                    document_uploads,
+                    prepared_docs,
+                    output_language,
+                    completed,
+                )
+                return
+
             # Step 3: Process all documents in parallel
             logger.info(f"Processing {len(document_uploads)} documents in parallel...")
             processor = get_document_processor()
 
             async def process_and_save(i: int, upload: Dict[str, Any]) -> Optional[Dict[str, Any]]:
                 """Process a single document and save the result. Returns None on failure."""
-                try:
-                    logger.info(f"Starting {i + 1}/{len(document_uploads)}: {upload['filename']}")
-
-                    pdf_data = prepared_docs[i]["pdf_data"]
-                    chunks = chunk_pdf(pdf_data, settings.PDF_CHUNK_SIZE)
-
-                    if len(chunks) == 1:
-                        # Normal path — single chunk, process as before
-                        doc_data = {
-                            "filename": upload["filename"],
-                            "pdf_data": pdf_data,
-                            "text_extractable": prepared_docs[i]["text_extractable"],
-                            "extracted_text": prepared_docs[i]["extracted_text"],
-                            "page_count": prepared_docs[i]["page_count"],
-                            "document_id": upload["document_id"],
-                        }
-                        result = await processor.process_document(
-                            doc_data,
-                            output_language=output_language,
-                        )
-                    else:
-                        # Chunked path — split, process in parallel, merge
+                # Collects the LLM calls of this document, chunk tasks included
+                with track_llm_usage() as usage:
+                    try:
                         logger.info(
-                            f"Document {upload['filename']} split into {len(chunks)} chunks"
+                            f"Starting {i + 1}/{len(document_uploads)}: {upload['filename']}"
                         )
 
-                        # Classify using first chunk only
-                        first_chunk_prepared = prepare_pdf(chunks[0])
-                        first_chunk_data = {
-                            "filename": upload["filename"],
-                            "pdf_data": first_chunk_prepared["pdf_data"],
-                            "text_extractable": first_chunk_prepared["text_extractable"],
-                            "extracted_text": first_chunk_prepared["extracted_text"],
-                            "page_count": first_chunk_prepared["page_count"],
-                            "document_id": upload["document_id"],
-                        }
-                        category = await processor.classify_document(first_chunk_data)
-
-                        # Process each chunk with the determined category
-                        processors_map = {
-                            "pv_ag": processor.process_pv_ag,
-                            "diags": processor.process_diagnostic,
-                            "diagnostic": processor.process_diagnostic,
-                            "taxe_fonciere": processor.process_tax,
-                            "charges": processor.process_charges,
-                            "other": processor.process_other,
-                        }
-                        process_fn = processors_map.get(category, processor.process_other)
+                        prepared = prepared_docs[i]
+                        plans = prepared.plan_chunks(
+                            settings.LLM_CHUNK_TOKEN_BUDGET, settings.PDF_CHUNK_SIZE
+                        )
 
-                        # Process all chunks in parallel — skip extracted text
-                        # to reduce per-request tokens (PDF already has the content)
-                        async def process_chunk(ci: int, chunk_bytes: bytes) -> Dict[str, Any]:
-                            chunk_prepared = prepare_pdf(chunk_bytes)
-                            chunk_doc = {
+                        if len(plans) == 1:
+                            # Normal path — single chunk (text only when every page has text)
+                            doc_data = {
                                 "filename": upload["filename"],
-                                "pdf_data": chunk_prepared["pdf_data"],
-                                "text_extractable": False,
-                                "extracted_text": "",
-                                "page_count": chunk_prepared["page_count"],
+                                **await prepared.chunk_document(plans[0]),
+                                "classification_text": prepared.text((0, LEADING_PAGES)),
                                 "document_id": upload["document_id"],
+                                "file_hash": upload.get("file_hash"),
                             }
+                            result = await processor.process_document(
+                                doc_data,
+                                output_language=output_language,
+                                on_classified=lambda category: publish_progress(
+                                    workflow_id,
+                                    CLASSIFIED,
+                                    document_id=upload["document_id"],
+                                    document_category=category,
+                                ),
+                            )
+                        else:
+                            # Chunked path — split, process in parallel, merge
                             logger.info(
-                                f"Processing chunk {ci + 1}/{len(chunks)} "
-                                f"({chunk_prepared['page_count']} pages) "
-                                f"for {upload['filename']}"
+                                f"Document {upload['filename']} split into {len(plans)} chunks "
+                                f"({sum(p.text_only for p in plans)} text only, "
+                                f"~{sum(p.tokens for p in plans)} tokens)"
                             )
-                            async with semaphore:
-                                return await process_fn(chunk_doc, output_language=output_language)
-
-                        chunk_tasks = [process_chunk(ci, c) for ci, c in enumerate(chunks)]
-                        chunk_results = await asyncio.gather(*chunk_tasks)
 
-                        # Merge chunk results
-                        merged_analysis = await processor.merge_chunk_results(
-                            chunk_results, category, output_language=output_language
-                        )
+                            # Classify from the first pages' text (or the first pages)
+                            first_pages_data = {
+                                "filename": upload["filename"],
+                                "pdf_data": prepared.pdf_data,
+                                "page_count": prepared.page_count,
+                                "classification_text": prepared.text((0, LEADING_PAGES)),
+                                "document_id": upload["document_id"],
+                                # Category is cached for the whole file
+                                "file_hash": upload.get("file_hash"),
+                            }
+                            category = await processor.classify_document(first_pages_data)
+                            publish_progress(
+                                workflow_id,
+                                CLASSIFIED,
+                                document_id=upload["document_id"],
+                                document_category=category,
+                            )
+                            merged_analysis = processor.get_cached_analysis(
+                                upload.get("file_hash"), category, output_language
+                            )
 
-                        result = {
-                            "filename": upload["filename"],
-                            "document_type": category,
-                            "result": merged_analysis,
-                            "document_id": upload["document_id"],
-                        }
+                            # Process each chunk with the determined category
+                            processors_map = {
+                                "pv_ag": processor.process_pv_ag,
+                                "diags": processor.process_diagnostic,
+                                "diagnostic": processor.process_diagnostic,
+                                "taxe_fonciere": processor.process_tax,
+                                "charges": processor.process_charges,
+                                "other": processor.process_other,
+                            }
+                            process_fn = processors_map.get(category, processor.process_other)
+
+                            # Process all chunks in parallel — text chunks as text only,
+                            # the others as native PDF without the extracted text
+                            async def process_chunk(ci: int, plan: ChunkPlan) -> Dict[str, Any]:
+                                chunk_doc = {
+                                    "filename": upload["filename"],
+                                    **await prepared.chunk_document(plan),
+                                    "document_id": upload["document_id"],
+                                }
+                                logger.info(
+                                    f"Processing chunk {ci + 1}/{len(plans)} "
+                                    f"(pages {plan.start + 1}-{plan.end}, "
+                                    f"{'text' if plan.text_only else 'pdf'}, ~{plan.tokens} tokens) "
+                                    f"for {upload['filename']}"
+                                )
+                                # Concurrency is bounded by the global LLM rate limiter
+                                chunk_result = await process_fn(
+                                    chunk_doc, output_language=output_language
+                                )
+                                publish_progress(
+                                    workflow_id,
+                                    CHUNK_DONE,
+                                    document_id=upload["document_id"],
+                                    chunk=ci + 1,
+                                    chunks=len(plans),
+                                )
+                                return chunk_result
+
+                            if merged_analysis is None:
+                                # Native chunks are built in one pass over the source
+                                await prepared.chunk_bytes_async(
+                                    [p.page_range for p in plans if not p.text_only]
+                                )
+                                chunk_tasks = [
+                                    process_chunk(ci, plan) for ci, plan in enumerate(plans)
+                                ]
+                                chunk_results = await asyncio.gather(*chunk_tasks)
+
+                                # Merge chunk results
+                                merged_analysis = await processor.merge_chunk_results(
+                                    chunk_results, category, output_language=output_language
+                                )
+                                processor.cache_analysis(
+                                    upload.get("file_hash"),
+                                    category,
+                                    output_language,
+                                    merged_analysis,
+                                )
+
+                            result = {
+                                "filename": upload["filename"],
+                                "document_type": category,
+                                "result": merged_analysis,
+                                "document_id": upload["document_id"],
+                            }
 
-                    await self._save_document_result(db, result)
-                    logger.info(f"Completed {i + 1}/{len(document_uploads)}: {upload['filename']}")
-                    return result
-                except Exception as e:
-                    logger.error(f"Failed to process {upload['filename']}: {e}", exc_info=True)
-                    doc = db.query(Document).filter(Document.id == upload["document_id"]).first()
-                    if doc:
-                        doc.processing_status = "failed"
-                        doc.processing_error = str(e)
-                        doc.is_analyzed = False
-                    db.commit()
-                    return None
+                        await self._save_document_result(result, usage)
+                        publish_progress(
+                            workflow_id,
+                            DOCUMENT_SAVED,
+                            document_id=upload["document_id"],
+                            document_category=result.get("document_type"),
+                            document_subcategory=(result.get("result") or {}).get("subcategory"),
+                            processing_status="completed",
+                            is_analyzed=True,
+                        )
+                        logger.info(
+                            f"Completed {i + 1}/{len(document_uploads)}: {upload['filename']}"
+                        )
+                        return result
+                    except Exception as e:
+                        logger.error(f"Failed to process {upload['filename']}: {e}", exc_info=True)
+                        self._fail_document(workflow_id, upload["document_id"], e, usage)
+                        return None
 
             tasks = [process_and_save(i, upload) for i, upload in enumerate(document_uploads)]
             results = await asyncio.gather(*tasks)
 
             # Step 4: Synthesize only successful results
-            successful_results = [r for r in results if r is not None]
+            await self._finish_workflow(
+                workflow_id,
+                property_id,
+                completed + [r for r in results if r is not None],
+                len(completed) + len(results),
+                output_language,
+            )
 
-            if successful_results:
-                logger.info(
-                    f"Synthesizing {len(successful_results)}/{len(results)} successful results..."
-                )
-                synthesis = await processor.synthesize_results(
+        except Exception as e:
+            logger.error(f"Bulk processing failed: {e}", exc_info=True)
+            values = {Document.processing_error: str(e)}
+            if final_attempt:
+                values[Document.processing_status] = "failed"
+            with _session() as db:
+                db.query(Document).filter(
+                    Document.id.in_(document_ids), Document.processing_status != "completed"
+                ).update(values, synchronize_session=False)
+                db.commit()
+            if final_attempt:
+                publish_progress(workflow_id, WORKFLOW_DONE, status="failed", error=str(e))
+            raise
+
+    async def _finish_workflow(
+        self,
+        workflow_id: str,
+        property_id: int,
+        successful_results: List[Dict[str, Any]],
+        total: int,
+        output_language: str,
+    ) -> None:
+        """Synthesize the successful results, if any, and end the workflow."""
+        if successful_results:
+            logger.info(f"Synthesizing {len(successful_results)}/{total} successful results...")
+            with track_llm_usage() as synthesis_usage:
+                synthesis = await get_document_processor().synthesize_results(
                     successful_results, output_language=output_language
                 )
-                await self._save_synthesis(db, synthesis, property_id)
-            else:
-                logger.warning(f"All {len(results)} documents failed — skipping synthesis")
+            with _session() as db:
+                record_llm_usage(db, synthesis_usage, workflow_id=workflow_id)
+                await self._save_synthesis(
+                    db, synthesis, property_id, successful_results, output_language
+                )
+            publish_progress(workflow_id, SYNTHESIS_DONE, synthesis=synthesis_status(synthesis))
+        else:
+            logger.warning(f"All {total} documents failed — skipping synthesis")
+
+        publish_progress(
+            workflow_id,
+            WORKFLOW_DONE,
+            status="completed" if successful_results else "failed",
+            completed=len(successful_results),
+            failed=total - len(successful_results),
+        )
+        logger.info(f"Bulk processing completed: {workflow_id}")
+
+    def _fail_document(
+        self,
+        workflow_id: str,
+        document_id: int,
+        error: Exception,
+        usage: Optional[LLMUsage] = None,
+    ) -> None:
+        """Mark a document as failed, with the LLM usage it took."""
+        with _session() as db:
+            doc = db.query(Document).filter(Document.id == document_id).first()
+            if doc:
+                doc.processing_status = "failed"
+                doc.processing_error = str(error)
+                doc.is_analyzed = False
+                if usage is not None:
+                    record_llm_usage(db, usage, doc)
+            db.commit()
+        publish_progress(
+            workflow_id,
+            DOCUMENT_FAILED,
+            document_id=document_id,
+            processing_status="failed",
+            processing_error=str(error),
+        )
 
-            logger.info(f"Bulk processing completed: {workflow_id}")
+    # ------------------------------------------------------------------
+    # Batch mode
+    # ------------------------------------------------------------------
 
-        except Exception as e:
-            logger.error(f"Bulk processing failed: {e}", exc_info=True)
-            for upload in document_uploads:
-                doc = db.query(Document).filter(Document.id == upload["document_id"]).first()
-                if doc:
-                    doc.processing_status = "failed"
-                    doc.processing_error = str(e)
+    def _use_batch(self, document_count: int) -> bool:
+        """Whether an upload this large goes to a batch job."""
+        threshold = settings.BULK_BATCH_MIN_DOCUMENTS
+        return threshold > 0 and document_count >= threshold and get_llm_batch_backend() is not None
+
+    async def _submit_batch(
+        self,
+        workflow_id: str,
+        property_id: int,
+        document_uploads: List[Dict[str, Any]],
+        prepared_docs: List[PreparedPdf],
+        output_language: str,
+        completed: Optional[List[Dict[str, Any]]] = None,
+    ) -> None:
+        """
+        Classify each document, then submit the analyses of every document
+        and chunk as one batch job and queue its polling.
+
+        Classification stays interactive (keywords first, a small call
+        otherwise): the analysis prompt depends on it. Cached analyses are
+        saved right away and not batched, like the documents completed by a
+        previous attempt.
+        """
+        processor = get_document_processor()
+        backend = get_llm_batch_backend()
+        cached: List[Dict[str, Any]] = list(completed or [])
+        total = len(document_uploads) + len(cached)
+
+        async def prepare_requests(
+            upload: Dict[str, Any], prepared: PreparedPdf
+        ) -> Optional[Tuple[Dict[str, Any], Dict[str, types.InlinedRequest]]]:
+            """The document and its chunk requests; None if cached or failed."""
+            with track_llm_usage() as usage:
+                try:
+                    category = await processor.classify_document(
+                        {
+                            "filename": upload["filename"],
+                            "pdf_data": prepared.pdf_data,
+                            "page_count": prepared.page_count,
+                            "classification_text": prepared.text((0, LEADING_PAGES)),
+                            "document_id": upload["document_id"],
+                            "file_hash": upload.get("file_hash"),
+                        }
+                    )
+                    publish_progress(
+                        workflow_id,
+                        CLASSIFIED,
+                        document_id=upload["document_id"],
+                        document_category=category,
+                    )
+                    result = {
+                        "filename": upload["filename"],
+                        "document_type": category,
+                        "document_id": upload["document_id"],
+                    }
+                    analysis = processor.get_cached_analysis(
+                        upload.get("file_hash"), category, output_language
+                    )
+                    if analysis is not None:
+                        result["result"] = analysis
+                        await self._save_document_result(result, usage)
+                        cached.append(result)
+                        return None
+
+                    plans = prepared.plan_chunks(
+                        settings.LLM_CHUNK_TOKEN_BUDGET, settings.PDF_CHUNK_SIZE
+                    )
+                    if len(plans) > 1:
+                        await prepared.chunk_bytes_async(
+                            [p.page_range for p in plans if not p.text_only]
+                        )
+                    chunk_requests = {}
+                    for ci, plan in enumerate(plans):
+                        chunk_doc = {
+                            "filename": upload["filename"],
+                            **await prepared.chunk_document(plan),
+                            "document_id": upload["document_id"],
+                        }
+                        chunk_requests[
+                            _batch_key(upload["document_id"], ci)
+                        ] = await processor.analysis_request(chunk_doc, category, output_language)
+                    # Classification calls; the batch answers are recorded on completion
+                    with _session() as db:
+                        record_llm_usage(
+                            db,
+                            usage,
+                            db.query(Document).filter(Document.id == upload["document_id"]).first(),
+                        )
+                        db.commit()
+                    document = {
+                        **result,
+                        "file_hash": upload.get("file_hash"),
+                        "chunks": len(plans),
+                    }
+                    return document, chunk_requests
+                except Exception as e:
+                    logger.error(
+                        f"Failed to prepare {upload['filename']} for batch: {e}", exc_info=True
+                    )
+                    self._fail_document(workflow_id, upload["document_id"], e, usage)
+                    return None
+
+        prepared_requests = await asyncio.gather(
+            *(prepare_requests(u, p) for u, p in zip(document_uploads, prepared_docs))
+        )
+        # In upload and chunk order: run_batch_job lists the keys the same way
+        batched: List[Dict[str, Any]] = []
+        requests: Dict[str, types.InlinedRequest] = {}
+        for entry in prepared_requests:
+            if entry is not None:
+                batched.append(entry[0])
+                requests.update(entry[1])
+
+        if not batched:
+            await self._finish_workflow(workflow_id, property_id, cached, total, output_language)
+            return
+
+        batch_name = await backend.submit(processor.model, requests, display_name=workflow_id)
+        payload = {
+            "workflow_id": workflow_id,
+            "property_id": property_id,
+            "output_language": output_language,
+            "batch": batch_name,
+            "model": processor.model,
+            "documents": batched,
+            "cached_results": cached,
+            "total": total,
+        }
+        with _session() as db:
+            enqueue(
+                db,
+                BULK_BATCH_JOB,
+                payload,
+                priority=BATCH_JOB_PRIORITY,
+                run_at=datetime.utcnow() + timedelta(seconds=settings.BULK_BATCH_POLL_SECONDS),
+            )
             db.commit()
+        publish_progress(
+            workflow_id,
+            BATCH_SUBMITTED,
+            batch=batch_name,
+            documents=len(batched),
+            requests=len(requests),
+        )
+        logger.info(
+            f"Submitted {len(requests)} analyses of {len(batched)} documents as batch "
+            f"{batch_name} ({len(cached)} cached)"
+        )
 
-        finally:
-            db.close()
-            if workflow_id in self.active_tasks:
-                del self.active_tasks[workflow_id]
+    async def run_batch_job(self, payload: Dict[str, Any], context: JobContext) -> None:
+        """Job handler: poll a submitted batch, and save its results once it is done."""
+        documents = payload["documents"]
+        keys = [_batch_key(d["document_id"], ci) for d in documents for ci in range(d["chunks"])]
+        status = await get_llm_batch_backend().poll(payload["batch"], payload["model"], keys)
+        if status.state == BATCH_PENDING:
+            raise JobNotReadyError(
+                settings.BULK_BATCH_POLL_SECONDS, f"batch {status.name} still running"
+            )
+
+        logger.info(
+            f"Batch {status.name} {status.state}: {len(status.responses)}/{len(keys)} answers"
+        )
+        await self._complete_batch(payload, status)
+
+    async def _complete_batch(self, payload: Dict[str, Any], status: BatchStatus) -> None:
+        """Save each document of a finished batch, merging chunked ones, then synthesize."""
+        workflow_id = payload["workflow_id"]
+        output_language = payload["output_language"]
+        processor = get_document_processor()
+
+        async def save_document(document: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+            filename = document["filename"]
+            category = document["document_type"]
+            with track_llm_usage() as usage:
+                try:
+                    chunk_results = [
+                        processor.parse_analysis(
+                            status.response(_batch_key(document["document_id"], ci)),
+                            filename,
+                        )
+                        for ci in range(document["chunks"])
+                    ]
+                    if len(chunk_results) == 1:
+                        analysis = chunk_results[0]
+                    else:
+                        analysis = await processor.merge_chunk_results(
+                            chunk_results, category, output_language=output_language
+                        )
+                    processor.cache_analysis(
+                        document.get("file_hash"), category, output_language, analysis
+                    )
+                    result = {
+                        "filename": filename,
+                        "document_type": category,
+                        "result": analysis,
+                        "document_id": document["document_id"],
+                    }
+                    await self._save_document_result(result, usage)
+                    publish_progress(
+                        workflow_id,
+                        DOCUMENT_SAVED,
+                        document_id=document["document_id"],
+                        document_category=category,
+                        document_subcategory=analysis.get("subcategory"),
+                        processing_status="completed",
+                        is_analyzed=True,
+                    )
+                    return result
+                except Exception as e:
+                    logger.error(f"Failed to save batch result of {filename}: {e}")
+                    self._fail_document(workflow_id, document["document_id"], e, usage)
+                    return None
+
+        results = await asyncio.gather(*(save_document(d) for d in payload["documents"]))
+        await self._finish_workflow(
+            workflow_id,
+            payload["property_id"],
+            payload["cached_results"] + [r for r in results if r is not None],
+            payload["total"],
+            output_language,
+        )
 
     async def _download_files(self, document_uploads: List[Dict[str, Any]]) -> List[bytes]:
         """Download files from storage in parallel."""
@@ -296,115 +627,148 @@ class BulkProcessor:
         tasks = [download_one(upload["storage_key"]) for upload in document_uploads]
         return await asyncio.gather(*tasks)
 
-    async def _prepare_documents(self, file_data_list: List[bytes]) -> List[Dict[str, Any]]:
-        """Prepare PDFs in parallel: extract text and metadata."""
-
-        async def prepare_one(file_data: bytes) -> Dict[str, Any]:
-            loop = asyncio.get_event_loop()
-            return await loop.run_in_executor(None, prepare_pdf, file_data)
-
-        tasks = [prepare_one(data) for data in file_data_list]
-        return await asyncio.gather(*tasks)
+    async def _prepare_documents(self, file_data_list: List[bytes]) -> List[PreparedPdf]:
+        """Prepare PDFs in parallel (bounded by the PDF process pool)."""
+        return await asyncio.gather(*(PreparedPdf.prepare_async(d) for d in file_data_list))
 
-    async def _save_document_result(self, db: Session, result: Dict[str, Any]) -> None:
-        """Save a processed document result."""
+    async def _save_document_result(
+        self, result: Dict[str, Any], usage: Optional[LLMUsage] = None
+    ) -> None:
+        """Save a processed document result, with the LLM usage it took."""
         doc_id = result.get("document_id")
         if not doc_id:
             return
 
-        doc = db.query(Document).filter(Document.id == doc_id).first()
-        if not doc:
-            return
+        with _session() as db:
+            doc = db.query(Document).filter(Document.id == doc_id).first()
+            if not doc:
+                return
+
+            analysis = result.get("result", {})
+            doc.document_category = result.get("document_type", "unknown")
+            doc.document_subcategory = analysis.get("subcategory")
+            doc.analysis_summary = analysis.get("summary")
+            doc.key_insights = analysis.get("key_insights", [])
+            doc.estimated_annual_cost = analysis.get("estimated_annual_cost", 0.0)
+
+            one_time = analysis.get("one_time_costs", 0.0)
+            if isinstance(one_time, (int, float)):
+                doc.one_time_costs = (
+                    [{"amount": one_time, "description": "Total"}] if one_time > 0 else []
+                )
+            else:
+                doc.one_time_costs = one_time
 
-        analysis = result.get("result", {})
-        doc.document_category = result.get("document_type", "unknown")
-        doc.document_subcategory = analysis.get("subcategory")
-        doc.is_analyzed = True
-        doc.analysis_summary = analysis.get("summary")
-        doc.key_insights = analysis.get("key_insights", [])
-        doc.estimated_annual_cost = analysis.get("estimated_annual_cost", 0.0)
-
-        one_time = analysis.get("one_time_costs", 0.0)
-        if isinstance(one_time, (int, float)):
-            doc.one_time_costs = (
-                [{"amount": one_time, "description": "Total"}] if one_time > 0 else []
-            )
-        else:
-            doc.one_time_costs = one_time
+            newly_analyzed = not doc.is_analyzed
+            doc.is_analyzed = True
+            doc.processing_status = "completed"
+            doc.parsed_at = datetime.utcnow()
 
-        doc.processing_status = "completed"
-        doc.parsed_at = datetime.utcnow()
+            # Increment user's documents analyzed count (once, even if a job is retried)
+            if doc.user_id and newly_analyzed:
+                increment_documents_analyzed(db, doc.user_id)
 
-        # Increment user's documents analyzed count
-        if doc.user_id:
-            user = db.query(User).filter(User.id == doc.user_id).first()
-            if user:
-                user.documents_analyzed_count = (user.documents_analyzed_count or 0) + 1
+            if usage is not None:
+                record_llm_usage(db, usage, doc)
 
-        db.commit()
+            db.commit()
         logger.info(f"Saved document {doc_id}: {result.get('filename')}")
 
     async def _save_synthesis(
-        self, db: Session, synthesis: Dict[str, Any], property_id: int
+        self,
+        db: Session,
+        synthesis: Dict[str, Any],
+        property_id: int,
+        results: List[Dict[str, Any]],
+        output_language: str = "French",
     ) -> None:
-        """Save synthesis to database."""
-        summary = (
-            db.query(DocumentSummary)
-            .filter(DocumentSummary.property_id == property_id, DocumentSummary.category == None)
-            .first()
+        """Save synthesis to database, recording the documents it covers."""
+        docs = db.query(Document).filter(Document.id.in_([r["document_id"] for r in results])).all()
+        # Later updates fold in any other document of the property incrementally
+        save_synthesis(
+            db, property_id, synthesis, [document_digest(doc) for doc in docs], output_language
         )
 
-        if not summary:
-            summary = DocumentSummary(property_id=property_id)
-            db.add(summary)
-
-        summary.overall_summary = synthesis.get("summary", "")
-        summary.total_annual_cost = synthesis.get("total_annual_costs", 0.0)
-        summary.total_one_time_cost = synthesis.get("total_one_time_costs", 0.0)
-        summary.risk_level = synthesis.get("risk_level", "unknown")
-        summary.key_findings = synthesis.get("key_findings", [])
-        summary.recommendations = synthesis.get("recommendations", [])
-
-        # Preserve user_overrides from previous synthesis_data when regenerating
-        if summary.synthesis_data:
-            try:
-                old_data = json.loads(summary.synthesis_data)
-                if "user_overrides" in old_data:
-                    synthesis["user_overrides"] = old_data["user_overrides"]
-            except (json.JSONDecodeError, TypeError):
-                pass
-
-        summary.synthesis_data = json.dumps(synthesis)
-        summary.last_updated = datetime.utcnow()
-
-        db.commit()
-        logger.info(f"Saved synthesis for property {property_id}")
-
     def start_background_task(
         self,
         workflow_id: str,
         property_id: int,
         document_uploads: List[Dict[str, Any]],
         output_language: str = "French",
-    ) -> None:
-        """Start background processing in a dedicated thread."""
-
-        def run_in_thread():
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            try:
-                loop.run_until_complete(
-                    self.process_bulk_upload(
-                        workflow_id, property_id, document_uploads, output_language
-                    )
+        db: Optional[Session] = None,
+    ) -> int:
+        """
+        Queue a bulk upload for processing by a job worker.
+
+        With a session the job is only flushed, so it commits together with
+        the caller's document records. Returns the job id.
+        """
+        payload = {
+            "workflow_id": workflow_id,
+            "property_id": property_id,
+            "document_uploads": document_uploads,
+            "output_language": output_language,
+        }
+        if db is not None:
+            return enqueue(db, BULK_UPLOAD_JOB, payload).id
+
+        own_db = SessionLocal()
+        try:
+            job_id = enqueue(own_db, BULK_UPLOAD_JOB, payload).id
+            own_db.commit()
+            return job_id
+        finally:
+            own_db.close()
+
+    async def run_job(self, payload: Dict[str, Any], context: JobContext) -> None:
+        """Job handler: process a queued bulk upload, skipping documents already completed."""
+        uploads = payload["document_uploads"]
+        completed = self._completed_results(uploads) if context.attempt > 1 else []
+        done = {result["document_id"] for result in completed}
+        await self.process_bulk_upload(
+            payload["workflow_id"],
+            payload["property_id"],
+            [upload for upload in uploads if upload["document_id"] not in done],
+            payload.get("output_language", "French"),
+            final_attempt=context.is_final_attempt,
+            completed=completed,
+        )
+
+    def _completed_results(self, document_uploads: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Synthesis inputs of the uploaded documents a previous attempt completed."""
+        with _session() as db:
+            docs = (
+                db.query(Document)
+                .filter(
+                    Document.id.in_([upload["document_id"] for upload in document_uploads]),
+                    Document.processing_status == "completed",
                 )
-            finally:
-                loop.close()
+                .all()
+            )
+            return [document_digest(doc) for doc in docs]
 
-        thread = threading.Thread(target=run_in_thread, daemon=True)
-        thread.start()
-        self.active_tasks[workflow_id] = thread
-        logger.info(f"Started background thread for: {workflow_id}")
+    def fail_job(self, payload: Dict[str, Any], error: str) -> None:
+        """Dead job handler: fail the documents a bulk upload or batch left unfinished."""
+        db = SessionLocal()
+        try:
+            # Bulk upload jobs list document_uploads, batch jobs the batched documents
+            uploads = payload.get("document_uploads", payload.get("documents", []))
+            document_ids = [upload["document_id"] for upload in uploads]
+            db.query(Document).filter(
+                Document.id.in_(document_ids),
+                Document.processing_status.in_(("pending", "processing")),
+            ).update(
+                {
+                    Document.processing_status: "failed",
+                    Document.processing_error: error,
+                },
+                synchronize_session=False,
+            )
+            db.commit()
+            publish_progress(payload["workflow_id"], WORKFLOW_DONE, status="failed", error=error)
+            logger.warning(f"Marked unfinished documents of {payload['workflow_id']} as failed")
+        finally:
+            db.close()
 
 
 # Singleton
@@ -4,21 +4,32 @@ Document Parser - Multimodal document parsing using Gemini.
 Handles PDF-to-image conversion and AI analysis for property documents.
 """
 
+import asyncio
 import base64
 import json
 import logging
 from datetime import datetime
-from typing import Any, Dict, List, Optional
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
 
-import fitz  # PyMuPDF
-from google import genai
 from google.genai import types
 from sqlalchemy.orm import Session
 
 from app.core.config import settings
 from app.models.document import Document, DocumentSummary
-from app.models.user import User
+from app.models.user import increment_documents_analyzed
 from app.prompts import get_prompt
+from app.services.ai import analysis_cache
+from app.services.ai.json_parse import parse_json
+from app.services.ai.llm_gateway import (
+    LLMUsage,
+    extract_text,
+    generation_config,
+    get_llm_gateway,
+    track_llm_usage,
+)
+from app.services.ai.llm_usage import record_llm_usage
+from app.services.documents.pdf_pool import get_pdf_pool
 from app.services.storage import get_storage_service
 
 logger = logging.getLogger(__name__)
@@ -28,57 +39,15 @@ class DocumentParser:
     """Multimodal document parser using Gemini vision capabilities."""
 
     def __init__(self):
-        """Initialize Gemini client."""
+        """Use the shared LLM gateway."""
         logger.info("Initializing DocumentParser")
 
-        self.use_vertexai = settings.GEMINI_USE_VERTEXAI
+        self.gateway = get_llm_gateway()
         self.model = settings.GEMINI_LLM_MODEL
-        self.project = settings.GOOGLE_CLOUD_PROJECT
-        self.location = settings.GOOGLE_CLOUD_LOCATION
-
-        if self.use_vertexai:
-            if not self.project:
-                raise RuntimeError("GOOGLE_CLOUD_PROJECT required for Vertex AI")
-            self.client = genai.Client(vertexai=True, project=self.project, location=self.location)
-        else:
-            api_key = settings.GOOGLE_CLOUD_API_KEY
-            if not api_key:
-                raise RuntimeError("GOOGLE_CLOUD_API_KEY required")
-            self.client = genai.Client(api_key=api_key)
 
         logger.info(f"Using model: {self.model}")
 
-    def _extract_text(self, response) -> str:
-        """Extract text from Gemini response."""
-        candidates = getattr(response, "candidates", None) or []
-        if not candidates:
-            return ""
-        content = getattr(candidates[0], "content", None)
-        parts = getattr(content, "parts", None) or []
-        return "\n".join(p.text for p in parts if getattr(p, "text", None)).strip()
-
-    def _get_config(
-        self, max_tokens: int = 4096, temperature: float = 0.1
-    ) -> types.GenerateContentConfig:
-        """Get generation configuration."""
-        return types.GenerateContentConfig(
-            temperature=temperature, top_p=0.95, max_output_tokens=max_tokens
-        )
-
-    def _extract_json(self, response_text: str) -> str:
-        """Extract JSON from response text."""
-        if "```json" in response_text:
-            return response_text.split("```json")[1].split("```")[0].strip()
-        elif "```" in response_text:
-            return response_text.split("```")[1].split("```")[0].strip()
-        else:
-            json_start = response_text.find("{")
-            json_end = response_text.rfind("}")
-            if json_start != -1 and json_end > json_start:
-                return response_text[json_start : json_end + 1].strip()
-        return response_text
-
-    def pdf_to_images_base64(
+    async def pdf_to_images_base64(
         self,
         pdf_path: str,
         max_pages: int = 20,
@@ -88,6 +57,8 @@ class DocumentParser:
         """
         Convert PDF pages to base64 images.
 
+        The file is read in a thread and rendered in the PDF process pool.
+
         Args:
             pdf_path: Local file path OR storage URI (storage://bucket/key)
             max_pages: Maximum number of pages to convert
@@ -114,27 +85,21 @@ class DocumentParser:
                         raise ValueError(f"Invalid storage path format: {pdf_path}")
 
                 # Download file bytes from storage
-                pdf_bytes = storage.download_file(key, bucket)
-                doc = fitz.open(stream=pdf_bytes, filetype="pdf")
-                logger.info(f"Downloaded and opened PDF from storage: {key}")
+                pdf_bytes = await asyncio.to_thread(storage.download_file, key, bucket)
+                logger.info(f"Downloaded PDF from storage: {key}")
             else:
                 # Local file path
-                doc = fitz.open(pdf_path)
-
-            images = []
-
-            for page_num in range(min(len(doc), max_pages)):
-                page = doc[page_num]
-                pix = page.get_pixmap(matrix=fitz.Matrix(150 / 72, 150 / 72))
-                img_bytes = pix.tobytes("png")
-                images.append(
-                    {
-                        "page_num": page_num + 1,
-                        "base64_image": base64.b64encode(img_bytes).decode("utf-8"),
-                    }
-                )
+                pdf_bytes = await asyncio.to_thread(Path(pdf_path).read_bytes)
+
+            pages = await get_pdf_pool().render_pages(pdf_bytes, max_pages)
+            images = [
+                {
+                    "page_num": page_num,
+                    "base64_image": base64.b64encode(img_bytes).decode("utf-8"),
+                }
+                for page_num, img_bytes in enumerate(pages, start=1)
+            ]
 
-            doc.close()
             logger.info(f"Converted {len(images)} pages from {pdf_path or storage_key}")
             return images
 
@@ -150,24 +115,24 @@ class DocumentParser:
             parts.append(types.Part.from_bytes(data=img_bytes, mime_type="image/png"))
         parts.append(types.Part.from_text(text=prompt))
 
-        response = self.client.models.generate_content(
+        response = await self.gateway.generate(
             model=self.model,
             contents=[types.Content(role="user", parts=parts)],
-            config=self._get_config(),
+            config=generation_config(),
+            operation="parse",
         )
 
-        response_text = self._extract_text(response)
+        response_text = extract_text(response)
         if not response_text:
             logger.warning("Empty response from AI model")
             raise ValueError("AI model returned empty response")
 
-        json_text = self._extract_json(response_text)
-        if not json_text or not json_text.strip():
+        try:
+            return parse_json(response_text)
+        except json.JSONDecodeError:
             logger.warning(f"Could not extract JSON from response: {response_text[:500]}")
             raise ValueError("Could not extract JSON from AI response")
 
-        return json.loads(json_text)
-
     async def parse_pv_ag_multimodal(
         self,
         pdf_path: str,
@@ -177,7 +142,7 @@ class DocumentParser:
     ) -> Dict[str, Any]:
         """Parse PV d'AG using multimodal approach."""
         logger.info(f"Parsing PV d'AG: {pdf_path}, storage_key: {storage_key}")
-        images = self.pdf_to_images_base64(
+        images = await self.pdf_to_images_base64(
             pdf_path, max_pages=15, storage_key=storage_key, storage_bucket=storage_bucket
         )
         if not images:
@@ -201,7 +166,7 @@ class DocumentParser:
     ) -> Dict[str, Any]:
         """Parse diagnostic document."""
         logger.info(f"Parsing diagnostic ({subcategory}): {pdf_path}, storage_key: {storage_key}")
-        images = self.pdf_to_images_base64(
+        images = await self.pdf_to_images_base64(
             pdf_path, max_pages=10, storage_key=storage_key, storage_bucket=storage_bucket
         )
         if not images:
@@ -228,7 +193,7 @@ class DocumentParser:
     ) -> Dict[str, Any]:
         """Parse tax or charges document."""
         logger.info(f"Parsing {category}: {pdf_path}, storage_key: {storage_key}")
-        images = self.pdf_to_images_base64(
+        images = await self.pdf_to_images_base64(
             pdf_path, max_pages=5, storage_key=storage_key, storage_bucket=storage_bucket
         )
         if not images:
@@ -244,6 +209,17 @@ class DocumentParser:
             logger.error(f"Tax/charges parsing error: {e}")
             return {"error": str(e), "summary": "Failed to parse", "key_insights": []}
 
+    def _parse_prompt(self, document: Document) -> Tuple[Optional[str], str]:
+        """Prompt name and variant parse_document uses for a document's category."""
+        category = document.document_category
+        if category == "pv_ag":
+            return "parse_pv_ag", ""
+        if category == "diags":
+            return "parse_diagnostic", document.document_subcategory or "general"
+        if category in ["taxe_fonciere", "charges"]:
+            return "parse_tax_charges", category
+        return None, ""
+
     async def parse_document(
         self, document: Document, db: Session, output_language: str = "French"
     ) -> Document:
@@ -252,35 +228,55 @@ class DocumentParser:
             f"Parsing document ID {document.id}, category: {document.document_category}, storage_key: {document.storage_key}"
         )
 
+        # Identical content parsed before with the same prompt: reuse the result
+        prompt_name, variant = self._parse_prompt(document)
         parsed_data = None
-        # Pass storage_key and storage_bucket for cloud storage support
-        storage_key = document.storage_key
-        storage_bucket = document.storage_bucket
-
-        if document.document_category == "pv_ag":
-            parsed_data = await self.parse_pv_ag_multimodal(
-                document.file_path,
-                storage_key=storage_key,
-                storage_bucket=storage_bucket,
-                output_language=output_language,
-            )
-        elif document.document_category == "diags":
-            parsed_data = await self.parse_diagnostic_multimodal(
-                document.file_path,
-                document.document_subcategory or "general",
-                storage_key=storage_key,
-                storage_bucket=storage_bucket,
-                output_language=output_language,
-            )
-        elif document.document_category in ["taxe_fonciere", "charges"]:
-            parsed_data = await self.parse_tax_charges_multimodal(
-                document.file_path,
-                document.document_category,
-                storage_key=storage_key,
-                storage_bucket=storage_bucket,
-                output_language=output_language,
+        if prompt_name:
+            parsed_data = analysis_cache.get_cached_analysis(
+                document.file_hash, prompt_name, self.model, output_language, variant
             )
 
+        usage = LLMUsage()
+        if parsed_data is None:
+            with track_llm_usage() as usage:
+                # Pass storage_key and storage_bucket for cloud storage support
+                storage_key = document.storage_key
+                storage_bucket = document.storage_bucket
+
+                if document.document_category == "pv_ag":
+                    parsed_data = await self.parse_pv_ag_multimodal(
+                        document.file_path,
+                        storage_key=storage_key,
+                        storage_bucket=storage_bucket,
+                        output_language=output_language,
+                    )
+                elif document.document_category == "diags":
+                    parsed_data = await self.parse_diagnostic_multimodal(
+                        document.file_path,
+                        document.document_subcategory or "general",
+                        storage_key=storage_key,
+                        storage_bucket=storage_bucket,
+                        output_language=output_language,
+                    )
+                elif document.document_category in ["taxe_fonciere", "charges"]:
+                    parsed_data = await self.parse_tax_charges_multimodal(
+                        document.file_path,
+                        document.document_category,
+                        storage_key=storage_key,
+                        storage_bucket=storage_bucket,
+                        output_language=output_language,
+                    )
+
+            if prompt_name and parsed_data and "error" not in parsed_data:
+                analysis_cache.store_analysis(
+                    document.file_hash,
+                    prompt_name,
+                    self.model,
+                    output_language,
+                    parsed_data,
+                    variant,
+                )
+
         if parsed_data and "error" not in parsed_data:
             document.is_analyzed = True
             document.parsed_at = datetime.utcnow()
@@ -303,10 +299,9 @@ class DocumentParser:
 
             # Increment user's documents analyzed count
             if document.user_id:
-                user = db.query(User).filter(User.id == document.user_id).first()
-                if user:
-                    user.documents_analyzed_count = (user.documents_analyzed_count or 0) + 1
+                increment_documents_analyzed(db, document.user_id)
 
+            record_llm_usage(db, usage, document)
             db.commit()
             db.refresh(document)
             logger.info(f"Successfully parsed document ID {document.id}")
@@ -315,6 +310,7 @@ class DocumentParser:
             document.analysis_summary = (
                 f"Failed: {parsed_data.get('error', 'Unknown')}" if parsed_data else "No data"
             )
+            record_llm_usage(db, usage, document)
             db.commit()
 
         return document
@@ -357,12 +353,13 @@ class DocumentParser:
             )
             parts = [types.Part.from_text(text=prompt)]
 
-            response = self.client.models.generate_content(
+            response = await self.gateway.generate(
                 model=self.model,
                 contents=[types.Content(role="user", parts=parts)],
-                config=self._get_config(),
+                config=generation_config(),
+                operation="aggregate",
             )
-            result = json.loads(self._extract_json(self._extract_text(response)))
+            result = parse_json(extract_text(response))
 
             summary = (
                 db.query(DocumentSummary)
@@ -433,12 +430,13 @@ class DocumentParser:
             )
             parts = [types.Part.from_text(text=prompt)]
 
-            response = self.client.models.generate_content(
+            response = await self.gateway.generate(
                 model=self.model,
                 contents=[types.Content(role="user", parts=parts)],
-                config=self._get_config(),
+                config=generation_config(),
+                operation="aggregate",
             )
-            result = json.loads(self._extract_json(self._extract_text(response)))
+            result = parse_json(extract_text(response))
 
             summary = (
                 db.query(DocumentSummary)
@@ -0,0 +1,283 @@
+"""
+PDF process pool - PyMuPDF work outside the event loop and the GIL.
+
+Analysis (text extraction), page splitting and page rendering are CPU-bound. Run in the
+default thread pool they contend on the GIL with the event loop; run inline
+they block it. PdfProcessPool runs them in a bounded ProcessPoolExecutor
+(PDF_POOL_WORKERS processes) shared by API requests and the job worker.
+
+PDF bytes are handed to the workers through shared memory: the parent copies
+the file once into a segment and the worker opens it from a memoryview over
+the same pages, so a 30 MB upload is never pickled through the pool's pipe.
+Only the (small) derived results travel back.
+
+At most 2 x PDF_POOL_WORKERS calls hold a segment at a time; further calls
+wait without blocking their event loop. With PDF_POOL_WORKERS=0, or after
+the pool broke (a worker crashed), operations fall back to a thread.
+
+Workers are recycled after PDF_POOL_MAX_TASKS_PER_CHILD operations to bound
+PyMuPDF's memory growth. ProcessPoolExecutor does this itself from Python
+3.11; on 3.10 the whole pool is replaced once it has run that many operations
+per worker.
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import sys
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import fitz  # PyMuPDF
+
+from app.core.config import settings
+from app.services.ai.rate_limiter import SharedSemaphore
+
+logger = logging.getLogger(__name__)
+
+RENDER_DPI = 150
+
+# ProcessPoolExecutor(max_tasks_per_child=...) is new in Python 3.11
+_NATIVE_RECYCLING = sys.version_info >= (3, 11)
+
+
+# =============================================================================
+# PyMuPDF operations (run inside the worker processes)
+#
+# They accept any bytes-like buffer and return only picklable data.
+# =============================================================================
+
+
+def _stream_size(doc: fitz.Document, xref: int) -> int:
+    try:
+        return len(doc.xref_stream_raw(xref) or b"")
+    except Exception:
+        return 0
+
+
+def analyze_pdf(pdf: Any) -> Dict[str, Any]:
+    """Page count, per-page text, byte estimates and largest image in one pass.
+
+    A page's byte estimate is the size of its content streams and of the
+    images it is the first to use; the remaining bytes (fonts, structure) are
+    spread evenly, so the estimates add up to the file size.
+    """
+    size = len(pdf)
+    doc = fitz.open(stream=pdf, filetype="pdf")
+    try:
+        page_texts = []
+        stream_sizes = []
+        page_image_bytes = []
+        image_sizes: Dict[int, int] = {}
+        for page in doc:
+            page_texts.append(page.get_text("text"))
+            page_bytes = sum(_stream_size(doc, xref) for xref in page.get_contents())
+            largest_image = 0
+            for image in page.get_images(full=True):
+                xref = image[0]
+                if xref not in image_sizes:
+                    image_sizes[xref] = _stream_size(doc, xref)
+                    page_bytes += image_sizes[xref]
+                largest_image = max(largest_image, image_sizes[xref])
+            stream_sizes.append(page_bytes)
+            page_image_bytes.append(largest_image)
+    finally:
+        doc.close()
+
+    page_count = len(page_texts)
+    total = sum(stream_sizes)
+    if page_count and total > size:
+        page_sizes = [s * size // total for s in stream_sizes]
+    elif page_count:
+        overhead = (size - total) // page_count
+        page_sizes = [s + overhead for s in stream_sizes]
+    else:
+        page_sizes = []
+    return {
+        "page_count": page_count,
+        "page_texts": page_texts,
+        "page_sizes": page_sizes,
+        "page_image_bytes": page_image_bytes,
+    }
+
+
+def extract_page_ranges(pdf: Any, ranges: List[Tuple[int, int]]) -> List[bytes]:
+    """Standalone PDFs for [start, end) page ranges, opening the source once."""
+    doc = fitz.open(stream=pdf, filetype="pdf")
+    try:
+        chunks = []
+        for start, end in ranges:
+            sub_doc = fitz.open()
+            sub_doc.insert_pdf(doc, from_page=start, to_page=end - 1)
+            chunks.append(sub_doc.tobytes())
+            sub_doc.close()
+    finally:
+        doc.close()
+    return chunks
+
+
+def render_pages(pdf: Any, max_pages: int, dpi: int = RENDER_DPI) -> List[bytes]:
+    """PNG renderings of the first max_pages pages."""
+    doc = fitz.open(stream=pdf, filetype="pdf")
+    try:
+        zoom = dpi / 72
+        return [
+            doc[page_num].get_pixmap(matrix=fitz.Matrix(zoom, zoom)).tobytes("png")
+            for page_num in range(min(len(doc), max_pages))
+        ]
+    finally:
+        doc.close()
+
+
+def _run_on_shared(fn: Callable[..., Any], name: str, size: int, args: tuple) -> Any:
+    """Worker side: map the parent's segment and run fn on a view of it."""
+    shm = shared_memory.SharedMemory(name=name)
+    view = shm.buf[:size]
+    try:
+        return fn(view, *args)
+    finally:
+        # PyMuPDF has closed the document; the view must go before the mapping
+        view.release()
+        shm.close()
+
+
+# =============================================================================
+# Pool
+# =============================================================================
+
+
+def _mp_context():
+    # Never fork: the API and the job worker run threads (and hold sockets).
+    # forkserver starts each worker from a small preloaded server process.
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("forkserver")
+        context.set_forkserver_preload([__name__])
+        return context
+    return multiprocessing.get_context("spawn")
+
+
+class PdfProcessPool:
+    """Bounded process pool for PyMuPDF operations, usable from any event loop."""
+
+    def __init__(self, max_workers: int, max_tasks_per_child: Optional[int] = None):
+        self.max_workers = max(0, max_workers)
+        self.max_tasks_per_child = max_tasks_per_child or None
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._submitted = 0  # Operations sent to the current executor
+        self._lock = threading.Lock()
+        self._slots = SharedSemaphore(max(1, 2 * self.max_workers))
+
+    def _new_executor(self) -> ProcessPoolExecutor:
+        kwargs: Dict[str, Any] = {}
+        if self.max_tasks_per_child and _NATIVE_RECYCLING:
+            kwargs["max_tasks_per_child"] = self.max_tasks_per_child
+        executor = ProcessPoolExecutor(
+            max_workers=self.max_workers, mp_context=_mp_context(), **kwargs
+        )
+        logger.info(f"PDF process pool started with {self.max_workers} workers")
+        return executor
+
+    def _submit(self, fn: Callable[..., Any], *args: Any) -> Tuple[ProcessPoolExecutor, Future]:
+        """Submit to the current executor, starting (or recycling) it if needed."""
+        with self._lock:
+            if (
+                self._executor is not None
+                and self.max_tasks_per_child
+                and not _NATIVE_RECYCLING
+                and self._submitted >= self.max_workers * self.max_tasks_per_child
+            ):
+                # Submitted operations still complete; the old workers exit afterwards
+                self._executor.shutdown(wait=False)
+                self._executor = None
+            if self._executor is None:
+                self._executor = self._new_executor()
+                self._submitted = 0
+            self._submitted += 1
+            executor = self._executor
+            try:
+                return executor, executor.submit(fn, *args)
+            except BrokenProcessPool:
+                self._executor = None
+                executor.shutdown(wait=False, cancel_futures=True)
+                raise
+
+    def _discard_executor(self, executor: ProcessPoolExecutor) -> None:
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    async def run(self, fn: Callable[..., Any], pdf_bytes: bytes, *args: Any) -> Any:
+        """Run fn(pdf_buffer, *args) in a worker process.
+
+        fn must be a module-level function (it is pickled by reference).
+        """
+        await self._slots.acquire()
+        try:
+            if self.max_workers > 0 and pdf_bytes:
+                try:
+                    return await self._run_in_process(fn, pdf_bytes, args)
+                except BrokenProcessPool:
+                    logger.error("PDF process pool is broken; restarting it")
+            return await asyncio.to_thread(fn, pdf_bytes, *args)
+        finally:
+            self._slots.release()
+
+    async def _run_in_process(self, fn: Callable[..., Any], pdf_bytes: bytes, args: tuple) -> Any:
+        size = len(pdf_bytes)
+        shm = shared_memory.SharedMemory(create=True, size=size)
+        try:
+            shm.buf[:size] = pdf_bytes
+            executor, future = self._submit(_run_on_shared, fn, shm.name, size, args)
+            try:
+                return await asyncio.wrap_future(future)
+            except BrokenProcessPool:
+                self._discard_executor(executor)
+                raise
+        finally:
+            # A worker still reading (cancelled call) keeps its own mapping
+            shm.close()
+            shm.unlink()
+
+    async def analyze(self, pdf_bytes: bytes) -> Dict[str, Any]:
+        return await self.run(analyze_pdf, pdf_bytes)
+
+    async def extract_page_ranges(
+        self, pdf_bytes: bytes, ranges: List[Tuple[int, int]]
+    ) -> List[bytes]:
+        return await self.run(extract_page_ranges, pdf_bytes, ranges)
+
+    async def render_pages(
+        self, pdf_bytes: bytes, max_pages: int, dpi: int = RENDER_DPI
+    ) -> List[bytes]:
+        return await self.run(render_pages, pdf_bytes, max_pages, dpi)
+
+    def shutdown(self, wait: bool = True) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=True)
+            logger.info("PDF process pool stopped")
+
+
+_instance: Optional[PdfProcessPool] = None
+
+
+def get_pdf_pool() -> PdfProcessPool:
+    """Get or create the process-wide PdfProcessPool (workers start on first use)."""
+    global _instance
+    if _instance is None:
+        _instance = PdfProcessPool(
+            max_workers=settings.PDF_POOL_WORKERS,
+            max_tasks_per_child=settings.PDF_POOL_MAX_TASKS_PER_CHILD,
+        )
+    return _instance
+
+
+def shutdown_pdf_pool() -> None:
+    """Stop the worker processes, if they were started."""
+    if _instance is not None:
+        _instance.shutdown()
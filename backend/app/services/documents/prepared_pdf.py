@@ -0,0 +1,246 @@
+"""
+Prepared PDF - one PyMuPDF pass over an uploaded document.
+
+PreparedPdf holds what the bulk processor needs from a PDF: page count,
+per-page text, byte estimates and largest image, all read in a single pass in
+the PDF process pool. Classification, chunking and processing work from it:
+
+- plan_chunks() splits the document into LLM calls of at most
+  LLM_CHUNK_TOKEN_BUDGET estimated tokens. Pages with a usable text layer
+  and no significant image are sent as text only (a fraction of the tokens
+  of a native PDF page); other pages go as native PDF, capped at
+  PDF_CHUNK_SIZE bytes per request,
+- chunk bytes are materialised lazily, several ranges per pool call, and
+  kept so each range is built once,
+- text for any page range comes from the stored page texts.
+"""
+
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.services.ai.rate_limiter import CHARS_PER_TOKEN, TOKENS_PER_PDF_PAGE
+from app.services.documents.pdf_pool import analyze_pdf, extract_page_ranges, get_pdf_pool
+
+logger = logging.getLogger(__name__)
+
+# Text-based PDFs are sent with their extracted text (see DocumentProcessor)
+TEXT_EXTRACTABLE_MIN_CHARS = 500
+# Smallest chunk worth a separate LLM call (byte-based chunk_ranges)
+MIN_PAGES_PER_CHUNK = 10
+# A page is sent as text when it has this much text and no image larger than a
+# logo or signature; scans, plans and charts keep their native PDF page
+TEXT_PAGE_MIN_CHARS = 200
+TEXT_PAGE_MAX_IMAGE_BYTES = 64 * 1024
+
+PageRange = Tuple[int, int]  # [start, end) page indexes
+
+
+@dataclass(frozen=True)
+class ChunkPlan:
+    """Pages sent in one LLM call, how they are sent and their token estimate."""
+
+    start: int
+    end: int
+    text_only: bool
+    tokens: int
+
+    @property
+    def page_range(self) -> PageRange:
+        return (self.start, self.end)
+
+    @property
+    def page_count(self) -> int:
+        return self.end - self.start
+
+
+@dataclass
+class PreparedPdf:
+    """A PDF with its page-level text and size estimates."""
+
+    pdf_data: bytes
+    page_count: int = 0
+    page_texts: List[str] = field(default_factory=list, repr=False)
+    page_sizes: List[int] = field(default_factory=list, repr=False)
+    page_image_bytes: List[int] = field(default_factory=list, repr=False)
+    _chunks: Dict[PageRange, bytes] = field(default_factory=dict, repr=False)
+
+    def __post_init__(self):
+        # Pages without analysis data count as empty pages of average size
+        missing = self.page_count - len(self.page_texts)
+        self.page_texts = self.page_texts + [""] * max(0, missing)
+        average = len(self.pdf_data) // self.page_count if self.page_count else 0
+        self.page_sizes = self.page_sizes + [average] * (self.page_count - len(self.page_sizes))
+        self.page_image_bytes = self.page_image_bytes + [0] * (
+            self.page_count - len(self.page_image_bytes)
+        )
+
+    @classmethod
+    def from_analysis(cls, pdf_data: bytes, analysis: Dict[str, Any]) -> "PreparedPdf":
+        prepared = cls(pdf_data=pdf_data, **analysis)
+        logger.info(
+            f"PDF prepared: {prepared.page_count} pages, "
+            f"{len(prepared.text())} chars extracted, "
+            f"text_extractable={prepared.text_extractable}"
+        )
+        return prepared
+
+    @classmethod
+    def prepare(cls, pdf_data: bytes) -> "PreparedPdf":
+        """Analyse in the calling thread. PDFs PyMuPDF cannot read get no pages."""
+        try:
+            return cls.from_analysis(pdf_data, analyze_pdf(pdf_data))
+        except Exception as e:
+            logger.error(f"PDF preparation error: {e}")
+            return cls(pdf_data=pdf_data)
+
+    @classmethod
+    async def prepare_async(cls, pdf_data: bytes) -> "PreparedPdf":
+        """Analyse in the PDF process pool."""
+        try:
+            return cls.from_analysis(pdf_data, await get_pdf_pool().analyze(pdf_data))
+        except Exception as e:
+            logger.error(f"PDF preparation error: {e}")
+            return cls(pdf_data=pdf_data)
+
+    # -------------------------------------------------------------------------
+    # Text
+    # -------------------------------------------------------------------------
+
+    def text(self, page_range: Optional[PageRange] = None) -> str:
+        start, end = page_range or (0, self.page_count)
+        return "\n\n".join(t for t in self.page_texts[start:end] if t.strip())
+
+    def paged_text(self, page_range: PageRange) -> str:
+        """Text of a page range with page markers, for text-only LLM parts."""
+        start, end = page_range
+        return "\n\n".join(
+            f"--- Page {page + 1} ---\n{self.page_texts[page].strip()}"
+            for page in range(start, end)
+        )
+
+    @property
+    def text_extractable(self) -> bool:
+        return len(self.text()) > TEXT_EXTRACTABLE_MIN_CHARS
+
+    @property
+    def extracted_text(self) -> str:
+        return self.text() if self.text_extractable else ""
+
+    # -------------------------------------------------------------------------
+    # Chunks
+    # -------------------------------------------------------------------------
+
+    def is_text_page(self, page: int) -> bool:
+        return (
+            len(self.page_texts[page].strip()) >= TEXT_PAGE_MIN_CHARS
+            and self.page_image_bytes[page] <= TEXT_PAGE_MAX_IMAGE_BYTES
+        )
+
+    def page_tokens(self, page: int, text_only: bool) -> int:
+        """Estimated input tokens of a page sent as text or as a native PDF page."""
+        text_tokens = len(self.page_texts[page]) // CHARS_PER_TOKEN
+        # Gemini reads a native page as an image plus its text layer
+        return text_tokens if text_only else TOKENS_PER_PDF_PAGE + text_tokens
+
+    def plan_chunks(self, token_budget: int, max_bytes: int) -> List[ChunkPlan]:
+        """Consecutive page ranges of at most token_budget estimated tokens.
+
+        A chunk whose pages are all text pages is sent as text only. Any other
+        chunk is sent as a native PDF, which must also stay under max_bytes.
+        A single page over budget gets a chunk of its own.
+        """
+        if self.page_count == 0:
+            return [ChunkPlan(0, 0, text_only=False, tokens=0)]
+
+        plans = []
+        start, all_text, text_tokens, native_tokens, size = 0, True, 0, 0, 0
+        for page in range(self.page_count):
+            page_size = self.page_sizes[page]
+            is_text = self.is_text_page(page)
+            next_text = text_tokens + self.page_tokens(page, text_only=True)
+            next_native = native_tokens + self.page_tokens(page, text_only=False)
+            next_all_text = all_text and is_text
+            over_budget = (next_text if next_all_text else next_native) > token_budget
+            too_big = not next_all_text and size + page_size > max_bytes
+            if page > start and (over_budget or too_big):
+                plans.append(self._plan(start, page, all_text, text_tokens, native_tokens))
+                start, all_text, size = page, is_text, page_size
+                text_tokens = self.page_tokens(page, text_only=True)
+                native_tokens = self.page_tokens(page, text_only=False)
+            else:
+                all_text, text_tokens, native_tokens = next_all_text, next_text, next_native
+                size += page_size
+        plans.append(self._plan(start, self.page_count, all_text, text_tokens, native_tokens))
+        return plans
+
+    @staticmethod
+    def _plan(start: int, end: int, text_only: bool, text_tokens: int, native_tokens: int):
+        return ChunkPlan(start, end, text_only, text_tokens if text_only else native_tokens)
+
+    def chunk_ranges(
+        self, chunk_size: int, min_pages: int = MIN_PAGES_PER_CHUNK
+    ) -> List[PageRange]:
+        """Page ranges of at most ~chunk_size bytes and at least min_pages pages.
+
+        A PDF within chunk_size (or that could not be read) is a single range.
+        """
+        if len(self.pdf_data) <= chunk_size or self.page_count == 0:
+            return [(0, self.page_count)]
+
+        ranges = []
+        start, size = 0, 0
+        for page, page_size in enumerate(self.page_sizes):
+            if page - start >= min_pages and size + page_size > chunk_size:
+                ranges.append((start, page))
+                start, size = page, 0
+            size += page_size
+        ranges.append((start, self.page_count))
+        return ranges
+
+    def _is_whole(self, page_range: PageRange) -> bool:
+        return page_range == (0, self.page_count)
+
+    def _missing(self, ranges: List[PageRange]) -> List[PageRange]:
+        return [r for r in dict.fromkeys(ranges) if r not in self._chunks and not self._is_whole(r)]
+
+    def _get(self, ranges: List[PageRange]) -> List[bytes]:
+        return [self.pdf_data if self._is_whole(r) else self._chunks[r] for r in ranges]
+
+    def chunk_bytes(self, ranges: List[PageRange]) -> List[bytes]:
+        """PDF bytes of page ranges, built in the calling thread."""
+        missing = self._missing(ranges)
+        if missing:
+            self._chunks.update(zip(missing, extract_page_ranges(self.pdf_data, missing)))
+        return self._get(ranges)
+
+    async def chunk_bytes_async(self, ranges: List[PageRange]) -> List[bytes]:
+        """PDF bytes of page ranges, built in one PDF process pool call."""
+        missing = self._missing(ranges)
+        if missing:
+            chunks = await get_pdf_pool().extract_page_ranges(self.pdf_data, missing)
+            self._chunks.update(zip(missing, chunks))
+        return self._get(ranges)
+
+    async def chunk_document(self, plan: ChunkPlan) -> Dict[str, Any]:
+        """Document fields (pdf_data, text, page_count) for DocumentProcessor.
+
+        Text-only chunks carry the page-marked text; only a whole-document
+        plan keeps pdf_data (needed if classification falls back to Gemini).
+        """
+        if plan.text_only:
+            return {
+                "pdf_data": self.pdf_data if self._is_whole(plan.page_range) else None,
+                "text_only": True,
+                "text_extractable": True,
+                "extracted_text": self.paged_text(plan.page_range),
+                "page_count": plan.page_count,
+            }
+        (pdf_data,) = await self.chunk_bytes_async([plan.page_range])
+        return {
+            "pdf_data": pdf_data,
+            "text_only": False,
+            "text_extractable": False,
+            "extracted_text": "",
+            "page_count": plan.page_count,
+        }
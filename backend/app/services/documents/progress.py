@@ -0,0 +1,147 @@
+"""
+Bulk Progress - Redis pub/sub fan-out of bulk processing events.
+
+BulkProcessor publishes an event each time a document is classified, a chunk
+is analyzed, a batch job is submitted, a document is saved or fails, the
+synthesis is saved and the workflow ends. Each event gets a per-workflow sequence number, is appended
+to a short log (replayed to late subscribers and after a reconnect with
+Last-Event-ID) and is published on the workflow channel, so the SSE endpoint
+of any API instance can stream it without polling Postgres.
+
+Publishing is best effort: with Redis down events are dropped (and
+publishing is skipped for a while) but the job is unaffected; the stream
+then tells the client to fall back to polling GET /bulk-status.
+"""
+
+import json
+import logging
+import time
+from typing import Any, AsyncIterator, Dict, Optional
+
+import redis
+import redis.asyncio as aioredis
+
+from app.core.cache import get_redis
+from app.core.config import settings
+from app.core.responses import json_dumps, raw_json
+
+logger = logging.getLogger(__name__)
+
+CLASSIFIED = "classified"
+BATCH_SUBMITTED = "batch_submitted"
+CHUNK_DONE = "chunk_done"
+DOCUMENT_SAVED = "document_saved"
+DOCUMENT_FAILED = "document_failed"
+SYNTHESIS_DONE = "synthesis_done"
+WORKFLOW_DONE = "workflow_done"
+
+# Seconds without publishing after a Redis failure (a down Redis costs a
+# connect timeout per call otherwise)
+_RETRY_AFTER = 30.0
+_retry_at = 0.0
+
+
+def _channel(workflow_id: str) -> str:
+    return f"bulk-events:{workflow_id}"
+
+
+def _log_key(workflow_id: str) -> str:
+    return f"bulk-events:{workflow_id}:log"
+
+
+def _seq_key(workflow_id: str) -> str:
+    return f"bulk-events:{workflow_id}:seq"
+
+
+def publish_progress(workflow_id: str, event: str, **data: Any) -> None:
+    """
+    Record and publish a progress event of a bulk workflow (never raises).
+
+    data is encoded like API responses (datetimes, decimals...); an event that
+    can't be encoded is logged and dropped.
+    """
+    global _retry_at
+    if time.monotonic() < _retry_at:
+        return
+    try:
+        # Encoded before taking a sequence number, so a bad event leaves no gap
+        encoded = raw_json(json_dumps(data))
+        client = get_redis()
+        seq = client.incr(_seq_key(workflow_id))
+        message = json_dumps({"id": seq, "event": event, "data": encoded})
+        ttl = settings.BULK_EVENTS_TTL
+        pipe = client.pipeline()
+        pipe.rpush(_log_key(workflow_id), message)
+        pipe.expire(_log_key(workflow_id), ttl)
+        pipe.expire(_seq_key(workflow_id), ttl)
+        pipe.publish(_channel(workflow_id), message)
+        pipe.execute()
+    except redis.RedisError as e:
+        _retry_at = time.monotonic() + _RETRY_AFTER
+        logger.warning(f"Progress events unavailable, skipping for {_RETRY_AFTER:.0f}s: {e}")
+    except Exception as e:
+        logger.warning(f"Dropped {event} event of workflow {workflow_id}: {e}", exc_info=True)
+
+
+def _async_client() -> aioredis.Redis:
+    return aioredis.Redis(
+        host=settings.REDIS_HOST,
+        port=settings.REDIS_PORT,
+        db=settings.REDIS_DB,
+        decode_responses=True,
+        socket_connect_timeout=2,
+    )
+
+
+async def stream_progress(
+    workflow_id: str, last_event_id: int = 0, keepalive: Optional[float] = None
+) -> AsyncIterator[Optional[Dict[str, Any]]]:
+    """
+    Events of a workflow after last_event_id, logged ones first, then live.
+
+    Yields None when no event arrived for `keepalive` seconds, and stops after
+    the workflow_done event. Raises redis.RedisError if Redis is unavailable.
+    """
+    keepalive = settings.BULK_EVENTS_KEEPALIVE if keepalive is None else keepalive
+    client = _async_client()
+    pubsub = client.pubsub()
+    try:
+        # Subscribe before reading the log so no event falls in between
+        await pubsub.subscribe(_channel(workflow_id))
+        backlog = await client.lrange(_log_key(workflow_id), 0, -1)
+
+        last = last_event_id
+        for message in backlog:
+            event = json.loads(message)
+            if event["id"] <= last:
+                continue
+            last = event["id"]
+            yield event
+            if event["event"] == WORKFLOW_DONE:
+                return
+
+        while True:
+            message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=keepalive)
+            if message is None:
+                yield None
+                continue
+            event = json.loads(message["data"])
+            if event["id"] <= last:
+                continue
+            last = event["id"]
+            yield event
+            if event["event"] == WORKFLOW_DONE:
+                return
+    finally:
+        try:
+            await pubsub.aclose()
+            await client.aclose()
+        except redis.RedisError:
+            pass
+
+
+def format_sse(event: str, data: Any, event_id: Optional[int] = None) -> str:
+    """One server-sent event."""
+    lines = [f"id: {event_id}"] if event_id is not None else []
+    lines += [f"event: {event}", f"data: {json_dumps(data).decode('utf-8')}"]
+    return "\n".join(lines) + "\n\n"
@@ -0,0 +1,314 @@
+"""
+Property Synthesis - Incremental overall synthesis of a property's documents.
+
+Each analyzed document is reduced to a compact digest (summary, insights,
+costs and non-empty extracted data). The fingerprints of the digests a
+synthesis was built from are stored next to it (synthesis_state), so an
+update only sends Gemini the previous synthesis plus the documents added,
+re-analyzed or removed since. A full synthesis is run when there is no
+usable state, the output language changed, or most documents changed.
+
+Uploads and deletions schedule the update as a debounced "synthesis" job:
+a burst of changes to one property is synthesized once, after
+SYNTHESIS_DEBOUNCE_SECONDS without a new change (SYNTHESIS_MAX_DELAY_SECONDS
+at most after the first one).
+"""
+
+import hashlib
+import json
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.document import Document, DocumentSummary
+from app.models.job import ProcessingJob
+from app.services.ai.document_processor import get_document_processor
+from app.services.jobs import JobContext, enqueue
+from app.services.jobs.queue import QUEUED
+
+logger = logging.getLogger(__name__)
+
+SYNTHESIS_JOB = "synthesis"
+
+
+def _prune(value: Any) -> Any:
+    """Drop None, empty strings and empty containers, recursively."""
+    if isinstance(value, dict):
+        pruned = {k: _prune(v) for k, v in value.items()}
+        return {k: v for k, v in pruned.items() if v not in (None, "", [], {})}
+    if isinstance(value, list):
+        return [v for v in (_prune(v) for v in value) if v not in (None, "", [], {})]
+    return value
+
+
+def document_digest(doc: Document) -> Dict[str, Any]:
+    """Compact synthesis input for one analyzed document."""
+    result: Dict[str, Any] = {
+        "summary": doc.analysis_summary or "",
+        "key_insights": doc.key_insights or [],
+        "estimated_annual_cost": doc.estimated_annual_cost or 0.0,
+        "one_time_costs": doc.one_time_costs or [],
+    }
+    if doc.extracted_data:
+        try:
+            result["extracted_data"] = (
+                json.loads(doc.extracted_data)
+                if isinstance(doc.extracted_data, str)
+                else doc.extracted_data
+            )
+        except (json.JSONDecodeError, TypeError):
+            pass
+    return {
+        "filename": doc.filename,
+        "document_type": doc.document_category,
+        "result": _prune(result),
+        "document_id": doc.id,
+    }
+
+
+def digest_fingerprint(digest: Dict[str, Any]) -> str:
+    content = json.dumps(
+        {k: digest[k] for k in ("filename", "document_type", "result")},
+        ensure_ascii=False,
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()[:16]
+
+
+def _state_entry(digest: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "fingerprint": digest_fingerprint(digest),
+        "filename": digest["filename"],
+        "document_type": digest["document_type"],
+    }
+
+
+@dataclass
+class SynthesisChanges:
+    """Documents added or re-analyzed (digests) and removed (state entries)."""
+
+    changed: List[Dict[str, Any]] = field(default_factory=list)
+    removed: List[Dict[str, Any]] = field(default_factory=list)
+
+    def __bool__(self) -> bool:
+        return bool(self.changed or self.removed)
+
+
+def diff_state(state: Dict[str, Any], digests: Dict[int, Dict[str, Any]]) -> SynthesisChanges:
+    """Compare the documents a synthesis covers with the current digests."""
+    covered = state.get("documents", {})
+    changes = SynthesisChanges()
+    for doc_id, digest in digests.items():
+        entry = covered.get(str(doc_id))
+        if entry is None or entry.get("fingerprint") != digest_fingerprint(digest):
+            changes.changed.append(digest)
+    current = {str(doc_id) for doc_id in digests}
+    changes.removed = [entry for doc_id, entry in covered.items() if doc_id not in current]
+    return changes
+
+
+def _load_json(value: Any) -> Optional[Dict[str, Any]]:
+    if not value:
+        return None
+    try:
+        return json.loads(value) if isinstance(value, str) else value
+    except (json.JSONDecodeError, TypeError):
+        return None
+
+
+def save_synthesis(
+    db: Session,
+    property_id: int,
+    synthesis: Dict[str, Any],
+    digests: List[Dict[str, Any]],
+    output_language: str,
+) -> DocumentSummary:
+    """Store an overall synthesis and the digests it covers (commits)."""
+    summary = (
+        db.query(DocumentSummary)
+        .filter(DocumentSummary.property_id == property_id, DocumentSummary.category == None)
+        .first()
+    )
+    if not summary:
+        summary = DocumentSummary(property_id=property_id)
+        db.add(summary)
+
+    summary.overall_summary = synthesis.get("summary", "")
+    summary.total_annual_cost = synthesis.get("total_annual_costs", 0.0)
+    summary.total_one_time_cost = synthesis.get("total_one_time_costs", 0.0)
+    summary.risk_level = synthesis.get("risk_level", "unknown")
+    summary.key_findings = synthesis.get("key_findings", [])
+    summary.recommendations = synthesis.get("recommendations", [])
+
+    # Preserve user_overrides from previous synthesis_data when regenerating
+    old_data = _load_json(summary.synthesis_data)
+    if old_data and "user_overrides" in old_data:
+        synthesis["user_overrides"] = old_data["user_overrides"]
+
+    summary.synthesis_data = json.dumps(synthesis)
+    summary.synthesis_state = {
+        "language": output_language,
+        "documents": {str(d["document_id"]): _state_entry(d) for d in digests},
+    }
+    summary.last_document_count = len(digests)
+    summary.last_updated = datetime.utcnow()
+
+    db.commit()
+    logger.info(f"Saved synthesis for property {property_id} ({len(digests)} documents)")
+    return summary
+
+
+def synthesis_status(synthesis: Dict[str, Any]) -> Dict[str, Any]:
+    """Synthesis fields in the shape of the GET /bulk-status response."""
+    return {
+        "summary": synthesis.get("summary", ""),
+        "total_annual_cost": synthesis.get("total_annual_costs", 0.0),
+        "total_one_time_cost": synthesis.get("total_one_time_costs", 0.0),
+        "risk_level": synthesis.get("risk_level", "unknown"),
+        "key_findings": synthesis.get("key_findings", []),
+        "recommendations": synthesis.get("recommendations", []),
+        "synthesis_data": synthesis,
+    }
+
+
+class PropertySynthesizer:
+    """Keeps the overall synthesis of a property in step with its documents."""
+
+    async def update(
+        self,
+        property_id: int,
+        output_language: str = "French",
+        full: bool = False,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Bring the property's overall synthesis up to date (commits).
+
+        Only changed documents are sent unless full is set or an incremental
+        update is not possible. The digests are read in one short session and
+        the result saved in another: no session is open during the Gemini
+        call. Returns the synthesis, None if the property has no analyzed
+        document left.
+        """
+        with SessionLocal() as db:
+            analyzed_docs = (
+                db.query(Document)
+                .filter(Document.property_id == property_id, Document.is_analyzed == True)
+                .all()
+            )
+            summary = (
+                db.query(DocumentSummary)
+                .filter(
+                    DocumentSummary.property_id == property_id, DocumentSummary.category == None
+                )
+                .first()
+            )
+
+            # If no analyzed documents remain, delete synthesis
+            if not analyzed_docs:
+                if summary:
+                    db.delete(summary)
+                    db.commit()
+                    logger.info(f"Deleted synthesis for property {property_id} (no documents)")
+                return None
+
+            digests = {doc.id: document_digest(doc) for doc in analyzed_docs}
+            state = (summary.synthesis_state or {}) if summary else {}
+            previous = _load_json(summary.synthesis_data) if summary else None
+
+        processor = get_document_processor()
+        incremental = (
+            not full
+            and previous is not None
+            and state.get("documents") is not None
+            and state.get("language") == output_language
+        )
+        if incremental:
+            changes = diff_state(state, digests)
+            if not changes:
+                logger.info(f"Synthesis for property {property_id} is up to date")
+                return previous
+            # Past half of the documents, a full synthesis is as cheap and fresher
+            incremental = len(changes.changed) * 2 <= len(digests)
+
+        if incremental:
+            previous.pop("user_overrides", None)
+            synthesis = await processor.update_synthesis(
+                previous,
+                changes.changed,
+                changes.removed,
+                list(digests.values()),
+                output_language=output_language,
+            )
+            logger.info(
+                f"Updated synthesis for property {property_id}: "
+                f"{len(changes.changed)} changed, {len(changes.removed)} removed "
+                f"of {len(digests)} documents"
+            )
+        else:
+            synthesis = await processor.synthesize_results(
+                list(digests.values()), output_language=output_language, raise_errors=True
+            )
+            logger.info(
+                f"Regenerated synthesis for property {property_id} from {len(digests)} documents"
+            )
+
+        with SessionLocal() as db:
+            save_synthesis(db, property_id, synthesis, list(digests.values()), output_language)
+        return synthesis
+
+    async def run_job(self, payload: Dict[str, Any], context: JobContext) -> None:
+        """Job handler: incremental update of one property's synthesis."""
+        await self.update(
+            payload["property_id"], output_language=payload.get("output_language", "French")
+        )
+
+
+def schedule_synthesis(db: Session, property_id: int, output_language: str = "French") -> int:
+    """
+    Queue the debounced synthesis job of a property (flushed, not committed).
+
+    A job still waiting for the same property is postponed instead of a new
+    one being added, up to SYNTHESIS_MAX_DELAY_SECONDS after it was queued.
+    Returns the job id.
+    """
+    now = datetime.utcnow()
+    run_at = now + timedelta(seconds=settings.SYNTHESIS_DEBOUNCE_SECONDS)
+    payload = {"property_id": property_id, "output_language": output_language}
+
+    job = (
+        db.query(ProcessingJob)
+        .filter(
+            ProcessingJob.kind == SYNTHESIS_JOB,
+            ProcessingJob.status == QUEUED,
+            ProcessingJob.payload["property_id"].as_integer() == property_id,
+        )
+        .with_for_update(skip_locked=True)
+        .first()
+    )
+    if job is None:
+        return enqueue(db, SYNTHESIS_JOB, payload, run_at=run_at).id
+
+    deadline = (job.created_at or now) + timedelta(seconds=settings.SYNTHESIS_MAX_DELAY_SECONDS)
+    job.run_at = max(job.run_at, min(run_at, deadline))
+    job.payload = payload
+    db.flush()
+    logger.info(f"Postponed synthesis job {job.id} for property {property_id} to {job.run_at}")
+    return job.id
+
+
+# Singleton
+_instance: Optional[PropertySynthesizer] = None
+
+
+def get_property_synthesizer() -> PropertySynthesizer:
+    """Get or create the PropertySynthesizer singleton."""
+    global _instance
+    if _instance is None:
+        _instance = PropertySynthesizer()
+    return _instance
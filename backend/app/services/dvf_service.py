@@ -12,8 +12,9 @@ import numpy as np
 from sqlalchemy import and_, or_
 from sqlalchemy.orm import Session
 
+from app.core.cache import get_generation, set_generation
 from app.core.i18n import translate
-from app.models.property import DVFSale, Property
+from app.models.property import DatasetGeneration, DVFSale, Property
 
 # DVF dataset uses abbreviated street types. Map full words → DVF abbreviations.
 # Source: frequency analysis of SPLIT_PART(adresse_complete, ' ', 2) in dvf_sales.
@@ -52,6 +53,21 @@ _STREET_TYPE_TO_DVF: dict[str, str] = {
 _DVF_TO_STREET_TYPE: dict[str, str] = {v: k for k, v in _STREET_TYPE_TO_DVF.items()}
 
 
+def get_dvf_generation(db: Session) -> int:
+    """
+    Current DVF import generation (0 before the first import).
+
+    Read from dataset_generations, which import_dvf.py bumps with the data;
+    Redis caches it for a few minutes.
+    """
+    generation = get_generation("dvf")
+    if generation is None:
+        row = db.get(DatasetGeneration, "dvf")
+        generation = row.generation if row else 0
+        set_generation("dvf", generation)
+    return generation
+
+
 def normalize_street(name: str) -> str:
     """
     Normalize a street name for fuzzy matching.
@@ -0,0 +1,23 @@
+"""
+Background Jobs package.
+
+Durable Postgres job queue (processing_jobs) and the worker that runs it.
+"""
+
+from app.services.jobs.queue import enqueue
+from app.services.jobs.worker import (
+    JobContext,
+    JobHandler,
+    JobNotReadyError,
+    JobWorker,
+    get_job_worker,
+)
+
+__all__ = [
+    "enqueue",
+    "JobContext",
+    "JobHandler",
+    "JobNotReadyError",
+    "JobWorker",
+    "get_job_worker",
+]
@@ -0,0 +1,217 @@
+"""
+Job queue - Postgres-backed durable queue operations.
+
+Jobs live in the processing_jobs table. Workers claim them with
+SELECT ... FOR UPDATE SKIP LOCKED so any number of worker processes can poll
+the same table without handing out a job twice, and hold a lease
+(locked_until) that they extend while the job runs.
+
+A job whose lease expires (worker killed by a deploy or scale-down) becomes
+claimable again; once it has used all its attempts it is failed by
+expire_exhausted() instead.
+"""
+
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Sequence
+
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.job import ProcessingJob
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+
+def enqueue(
+    db: Session,
+    kind: str,
+    payload: Dict[str, Any],
+    priority: int = 0,
+    max_attempts: Optional[int] = None,
+    run_at: Optional[datetime] = None,
+) -> ProcessingJob:
+    """
+    Add a job to the queue (flushed, not committed).
+
+    Committing is left to the caller so the job is only visible to workers
+    once the records it refers to are committed in the same transaction.
+    """
+    job = ProcessingJob(
+        kind=kind,
+        payload=payload,
+        status=QUEUED,
+        priority=priority,
+        attempts=0,
+        max_attempts=max_attempts or settings.JOB_MAX_ATTEMPTS,
+        run_at=run_at or datetime.utcnow(),
+    )
+    db.add(job)
+    db.flush()
+    logger.info(f"Enqueued {kind} job {job.id}")
+    return job
+
+
+def claim(
+    db: Session, worker_id: str, kinds: Sequence[str], lease_seconds: int
+) -> Optional[ProcessingJob]:
+    """
+    Claim the next runnable job and lease it to worker_id (commits).
+
+    Runnable means queued and due, or running with an expired lease and
+    attempts left. Rows locked by a concurrent claim are skipped.
+    """
+    now = datetime.utcnow()
+    job = (
+        db.query(ProcessingJob)
+        .filter(
+            ProcessingJob.kind.in_(list(kinds)),
+            or_(
+                and_(ProcessingJob.status == QUEUED, ProcessingJob.run_at <= now),
+                and_(
+                    ProcessingJob.status == RUNNING,
+                    ProcessingJob.locked_until < now,
+                    ProcessingJob.attempts < ProcessingJob.max_attempts,
+                ),
+            ),
+        )
+        .order_by(ProcessingJob.priority.desc(), ProcessingJob.run_at, ProcessingJob.id)
+        .with_for_update(skip_locked=True)
+        .limit(1)
+        .first()
+    )
+    if job is None:
+        db.rollback()
+        return None
+
+    if job.status == RUNNING:
+        logger.warning(
+            f"Recovering {job.kind} job {job.id}: lease of {job.locked_by} expired "
+            f"at {job.locked_until}"
+        )
+
+    job.status = RUNNING
+    job.attempts = (job.attempts or 0) + 1
+    job.locked_by = worker_id
+    job.locked_until = now + timedelta(seconds=lease_seconds)
+    job.started_at = now
+    db.commit()
+    return job
+
+
+def _owned(db: Session, job_id: int, worker_id: str):
+    """Query for a job still leased to worker_id."""
+    return db.query(ProcessingJob).filter(
+        ProcessingJob.id == job_id,
+        ProcessingJob.status == RUNNING,
+        ProcessingJob.locked_by == worker_id,
+    )
+
+
+def extend_lease(db: Session, job_id: int, worker_id: str, lease_seconds: int) -> bool:
+    """Heartbeat: push the lease forward. False if the lease was lost."""
+    updated = _owned(db, job_id, worker_id).update(
+        {ProcessingJob.locked_until: datetime.utcnow() + timedelta(seconds=lease_seconds)},
+        synchronize_session=False,
+    )
+    db.commit()
+    return updated == 1
+
+
+def complete(db: Session, job_id: int, worker_id: str) -> bool:
+    """Mark a leased job as succeeded."""
+    updated = _owned(db, job_id, worker_id).update(
+        {
+            ProcessingJob.status: SUCCEEDED,
+            ProcessingJob.locked_by: None,
+            ProcessingJob.locked_until: None,
+            ProcessingJob.finished_at: datetime.utcnow(),
+        },
+        synchronize_session=False,
+    )
+    db.commit()
+    return updated == 1
+
+
+def fail(
+    db: Session, job_id: int, worker_id: str, error: str, backoff_seconds: Optional[int] = None
+) -> Optional[str]:
+    """
+    Record a failed attempt.
+
+    The job is queued again after an exponential backoff while attempts
+    remain, otherwise it is failed for good. Returns the new status, or None
+    if the lease was lost.
+    """
+    job = _owned(db, job_id, worker_id).with_for_update().first()
+    if job is None:
+        db.rollback()
+        return None
+
+    backoff = settings.JOB_RETRY_BACKOFF_SECONDS if backoff_seconds is None else backoff_seconds
+    now = datetime.utcnow()
+    job.last_error = error[:2000]
+    job.locked_by = None
+    job.locked_until = None
+    if job.attempts >= job.max_attempts:
+        job.status = FAILED
+        job.finished_at = now
+    else:
+        job.status = QUEUED
+        job.run_at = now + timedelta(seconds=backoff * 2 ** (job.attempts - 1))
+    status = job.status
+    db.commit()
+    return status
+
+
+def release(db: Session, job_id: int, worker_id: str, delay_seconds: float = 0) -> bool:
+    """
+    Hand a leased job back without consuming an attempt: on graceful
+    shutdown, or to run it again in delay_seconds (see JobNotReadyError).
+    """
+    updated = _owned(db, job_id, worker_id).update(
+        {
+            ProcessingJob.status: QUEUED,
+            ProcessingJob.attempts: ProcessingJob.attempts - 1,
+            ProcessingJob.locked_by: None,
+            ProcessingJob.locked_until: None,
+            ProcessingJob.run_at: datetime.utcnow() + timedelta(seconds=delay_seconds),
+        },
+        synchronize_session=False,
+    )
+    db.commit()
+    return updated == 1
+
+
+def expire_exhausted(db: Session, kinds: Sequence[str]) -> List[ProcessingJob]:
+    """Fail running jobs whose lease expired on their last attempt (commits)."""
+    now = datetime.utcnow()
+    jobs = (
+        db.query(ProcessingJob)
+        .filter(
+            ProcessingJob.kind.in_(list(kinds)),
+            ProcessingJob.status == RUNNING,
+            ProcessingJob.locked_until < now,
+            ProcessingJob.attempts >= ProcessingJob.max_attempts,
+        )
+        .with_for_update(skip_locked=True)
+        .all()
+    )
+    for job in jobs:
+        logger.error(
+            f"{job.kind} job {job.id} lost its worker on attempt "
+            f"{job.attempts}/{job.max_attempts}, giving up"
+        )
+        job.status = FAILED
+        job.last_error = f"Worker lease expired (last held by {job.locked_by})"
+        job.locked_by = None
+        job.locked_until = None
+        job.finished_at = now
+    db.commit()
+    return jobs
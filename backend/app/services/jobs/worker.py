@@ -0,0 +1,314 @@
+"""
+Job worker - Runs queued jobs with leases, retries and orphan recovery.
+
+A JobWorker polls the queue, runs up to `concurrency` jobs at once on its
+event loop and keeps each job's lease alive with a heartbeat. It runs either
+embedded in an API process (start_in_background, one daemon thread with its
+own event loop) or standalone via scripts/run_worker.py. Throughput scales
+with the number of worker processes.
+"""
+
+import asyncio
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.services.jobs import queue
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class JobContext:
+    """Information about the attempt being run, passed to handlers."""
+
+    job_id: int
+    kind: str
+    attempt: int
+    max_attempts: int
+
+    @property
+    def is_final_attempt(self) -> bool:
+        return self.attempt >= self.max_attempts
+
+
+class JobNotReadyError(Exception):
+    """
+    Raised by a handler that is waiting on something external (a batch job):
+    the job runs again in `delay` seconds without consuming an attempt.
+    """
+
+    def __init__(self, delay: float, reason: str = ""):
+        super().__init__(reason or f"retry in {delay:.0f}s")
+        self.delay = delay
+
+
+@dataclass
+class JobHandler:
+    """
+    Handler for one job kind.
+
+    run(payload, context) raises to request a retry, or JobNotReadyError to
+    run again later without using an attempt. on_dead(payload, error) is
+    called once the job has failed for good, including when its last
+    worker died.
+    """
+
+    run: Callable[[Dict[str, Any], JobContext], Awaitable[None]]
+    on_dead: Optional[Callable[[Dict[str, Any], str], None]] = None
+
+
+@dataclass
+class _ClaimedJob:
+    """Plain copy of a claimed job, detached from its session."""
+
+    id: int
+    kind: str
+    payload: Dict[str, Any]
+    attempts: int
+    max_attempts: int
+
+
+class JobWorker:
+    """Polls the processing_jobs queue and runs jobs with registered handlers."""
+
+    def __init__(
+        self,
+        handlers: Dict[str, JobHandler],
+        concurrency: Optional[int] = None,
+        lease_seconds: Optional[int] = None,
+        poll_interval: Optional[float] = None,
+        session_factory: Callable = SessionLocal,
+        worker_id: Optional[str] = None,
+    ):
+        self.handlers = handlers
+        self.concurrency = max(1, concurrency or settings.JOB_WORKER_CONCURRENCY)
+        self.lease_seconds = lease_seconds or settings.JOB_LEASE_SECONDS
+        self.poll_interval = settings.JOB_POLL_INTERVAL if poll_interval is None else poll_interval
+        self.session_factory = session_factory
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._stop_requested = False
+        self._wakeup: Optional[asyncio.Event] = None
+        self._thread: Optional[threading.Thread] = None
+
+    # ------------------------------------------------------------------
+    # Queue access (blocking, run in a thread)
+    # ------------------------------------------------------------------
+
+    def _with_session(self, fn: Callable, *args):
+        db = self.session_factory()
+        try:
+            return fn(db, *args)
+        finally:
+            db.close()
+
+    def _claim(self) -> Optional[_ClaimedJob]:
+        def claim(db):
+            job = queue.claim(db, self.worker_id, list(self.handlers), self.lease_seconds)
+            if job is None:
+                return None
+            return _ClaimedJob(job.id, job.kind, job.payload, job.attempts, job.max_attempts)
+
+        return self._with_session(claim)
+
+    def _expire_exhausted(self) -> list:
+        def expire(db):
+            jobs = queue.expire_exhausted(db, list(self.handlers))
+            return [(job.kind, job.payload, job.last_error) for job in jobs]
+
+        return self._with_session(expire)
+
+    def _call_on_dead(self, kind: str, payload: Dict[str, Any], error: str) -> None:
+        handler = self.handlers.get(kind)
+        if handler is None or handler.on_dead is None:
+            return
+        try:
+            handler.on_dead(payload, error)
+        except Exception as e:
+            logger.error(f"on_dead handler for {kind} failed: {e}", exc_info=True)
+
+    # ------------------------------------------------------------------
+    # Execution
+    # ------------------------------------------------------------------
+
+    async def _keep_lease(self, job: _ClaimedJob, runner: asyncio.Task, lost: asyncio.Event):
+        """Extend the lease every third of its length; cancel the job if it is lost."""
+        interval = max(self.lease_seconds / 3, 0.01)
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                held = await asyncio.to_thread(
+                    self._with_session,
+                    queue.extend_lease,
+                    job.id,
+                    self.worker_id,
+                    self.lease_seconds,
+                )
+            except Exception as e:
+                # Transient DB error: keep running, the next beat may succeed
+                logger.warning(f"Lease heartbeat for job {job.id} failed: {e}")
+                continue
+            if not held:
+                logger.error(f"Lost lease on {job.kind} job {job.id}, cancelling it")
+                lost.set()
+                runner.cancel()
+                return
+
+    async def _execute(self, job: _ClaimedJob) -> None:
+        handler = self.handlers[job.kind]
+        context = JobContext(job.id, job.kind, job.attempts, job.max_attempts)
+        logger.info(
+            f"Worker {self.worker_id} running {job.kind} job {job.id} "
+            f"(attempt {job.attempts}/{job.max_attempts})"
+        )
+        started = time.monotonic()
+
+        runner = asyncio.ensure_future(handler.run(job.payload, context))
+        lost = asyncio.Event()
+        heartbeat = asyncio.create_task(self._keep_lease(job, runner, lost))
+        try:
+            await runner
+        except asyncio.CancelledError:
+            if lost.is_set():
+                return
+            # Worker shutting down: hand the job to another worker right away
+            runner.cancel()
+            await asyncio.to_thread(self._with_session, queue.release, job.id, self.worker_id)
+            logger.info(f"Released {job.kind} job {job.id} on shutdown")
+            raise
+        except JobNotReadyError as e:
+            await asyncio.to_thread(
+                self._with_session, queue.release, job.id, self.worker_id, e.delay
+            )
+            logger.info(f"{job.kind} job {job.id} waiting: {e}")
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            logger.error(f"{job.kind} job {job.id} failed: {error}", exc_info=True)
+            status = await asyncio.to_thread(
+                self._with_session, queue.fail, job.id, self.worker_id, error
+            )
+            if status == queue.FAILED:
+                await asyncio.to_thread(self._call_on_dead, job.kind, job.payload, error)
+        else:
+            await asyncio.to_thread(self._with_session, queue.complete, job.id, self.worker_id)
+            logger.info(f"{job.kind} job {job.id} succeeded in {time.monotonic() - started:.1f}s")
+        finally:
+            heartbeat.cancel()
+
+    async def run(self, shutdown_grace: float = 8.0) -> None:
+        """Poll and run jobs until stop() is called."""
+        self._wakeup = asyncio.Event()
+        self._loop = asyncio.get_running_loop()
+        running: set = set()
+        next_sweep = 0.0
+
+        logger.info(
+            f"Job worker {self.worker_id} started "
+            f"(kinds={list(self.handlers)}, concurrency={self.concurrency})"
+        )
+
+        while not self._stop_requested:
+            try:
+                if time.monotonic() >= next_sweep:
+                    for kind, payload, error in await asyncio.to_thread(self._expire_exhausted):
+                        await asyncio.to_thread(self._call_on_dead, kind, payload, error)
+                    next_sweep = time.monotonic() + self.lease_seconds / 2
+
+                while len(running) < self.concurrency and not self._stop_requested:
+                    job = await asyncio.to_thread(self._claim)
+                    if job is None:
+                        break
+                    task = asyncio.create_task(self._execute(job))
+                    running.add(task)
+                    task.add_done_callback(running.discard)
+                    task.add_done_callback(lambda _: self._wakeup.set())
+            except Exception as e:
+                logger.error(f"Job worker poll failed: {e}", exc_info=True)
+
+            # Sleep until the poll interval elapses, a slot frees up or stop()
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+        if running:
+            logger.info(f"Waiting up to {shutdown_grace}s for {len(running)} running jobs")
+            _, pending = await asyncio.wait(running, timeout=shutdown_grace)
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+        logger.info(f"Job worker {self.worker_id} stopped")
+
+    def notify(self) -> None:
+        """Wake the poll loop early (e.g. right after enqueueing in this process)."""
+        if self._loop is not None and self._wakeup is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    def stop(self) -> None:
+        """Ask the poll loop to finish (thread-safe)."""
+        self._stop_requested = True
+        self.notify()
+
+    # ------------------------------------------------------------------
+    # Embedded mode
+    # ------------------------------------------------------------------
+
+    def start_in_background(self) -> None:
+        """Run the worker in a daemon thread with its own event loop."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_requested = False
+
+        def run_in_thread():
+            loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(loop)
+            try:
+                loop.run_until_complete(self.run())
+            finally:
+                loop.close()
+
+        self._thread = threading.Thread(target=run_in_thread, name="job-worker", daemon=True)
+        self._thread.start()
+
+    def shutdown(self, timeout: float = 10.0) -> None:
+        """Stop an embedded worker and wait for its thread."""
+        self.stop()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+
+# Singleton
+_instance: Optional[JobWorker] = None
+
+
+def get_job_worker() -> JobWorker:
+    """Get or create the JobWorker singleton with the application's handlers."""
+    global _instance
+    if _instance is None:
+        from app.services.documents.bulk_processor import (
+            BULK_BATCH_JOB,
+            BULK_UPLOAD_JOB,
+            get_bulk_processor,
+        )
+        from app.services.documents.synthesis import SYNTHESIS_JOB, get_property_synthesizer
+
+        processor = get_bulk_processor()
+        _instance = JobWorker(
+            {
+                BULK_UPLOAD_JOB: JobHandler(run=processor.run_job, on_dead=processor.fail_job),
+                BULK_BATCH_JOB: JobHandler(run=processor.run_batch_job, on_dead=processor.fail_job),
+                SYNTHESIS_JOB: JobHandler(run=get_property_synthesizer().run_job),
+            }
+        )
+    return _instance
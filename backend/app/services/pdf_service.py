@@ -13,6 +13,7 @@ from sqlalchemy.orm import Session
 from app.models.document import DocumentSummary
 from app.models.photo import Photo
 from app.models.price_analysis import PriceAnalysis
+from app.services import price_analysis_sales
 from app.services.storage import get_storage_service
 
 logger = logging.getLogger(__name__)
@@ -202,7 +203,9 @@ def generate_full_report_pdf(property_obj, db: Session, locale: str = "fr") -> b
     comparable_sales: list = []
     market_trend = None
     if price_analysis:
-        comparable_sales = price_analysis.comparable_sales_json or []
+        comparable_sales, _ = price_analysis_sales.list_sales(
+            db, price_analysis.id, price_analysis_sales.COMPARABLE
+        )
         market_trend = price_analysis.market_trend_json
 
     annual_cost_breakdown, one_time_cost_breakdown = _get_synthesis_data(synthesis)
@@ -242,7 +245,9 @@ def generate_price_analysis_pdf(property_obj, db: Session, locale: str = "fr") -
     comparable_sales: list = []
     market_trend = None
     if price_analysis:
-        comparable_sales = price_analysis.comparable_sales_json or []
+        comparable_sales, _ = price_analysis_sales.list_sales(
+            db, price_analysis.id, price_analysis_sales.COMPARABLE
+        )
         market_trend = price_analysis.market_trend_json
 
     export_date = datetime.utcnow().strftime("%d/%m/%Y")
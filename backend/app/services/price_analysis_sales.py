@@ -0,0 +1,225 @@
+"""
+Price analysis sales - comparable and neighboring DVF sales of an analysis.
+
+Sales are persisted as references (DVF id_mutation + flags) in
+price_analysis_sales rather than as serialized dicts inside the PriceAnalysis
+JSON columns. Details are read back from dvf_sales one page at a time.
+id_mutation is the natural key of a sale: unlike dvf_sales.id it is unchanged
+when the DVF import truncates and reloads the table.
+"""
+
+from collections import defaultdict
+from typing import Sequence
+
+from sqlalchemy import func, insert
+from sqlalchemy.orm import Session
+
+from app.models.price_analysis import PriceAnalysisSale
+from app.models.property import DVFSale, DVFSaleLot
+
+COMPARABLE = "comparable"
+NEIGHBORING = "neighboring"
+SALE_KINDS = (COMPARABLE, NEIGHBORING)
+
+# Sort keys accepted by the sales endpoint
+SORT_COLUMNS = {
+    "position": PriceAnalysisSale.position,
+    "sale_date": DVFSale.date_mutation,
+    "sale_price": DVFSale.prix,
+    "price_per_sqm": DVFSale.prix_m2,
+    "surface_area": DVFSale.surface_bati,
+}
+
+
+def serialize_sale(sale: DVFSale, is_outlier: bool = False) -> dict:
+    """Serialize a DVFSale to a JSON-safe dict."""
+    result = {
+        "id": sale.id,
+        "address": sale.adresse_complete or "",
+        "sale_date": sale.date_mutation.isoformat()
+        if hasattr(sale.date_mutation, "isoformat")
+        else str(sale.date_mutation),
+        "sale_price": float(sale.prix) if sale.prix else 0,
+        "postal_code": sale.code_postal or "",
+        "city": sale.nom_commune or "",
+        "property_type": sale.type_principal or "",
+        "surface_area": sale.surface_bati,
+        "rooms": sale.nombre_pieces,
+        "price_per_sqm": float(sale.prix_m2) if sale.prix_m2 else None,
+        "unit_count": sale.nombre_lots,
+        "is_multi_unit": (sale.nombre_lots or 1) > 1,
+        "is_outlier": is_outlier,
+        "longitude": sale.longitude,
+        "latitude": sale.latitude,
+    }
+
+    # Include individual lot details for multi-unit sales
+    if (sale.nombre_lots or 1) > 1 and hasattr(sale, "lots") and sale.lots:
+        total_surface = sum(lot.surface_bati or 0 for lot in sale.lots)
+        result["lots_detail"] = [
+            {
+                "lot_type": lot.lot_type,
+                "surface_area": lot.surface_bati,
+                "rooms": lot.nombre_pieces,
+                "price_per_sqm": (
+                    round(float(sale.prix) / total_surface, 2)
+                    if sale.prix and total_surface > 0 and lot.surface_bati
+                    else None
+                ),
+            }
+            for lot in sale.lots
+        ]
+        # Use actual lot count from data (nombre_lots can be unreliable)
+        result["unit_count"] = len(sale.lots)
+
+    return result
+
+
+def attach_lots(db: Session, sales: Sequence[DVFSale]) -> None:
+    """Load lot details for multi-unit sales (sets sale.lots, one query)."""
+    multi_unit = {sale.id_mutation: sale for sale in sales if (sale.nombre_lots or 1) > 1}
+    if not multi_unit:
+        return
+
+    lots_by_mutation = defaultdict(list)
+    for lot in db.query(DVFSaleLot).filter(DVFSaleLot.id_mutation.in_(list(multi_unit))).all():
+        lots_by_mutation[lot.id_mutation].append(lot)
+    for id_mutation, sale in multi_unit.items():
+        sale.lots = lots_by_mutation.get(id_mutation, [])
+
+
+def mutations_for_ids(db: Session, sale_ids: Sequence[int]) -> list[str]:
+    """id_mutation of the given dvf_sales ids (as served by the API), in order."""
+    if not sale_ids:
+        return []
+    rows = db.query(DVFSale.id, DVFSale.id_mutation).filter(DVFSale.id.in_(list(sale_ids))).all()
+    by_id = dict(rows)
+    return [by_id[sale_id] for sale_id in sale_ids if sale_id in by_id]
+
+
+def ids_for_mutations(db: Session, mutations: Sequence[str]) -> list[int]:
+    """Current dvf_sales ids of the given mutations, in order (dropped ones are skipped)."""
+    if not mutations:
+        return []
+    rows = (
+        db.query(DVFSale.id_mutation, DVFSale.id)
+        .filter(DVFSale.id_mutation.in_(list(mutations)))
+        .all()
+    )
+    by_mutation = dict(rows)
+    return [by_mutation[m] for m in mutations if m in by_mutation]
+
+
+def replace_sales(
+    db: Session,
+    price_analysis_id: int,
+    kind: str,
+    sales: Sequence[DVFSale],
+    outlier_flags: Sequence[bool],
+) -> None:
+    """
+    Store the references of one kind (flushed, not committed).
+
+    Re-running an analysis after an exclusion toggle usually yields the same
+    sales, in which case the stored rows are left untouched.
+    """
+    refs = []
+    seen = set()
+    for position, sale in enumerate(sales):
+        if sale.id_mutation in seen:
+            continue
+        seen.add(sale.id_mutation)
+        is_outlier = bool(outlier_flags[position]) if position < len(outlier_flags) else False
+        refs.append((sale.id_mutation, position, is_outlier))
+
+    stored = (
+        db.query(
+            PriceAnalysisSale.id_mutation, PriceAnalysisSale.position, PriceAnalysisSale.is_outlier
+        )
+        .filter(
+            PriceAnalysisSale.price_analysis_id == price_analysis_id,
+            PriceAnalysisSale.kind == kind,
+        )
+        .order_by(PriceAnalysisSale.position)
+        .all()
+    )
+    if [tuple(row) for row in stored] == refs:
+        return
+
+    db.query(PriceAnalysisSale).filter(
+        PriceAnalysisSale.price_analysis_id == price_analysis_id,
+        PriceAnalysisSale.kind == kind,
+    ).delete(synchronize_session=False)
+    if refs:
+        db.execute(
+            insert(PriceAnalysisSale),
+            [
+                {
+                    "price_analysis_id": price_analysis_id,
+                    "id_mutation": id_mutation,
+                    "kind": kind,
+                    "position": position,
+                    "is_outlier": is_outlier,
+                }
+                for id_mutation, position, is_outlier in refs
+            ],
+        )
+
+
+def count_sales(db: Session, price_analysis_id: int) -> dict[str, int]:
+    """Number of stored sales per kind, counted like list_sales totals."""
+    counts = dict.fromkeys(SALE_KINDS, 0)
+    rows = (
+        db.query(PriceAnalysisSale.kind, func.count(PriceAnalysisSale.id))
+        .join(DVFSale, DVFSale.id_mutation == PriceAnalysisSale.id_mutation)
+        .filter(PriceAnalysisSale.price_analysis_id == price_analysis_id)
+        .group_by(PriceAnalysisSale.kind)
+        .all()
+    )
+    counts.update({kind: count for kind, count in rows})
+    return counts
+
+
+def list_sales(
+    db: Session,
+    price_analysis_id: int,
+    kind: str,
+    sort: str = "position",
+    descending: bool = False,
+    offset: int = 0,
+    limit: int | None = None,
+    excluded_mutations: Sequence[str] | None = None,
+) -> tuple[list[dict], int]:
+    """
+    Return one page of serialized sales and the total count for a kind.
+
+    With excluded_mutations, each sale gets an is_excluded flag.
+
+    References survive DVF re-imports; a mutation dropped from the dataset is
+    skipped (and not counted). The re-import also makes the analysis stale, so
+    the next refresh rebuilds the references.
+    """
+    query = (
+        db.query(DVFSale, PriceAnalysisSale.is_outlier)
+        .join(PriceAnalysisSale, PriceAnalysisSale.id_mutation == DVFSale.id_mutation)
+        .filter(
+            PriceAnalysisSale.price_analysis_id == price_analysis_id,
+            PriceAnalysisSale.kind == kind,
+        )
+    )
+    total = query.count()
+
+    column = SORT_COLUMNS.get(sort, PriceAnalysisSale.position)
+    order = column.desc().nulls_last() if descending else column.asc().nulls_last()
+    query = query.order_by(order, PriceAnalysisSale.position).offset(offset)
+    if limit is not None:
+        query = query.limit(limit)
+    rows = query.all()
+
+    attach_lots(db, [sale for sale, _ in rows])
+    items = [serialize_sale(sale, is_outlier) for sale, is_outlier in rows]
+    if excluded_mutations is not None:
+        excluded = set(excluded_mutations)
+        for item, (sale, _) in zip(items, rows):
+            item["is_excluded"] = sale.id_mutation in excluded
+    return items, total
@@ -8,6 +8,7 @@ Supports:
 The backend is selected based on STORAGE_BACKEND environment variable.
 """
 
+import hashlib
 import logging
 from abc import ABC, abstractmethod
 from datetime import timedelta
@@ -15,12 +16,68 @@ from io import BytesIO
 from typing import BinaryIO, Optional
 from urllib.parse import urlparse
 
-from app.core.cache import cache_get, cache_set
+from app.core.cache import cached
 from app.core.config import settings
 from app.core.logging import trace_storage_operation
 
 logger = logging.getLogger(__name__)
 
+# Part size of streamed uploads whose length is unknown (S3 minimum is 5MB)
+STREAM_PART_SIZE = 10 * 1024 * 1024
+
+
+class FileTooLargeError(ValueError):
+    """A streamed upload went past its size limit."""
+
+
+class HashingReader:
+    """
+    Read-only file wrapper computing the SHA-256 and size of what is read.
+
+    Lets an upload be piped to storage chunk by chunk and hashed on the way,
+    without holding it in memory. Bytes read again after a seek (an upload
+    retrying a part) are hashed once, and bytes skipped by a forward seek are
+    read and hashed on the way. Raises FileTooLargeError as soon as more than
+    max_bytes have been read.
+    """
+
+    def __init__(self, stream: BinaryIO, max_bytes: Optional[int] = None):
+        self.stream = stream
+        self.max_bytes = max_bytes
+        self.size = 0  # Bytes read so far (furthest position reached)
+        self._position = 0
+        self._sha256 = hashlib.sha256()
+
+    def read(self, size: int = -1) -> bytes:
+        start = self._position
+        data = self.stream.read(size)
+        self._position += len(data)
+        if self._position > self.size:
+            if self.max_bytes is not None and self._position > self.max_bytes:
+                raise FileTooLargeError(f"Upload larger than {self.max_bytes} bytes")
+            self._sha256.update(data[self.size - start :])
+            self.size = self._position
+        return data
+
+    def seek(self, offset: int, whence: int = 0) -> int:
+        target = self.stream.seek(offset, whence)
+        if target <= self.size:
+            self._position = target
+            return target
+        # Past what was hashed: read the gap so the digest covers every byte
+        self._position = self.stream.seek(self.size)
+        while self._position < target:
+            if not self.read(min(STREAM_PART_SIZE, target - self._position)):
+                break  # target is past the end of the stream
+        return self._position
+
+    def tell(self) -> int:
+        return self._position
+
+    def hexdigest(self) -> str:
+        """SHA-256 of the bytes read (the whole file once it has been read to the end)."""
+        return self._sha256.hexdigest()
+
 
 # =============================================================================
 # Storage Backend Interface
@@ -42,6 +99,19 @@ class StorageBackend(ABC):
         """Upload a file to storage."""
         pass
 
+    @abstractmethod
+    def upload_stream(
+        self,
+        stream: BinaryIO,
+        filename: str,
+        length: Optional[int] = None,
+        bucket_name: Optional[str] = None,
+        content_type: str = "application/octet-stream",
+        metadata: Optional[dict] = None,
+    ) -> str:
+        """Upload a file read from a stream in chunks (length, if known, in bytes)."""
+        pass
+
     @abstractmethod
     def download_file(self, object_name: str, bucket_name: Optional[str] = None) -> bytes:
         """Download a file from storage."""
@@ -166,6 +236,39 @@ class MinIOBackend(StorageBackend):
                 logger.error(f"Upload failed: {e}")
                 raise
 
+    def upload_stream(
+        self,
+        stream: BinaryIO,
+        filename: str,
+        length: Optional[int] = None,
+        bucket_name: Optional[str] = None,
+        content_type: str = "application/octet-stream",
+        metadata: Optional[dict] = None,
+    ) -> str:
+        from minio.error import S3Error
+
+        bucket = bucket_name or self.default_bucket
+
+        with trace_storage_operation(
+            operation="upload", bucket=bucket, filename=filename, file_size=length
+        ):
+            try:
+                # Sent in parts as the stream is read; unknown lengths need a part size
+                self.client.put_object(
+                    bucket_name=bucket,
+                    object_name=filename,
+                    data=stream,
+                    length=length if length is not None else -1,
+                    content_type=content_type,
+                    metadata=metadata or {},
+                    part_size=0 if length is not None else STREAM_PART_SIZE,
+                )
+                logger.info(f"Uploaded stream: {filename}")
+                return filename
+            except S3Error as e:
+                logger.error(f"Upload failed: {e}")
+                raise
+
     def download_file(self, object_name: str, bucket_name: Optional[str] = None) -> bytes:
         from minio.error import S3Error
 
@@ -343,6 +446,32 @@ class GCSBackend(StorageBackend):
                 logger.error(f"GCS upload failed: {e}")
                 raise
 
+    def upload_stream(
+        self,
+        stream: BinaryIO,
+        filename: str,
+        length: Optional[int] = None,
+        bucket_name: Optional[str] = None,
+        content_type: str = "application/octet-stream",
+        metadata: Optional[dict] = None,
+    ) -> str:
+        bucket = self._get_bucket(bucket_name)
+
+        with trace_storage_operation(
+            operation="upload", bucket=bucket.name, filename=filename, file_size=length
+        ):
+            try:
+                blob = bucket.blob(filename)
+                # Metadata goes with the upload itself (no extra patch request)
+                if metadata:
+                    blob.metadata = metadata
+                blob.upload_from_file(stream, size=length, content_type=content_type)
+                logger.info(f"Uploaded stream to GCS: {filename}")
+                return filename
+            except Exception as e:
+                logger.error(f"GCS upload failed: {e}")
+                raise
+
     def download_file(self, object_name: str, bucket_name: Optional[str] = None) -> bytes:
         bucket = self._get_bucket(bucket_name)
 
@@ -492,6 +621,20 @@ class StorageService:
         """Upload a file to storage."""
         return self._backend.upload_file(file_data, filename, bucket_name, content_type, metadata)
 
+    def upload_stream(
+        self,
+        stream: BinaryIO,
+        filename: str,
+        length: Optional[int] = None,
+        bucket_name: Optional[str] = None,
+        content_type: str = "application/octet-stream",
+        metadata: Optional[dict] = None,
+    ) -> str:
+        """Upload a file read from a stream in chunks, without loading it in memory."""
+        return self._backend.upload_stream(
+            stream, filename, length, bucket_name, content_type, metadata
+        )
+
     def download_file(self, object_name: str, bucket_name: Optional[str] = None) -> bytes:
         """Download a file from storage."""
         return self._backend.download_file(object_name, bucket_name)
@@ -508,22 +651,18 @@ class StorageService:
         """Check if a file exists."""
         return self._backend.file_exists(object_name, bucket_name)
 
+    # Cache for 50 min (safety margin vs typical 60-min URL expiry)
+    @cached(
+        key=lambda self, storage_key, bucket_name, expiry: (
+            f"presigned_url:{bucket_name or self._backend.default_bucket}:{storage_key}"
+        ),
+        ttl=3000,
+    )
     def get_presigned_url(
         self, storage_key: str, bucket_name: Optional[str] = None, expiry=None
     ) -> str:
         """Generate a presigned/signed URL for file access (cached in Redis)."""
-        bucket = bucket_name or self._backend.default_bucket
-        cache_key = f"presigned_url:{bucket}:{storage_key}"
-
-        cached = cache_get(cache_key)
-        if cached is not None:
-            return cached
-
-        url = self._backend.get_presigned_url(storage_key, bucket_name, expiry)
-
-        # Cache for 50 min (safety margin vs typical 60-min URL expiry)
-        cache_set(cache_key, url, ttl=3000)
-        return url
+        return self._backend.get_presigned_url(storage_key, bucket_name, expiry)
 
     def list_files(self, prefix: str = "", bucket_name: Optional[str] = None) -> list[str]:
         """List files with optional prefix filter."""
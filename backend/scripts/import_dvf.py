@@ -188,6 +188,31 @@ def chunked_copy(
     return loaded
 
 
+BUMP_GENERATION_SQL = """
+INSERT INTO dataset_generations (name, generation, imported_at)
+VALUES ('dvf', 1, now())
+ON CONFLICT (name) DO UPDATE
+SET generation = dataset_generations.generation + 1, imported_at = now()
+RETURNING generation
+"""
+
+
+def invalidate_dvf_caches(generation: int) -> None:
+    """Publish the new DVF generation so the API drops DVF-derived cache entries.
+
+    Best effort: the generation is already committed with the data, so a
+    missing app package or an unreachable Redis only means cached entries
+    (and the cached generation) expire on their own TTL.
+    """
+    try:
+        sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+        from app.core.cache import publish_generation
+
+        publish_generation("dvf", generation)
+    except Exception as e:
+        print(f"Warning: could not invalidate DVF caches ({e})")
+
+
 def main() -> None:
     parser = argparse.ArgumentParser(description="Import geolocalized DVF data")
     parser.add_argument("--csv", type=str, help="Path to dvf.csv", default=None)
@@ -487,7 +512,12 @@ def main() -> None:
             cur.execute(idx_sql)
             print(f"done ({time.time() - t_idx:.1f}s)")
 
-        # Commit the data + indexes
+        # Durable import generation: analyses computed before it become stale
+        cur.execute(BUMP_GENERATION_SQL)
+        generation = cur.fetchone()[0]
+        print(f"DVF generation: {generation}")
+
+        # Commit the data + indexes + generation
         conn.commit()
 
         # ANALYZE needs autocommit
@@ -496,6 +526,8 @@ def main() -> None:
         cur.execute("ANALYZE dvf_sales")
         cur.execute("ANALYZE dvf_sale_lots")
 
+        invalidate_dvf_caches(generation)
+
         t_total = time.time() - t0
         print()
         print("=" * 60)
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Standalone job worker.
+
+Runs queued background jobs (bulk document processing) outside the API
+processes. Start as many as needed; they share the processing_jobs queue.
+Set JOB_WORKER_ENABLED=false on the API when all processing should happen here.
+
+Usage:
+    python scripts/run_worker.py                  # JOB_WORKER_CONCURRENCY jobs at once
+    python scripts/run_worker.py --concurrency 4
+"""
+
+import argparse
+import asyncio
+import logging
+import signal
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.core.config import settings  # noqa: E402
+from app.core.logging import setup_logging  # noqa: E402
+from app.prompts import load_prompts  # noqa: E402
+from app.services.documents.pdf_pool import shutdown_pdf_pool  # noqa: E402
+from app.services.jobs import get_job_worker  # noqa: E402
+
+logger = logging.getLogger(__name__)
+
+
+async def run(concurrency: int) -> None:
+    worker = get_job_worker()
+    worker.concurrency = max(1, concurrency)
+
+    # SIGTERM (deploys, scale-down) stops claiming; unfinished jobs are released
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, worker.stop)
+
+    try:
+        await worker.run()
+    finally:
+        shutdown_pdf_pool()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run background job worker")
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=settings.JOB_WORKER_CONCURRENCY,
+        help="Jobs run at once by this process",
+    )
+    args = parser.parse_args()
+
+    setup_logging(settings.LOG_LEVEL)
+    load_prompts()
+    asyncio.run(run(args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
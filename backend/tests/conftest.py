@@ -0,0 +1,38 @@
+"""Shared fixtures: an in-memory SQLite database for service tests."""
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+
+@pytest.fixture
+def tables():
+    """Models whose tables the engine creates; modules override it."""
+    return ()
+
+
+@pytest.fixture
+def engine(tables):
+    # Every session shares the one in-memory database (StaticPool). SQLite does
+    # not enforce the foreign keys to users and properties and ignores
+    # FOR UPDATE SKIP LOCKED; DVFSale can't be created (Postgres-only column).
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    for model in tables:
+        model.__table__.create(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def session_factory(engine):
+    return sessionmaker(bind=engine)
+
+
+@pytest.fixture
+def db(session_factory):
+    session = session_factory()
+    yield session
+    session.close()
@@ -0,0 +1,112 @@
+"""Tests for the content-hash cache of LLM document analyses."""
+
+import json
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.services.ai import analysis_cache
+from app.services.ai.document_processor import DocumentProcessor
+from app.services.ai.llm_files import InlineFileStore
+from app.services.ai.llm_gateway import LLMGateway
+
+FILE_HASH = "a" * 64
+
+
+@pytest.fixture
+def store():
+    """In-memory replacement for the Redis object cache."""
+    data = {}
+    with (
+        patch.object(analysis_cache, "cache_get_obj", side_effect=data.get),
+        patch.object(
+            analysis_cache,
+            "cache_set_obj",
+            side_effect=lambda key, value, ttl: data.__setitem__(key, value),
+        ),
+    ):
+        yield data
+
+
+@pytest.fixture
+def processor():
+    with patch.object(DocumentProcessor, "__init__", lambda self: None):
+        proc = DocumentProcessor.__new__(DocumentProcessor)
+        proc.client = MagicMock()
+        proc.gateway = LLMGateway(client=proc.client)
+        proc.files = InlineFileStore()
+        proc.model = "gemini-2.5-flash"
+        return proc
+
+
+def gemini_response(text: str) -> MagicMock:
+    response = MagicMock()
+    response.candidates = [MagicMock()]
+    response.candidates[0].content.parts = [MagicMock(text=text, thought=False)]
+    return response
+
+
+class TestKeys:
+    def test_analysis_key_covers_prompt_model_and_language(self):
+        key = analysis_cache.analysis_key(FILE_HASH, "dp_process_pv_ag", "m1", "French")
+        assert FILE_HASH in key
+        assert "dp_process_pv_ag@v1:" in key
+        assert key != analysis_cache.analysis_key(FILE_HASH, "dp_process_pv_ag", "m1", "English")
+        assert key != analysis_cache.analysis_key(FILE_HASH, "dp_process_pv_ag", "m2", "French")
+        assert key != analysis_cache.analysis_key(FILE_HASH, "dp_process_tax", "m1", "French")
+
+    def test_without_hash_nothing_is_cached(self, store):
+        analysis_cache.store_analysis(None, "dp_process_pv_ag", "m", "French", {"summary": "x"})
+        assert store == {}
+        assert analysis_cache.get_cached_analysis(None, "dp_process_pv_ag", "m", "French") is None
+
+
+class TestProcessDocument:
+    @pytest.mark.asyncio
+    async def test_same_content_is_analyzed_once(self, processor, store):
+        analysis = {"summary": "AG 2024", "key_insights": ["Ravalement voté"]}
+        processor.client.aio.models.generate_content = AsyncMock(
+            side_effect=[gemini_response("pv_ag"), gemini_response(json.dumps(analysis))]
+        )
+        document = {"filename": "pv.pdf", "pdf_data": b"%PDF", "file_hash": FILE_HASH}
+
+        first = await processor.process_document({**document, "document_id": 1})
+        second = await processor.process_document(
+            {**document, "filename": "pv-copy.pdf", "document_id": 2}
+        )
+
+        assert processor.client.aio.models.generate_content.call_count == 2
+        assert second == {
+            "filename": "pv-copy.pdf",
+            "document_type": "pv_ag",
+            "result": analysis,
+            "document_id": 2,
+        }
+        assert first["result"] == second["result"]
+
+    @pytest.mark.asyncio
+    async def test_other_language_reuses_classification_only(self, processor, store):
+        processor.client.aio.models.generate_content = AsyncMock(
+            side_effect=[
+                gemini_response("charges"),
+                gemini_response('{"summary": "Charges"}'),
+                gemini_response('{"summary": "Service charges"}'),
+            ]
+        )
+        document = {"filename": "c.pdf", "pdf_data": b"%PDF", "file_hash": FILE_HASH}
+
+        await processor.process_document(document, output_language="French")
+        result = await processor.process_document(document, output_language="English")
+
+        assert processor.client.aio.models.generate_content.call_count == 3
+        assert result["result"] == {"summary": "Service charges"}
+
+    @pytest.mark.asyncio
+    async def test_failed_classification_is_not_cached(self, processor, store):
+        processor.client.aio.models.generate_content = AsyncMock(
+            side_effect=ValueError("bad request")
+        )
+        document = {"filename": "x.pdf", "pdf_data": b"%PDF", "file_hash": FILE_HASH}
+
+        assert await processor.classify_document(document) == "other"
+        assert store == {}
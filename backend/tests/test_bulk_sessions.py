@@ -0,0 +1,192 @@
+"""Tests for BulkProcessor's database use: per-document sessions, batched updates, counters."""
+
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from sqlalchemy import event
+
+from app.models.document import Document
+from app.models.llm_usage import LLMCallRecord
+from app.models.user import User, increment_documents_analyzed
+from app.services.documents import bulk_processor
+from app.services.documents.bulk_processor import BulkProcessor
+from app.services.documents.prepared_pdf import PreparedPdf
+from app.services.jobs import JobContext
+
+UPLOADS = [{"document_id": i, "filename": f"doc{i}.pdf", "storage_key": f"k{i}"} for i in (1, 2, 3)]
+
+
+@pytest.fixture
+def tables():
+    return (User, Document, LLMCallRecord)
+
+
+@pytest.fixture
+def statements(engine):
+    executed = []
+    event.listen(
+        engine, "before_cursor_execute", lambda conn, cur, sql, *args: executed.append(sql)
+    )
+    return executed
+
+
+@pytest.fixture
+def sessions(session_factory):
+    """The session factory, counting the sessions it opened."""
+    opened = MagicMock(side_effect=session_factory)
+    db = session_factory()
+    db.add(User(id=1, email="a@b.c", hashed_password="x", documents_analyzed_count=0))
+    for upload in UPLOADS:
+        db.add(
+            Document(
+                id=upload["document_id"],
+                user_id=1,
+                filename=upload["filename"],
+                file_path="",
+                document_category="pending_classification",
+                processing_status="pending",
+            )
+        )
+    db.commit()
+    db.close()
+    return opened
+
+
+@pytest.fixture
+def ai():
+    async def process_document(doc, output_language="French", on_classified=None):
+        if doc["filename"] == "doc3.pdf":
+            raise RuntimeError("429 RESOURCE_EXHAUSTED")
+        return {
+            "filename": doc["filename"],
+            "document_type": "other",
+            "result": {"summary": "ok"},
+            "document_id": doc["document_id"],
+        }
+
+    ai = MagicMock()
+    ai.process_document = process_document
+    ai.synthesize_results = AsyncMock(return_value={"summary": "synthesis"})
+    return ai
+
+
+async def run(processor: BulkProcessor, sessions, ai, download=None, attempt=None) -> None:
+    """Process UPLOADS directly, or through run_job as the given job attempt."""
+    prepared = [PreparedPdf(pdf_data=b"pdf", page_count=1) for _ in UPLOADS]
+    download = download or AsyncMock(return_value=[b"pdf"] * 3)
+    with (
+        patch.object(bulk_processor, "SessionLocal", sessions),
+        patch.object(bulk_processor, "get_document_processor", return_value=ai),
+        patch.object(bulk_processor, "publish_progress"),
+        patch.object(processor, "_download_files", new=download),
+        patch.object(processor, "_prepare_documents", new=AsyncMock(return_value=prepared)),
+        patch.object(processor, "_save_synthesis", new=AsyncMock()),
+    ):
+        if attempt is None:
+            await processor.process_bulk_upload("wf", 1, UPLOADS)
+        else:
+            payload = {"workflow_id": "wf", "property_id": 1, "document_uploads": UPLOADS}
+            await processor.run_job(
+                payload, JobContext(1, bulk_processor.BULK_UPLOAD_JOB, attempt, 3)
+            )
+
+
+class TestBulkSessions:
+    @pytest.mark.asyncio
+    async def test_documents_move_to_processing_in_one_update(self, sessions, ai, statements):
+        seen = []
+
+        async def download(uploads):
+            seen.extend(statements)
+            return [b"pdf"] * 3
+
+        await run(BulkProcessor(), sessions, ai, download=download)
+
+        updates = [s for s in seen if s.startswith("UPDATE documents")]
+        assert len(updates) == 1
+        assert "processing_status" in updates[0]
+        assert not [s for s in seen if s.startswith("SELECT")]
+
+    @pytest.mark.asyncio
+    async def test_each_document_writes_in_its_own_session(self, sessions, ai, db):
+        await run(BulkProcessor(), sessions, ai)
+
+        # Status update, two saves, one failure, synthesis usage
+        assert sessions.call_count == 5
+        statuses = [d.processing_status for d in db.query(Document).order_by(Document.id)]
+        assert statuses == ["completed", "completed", "failed"]
+        assert db.get(User, 1).documents_analyzed_count == 2
+
+    @pytest.mark.asyncio
+    async def test_retried_upload_counts_documents_once(self, sessions, ai, db):
+        processor = BulkProcessor()
+        await run(processor, sessions, ai)
+        await run(processor, sessions, ai)
+
+        assert db.get(User, 1).documents_analyzed_count == 2
+
+    @pytest.mark.asyncio
+    async def test_retry_skips_completed_documents(self, sessions, ai):
+        processor = BulkProcessor()
+        await run(processor, sessions, ai, attempt=1)
+
+        analyzed = []
+        process_document = ai.process_document
+
+        async def tracked(doc, **kwargs):
+            analyzed.append(doc["filename"])
+            return await process_document(doc, **kwargs)
+
+        ai.process_document = tracked
+        await run(processor, sessions, ai, attempt=2)
+
+        assert analyzed == ["doc3.pdf"]
+        # The completed documents are still synthesized
+        synthesized = ai.synthesize_results.call_args.args[0]
+        assert sorted(r["document_id"] for r in synthesized) == [1, 2]
+
+
+class TestFailJob:
+    def _statuses(self, db):
+        return [d.processing_status for d in db.query(Document).order_by(Document.id)]
+
+    @pytest.mark.parametrize(
+        "payload",
+        [
+            {"workflow_id": "wf", "document_uploads": UPLOADS[:2]},
+            {"workflow_id": "wf", "documents": UPLOADS[:2]},
+        ],
+    )
+    def test_fails_unfinished_documents(self, sessions, db, payload):
+        with (
+            patch.object(bulk_processor, "SessionLocal", sessions),
+            patch.object(bulk_processor, "publish_progress"),
+        ):
+            BulkProcessor().fail_job(payload, "boom")
+
+        assert self._statuses(db) == ["failed", "failed", "pending"]
+
+    def test_empty_upload_list(self, sessions, db):
+        with (
+            patch.object(bulk_processor, "SessionLocal", sessions),
+            patch.object(bulk_processor, "publish_progress"),
+        ):
+            BulkProcessor().fail_job({"workflow_id": "wf", "document_uploads": []}, "boom")
+
+        assert self._statuses(db) == ["pending"] * 3
+
+
+class TestIncrementDocumentsAnalyzed:
+    def test_concurrent_sessions_do_not_lose_updates(self, sessions):
+        first, second = sessions(), sessions()
+        # Both sessions have read the count before either writes
+        assert first.get(User, 1).documents_analyzed_count == 0
+        assert second.get(User, 1).documents_analyzed_count == 0
+
+        increment_documents_analyzed(first, 1)
+        first.commit()
+        increment_documents_analyzed(second, 1, count=2)
+        second.commit()
+
+        db = sessions()
+        assert db.get(User, 1).documents_analyzed_count == 3
@@ -0,0 +1,191 @@
+"""Tests for the streaming bulk upload: chunked hashing, bounded storage writes, 202."""
+
+import hashlib
+import io
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api import documents
+from app.core.better_auth_security import get_current_user_hybrid as get_current_user
+from app.core.database import get_db
+from app.main import app
+from app.models.document import Document
+from app.models.job import ProcessingJob
+from app.models.property import Property
+from app.models.user import User
+from app.services.documents.bulk_processor import BULK_UPLOAD_JOB
+from app.services.storage import FileTooLargeError, HashingReader
+
+client = TestClient(app)
+
+
+class FakeStorage:
+    """Reads each stream in small chunks, tracking how many uploads overlap."""
+
+    bucket = "documents"
+
+    def __init__(self, fail_on: str = ""):
+        self.fail_on = fail_on
+        self.objects = {}
+        self.deleted = []
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+
+    def upload_stream(self, stream, filename, length=None, **kwargs):
+        with self._lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        try:
+            time.sleep(0.02)
+            if self.fail_on and filename.endswith(self.fail_on):
+                raise RuntimeError("storage unavailable")
+            chunks = iter(lambda: stream.read(1024), b"")
+            self.objects[filename] = b"".join(chunks)
+            return filename
+        finally:
+            with self._lock:
+                self.active -= 1
+
+    def delete_file(self, object_name, bucket_name=None):
+        self.deleted.append(object_name)
+        return True
+
+
+@pytest.fixture
+def tables():
+    return (User, Property, Document, ProcessingJob)
+
+
+@pytest.fixture
+def db(session_factory):
+    session = session_factory()
+    session.add(User(id=1, email="a@b.c", hashed_password="x", uuid="user-uuid"))
+    session.add(Property(id=1, user_id=1, address="1 rue de la Paix"))
+    session.commit()
+    app.dependency_overrides[get_db] = lambda: session
+    app.dependency_overrides[get_current_user] = lambda: "1"
+    yield session
+    app.dependency_overrides.pop(get_db, None)
+    app.dependency_overrides.pop(get_current_user, None)
+    session.close()
+
+
+@pytest.fixture
+def storage():
+    storage = FakeStorage()
+    with (
+        patch.object(documents, "get_storage_service", return_value=storage),
+        patch.object(documents, "get_job_worker"),
+        patch.object(documents.settings, "BULK_UPLOAD_CONCURRENCY", 2),
+    ):
+        yield storage
+
+
+def upload(*files):
+    return client.post(
+        "/api/documents/bulk-upload",
+        files=[("files", (name, data, "application/pdf")) for name, data in files],
+        data={"property_id": "1"},
+    )
+
+
+PDFS = [(f"doc{i}.pdf", b"%PDF-1.7 " + bytes([i]) * 5000) for i in range(5)]
+
+
+class TestBulkUpload:
+    def test_records_and_job_created_with_streamed_hashes(self, db, storage):
+        response = upload(*PDFS)
+
+        assert response.status_code == 202
+        body = response.json()
+        assert body["total_files"] == 5
+        docs = db.query(Document).order_by(Document.id).all()
+        assert [d.id for d in docs] == body["document_ids"]
+        for doc, (name, data) in zip(docs, PDFS):
+            assert doc.filename == name
+            assert doc.file_hash == hashlib.sha256(data).hexdigest()
+            assert doc.file_size == len(data)
+            assert storage.objects[doc.storage_key] == data
+            assert (doc.workflow_id, doc.processing_status) == (body["workflow_id"], "processing")
+
+        (job,) = db.query(ProcessingJob).all()
+        assert job.kind == BULK_UPLOAD_JOB
+        assert [u["document_id"] for u in job.payload["document_uploads"]] == [d.id for d in docs]
+
+    def test_uploads_are_concurrent_but_bounded(self, db, storage):
+        upload(*PDFS)
+
+        assert storage.max_active == 2
+
+    def test_oversized_file_is_skipped(self, db, storage):
+        with patch.object(documents.settings, "MAX_UPLOAD_SIZE", 6000):
+            response = upload(PDFS[0], ("big.pdf", b"x" * 7000))
+
+        assert response.json()["total_files"] == 1
+        assert [d.filename for d in db.query(Document)] == ["doc0.pdf"]
+
+    def test_failed_upload_leaves_no_records_or_objects(self, db, storage):
+        storage.fail_on = "doc3.pdf"
+
+        response = upload(*PDFS)
+
+        assert response.status_code == 500
+        assert db.query(Document).count() == 0
+        assert db.query(ProcessingJob).count() == 0
+        assert sorted(storage.deleted) == sorted(storage.objects)
+
+
+class TestHashingReader:
+    def test_hashes_what_is_read_once(self):
+        data = bytes(range(256)) * 40
+        reader = HashingReader(io.BytesIO(data))
+
+        reader.read(1000)
+        # A retried part is read again from an earlier position
+        reader.seek(500)
+        while reader.read(700):
+            pass
+
+        assert reader.size == len(data)
+        assert reader.hexdigest() == hashlib.sha256(data).hexdigest()
+
+    def test_forward_seek_hashes_the_gap(self):
+        data = bytes(range(256)) * 40
+        reader = HashingReader(io.BytesIO(data))
+
+        reader.read(100)
+        assert reader.seek(5000) == 5000
+        assert reader.read() == data[5000:]
+        assert reader.hexdigest() == hashlib.sha256(data).hexdigest()
+
+    def test_seek_to_end_then_rewind(self):
+        data = b"abc" * 1000
+        reader = HashingReader(io.BytesIO(data))
+
+        assert reader.seek(0, io.SEEK_END) == len(data)
+        assert reader.seek(0) == 0
+        assert reader.read() == data
+        assert reader.size == len(data)
+        assert reader.hexdigest() == hashlib.sha256(data).hexdigest()
+
+    def test_seek_past_the_end_stops_at_the_end(self):
+        reader = HashingReader(io.BytesIO(b"x" * 10))
+        assert reader.seek(50) == 10
+        assert reader.read() == b""
+
+    def test_forward_seek_respects_the_limit(self):
+        reader = HashingReader(io.BytesIO(b"x" * 100), max_bytes=60)
+        with pytest.raises(FileTooLargeError):
+            reader.seek(80)
+
+    def test_stops_past_the_limit(self):
+        reader = HashingReader(io.BytesIO(b"x" * 100), max_bytes=60)
+
+        reader.read(50)
+        with pytest.raises(FileTooLargeError):
+            reader.read(50)
@@ -0,0 +1,349 @@
+"""Tests for the Redis cache helpers and codecs."""
+
+import time
+import zlib
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from app.core import cache
+from app.core.cache import (
+    CompressedCodec,
+    JsonCodec,
+    RawCodec,
+    cache_get_bytes,
+    cache_get_obj,
+    cache_set_bytes,
+    cached,
+    get_codec,
+    get_generation,
+    invalidate_tags,
+    publish_generation,
+)
+
+PAYLOAD = {
+    "estimated_value": 450000.0,
+    "trend_projection": {
+        "neighboring_sales": [
+            {"id": i, "address": f"{i} RUE DE LA PAIX", "price_per_sqm": 10000.0 + i}
+            for i in range(500)
+        ]
+    },
+}
+
+
+class TestCodecs:
+    """Round-trip and framing behaviour of the cache codecs."""
+
+    @pytest.mark.parametrize("spec", ["json", "orjson", "msgpack", "json+zstd", "orjson+zstd"])
+    def test_round_trip(self, spec):
+        codec = get_codec(spec)
+        assert codec.decode(codec.encode(PAYLOAD)) == PAYLOAD
+
+    def test_unknown_serializer_falls_back_to_json(self):
+        assert isinstance(get_codec("pickle"), JsonCodec)
+
+    def test_small_payload_stored_uncompressed(self):
+        codec = CompressedCodec(JsonCodec(), min_size=1024)
+        encoded = codec.encode({"a": 1})
+        assert encoded[:1] == b"\x00"
+        assert codec.decode(encoded) == {"a": 1}
+
+    def test_large_payload_compressed(self):
+        codec = CompressedCodec(JsonCodec(), min_size=1024)
+        raw = JsonCodec().encode(PAYLOAD)
+        encoded = codec.encode(PAYLOAD)
+        assert encoded[:1] == b"\x02"
+        assert len(encoded) < len(raw) / 3
+
+    def test_zlib_compressor_from_spec(self):
+        codec = get_codec("orjson+zlib")
+        assert codec.name == "orjson+zlib"
+        assert codec.encode(PAYLOAD)[:1] == b"\x01"
+        assert codec.decode(codec.encode(PAYLOAD)) == PAYLOAD
+
+    def test_decodes_zlib_frames_regardless_of_compressor(self):
+        """Entries written with zlib stay readable by a zstd codec."""
+        codec = CompressedCodec(RawCodec())
+        body = b'{"x": "' + b"y" * 5000 + b'"}'
+        assert codec.decode(b"\x01" + zlib.compress(body)) == body
+
+    def test_unknown_frame_raises(self):
+        with pytest.raises(ValueError):
+            CompressedCodec(RawCodec()).decode(b'{"legacy": "text value"}')
+
+
+class TestBinaryHelpers:
+    """cache_*_obj / cache_*_bytes are fault tolerant like cache_get / cache_set."""
+
+    def test_bytes_round_trip(self):
+        store: dict[str, bytes] = {}
+        fake = MagicMock()
+        fake.set.side_effect = lambda key, value, ex: store.__setitem__(key, value)
+        fake.get.side_effect = store.get
+
+        body = b'{"comparable_sales": [' + b'{"id": 1},' * 1000 + b'{"id": 2}]}'
+        with patch.object(cache, "get_redis_binary", return_value=fake):
+            cache_set_bytes("price_analysis_full:1", body, 1800)
+            assert len(store["price_analysis_full:1"]) < len(body)
+            assert cache_get_bytes("price_analysis_full:1") == body
+
+    def test_redis_down_is_a_miss(self):
+        fake = MagicMock()
+        fake.get.side_effect = ConnectionError("redis down")
+        with patch.object(cache, "get_redis_binary", return_value=fake):
+            assert cache_get_obj("dvf_stats") is None
+
+    def test_legacy_text_entry_is_a_miss(self):
+        fake = MagicMock()
+        fake.get.return_value = b'{"total_records": 10}'
+        with patch.object(cache, "get_redis_binary", return_value=fake):
+            assert cache_get_bytes("price_analysis_full:1") is None
+
+
+class FakeRedis:
+    """Minimal in-memory stand-in for the binary Redis client used by @cached."""
+
+    def __init__(self):
+        self.data: dict = {}
+        self.ttls: dict = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, ex=None, px=None, nx=False):
+        if nx and key in self.data:
+            return None
+        self.data[key] = value.encode() if isinstance(value, str) else value
+        self.ttls[key] = ex if ex is not None else (px / 1000 if px else -1)
+        return True
+
+    def delete(self, *keys):
+        deleted = 0
+        for key in keys:
+            deleted += self.data.pop(key, None) is not None
+            self.ttls.pop(key, None)
+        return deleted
+
+    def sadd(self, key, *members):
+        self.data.setdefault(key, set()).update(members)
+        self.ttls.setdefault(key, -1)
+
+    def smembers(self, key):
+        return set(self.data.get(key, set()))
+
+    def ttl(self, key):
+        return self.ttls.get(key, -2)
+
+    def expire(self, key, seconds):
+        self.ttls[key] = seconds
+
+    def incr(self, key):
+        self.data[key] = str(int(self.data.get(key, 0)) + 1).encode()
+        return int(self.data[key])
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    def register_script(self, script):
+        # Only the lock release script is used: compare-and-delete
+        def run(keys=(), args=()):
+            if self.data.get(keys[0]) == args[0].encode():
+                return self.delete(keys[0])
+            return 0
+
+        return run
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.calls = []
+
+    def __getattr__(self, name):
+        def record(*args, **kwargs):
+            self.calls.append((name, args, kwargs))
+
+        return record
+
+    def execute(self):
+        return [getattr(self.redis, name)(*args, **kwargs) for name, args, kwargs in self.calls]
+
+
+@pytest.fixture
+def fake_redis():
+    fake = FakeRedis()
+    with patch.object(cache, "get_redis_binary", return_value=fake):
+        yield fake
+
+
+class TestCachedDecorator:
+    """@cached memoization, stampede protection, early refresh and tags."""
+
+    def test_hit_skips_recompute(self, fake_redis):
+        calls = []
+
+        @cached(key="square:{x}", ttl=60, beta=0)
+        def square(x):
+            calls.append(x)
+            return x * x
+
+        assert square(4) == 16
+        assert square(4) == 16
+        assert square(x=4) == 16
+        assert calls == [4]
+
+    def test_attribute_keys_and_tags(self, fake_redis):
+        prop = MagicMock(id=7)
+
+        @cached(key="summary:{prop.id}", ttl=60, tags=["property:{prop.id}"], beta=0)
+        def summary(prop):
+            return {"id": prop.id}
+
+        summary(prop)
+        assert "summary:7" in fake_redis.data
+        assert fake_redis.smembers("cache:tag:property:7") == {"summary:7"}
+        assert fake_redis.ttl("cache:tag:property:7") == 60
+
+    def test_invalidate_tags_drops_entries(self, fake_redis):
+        calls = []
+
+        @cached(key="value:{n}", ttl=60, tags=["group:{n}"], beta=0)
+        def value(n):
+            calls.append(n)
+            return n
+
+        value(1)
+        value(2)
+        assert invalidate_tags("group:1") == 1
+        value(1)
+        value(2)
+        assert calls == [1, 2, 1]
+
+    def test_none_is_not_cached(self, fake_redis):
+        calls = []
+
+        @cached(key="missing", ttl=60)
+        def missing():
+            calls.append(1)
+            return None
+
+        missing()
+        missing()
+        assert len(calls) == 2
+        assert "missing" not in fake_redis.data
+
+    def test_redis_down_calls_function(self):
+        fake = MagicMock()
+        fake.get.side_effect = ConnectionError("redis down")
+
+        @cached(key="k", ttl=60)
+        def compute():
+            return "fresh"
+
+        with patch.object(cache, "get_redis_binary", return_value=fake):
+            assert compute() == "fresh"
+        fake.set.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_waits_for_lock_holder_instead_of_recomputing(self, fake_redis):
+        calls = []
+
+        @cached(key="slow", ttl=60, lock_timeout=1.0)
+        async def slow():
+            calls.append(1)
+            return "mine"
+
+        # Another worker holds the lock and publishes its result while we wait
+        fake_redis.set("cache:lock:slow", "other", nx=True, px=1000)
+
+        async def publish(_):
+            cache._store_entry("slow", "theirs", 60, 0.5, [], cache.get_default_codec())
+
+        with patch.object(cache.asyncio, "sleep", side_effect=publish):
+            assert await slow() == "theirs"
+        assert calls == []
+
+    def test_sync_function_computes_instead_of_blocking_on_the_lock(self, fake_redis):
+        @cached(key="presigned", ttl=60, lock_timeout=10.0)
+        def presigned():
+            return "url"
+
+        fake_redis.set("cache:lock:presigned", "other", nx=True, px=10_000)
+
+        with patch.object(cache.time, "sleep") as sleep:
+            assert presigned() == "url"
+        sleep.assert_not_called()
+        # The other caller's lock is left alone
+        assert fake_redis.data["cache:lock:presigned"] == b"other"
+
+    def test_expired_lock_falls_back_to_compute(self, fake_redis):
+        @cached(key="orphan", ttl=60, lock_timeout=0.01)
+        def orphan():
+            return "computed"
+
+        fake_redis.set("cache:lock:orphan", "dead-worker", nx=True, px=10)
+        assert orphan() == "computed"
+
+    def test_lock_release_is_one_compare_and_delete(self):
+        r = MagicMock()
+        with patch.object(cache, "get_redis_binary", return_value=r):
+            cache._release_lock("k", "token")
+
+        # No separate GET then DEL: the lock may change hands in between
+        r.register_script.return_value.assert_called_once_with(
+            keys=["cache:lock:k"], args=["token"]
+        )
+        r.get.assert_not_called()
+        r.delete.assert_not_called()
+
+    def test_release_leaves_a_lock_taken_by_another_caller(self, fake_redis):
+        token = cache._acquire_lock("k", 1.0)
+        # Our lock expired and another caller took it
+        fake_redis.delete("cache:lock:k")
+        fake_redis.set("cache:lock:k", "other", nx=True, px=1000)
+
+        cache._release_lock("k", token)
+
+        assert fake_redis.data["cache:lock:k"] == b"other"
+
+    def test_early_refresh_near_expiry(self, fake_redis):
+        calls = []
+
+        @cached(key="hot", ttl=60)
+        def hot():
+            calls.append(1)
+            return len(calls)
+
+        assert hot() == 1
+        # Entry expires in 1s and took 2s to compute: a refresh is (almost) certain
+        payload = fake_redis.data["hot"][cache._ENVELOPE.size :]
+        fake_redis.data["hot"] = cache._ENVELOPE.pack(time.time() + 1, 2.0) + payload
+        with patch.object(cache.random, "random", return_value=0.999):
+            assert hot() == 2
+        assert "cache:lock:hot" not in fake_redis.data
+
+    def test_published_generation_invalidates_dataset_tag(self, fake_redis):
+        @cached(key="dvf_stats", ttl=60, tags=["dvf"], beta=0)
+        def stats():
+            return {"total_records": 10}
+
+        stats()
+        assert get_generation("dvf") is None
+        publish_generation("dvf", 4)
+        assert get_generation("dvf") == 4
+        assert fake_redis.ttls["cache:generation:dvf"] == cache.GENERATION_TTL
+        assert "dvf_stats" not in fake_redis.data
+
+    @pytest.mark.asyncio
+    async def test_async_functions(self, fake_redis):
+        calls = []
+
+        @cached(key="body:{pid}", ttl=60, codec=cache.get_bytes_codec(), beta=0)
+        async def body(pid):
+            calls.append(pid)
+            return b'{"id": %d}' % pid
+
+        assert await body(3) == b'{"id": 3}'
+        assert await body(3) == b'{"id": 3}'
+        assert calls == [3]
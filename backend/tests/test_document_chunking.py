@@ -2,6 +2,7 @@
 
 import asyncio
 import json
+import re
 from unittest.mock import AsyncMock, MagicMock, patch
 
 import fitz  # PyMuPDF
@@ -10,8 +11,15 @@ from fastapi.testclient import TestClient
 
 from app.core.better_auth_security import get_current_user_hybrid as get_current_user
 from app.main import app
-from app.services.ai.document_processor import DocumentProcessor
+from app.services.ai.document_processor import (
+    SYNTHESIS_SCHEMA,
+    DocumentProcessor,
+    _merge_groups,
+)
+from app.services.ai.llm_files import InlineFileStore
+from app.services.ai.llm_gateway import LLMGateway
 from app.services.documents.bulk_processor import BulkProcessor, chunk_pdf
+from app.services.documents.prepared_pdf import PreparedPdf
 
 
 class TestRetryLogic:
@@ -23,6 +31,8 @@ class TestRetryLogic:
         with patch.object(DocumentProcessor, "__init__", lambda self: None):
             proc = DocumentProcessor.__new__(DocumentProcessor)
             proc.client = MagicMock()
+            proc.gateway = LLMGateway(client=proc.client)
+            proc.files = InlineFileStore()
             proc.model = "gemini-2.5-flash"
             proc.use_vertexai = True
             proc.project = "test-project"
@@ -45,12 +55,9 @@ class TestRetryLogic:
                 raise Exception("429 RESOURCE_EXHAUSTED. {'error': {'code': 429}}")
             return mock_response
 
-        processor.client.models.generate_content = side_effect
+        processor.client.aio.models.generate_content = AsyncMock(side_effect=side_effect)
 
-        with patch(
-            "app.services.ai.document_processor.asyncio.sleep",
-            new_callable=lambda: lambda *a: asyncio.coroutine(lambda *a: None)(),
-        ):
+        with patch("app.services.ai.llm_gateway.asyncio.sleep", new=AsyncMock()):
             result = await processor.classify_document(
                 {
                     "filename": "test.pdf",
@@ -68,12 +75,9 @@ class TestRetryLogic:
         def side_effect(*args, **kwargs):
             raise Exception("429 RESOURCE_EXHAUSTED. {'error': {'code': 429}}")
 
-        processor.client.models.generate_content = side_effect
+        processor.client.aio.models.generate_content = AsyncMock(side_effect=side_effect)
 
-        with patch(
-            "app.services.ai.document_processor.asyncio.sleep",
-            new_callable=lambda: lambda *a: asyncio.coroutine(lambda *a: None)(),
-        ):
+        with patch("app.services.ai.llm_gateway.asyncio.sleep", new=AsyncMock()):
             result = await processor.classify_document(
                 {
                     "filename": "test.pdf",
@@ -94,12 +98,9 @@ class TestRetryLogic:
             call_count += 1
             raise ValueError("Invalid input")
 
-        processor.client.models.generate_content = side_effect
+        processor.client.aio.models.generate_content = AsyncMock(side_effect=side_effect)
 
-        with patch(
-            "app.services.ai.document_processor.asyncio.sleep",
-            new_callable=lambda: lambda *a: asyncio.coroutine(lambda *a: None)(),
-        ):
+        with patch("app.services.ai.llm_gateway.asyncio.sleep", new=AsyncMock()):
             result = await processor.classify_document(
                 {
                     "filename": "test.pdf",
@@ -119,6 +120,8 @@ class TestMergeChunkResults:
         with patch.object(DocumentProcessor, "__init__", lambda self: None):
             proc = DocumentProcessor.__new__(DocumentProcessor)
             proc.client = MagicMock()
+            proc.gateway = LLMGateway(client=proc.client)
+            proc.files = InlineFileStore()
             proc.model = "gemini-2.5-flash"
             proc.use_vertexai = True
             proc.project = "test-project"
@@ -140,7 +143,7 @@ class TestMergeChunkResults:
         mock_response.candidates[0].content.parts = [
             MagicMock(text=json.dumps(merged_result), thought=False)
         ]
-        processor.client.models.generate_content = MagicMock(return_value=mock_response)
+        processor.client.aio.models.generate_content = AsyncMock(return_value=mock_response)
 
         chunks = [
             {"summary": "Part 1", "key_insights": ["A"], "estimated_annual_cost": 500.0},
@@ -151,15 +154,74 @@ class TestMergeChunkResults:
 
         assert result["summary"] == "Merged summary"
         assert result["estimated_annual_cost"] == 1000.0
-        processor.client.models.generate_content.assert_called_once()
+        processor.client.aio.models.generate_content.assert_called_once()
 
         # Verify prompt contains both chunk results
-        call_args = processor.client.models.generate_content.call_args
+        call_args = processor.client.aio.models.generate_content.call_args
         content_parts = call_args.kwargs.get("contents", call_args[1].get("contents", []))[0].parts
         prompt_text = content_parts[0].text
         assert "Chunk 1" in prompt_text
         assert "Chunk 2" in prompt_text
 
+    @pytest.mark.asyncio
+    async def test_many_chunks_merge_as_tree(self, processor):
+        """Groups merge in parallel, level by level, keeping page order."""
+        prompts = []
+        first_level = asyncio.Barrier(3)
+
+        async def merge(model, contents, config):
+            prompt = contents[0].parts[0].text
+            prompts.append(prompt)
+            if len(prompts) <= 3:
+                # all three first-level merges are in flight
+                await asyncio.wait_for(first_level.wait(), timeout=5)
+            summary = "".join(re.findall(r'"summary":"(\w+)"', prompt))
+            response = MagicMock()
+            response.candidates = [MagicMock()]
+            response.candidates[0].content.parts = [
+                MagicMock(text=json.dumps({"summary": summary}), thought=False)
+            ]
+            return response
+
+        processor.client.aio.models.generate_content = AsyncMock(side_effect=merge)
+        chunks = [{"summary": letter} for letter in "abcdefghi"]
+
+        with patch("app.services.ai.document_processor.settings.LLM_MERGE_FAN_IN", 3):
+            result = await processor.merge_chunk_results(chunks, "pv_ag")
+
+        assert result["summary"] == "abcdefghi"
+        # 3 groups of 3, then one merge of the 3 partial results
+        assert len(prompts) == 4
+        # Compact JSON in the prompt
+        assert any('{"summary":"a"}' in prompt for prompt in prompts)
+
+    @pytest.mark.asyncio
+    async def test_synthesis_uses_structured_output(self, processor):
+        """The synthesis calls ask Gemini for JSON of the synthesis schema."""
+        response = MagicMock()
+        response.candidates = [MagicMock()]
+        response.candidates[0].content.parts = [
+            MagicMock(text='{"summary": "ok", "risk_level": "low"}', thought=False)
+        ]
+        processor.client.aio.models.generate_content = AsyncMock(return_value=response)
+
+        result = await processor.update_synthesis({"summary": "old"}, [], [], [])
+
+        assert result == {"summary": "ok", "risk_level": "low"}
+        config = processor.client.aio.models.generate_content.call_args.kwargs["config"]
+        assert config.response_mime_type == "application/json"
+        assert config.response_schema is SYNTHESIS_SCHEMA
+        assert config.response_schema.property_ordering[0] == "summary"
+
+    def test_merge_groups_respect_token_budget(self):
+        results = ["x" * 400] * 7  # 100 tokens each
+
+        assert _merge_groups(results, fan_in=4, token_budget=1000) == [(0, 4), (4, 7)]
+        pairs = [(0, 2), (2, 4), (4, 6), (6, 7)]
+        assert _merge_groups(results, fan_in=4, token_budget=250) == pairs
+        # Results over budget are still merged in pairs so every level shrinks
+        assert _merge_groups(results, fan_in=4, token_budget=10) == pairs
+
 
 def _make_test_pdf(num_pages: int, text_per_page: str = "Hello world " * 100) -> bytes:
     """Create a test PDF with the given number of pages."""
@@ -252,14 +314,7 @@ class TestErrorPropagation:
                         processor,
                         "_prepare_documents",
                         new=AsyncMock(
-                            return_value=[
-                                {
-                                    "pdf_data": b"fake-pdf",
-                                    "text_extractable": False,
-                                    "extracted_text": "",
-                                    "page_count": 5,
-                                }
-                            ]
+                            return_value=[PreparedPdf(pdf_data=b"fake-pdf", page_count=5)]
                         ),
                     ):
                         with patch.object(processor, "_save_synthesis", new=AsyncMock()):
@@ -296,7 +351,7 @@ class TestErrorPropagation:
             mock_ai = MagicMock()
             call_count = 0
 
-            async def mock_process(doc, output_language="French"):
+            async def mock_process(doc, output_language="French", on_classified=None):
                 nonlocal call_count
                 call_count += 1
                 if call_count == 1:
@@ -321,18 +376,8 @@ class TestErrorPropagation:
                         "_prepare_documents",
                         new=AsyncMock(
                             return_value=[
-                                {
-                                    "pdf_data": b"pdf1",
-                                    "text_extractable": False,
-                                    "extracted_text": "",
-                                    "page_count": 5,
-                                },
-                                {
-                                    "pdf_data": b"pdf2",
-                                    "text_extractable": False,
-                                    "extracted_text": "",
-                                    "page_count": 5,
-                                },
+                                PreparedPdf(pdf_data=b"pdf1", page_count=5),
+                                PreparedPdf(pdf_data=b"pdf2", page_count=5),
                             ]
                         ),
                     ):
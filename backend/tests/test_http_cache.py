@@ -0,0 +1,140 @@
+"""Tests for ETag / Last-Modified conditional request helpers."""
+
+from datetime import datetime
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from fastapi import Request
+from fastapi.testclient import TestClient
+
+from app.api import properties
+from app.core.better_auth_security import get_current_user_hybrid as get_current_user
+from app.core.database import get_db
+from app.core.http_cache import (
+    format_http_date,
+    is_not_modified,
+    make_etag,
+    not_modified_response,
+    validator_headers,
+)
+from app.main import app
+
+UPDATED_AT = datetime(2026, 3, 14, 9, 26, 53, 589793)
+
+
+def make_request(**headers: str) -> Request:
+    raw = [(k.replace("_", "-").encode(), v.encode()) for k, v in headers.items()]
+    return Request({"type": "http", "method": "GET", "headers": raw})
+
+
+class TestEtags:
+    """ETag construction and If-None-Match matching."""
+
+    def test_etag_is_weak_and_stable(self):
+        etag = make_etag("price-analysis", 42, UPDATED_AT)
+        assert etag.startswith('W/"')
+        assert etag == make_etag("price-analysis", 42, UPDATED_AT)
+
+    def test_etag_changes_with_version(self):
+        assert make_etag("market-trend", 42, 1) != make_etag("market-trend", 42, 2)
+        assert make_etag("price-analysis", 42, UPDATED_AT) != make_etag(
+            "price-analysis-full", 42, UPDATED_AT
+        )
+
+    def test_if_none_match(self):
+        etag = make_etag("price-analysis", 42, UPDATED_AT)
+        assert is_not_modified(make_request(if_none_match=etag), etag)
+        assert is_not_modified(make_request(if_none_match=f'"other", {etag}'), etag)
+        assert is_not_modified(make_request(if_none_match="*"), etag)
+        assert not is_not_modified(make_request(if_none_match='W/"stale"'), etag)
+
+    def test_weak_comparison(self):
+        etag = make_etag("price-analysis", 42, UPDATED_AT)
+        assert is_not_modified(make_request(if_none_match=etag[2:]), etag)
+
+    def test_no_conditional_headers(self):
+        assert not is_not_modified(make_request(), make_etag("x"), UPDATED_AT)
+
+
+class TestLastModified:
+    """If-Modified-Since handling against naive UTC database timestamps."""
+
+    def test_not_modified_since_same_second(self):
+        request = make_request(if_modified_since=format_http_date(UPDATED_AT))
+        assert is_not_modified(request, make_etag("x"), UPDATED_AT)
+
+    def test_modified_after(self):
+        request = make_request(if_modified_since="Fri, 13 Mar 2026 00:00:00 GMT")
+        assert not is_not_modified(request, make_etag("x"), UPDATED_AT)
+
+    def test_if_none_match_takes_precedence(self):
+        request = make_request(
+            if_none_match='W/"stale"', if_modified_since=format_http_date(UPDATED_AT)
+        )
+        assert not is_not_modified(request, make_etag("x"), UPDATED_AT)
+
+    def test_invalid_date_is_ignored(self):
+        request = make_request(if_modified_since="yesterday")
+        assert not is_not_modified(request, make_etag("x"), UPDATED_AT)
+
+    def test_without_last_modified(self):
+        request = make_request(if_modified_since=format_http_date(UPDATED_AT))
+        assert not is_not_modified(request, make_etag("x"))
+
+
+class TestResponses:
+    def test_validator_headers(self):
+        headers = validator_headers('W/"abc"', UPDATED_AT)
+        assert headers["ETag"] == 'W/"abc"'
+        assert headers["Last-Modified"] == "Sat, 14 Mar 2026 09:26:53 GMT"
+        assert headers["Cache-Control"] == "private, no-cache"
+        assert "Last-Modified" not in validator_headers('W/"abc"')
+
+    def test_not_modified_response_is_empty(self):
+        response = not_modified_response('W/"abc"', UPDATED_AT)
+        assert response.status_code == 304
+        assert response.body == b""
+        assert response.headers["etag"] == 'W/"abc"'
+
+
+@pytest.fixture
+def property_client():
+    db = MagicMock()
+    db.query.return_value.filter.return_value.first.return_value = MagicMock(id=5)
+    app.dependency_overrides[get_db] = lambda: db
+    app.dependency_overrides[get_current_user] = lambda: "1"
+    yield TestClient(app)
+    app.dependency_overrides.pop(get_db, None)
+    app.dependency_overrides.pop(get_current_user, None)
+
+
+class TestPriceAnalysisValidators:
+    @pytest.mark.parametrize(
+        "path, body_fn",
+        [
+            ("/api/properties/5/price-analysis", "_price_analysis_summary_body"),
+            ("/api/properties/5/price-analysis/full", "_price_analysis_full_body"),
+        ],
+    )
+    def test_unversioned_analysis_has_no_validators(self, property_client, path, body_fn):
+        with (
+            patch.object(properties, "_fresh_analysis_version", return_value=None),
+            patch.object(properties, body_fn, new=AsyncMock(return_value=b"{}")),
+        ):
+            response = property_client.get(path)
+
+        assert response.status_code == 200
+        assert "etag" not in response.headers
+        assert "last-modified" not in response.headers
+
+    def test_versioned_analysis_has_validators(self, property_client):
+        with (
+            patch.object(properties, "_fresh_analysis_version", return_value=UPDATED_AT),
+            patch.object(
+                properties, "_price_analysis_summary_body", new=AsyncMock(return_value=b"{}")
+            ),
+        ):
+            response = property_client.get("/api/properties/5/price-analysis")
+
+        assert response.headers["etag"] == make_etag("price-analysis", 5, UPDATED_AT)
+        assert response.headers["last-modified"] == format_http_date(UPDATED_AT)
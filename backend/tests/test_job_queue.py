@@ -0,0 +1,202 @@
+"""Tests for the durable job queue and worker."""
+
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.models.job import ProcessingJob
+from app.services.jobs import queue
+from app.services.jobs.worker import JobHandler, JobNotReadyError, JobWorker
+
+
+@pytest.fixture
+def tables():
+    # SQLite ignores FOR UPDATE SKIP LOCKED; lease and retry logic is the same
+    return (ProcessingJob,)
+
+
+def add_job(db, **kwargs) -> int:
+    job = queue.enqueue(db, "test", {"n": 1}, **kwargs)
+    db.commit()
+    return job.id
+
+
+class TestQueue:
+    def test_claim_leases_job_once(self, db):
+        job_id = add_job(db)
+
+        job = queue.claim(db, "w1", ["test"], lease_seconds=60)
+        assert job.id == job_id
+        assert job.status == queue.RUNNING
+        assert job.attempts == 1
+        assert job.locked_by == "w1"
+        assert queue.claim(db, "w2", ["test"], lease_seconds=60) is None
+
+    def test_claim_ignores_other_kinds_and_future_jobs(self, db):
+        add_job(db, run_at=datetime.utcnow() + timedelta(minutes=5))
+        assert queue.claim(db, "w1", ["test"], lease_seconds=60) is None
+        assert queue.claim(db, "w1", ["other"], lease_seconds=60) is None
+
+    def test_higher_priority_first(self, db):
+        add_job(db)
+        urgent = add_job(db, priority=10)
+        assert queue.claim(db, "w1", ["test"], lease_seconds=60).id == urgent
+
+    def test_expired_lease_is_reclaimed(self, db):
+        job_id = add_job(db)
+        queue.claim(db, "w1", ["test"], lease_seconds=60)
+        db.query(ProcessingJob).update(
+            {ProcessingJob.locked_until: datetime.utcnow() - timedelta(seconds=1)}
+        )
+        db.commit()
+
+        job = queue.claim(db, "w2", ["test"], lease_seconds=60)
+        assert job.id == job_id
+        assert job.locked_by == "w2"
+        assert job.attempts == 2
+        # The dead worker can no longer touch it
+        assert not queue.extend_lease(db, job_id, "w1", 60)
+        assert not queue.complete(db, job_id, "w1")
+        assert queue.complete(db, job_id, "w2")
+
+    def test_fail_retries_with_backoff_then_fails(self, db):
+        job_id = add_job(db, max_attempts=2)
+
+        queue.claim(db, "w1", ["test"], lease_seconds=60)
+        assert queue.fail(db, job_id, "w1", "boom", backoff_seconds=30) == queue.QUEUED
+        job = db.get(ProcessingJob, job_id)
+        assert job.run_at > datetime.utcnow() + timedelta(seconds=20)
+        assert job.last_error == "boom"
+
+        db.query(ProcessingJob).update({ProcessingJob.run_at: datetime.utcnow()})
+        db.commit()
+        queue.claim(db, "w1", ["test"], lease_seconds=60)
+        assert queue.fail(db, job_id, "w1", "boom again", backoff_seconds=30) == queue.FAILED
+        assert queue.claim(db, "w1", ["test"], lease_seconds=60) is None
+
+    def test_release_does_not_consume_attempt(self, db):
+        job_id = add_job(db)
+        queue.claim(db, "w1", ["test"], lease_seconds=60)
+
+        assert queue.release(db, job_id, "w1")
+        job = queue.claim(db, "w2", ["test"], lease_seconds=60)
+        assert job.id == job_id
+        assert job.attempts == 1
+
+    def test_expire_exhausted(self, db):
+        job_id = add_job(db, max_attempts=1)
+        queue.claim(db, "w1", ["test"], lease_seconds=60)
+        assert queue.expire_exhausted(db, ["test"]) == []
+
+        db.query(ProcessingJob).update(
+            {ProcessingJob.locked_until: datetime.utcnow() - timedelta(seconds=1)}
+        )
+        db.commit()
+        assert queue.claim(db, "w2", ["test"], lease_seconds=60) is None
+        assert [job.id for job in queue.expire_exhausted(db, ["test"])] == [job_id]
+        assert db.get(ProcessingJob, job_id).status == queue.FAILED
+
+
+class TestWorker:
+    async def _run_until(self, worker: JobWorker, condition, timeout: float = 5.0):
+        task = asyncio.create_task(worker.run(shutdown_grace=1.0))
+        deadline = asyncio.get_running_loop().time() + timeout
+        while not condition():
+            assert asyncio.get_running_loop().time() < deadline, "condition not met"
+            await asyncio.sleep(0.01)
+        worker.stop()
+        await task
+
+    def test_runs_jobs_to_completion(self, db, session_factory):
+        for _ in range(3):
+            add_job(db)
+        seen = []
+
+        async def handle(payload, context):
+            seen.append((payload["n"], context.attempt))
+
+        worker = JobWorker(
+            {"test": JobHandler(run=handle)},
+            concurrency=2,
+            poll_interval=0.01,
+            session_factory=session_factory,
+        )
+        asyncio.run(self._run_until(worker, lambda: len(seen) == 3))
+
+        db.expire_all()
+        statuses = {job.status for job in db.query(ProcessingJob).all()}
+        assert statuses == {queue.SUCCEEDED}
+        assert seen == [(1, 1)] * 3
+
+    def test_retries_then_calls_on_dead(self, db, session_factory, monkeypatch):
+        monkeypatch.setattr(queue.settings, "JOB_RETRY_BACKOFF_SECONDS", 0)
+        job_id = add_job(db, max_attempts=2)
+        attempts = []
+        dead = []
+
+        async def handle(payload, context):
+            attempts.append(context.is_final_attempt)
+            raise RuntimeError("gemini unavailable")
+
+        worker = JobWorker(
+            {"test": JobHandler(run=handle, on_dead=lambda p, e: dead.append(e))},
+            poll_interval=0.01,
+            session_factory=session_factory,
+        )
+        asyncio.run(self._run_until(worker, lambda: dead))
+
+        assert attempts == [False, True]
+        assert dead == ["RuntimeError: gemini unavailable"]
+        db.expire_all()
+        assert db.get(ProcessingJob, job_id).status == queue.FAILED
+
+    def test_shutdown_releases_running_job(self, db, session_factory):
+        job_id = add_job(db)
+        started = asyncio.Event()
+
+        async def handle(payload, context):
+            started.set()
+            await asyncio.sleep(60)
+
+        worker = JobWorker(
+            {"test": JobHandler(run=handle)},
+            poll_interval=0.01,
+            session_factory=session_factory,
+        )
+
+        async def scenario():
+            task = asyncio.create_task(worker.run(shutdown_grace=0.05))
+            await asyncio.wait_for(started.wait(), timeout=5)
+            worker.stop()
+            await task
+
+        asyncio.run(scenario())
+
+        db.expire_all()
+        job = db.get(ProcessingJob, job_id)
+        assert job.status == queue.QUEUED
+        assert job.attempts == 0
+        assert job.locked_by is None
+
+    def test_not_ready_job_runs_again_later_without_using_an_attempt(self, db, session_factory):
+        job_id = add_job(db, max_attempts=1)
+        polls = []
+
+        async def handle(payload, context):
+            polls.append(context.attempt)
+            raise JobNotReadyError(60, "batch still running")
+
+        worker = JobWorker(
+            {"test": JobHandler(run=handle)},
+            poll_interval=0.01,
+            session_factory=session_factory,
+        )
+        asyncio.run(self._run_until(worker, lambda: polls))
+
+        db.expire_all()
+        job = db.get(ProcessingJob, job_id)
+        assert job.status == queue.QUEUED
+        assert job.attempts == 0
+        assert job.run_at > datetime.utcnow() + timedelta(seconds=50)
+        assert polls == [1]
@@ -0,0 +1,48 @@
+"""Tests for the tolerant JSON parser of LLM responses."""
+
+import json
+
+import pytest
+
+from app.services.ai.json_parse import parse_json
+
+
+class TestParseJson:
+    def test_fenced_json_with_prose_and_trailing_text(self):
+        text = 'Voici le résultat :\n```json\n{"summary": "ok", "risks": []}\n```\nBonne lecture.'
+        assert parse_json(text) == {"summary": "ok", "risks": []}
+
+    def test_truncated_output_keeps_complete_values(self):
+        text = '```json\n{"summary": "ok", "items": [1, 2,'
+        assert parse_json(text) == {"summary": "ok", "items": [1, 2]}
+
+    def test_unterminated_string_is_kept_and_dangling_key_dropped(self):
+        assert parse_json('{"a": 1, "summary": "Travaux de toit') == {
+            "a": 1,
+            "summary": "Travaux de toit",
+        }
+        assert parse_json('{"a": 1, "b') == {"a": 1}
+        assert parse_json('{"a": 1, "b": tr') == {"a": 1}
+
+    def test_thousands_separators_and_trailing_commas(self):
+        text = '{"estimated_annual_cost": 12,500.50, "items": [1, 2,], "total": 3,}'
+        assert parse_json(text) == {"estimated_annual_cost": 12500.5, "items": [1, 2], "total": 3}
+
+    def test_escapes_and_raw_newlines(self):
+        text = '{"a": "ligne\nsuivante", "b": "\\"cité\\" \\u00e9 \\ud83d\\ude00", "c": "\\é"} x'
+        assert parse_json(text) == {"a": "ligne\nsuivante", "b": '"cité" é 😀', "c": "é"}
+
+    def test_no_json_raises(self):
+        with pytest.raises(json.JSONDecodeError):
+            parse_json("Désolé, je ne peux pas analyser ce document.")
+
+    def test_nested_values_after_a_tolerant_fix(self):
+        document = {
+            "summary": 'Résumé "court"',
+            "amount": -1500.25,
+            "flags": [True, False, None],
+            "items": [{"title": f"Point {i}", "cost": i * 1.5} for i in range(20)],
+        }
+        text = json.dumps(document, ensure_ascii=False)
+        # The trailing comma sends the whole text through the tolerant pass
+        assert parse_json(text[:-1] + ",}") == document
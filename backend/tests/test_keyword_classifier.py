@@ -0,0 +1,135 @@
+"""Tests for tiered document classification."""
+
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import fitz  # PyMuPDF
+import pytest
+
+from app.services.ai.document_processor import DocumentProcessor
+from app.services.ai.keyword_classifier import classify_text
+from app.services.ai.llm_files import InlineFileStore
+from app.services.ai.llm_gateway import LLMGateway
+from app.services.documents import pdf_pool
+from app.services.documents.pdf_pool import PdfProcessPool
+
+PV_AG = """
+PROCÈS-VERBAL DE L'ASSEMBLÉE GÉNÉRALE ORDINAIRE DU 12 JUIN 2024
+Feuille de présence signée. Secrétaire de séance : M. Martin. Scrutateur : Mme Durand.
+Résolution n°4 : ravalement de façade, majorité de l'article 25.
+Ont voté pour : 6 234 tantièmes. Ont voté contre : 1 200 tantièmes. Abstentions : 0.
+Résolution n°5 : approbation des comptes, majorité de l'article 24.
+"""
+
+DPE = """
+Diagnostic de performance énergétique (DPE) - logement
+Classe énergie : E - 312 kWhep/m².an. Classe climat : D.
+Diagnostiqueur certifié. Amiante : néant. Termites : absence d'indices.
+"""
+
+TAXE = """
+AVIS D'IMPÔT 2024 - TAXE FONCIÈRE
+Direction générale des Finances publiques. Numéro fiscal : 12 34 567 890 123
+Propriétés bâties - base d'imposition : 2 150 €. Taxe d'enlèvement des ordures ménagères.
+"""
+
+CHARGES = """
+Appel de fonds - 3e trimestre 2024. Budget prévisionnel voté : 48 000 €.
+Votre quote-part (lot n°12, 245 tantièmes) : 612,50 €. Fonds de travaux : 30,60 €.
+"""
+
+
+def gemini_response(text: str) -> MagicMock:
+    response = MagicMock()
+    response.candidates = [MagicMock()]
+    response.candidates[0].content.parts = [MagicMock(text=text, thought=False)]
+    return response
+
+
+@pytest.fixture
+def processor():
+    with patch.object(DocumentProcessor, "__init__", lambda self: None):
+        proc = DocumentProcessor.__new__(DocumentProcessor)
+        proc.client = MagicMock()
+        proc.gateway = LLMGateway(client=proc.client)
+        proc.files = InlineFileStore()
+        proc.model = "gemini-2.5-flash"
+        return proc
+
+
+@pytest.fixture(autouse=True)
+def no_cache():
+    with (
+        patch("app.services.ai.analysis_cache.get_cached_classification", return_value=None) as get,
+        patch("app.services.ai.analysis_cache.store_classification") as store,
+    ):
+        yield get, store
+
+
+class TestClassifyText:
+    @pytest.mark.parametrize(
+        "text,expected",
+        [(PV_AG, "pv_ag"), (DPE, "diags"), (TAXE, "taxe_fonciere"), (CHARGES, "charges")],
+    )
+    def test_distinctive_vocabulary(self, text, expected):
+        result = classify_text(text)
+        assert result.category == expected
+        assert result.confidence >= 0.6
+
+    def test_no_text(self):
+        result = classify_text("")
+        assert result.category is None
+        assert result.confidence == 0.0
+
+    def test_stray_keyword_is_not_trusted(self):
+        result = classify_text("Contrat d'assurance habitation. Clause amiante exclue.")
+        assert result.category == "diags"
+        assert result.confidence < 0.6
+
+    def test_mixed_document_has_low_confidence(self):
+        assert classify_text(PV_AG + CHARGES + CHARGES).confidence < 0.6
+
+    def test_filename_hint(self):
+        assert classify_text("", "PV_AG_2024.pdf").scores == {"pv_ag": 3.0}
+
+
+class TestClassifyDocument:
+    @pytest.mark.asyncio
+    async def test_keywords_skip_gemini(self, processor):
+        category = await processor.classify_document(
+            {"filename": "scan.pdf", "pdf_data": b"%PDF", "extracted_text": PV_AG}
+        )
+        assert category == "pv_ag"
+        processor.client.aio.models.generate_content.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_gemini_sees_only_first_pages(self, processor, no_cache):
+        doc = fitz.open()
+        for i in range(20):
+            doc.new_page().insert_text((72, 72), f"Page {i + 1}")
+        pdf_bytes = doc.tobytes()
+        processor.client.aio.models.generate_content = AsyncMock(
+            return_value=gemini_response("charges")
+        )
+
+        with patch.object(pdf_pool, "get_pdf_pool", return_value=PdfProcessPool(max_workers=0)):
+            category = await processor.classify_document(
+                {
+                    "filename": "releve.pdf",
+                    "pdf_data": pdf_bytes,
+                    "page_count": 20,
+                    "file_hash": "h",
+                }
+            )
+
+        assert category == "charges"
+        sent = processor.client.aio.models.generate_content.call_args.kwargs["contents"][0].parts[0]
+        assert len(fitz.open(stream=sent.inline_data.data, filetype="pdf")) == 3
+        no_cache[1].assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_gemini_failure_uses_keyword_guess(self, processor):
+        processor.client.aio.models.generate_content = AsyncMock(side_effect=ValueError("bad"))
+        category = await processor.classify_document(
+            {"filename": "x.pdf", "pdf_data": b"%PDF", "extracted_text": "Clause amiante."}
+        )
+        assert category == "diags"
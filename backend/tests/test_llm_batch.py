@@ -0,0 +1,288 @@
+"""Tests for batch-mode bulk processing against the local stand-in batch server."""
+
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import fitz  # PyMuPDF
+import pytest
+from google.genai import types
+
+from app.models.document import Document
+from app.models.job import ProcessingJob
+from app.models.llm_usage import LLMCallRecord
+from app.models.user import User
+from app.services.ai.document_processor import DocumentProcessor
+from app.services.ai.llm_batch import (
+    PENDING,
+    SUCCEEDED,
+    GeminiBatchBackend,
+    LocalBatchServer,
+)
+from app.services.ai.llm_files import InlineFileStore
+from app.services.ai.llm_gateway import LLMGateway
+from app.services.documents import bulk_processor
+from app.services.documents.bulk_processor import (
+    BATCH_JOB_PRIORITY,
+    BULK_BATCH_JOB,
+    BulkProcessor,
+)
+from app.services.documents.prepared_pdf import PreparedPdf
+from app.services.documents.progress import BATCH_SUBMITTED
+from app.services.jobs import JobNotReadyError
+
+
+def make_pdf(num_pages: int) -> bytes:
+    doc = fitz.open()
+    for i in range(num_pages):
+        page = doc.new_page()
+        for line in range(12):
+            page.insert_text((72, 72 + 14 * line), f"Page {i + 1}: travaux votés en assemblée")
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+def gemini_response(text: str, prompt_tokens: int = 1000, output_tokens: int = 100):
+    return types.GenerateContentResponse(
+        candidates=[types.Candidate(content=types.Content(role="model", parts=[{"text": text}]))],
+        usage_metadata=types.GenerateContentResponseUsageMetadata(
+            prompt_token_count=prompt_tokens,
+            candidates_token_count=output_tokens,
+            total_token_count=prompt_tokens + output_tokens,
+        ),
+    )
+
+
+def request_text(request: types.InlinedRequest) -> str:
+    return "".join(part.text or "" for part in request.contents[0].parts)
+
+
+@pytest.fixture
+def tables():
+    return (User, Document, LLMCallRecord, ProcessingJob)
+
+
+@pytest.fixture
+def db(session_factory):
+    session = session_factory()
+    for name in ("pv.pdf", "charges.pdf"):
+        session.add(
+            Document(
+                user_id=1,
+                filename=name,
+                file_path="",
+                document_category="pending_classification",
+                processing_status="processing",
+                workflow_id="wf",
+            )
+        )
+    session.commit()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def ai():
+    with patch.object(DocumentProcessor, "__init__", lambda self: None):
+        proc = DocumentProcessor.__new__(DocumentProcessor)
+        proc.client = MagicMock()
+        proc.gateway = LLMGateway(client=proc.client)
+        proc.files = InlineFileStore()
+        proc.model = "gemini-2.5-flash"
+    proc.classify_document = AsyncMock(return_value="pv_ag")
+    proc.merge_chunk_results = AsyncMock(return_value={"summary": "merged"})
+    proc.synthesize_results = AsyncMock(return_value={"summary": "synthesis"})
+    return proc
+
+
+@pytest.fixture
+def server():
+    async def respond(model, request):
+        if "charges.pdf" in request_text(request):
+            return gemini_response('{"summary": "Charges OK", "estimated_annual_cost": 1200}')
+        return gemini_response('{"summary": "PV OK", "key_insights": ["Ravalement"]}')
+
+    return LocalBatchServer(respond=respond, run_on_poll=False)
+
+
+@pytest.fixture
+def env(session_factory, ai, server):
+    events = []
+    with (
+        patch.object(bulk_processor, "SessionLocal", session_factory),
+        patch.object(bulk_processor, "get_document_processor", return_value=ai),
+        patch.object(bulk_processor, "get_llm_batch_backend", return_value=server),
+        patch.object(bulk_processor, "publish_progress", lambda wf, e, **d: events.append(e)),
+        patch.object(bulk_processor.settings, "BULK_BATCH_MIN_DOCUMENTS", 2),
+        patch("app.services.ai.analysis_cache.get_cached_analysis", return_value=None),
+        patch("app.services.ai.analysis_cache.store_analysis"),
+    ):
+        yield events
+
+
+UPLOADS = [
+    {"document_id": 1, "filename": "pv.pdf", "storage_key": "k1", "file_hash": "h1"},
+    {"document_id": 2, "filename": "charges.pdf", "storage_key": "k2", "file_hash": "h2"},
+]
+
+
+async def submit(processor: BulkProcessor, pages: int = 2) -> None:
+    prepared = [PreparedPdf.prepare(make_pdf(pages)) for _ in UPLOADS]
+    with (
+        patch.object(processor, "_download_files", new=AsyncMock(return_value=[b""] * 2)),
+        patch.object(processor, "_prepare_documents", new=AsyncMock(return_value=prepared)),
+    ):
+        await processor.process_bulk_upload("wf", 1, UPLOADS)
+
+
+def batch_job(db) -> ProcessingJob:
+    (job,) = db.query(ProcessingJob).filter(ProcessingJob.kind == BULK_BATCH_JOB).all()
+    return job
+
+
+class TestBatchMode:
+    @pytest.mark.asyncio
+    async def test_large_upload_is_submitted_as_one_low_priority_batch(self, db, env, ai, server):
+        processor = BulkProcessor()
+        with patch.object(processor, "_save_synthesis", new=AsyncMock()) as save_synthesis:
+            await submit(processor)
+
+        (job,) = server.jobs.values()
+        assert list(job.requests) == ["1/0", "2/0"]
+        assert "charges.pdf" in request_text(job.requests["2/0"])
+        ai.client.aio.models.generate_content.assert_not_called()
+
+        queued = batch_job(db)
+        assert queued.priority == BATCH_JOB_PRIORITY
+        assert queued.run_at > datetime.utcnow() + timedelta(seconds=30)
+        assert BATCH_SUBMITTED in env
+        assert {d.processing_status for d in db.query(Document)} == {"processing"}
+        save_synthesis.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_completion_saves_results_through_save_document_result(self, db, env, ai, server):
+        processor = BulkProcessor()
+        with patch.object(processor, "_save_synthesis", new=AsyncMock()) as save_synthesis:
+            await submit(processor)
+            payload = batch_job(db).payload
+
+            with pytest.raises(JobNotReadyError):
+                await processor.run_batch_job(payload, MagicMock())
+
+            await server.run()
+            await processor.run_batch_job(payload, MagicMock())
+
+        db.expire_all()
+        pv, charges = db.query(Document).order_by(Document.id).all()
+        assert (pv.processing_status, pv.is_analyzed) == ("completed", True)
+        assert pv.analysis_summary == "PV OK"
+        assert charges.estimated_annual_cost == 1200
+
+        # Batch answers are recorded per document at the batch price
+        rows = db.query(LLMCallRecord).filter(LLMCallRecord.document_id == pv.id).all()
+        assert [r.operation for r in rows] == ["batch_analyze"]
+        assert rows[0].cost_usd == pytest.approx((1000 * 0.30 + 100 * 2.50) / 1e6 / 2)
+
+        (results,) = ai.synthesize_results.await_args.args
+        assert sorted(r["document_id"] for r in results) == [1, 2]
+        save_synthesis.assert_awaited_once()
+        assert env[-1] == "workflow_done"
+
+    @pytest.mark.asyncio
+    async def test_failed_request_fails_only_its_document(self, db, env, server):
+        async def respond(model, request):
+            if "charges.pdf" in request_text(request):
+                raise RuntimeError("400 INVALID_ARGUMENT")
+            return gemini_response('{"summary": "PV OK"}')
+
+        server.respond = respond
+        server.run_on_poll = True
+        processor = BulkProcessor()
+        with patch.object(processor, "_save_synthesis", new=AsyncMock()):
+            await submit(processor)
+            await processor.run_batch_job(batch_job(db).payload, MagicMock())
+
+        db.expire_all()
+        pv, charges = db.query(Document).order_by(Document.id).all()
+        assert pv.processing_status == "completed"
+        assert charges.processing_status == "failed"
+        assert "INVALID_ARGUMENT" in charges.processing_error
+
+    @pytest.mark.asyncio
+    async def test_chunked_documents_are_merged_on_completion(self, db, env, ai, server):
+        server.run_on_poll = True
+        processor = BulkProcessor()
+        with (
+            patch.object(processor, "_save_synthesis", new=AsyncMock()),
+            patch.object(bulk_processor.settings, "LLM_CHUNK_TOKEN_BUDGET", 500),
+        ):
+            await submit(processor, pages=6)
+            payload = batch_job(db).payload
+            await processor.run_batch_job(payload, MagicMock())
+
+        chunks = payload["documents"][0]["chunks"]
+        assert chunks > 1
+        assert ai.merge_chunk_results.await_count == 2
+        assert len(ai.merge_chunk_results.await_args.args[0]) == chunks
+        db.expire_all()
+        assert db.get(Document, 1).analysis_summary == "merged"
+
+    @pytest.mark.asyncio
+    async def test_small_upload_stays_interactive(self, db, env, ai, server):
+        ai.process_document = AsyncMock(
+            side_effect=lambda doc, **kw: {
+                "filename": doc["filename"],
+                "document_type": "pv_ag",
+                "result": {"summary": "ok"},
+                "document_id": doc["document_id"],
+            }
+        )
+        processor = BulkProcessor()
+        with (
+            patch.object(bulk_processor.settings, "BULK_BATCH_MIN_DOCUMENTS", 3),
+            patch.object(processor, "_save_synthesis", new=AsyncMock()),
+        ):
+            await submit(processor)
+
+        assert server.jobs == {}
+        assert ai.process_document.await_count == 2
+
+
+class TestGeminiBatchBackend:
+    @pytest.mark.asyncio
+    async def test_keys_sent_as_metadata_and_answers_matched(self):
+        client = MagicMock()
+        client.aio.batches.create = AsyncMock(return_value=types.BatchJob(name="batches/1"))
+        client.aio.batches.get = AsyncMock(
+            return_value=types.BatchJob(
+                name="batches/1",
+                state=types.JobState.JOB_STATE_SUCCEEDED,
+                dest=types.BatchJobDestination(
+                    inlined_responses=[
+                        types.InlinedResponse(response=gemini_response("{}")),
+                        types.InlinedResponse(error=types.JobError(message="too large")),
+                    ]
+                ),
+            )
+        )
+        backend = GeminiBatchBackend(gateway=LLMGateway(client=client))
+        request = types.InlinedRequest(contents="hi")
+
+        name = await backend.submit("m", {"1/0": request, "2/0": request}, display_name="wf")
+        status = await backend.poll(name, "m", ["1/0", "2/0"])
+
+        src = client.aio.batches.create.await_args.kwargs["src"]
+        assert [r.metadata["key"] for r in src] == ["1/0", "2/0"]
+        assert status.state == SUCCEEDED
+        assert list(status.responses) == ["1/0"]
+        assert status.errors == {"2/0": "too large"}
+
+    @pytest.mark.asyncio
+    async def test_running_batch_is_pending(self):
+        client = MagicMock()
+        client.aio.batches.get = AsyncMock(
+            return_value=types.BatchJob(name="batches/1", state=types.JobState.JOB_STATE_RUNNING)
+        )
+        backend = GeminiBatchBackend(gateway=LLMGateway(client=client))
+
+        assert (await backend.poll("batches/1", "m", ["1/0"])).state == PENDING
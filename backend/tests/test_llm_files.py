@@ -0,0 +1,190 @@
+"""Tests for the LLM file store: upload once, reference by URI, inline fallback."""
+
+import asyncio
+import time
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from google.genai import types
+
+from app.services.ai import llm_files, rate_limiter
+from app.services.ai.document_processor import DocumentProcessor
+from app.services.ai.llm_files import (
+    GeminiFileStore,
+    InlineFileStore,
+    LocalFileStore,
+    UploadingFileStore,
+    create_llm_file_store,
+)
+from app.services.ai.llm_gateway import LLMGateway
+from app.services.ai.rate_limiter import estimate_tokens
+
+PDF = b"%PDF-1.7 " + b"x" * 4096
+
+
+def gemini_response(text: str) -> MagicMock:
+    response = MagicMock()
+    response.candidates = [MagicMock()]
+    response.candidates[0].content.parts = [MagicMock(text=text, thought=False)]
+    return response
+
+
+def sent_parts(call) -> list:
+    return call.kwargs["contents"][0].parts
+
+
+@pytest.fixture
+def processor():
+    with patch.object(DocumentProcessor, "__init__", lambda self: None):
+        proc = DocumentProcessor.__new__(DocumentProcessor)
+        proc.client = MagicMock()
+        proc.gateway = LLMGateway(client=proc.client)
+        proc.files = LocalFileStore(min_bytes=1024)
+        proc.model = "gemini-2.5-flash"
+        return proc
+
+
+@pytest.fixture(autouse=True)
+def no_cache():
+    with (
+        patch("app.services.ai.analysis_cache.get_cached_classification", return_value=None),
+        patch("app.services.ai.analysis_cache.store_classification"),
+        patch("app.services.ai.analysis_cache.get_cached_analysis", return_value=None),
+        patch("app.services.ai.analysis_cache.store_analysis"),
+    ):
+        yield
+
+
+class TestDocumentProcessor:
+    @pytest.mark.asyncio
+    async def test_short_document_uploaded_once_for_classify_and_analysis(self, processor):
+        processor.client.aio.models.generate_content = AsyncMock(
+            side_effect=[gemini_response("pv_ag"), gemini_response('{"summary": "ok"}')]
+        )
+
+        result = await processor.process_document(
+            {"filename": "pv.pdf", "pdf_data": PDF, "page_count": 2}
+        )
+
+        assert result["document_type"] == "pv_ag"
+        assert processor.files.uploads == 1
+        classify, analyze = processor.client.aio.models.generate_content.await_args_list
+        (uri,) = processor.files.objects
+        for call in (classify, analyze):
+            pdf_part = sent_parts(call)[0]
+            assert pdf_part.inline_data is None
+            assert pdf_part.file_data.file_uri == uri
+
+    @pytest.mark.asyncio
+    async def test_small_pdf_stays_inline(self, processor):
+        parts = await processor._build_document_parts({"pdf_data": b"%PDF-1.7"})
+
+        assert parts[0].inline_data.data == b"%PDF-1.7"
+        assert processor.files.uploads == 0
+
+
+class TestFileStore:
+    @pytest.mark.asyncio
+    async def test_same_content_reuses_the_handle(self):
+        store = LocalFileStore(min_bytes=0)
+
+        first = await store.part(PDF)
+        again = await store.part(PDF)
+        other = await store.part(PDF + b"y")
+
+        assert first.file_data.file_uri == again.file_data.file_uri
+        assert other.file_data.file_uri != first.file_data.file_uri
+        assert store.uploads == 2
+
+    @pytest.mark.asyncio
+    async def test_concurrent_requests_share_one_upload(self):
+        store = LocalFileStore(min_bytes=0)
+        upload = store._upload
+
+        async def slow_upload(*args):
+            await asyncio.sleep(0.01)
+            return await upload(*args)
+
+        with patch.object(store, "_upload", side_effect=slow_upload) as mock:
+            parts = await asyncio.gather(*[store.part(PDF) for _ in range(5)])
+
+        assert mock.await_count == 1
+        assert len({p.file_data.file_uri for p in parts}) == 1
+
+    @pytest.mark.asyncio
+    async def test_failed_upload_falls_back_to_inline(self):
+        store = LocalFileStore(min_bytes=0)
+
+        with patch.object(store, "_upload", side_effect=RuntimeError("quota")):
+            part = await store.part(PDF)
+
+        assert part.inline_data.data == PDF
+        assert part.file_data is None
+
+    @pytest.mark.asyncio
+    async def test_handle_near_expiry_is_uploaded_again(self):
+        store = LocalFileStore(min_bytes=0, ttl=llm_files.EXPIRY_MARGIN + 60)
+        await store.part(PDF)
+
+        with patch.object(llm_files.time, "time", return_value=time.time() + 120):
+            await store.part(PDF)
+
+        assert store.uploads == 2
+
+    @pytest.mark.asyncio
+    async def test_token_estimate_uses_the_uploaded_size(self):
+        store = LocalFileStore(min_bytes=0)
+        data = b"x" * (10 * 50 * 1024)
+
+        by_uri = estimate_tokens([await store.part(data)])
+
+        assert by_uri == estimate_tokens(
+            [types.Part.from_bytes(data=data, mime_type="application/pdf")]
+        )
+        assert by_uri == 11 * rate_limiter.TOKENS_PER_PDF_PAGE
+
+
+class TestInlineFileStore:
+    @pytest.mark.asyncio
+    async def test_parts_carry_the_bytes(self):
+        store = InlineFileStore()
+
+        part = await store.part(PDF)
+
+        assert part.inline_data.data == PDF
+        assert not isinstance(store, UploadingFileStore)
+
+
+class TestGeminiFileStore:
+    @pytest.mark.asyncio
+    async def test_waits_until_the_file_is_active(self):
+        processing = types.File(name="files/abc", uri="https://f/abc", state="PROCESSING")
+        active = processing.model_copy(update={"state": types.FileState.ACTIVE})
+        client = MagicMock()
+        client.aio.files.upload = AsyncMock(return_value=processing)
+        client.aio.files.get = AsyncMock(return_value=active)
+        store = GeminiFileStore(gateway=LLMGateway(client=client), min_bytes=0)
+
+        with patch.object(llm_files, "_POLL_INTERVAL", 0):
+            part = await store.part(PDF)
+
+        assert part.file_data.file_uri == "https://f/abc"
+        config = client.aio.files.upload.await_args.kwargs["config"]
+        assert config.mime_type == "application/pdf"
+        client.aio.files.get.assert_awaited_once_with(name="files/abc")
+
+
+class TestBackendSelection:
+    @pytest.mark.parametrize(
+        "vertexai,storage,expected",
+        [(False, "minio", "gemini"), (True, "gcs", "gcs"), (True, "minio", "inline")],
+    )
+    def test_auto(self, vertexai, storage, expected):
+        with (
+            patch.object(llm_files.settings, "LLM_FILE_BACKEND", "auto"),
+            patch.object(llm_files.settings, "GEMINI_USE_VERTEXAI", vertexai),
+            patch.object(llm_files.settings, "STORAGE_BACKEND", storage),
+            patch.object(llm_files, "get_llm_gateway"),
+            patch("app.services.storage.get_storage_service"),
+        ):
+            assert create_llm_file_store().name == expected
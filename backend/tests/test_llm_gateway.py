@@ -0,0 +1,245 @@
+"""Tests for the LLM gateway: retries, deadlines, hedging, circuit breaker, pooling, metrics."""
+
+import asyncio
+import time
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.services.ai import llm_gateway
+from app.services.ai.llm_gateway import (
+    CircuitBreaker,
+    LLMGateway,
+    LLMTimeoutError,
+    LLMUnavailableError,
+    extract_image,
+    extract_text,
+)
+from app.services.ai.rate_limiter import LLMRateLimiter
+
+
+@pytest.fixture
+def limiter():
+    limiter = LLMRateLimiter(max_concurrency=1)
+    with patch.object(llm_gateway, "get_rate_limiter", return_value=limiter):
+        yield limiter
+
+
+@pytest.fixture
+def no_sleep():
+    with patch("app.services.ai.llm_gateway.asyncio.sleep", new=AsyncMock()) as sleep:
+        yield sleep
+
+
+def make_gateway(side_effect) -> LLMGateway:
+    client = MagicMock()
+    client.aio.models.generate_content = AsyncMock(side_effect=side_effect)
+    return LLMGateway(client=client)
+
+
+def usage(prompt: int, output: int) -> MagicMock:
+    return MagicMock(
+        usage_metadata=MagicMock(
+            total_token_count=prompt + output,
+            prompt_token_count=prompt,
+            candidates_token_count=output,
+        )
+    )
+
+
+class TestGenerate:
+    @pytest.mark.asyncio
+    async def test_retries_transient_errors_with_jittered_backoff(self, limiter, no_sleep):
+        response = usage(10, 5)
+        gateway = make_gateway(
+            [RuntimeError("429 RESOURCE_EXHAUSTED"), RuntimeError("503"), response]
+        )
+
+        assert await gateway.generate(model="m", contents="hi") is response
+        first, second = [call.args[0] for call in no_sleep.await_args_list]
+        assert 2.5 <= first <= 5
+        assert 5 <= second <= 10
+
+    @pytest.mark.asyncio
+    async def test_other_errors_are_not_retried(self, limiter, no_sleep):
+        gateway = make_gateway(ValueError("Invalid input"))
+
+        with pytest.raises(ValueError):
+            await gateway.generate(model="m", contents="hi")
+        assert gateway.client.aio.models.generate_content.await_count == 1
+
+    @pytest.mark.asyncio
+    async def test_timeout_is_retried_then_raised(self, limiter):
+        async def hang(**kwargs):
+            await asyncio.sleep(10)
+
+        gateway = make_gateway(hang)
+
+        with patch.object(llm_gateway, "RETRY_BASE_DELAY", 0), pytest.raises(LLMTimeoutError):
+            await gateway.generate(model="m", contents="hi", timeout=0.01, retries=1)
+        assert gateway.client.aio.models.generate_content.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_cancellation_frees_the_slot(self, limiter):
+        started = asyncio.Event()
+
+        async def hang(**kwargs):
+            started.set()
+            await asyncio.sleep(10)
+
+        task = asyncio.create_task(make_gateway(hang).generate(model="m", contents="hi", timeout=0))
+        await started.wait()
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        # The only slot is free again: the next call does not wait
+        gateway = make_gateway([MagicMock()])
+        await asyncio.wait_for(gateway.generate(model="m", contents="hi"), timeout=1)
+
+    @pytest.mark.asyncio
+    async def test_metrics_by_model_and_operation(self, limiter, no_sleep):
+        gateway = make_gateway([RuntimeError("503"), usage(100, 20), usage(50, 10)])
+
+        await gateway.generate(model="m", contents="a", operation="classify", context="x.pdf")
+        await gateway.generate(model="m", contents="b", operation="classify")
+
+        stats = gateway.metrics.snapshot()["m/classify"]
+        assert stats["calls"] == 2
+        assert stats["retries"] == 1
+        assert stats["errors"] == 0
+        assert (stats["input_tokens"], stats["output_tokens"]) == (150, 30)
+
+    @pytest.mark.asyncio
+    async def test_deadline_stops_retries(self, limiter, no_sleep):
+        gateway = make_gateway(RuntimeError("503"))
+
+        # The first backoff (2.5s at least) would pass the 1s deadline
+        with pytest.raises(RuntimeError):
+            await gateway.generate(model="m", contents="hi", deadline=1)
+        assert gateway.client.aio.models.generate_content.await_count == 1
+        no_sleep.assert_not_awaited()
+
+
+class TestHedging:
+    @pytest.fixture(autouse=True)
+    def settings(self):
+        with patch.object(llm_gateway.settings, "LLM_HEDGE_MIN_SAMPLES", 3):
+            yield
+
+    @staticmethod
+    def slow_then_fast(fast_response):
+        calls = []
+
+        async def generate(**kwargs):
+            calls.append(kwargs)
+            if len(calls) == 1:
+                await asyncio.sleep(10)
+            return fast_response
+
+        return generate, calls
+
+    @pytest.mark.asyncio
+    async def test_duplicate_sent_after_p95(self):
+        limiter = LLMRateLimiter(max_concurrency=2)
+        response = usage(1, 1)
+        generate, calls = self.slow_then_fast(response)
+        gateway = make_gateway(generate)
+        for _ in range(3):
+            gateway.metrics.record_latency("m", "classify", 0.01)
+
+        with patch.object(llm_gateway, "get_rate_limiter", return_value=limiter):
+            result = await asyncio.wait_for(
+                gateway.generate(model="m", contents="hi", operation="classify", hedge=True),
+                timeout=1,
+            )
+
+        assert result is response
+        assert len(calls) == 2
+        assert gateway.metrics.snapshot()["m/classify"]["hedged"] == 1
+        # The slow request was cancelled: both slots are free
+        await asyncio.sleep(0)
+        assert limiter._slots._value == 2
+
+    @pytest.mark.asyncio
+    async def test_no_hedge_without_enough_samples(self, limiter):
+        response = usage(1, 1)
+        gateway = make_gateway([response])
+        gateway.metrics.record_latency("m", "classify", 0.01)
+
+        await gateway.generate(model="m", contents="hi", operation="classify", hedge=True)
+        assert gateway.metrics.snapshot()["m/classify"]["hedged"] == 0
+
+
+class TestCircuitBreaker:
+    @pytest.mark.asyncio
+    async def test_opens_after_consecutive_failures_then_fails_fast(self, limiter, no_sleep):
+        with patch.object(llm_gateway.settings, "LLM_BREAKER_THRESHOLD", 2):
+            gateway = make_gateway(RuntimeError("503"))
+            with pytest.raises(RuntimeError):
+                await gateway.generate(model="m", contents="hi", retries=1)
+
+            with pytest.raises(LLMUnavailableError):
+                await gateway.generate(model="m", contents="hi")
+
+        assert gateway.client.aio.models.generate_content.await_count == 2
+        assert gateway.breaker("m").is_open
+
+    def test_half_open_probe(self):
+        breaker = CircuitBreaker("m", threshold=1, cooldown=30)
+        breaker.record_failure()
+        assert not breaker.allow()
+
+        with patch.object(llm_gateway.time, "monotonic", return_value=time.monotonic() + 31):
+            # One probe at a time
+            assert breaker.allow()
+            assert not breaker.allow()
+            breaker.record_failure()
+            assert not breaker.allow()
+
+        with patch.object(llm_gateway.time, "monotonic", return_value=time.monotonic() + 62):
+            assert breaker.allow()
+            breaker.record_success()
+        assert not breaker.is_open
+        assert breaker.allow()
+
+    @pytest.mark.asyncio
+    async def test_client_errors_do_not_open_it(self, limiter):
+        with patch.object(llm_gateway.settings, "LLM_BREAKER_THRESHOLD", 1):
+            gateway = make_gateway(ValueError("400 INVALID_ARGUMENT"))
+            for _ in range(2):
+                with pytest.raises(ValueError):
+                    await gateway.generate(model="m", contents="hi")
+
+        assert not gateway.breaker("m").is_open
+
+
+class TestClientPool:
+    def test_one_client_per_event_loop(self):
+        gateway = LLMGateway()
+
+        async def client():
+            return gateway.client, gateway.client
+
+        with patch.object(llm_gateway, "_create_client", side_effect=lambda: MagicMock()):
+            first, again = asyncio.run(client())
+            other, _ = asyncio.run(client())
+
+        assert first is again
+        assert first is not other
+
+
+class TestResponseHelpers:
+    def test_extract_text_skips_thoughts(self):
+        response = MagicMock()
+        response.candidates[0].content.parts = [
+            MagicMock(text="thinking...", thought=True),
+            MagicMock(text='{"a": 1}', thought=False),
+        ]
+        assert extract_text(response) == '{"a": 1}'
+
+    def test_extract_image(self):
+        part = MagicMock(inline_data=MagicMock(data=b"png", mime_type="image/png"))
+        response = MagicMock()
+        response.candidates[0].content.parts = [MagicMock(inline_data=None), part]
+        assert extract_image(response).inline_data.data == b"png"
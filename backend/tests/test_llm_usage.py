@@ -0,0 +1,168 @@
+"""Tests for the per-document LLM usage tracking and its aggregation."""
+
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from fastapi import HTTPException
+
+from app.api.admin import get_superuser
+from app.models.document import Document
+from app.models.llm_usage import LLMCallRecord
+from app.models.user import User
+from app.services.ai import llm_gateway
+from app.services.ai.llm_gateway import (
+    LLMCallMetrics,
+    LLMGateway,
+    LLMUsage,
+    estimate_cost,
+    track_llm_usage,
+)
+from app.services.ai.llm_usage import llm_usage_stats, record_llm_usage
+from app.services.ai.rate_limiter import LLMRateLimiter
+
+
+@pytest.fixture
+def tables():
+    return (User, Document, LLMCallRecord)
+
+
+def add_document(db, category: str, workflow_id: str = "wf") -> Document:
+    doc = Document(
+        user_id=1,
+        filename=f"{category}.pdf",
+        file_path="",
+        document_category=category,
+        workflow_id=workflow_id,
+    )
+    db.add(doc)
+    db.commit()
+    return doc
+
+
+def call(operation: str, tokens=(1000, 200, 300), latency_ms=1000, **kwargs) -> LLMCallMetrics:
+    input_tokens, output_tokens, thinking_tokens = tokens
+    return LLMCallMetrics(
+        model="gemini-2.5-flash",
+        operation=operation,
+        latency_ms=latency_ms,
+        attempts=kwargs.pop("attempts", 1),
+        input_tokens=input_tokens,
+        output_tokens=output_tokens,
+        thinking_tokens=thinking_tokens,
+        cost_usd=estimate_cost("gemini-2.5-flash", *tokens),
+        **kwargs,
+    )
+
+
+class TestTrackUsage:
+    @pytest.mark.asyncio
+    async def test_collects_calls_of_child_tasks(self):
+        response = MagicMock(
+            usage_metadata=MagicMock(
+                total_token_count=1500,
+                prompt_token_count=1000,
+                candidates_token_count=200,
+                thoughts_token_count=300,
+            )
+        )
+        client = MagicMock()
+        client.aio.models.generate_content = AsyncMock(return_value=response)
+        gateway = LLMGateway(client=client)
+
+        with patch.object(
+            llm_gateway, "get_rate_limiter", return_value=LLMRateLimiter(max_concurrency=2)
+        ):
+            with track_llm_usage() as usage:
+                await asyncio.gather(
+                    gateway.generate(model="gemini-2.5-flash", contents="a", operation="analyze"),
+                    gateway.generate(model="gemini-2.5-flash", contents="b", operation="merge"),
+                )
+            # Outside the block calls are no longer collected
+            await gateway.generate(model="gemini-2.5-flash", contents="c")
+
+        assert [c.operation for c in usage.calls] == ["analyze", "merge"]
+        assert usage.total_tokens == 3000
+        assert usage.model == "gemini-2.5-flash"
+        # 1000 input at $0.30/M, 500 output + thinking at $2.50/M, twice
+        assert usage.cost_usd == pytest.approx(2 * (0.0003 + 0.00125))
+
+    def test_unknown_model_costs_nothing(self):
+        assert estimate_cost("some-model", 1000, 1000, 0) == 0.0
+        assert estimate_cost("gemini-2.5-flash-lite-001", 10**6, 0, 0) == pytest.approx(0.10)
+
+
+class TestRecordUsage:
+    def test_rows_and_document_totals(self, db):
+        doc = add_document(db, "pv_ag")
+        record_llm_usage(db, LLMUsage([call("classify"), call("analyze")]), doc)
+        db.commit()
+        record_llm_usage(db, LLMUsage([call("analyze")]), doc)
+        db.commit()
+
+        rows = db.query(LLMCallRecord).all()
+        assert len(rows) == 3
+        assert {(r.document_id, r.workflow_id, r.document_category) for r in rows} == {
+            (doc.id, "wf", "pv_ag")
+        }
+        assert doc.langchain_model == "gemini-2.5-flash"
+        assert doc.langchain_tokens_used == 4500
+        assert doc.langchain_cost == pytest.approx(sum(r.cost_usd for r in rows))
+
+    def test_nothing_recorded_without_calls(self, db):
+        doc = add_document(db, "pv_ag")
+        record_llm_usage(db, LLMUsage(), doc)
+
+        assert db.query(LLMCallRecord).count() == 0
+        assert doc.langchain_tokens_used is None
+
+
+class TestStats:
+    def test_aggregates_by_operation_category_and_document(self, db):
+        pv_ag = add_document(db, "pv_ag")
+        diags = add_document(db, "diags", workflow_id="wf2")
+        record_llm_usage(
+            db,
+            LLMUsage([call("classify", (100, 1, 0)), call("analyze", (10000, 2000, 4000))]),
+            pv_ag,
+        )
+        record_llm_usage(
+            db, LLMUsage([call("analyze", (2000, 500, 0), latency_ms=3000, attempts=2)]), diags
+        )
+        record_llm_usage(
+            db, LLMUsage([call("synthesis", error="LLMTimeoutError")]), workflow_id="wf"
+        )
+        db.commit()
+
+        stats = llm_usage_stats(db)
+
+        assert stats["totals"]["calls"] == 4
+        assert stats["totals"]["retries"] == 1
+        assert stats["totals"]["errors"] == 1
+        analyze = next(r for r in stats["by_operation"] if r["operation"] == "analyze")
+        assert analyze["calls"] == 2
+        assert analyze["max_latency_ms"] == 3000
+        # Most expensive first
+        assert stats["by_operation"][0]["operation"] == "analyze"
+        assert stats["by_document_category"][0]["document_category"] == "pv_ag"
+        assert [r["document_id"] for r in stats["top_documents"]] == [pv_ag.id, diags.id]
+        assert stats["top_workflows"][0]["workflow_id"] == "wf"
+
+        only_wf2 = llm_usage_stats(db, workflow_id="wf2")
+        assert only_wf2["totals"]["calls"] == 1
+
+
+class TestAdminAccess:
+    def test_superuser_required(self, db):
+        db.add_all(
+            [
+                User(id=1, email="a@x.fr", hashed_password="", is_superuser=True),
+                User(id=2, email="b@x.fr", hashed_password="", is_superuser=False),
+            ]
+        )
+        db.commit()
+
+        assert get_superuser("1", db).id == 1
+        with pytest.raises(HTTPException) as exc:
+            get_superuser("2", db)
+        assert exc.value.status_code == 403
@@ -0,0 +1,131 @@
+"""Tests for the PyMuPDF process pool."""
+
+import asyncio
+import time
+from concurrent.futures.process import BrokenProcessPool
+from unittest.mock import patch
+
+import fitz  # PyMuPDF
+import pytest
+
+from app.services.documents import pdf_pool
+from app.services.documents.pdf_pool import PdfProcessPool
+
+
+def make_pdf(num_pages: int, text: str = "Assemblée générale des copropriétaires ") -> bytes:
+    doc = fitz.open()
+    for i in range(num_pages):
+        page = doc.new_page()
+        page.insert_text((72, 72), f"page {i + 1}")
+        for line in range(3):
+            page.insert_text((72, 100 + 20 * line), text)
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+@pytest.fixture(scope="module")
+def pool():
+    pool = PdfProcessPool(max_workers=2)
+    yield pool
+    pool.shutdown()
+
+
+class TestProcessPool:
+    def test_operations_run_in_worker_processes(self, pool):
+        pdf_bytes = make_pdf(12)
+
+        async def run():
+            return await asyncio.gather(
+                pool.analyze(pdf_bytes),
+                pool.extract_page_ranges(pdf_bytes, [(0, 10), (10, 12)]),
+                pool.render_pages(pdf_bytes, max_pages=2),
+            )
+
+        analysis, chunks, pages = asyncio.run(run())
+
+        assert analysis["page_count"] == 12
+        assert "page 12" in analysis["page_texts"][11]
+        assert sum(analysis["page_sizes"]) <= len(pdf_bytes)
+        assert [len(fitz.open(stream=c, filetype="pdf")) for c in chunks] == [10, 2]
+        assert len(pages) == 2 and all(p.startswith(b"\x89PNG") for p in pages)
+
+    def test_event_loop_stays_responsive(self, pool):
+        pdf_bytes = make_pdf(40)
+
+        async def run():
+            ticks = 0
+            stop = asyncio.Event()
+
+            async def heartbeat():
+                nonlocal ticks
+                while not stop.is_set():
+                    ticks += 1
+                    await asyncio.sleep(0.01)
+
+            beat = asyncio.create_task(heartbeat())
+            started = time.monotonic()
+            await asyncio.gather(*(pool.render_pages(pdf_bytes, max_pages=40) for _ in range(4)))
+            elapsed = time.monotonic() - started
+            stop.set()
+            await beat
+            return ticks, elapsed
+
+        ticks, elapsed = asyncio.run(run())
+        # The heartbeat kept running while the pages rendered
+        assert ticks >= elapsed / 0.01 * 0.5
+
+    def test_without_workers_runs_in_thread(self):
+        pool = PdfProcessPool(max_workers=0)
+        analysis = asyncio.run(pool.analyze(make_pdf(1)))
+        assert analysis["page_count"] == 1
+        assert pool._executor is None
+
+    def test_broken_pool_falls_back_and_restarts(self):
+        pool = PdfProcessPool(max_workers=1)
+
+        async def broken(*args):
+            raise BrokenProcessPool("worker died")
+
+        try:
+            with patch.object(pool, "_run_in_process", side_effect=broken):
+                analysis = asyncio.run(pool.analyze(make_pdf(2)))
+            assert analysis["page_count"] == 2
+            assert pool._executor is None
+        finally:
+            pool.shutdown()
+
+    @pytest.mark.parametrize("native", [True, False])
+    def test_workers_are_recycled(self, native):
+        if native and not pdf_pool._NATIVE_RECYCLING:
+            pytest.skip("max_tasks_per_child needs Python 3.11")
+        pool = PdfProcessPool(max_workers=1, max_tasks_per_child=2)
+        pdf_bytes = make_pdf(1)
+
+        async def run():
+            executors = []
+            for _ in range(3):
+                analysis = await pool.analyze(pdf_bytes)
+                assert analysis["page_count"] == 1
+                executors.append(pool._executor)
+            return executors
+
+        try:
+            with patch.object(pdf_pool, "_NATIVE_RECYCLING", native):
+                executors = asyncio.run(run())
+        finally:
+            pool.shutdown()
+        # The executor recycles its own workers, or is replaced as a whole
+        assert executors[0] is executors[1]
+        assert (executors[2] is executors[0]) == native
+
+    def test_worker_errors_propagate(self, pool):
+        with pytest.raises(Exception):
+            asyncio.run(pool.analyze(b"not a pdf"))
+
+    def test_getter_uses_settings(self):
+        with (
+            patch.object(pdf_pool, "_instance", None),
+            patch.object(pdf_pool.settings, "PDF_POOL_WORKERS", 3),
+        ):
+            assert pdf_pool.get_pdf_pool().max_workers == 3
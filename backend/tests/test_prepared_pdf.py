@@ -0,0 +1,234 @@
+"""Tests for the single-pass PreparedPdf."""
+
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import fitz  # PyMuPDF
+import pytest
+
+from app.services.ai.document_processor import DocumentProcessor
+from app.services.ai.llm_files import LocalFileStore
+from app.services.documents import prepared_pdf
+from app.services.documents.bulk_processor import BulkProcessor
+from app.services.documents.pdf_pool import PdfProcessPool
+from app.services.documents.prepared_pdf import PreparedPdf
+
+
+def make_pdf(num_pages: int, lines: int = 12) -> bytes:
+    doc = fitz.open()
+    for i in range(num_pages):
+        page = doc.new_page()
+        page.insert_text((72, 72), f"Page {i + 1}")
+        for line in range(lines):
+            page.insert_text((72, 100 + 14 * line), "Travaux de ravalement votés en assemblée")
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+@pytest.fixture
+def thread_pool():
+    """PDF pool running operations in threads, counting calls."""
+    pool = PdfProcessPool(max_workers=0)
+    calls = []
+    run = pool.run
+
+    async def counting_run(fn, *args):
+        calls.append(fn.__name__)
+        return await run(fn, *args)
+
+    with (
+        patch.object(pool, "run", side_effect=counting_run),
+        patch.object(prepared_pdf, "get_pdf_pool", return_value=pool),
+    ):
+        yield calls
+
+
+class TestPreparedPdf:
+    def test_single_pass_analysis(self):
+        prepared = PreparedPdf.prepare(make_pdf(3))
+
+        assert prepared.page_count == 3
+        assert len(prepared.page_texts) == len(prepared.page_sizes) == 3
+        assert "Page 2" in prepared.page_texts[1]
+        assert prepared.text_extractable is True
+        assert prepared.extracted_text == prepared.text()
+        assert "Page 3" not in prepared.text((0, 2))
+
+    def test_short_text_is_not_extractable(self):
+        prepared = PreparedPdf.prepare(make_pdf(1, lines=0))
+        assert prepared.text_extractable is False
+        assert prepared.extracted_text == ""
+
+    def test_unreadable_pdf(self):
+        prepared = PreparedPdf.prepare(b"not a pdf")
+        assert prepared.page_count == 0
+        assert prepared.chunk_ranges(1) == [(0, 0)]
+        (plan,) = prepared.plan_chunks(token_budget=1000, max_bytes=1)
+        document = asyncio.run(prepared.chunk_document(plan))
+        assert document["pdf_data"] == b"not a pdf"
+        assert document["text_only"] is False
+
+    def test_chunk_ranges_follow_page_sizes(self):
+        # Scanned pages in the middle are much heavier than the text pages
+        sizes = [10] * 10 + [100] * 20 + [10] * 10
+        prepared = PreparedPdf(pdf_data=b"x" * sum(sizes), page_count=len(sizes), page_sizes=sizes)
+
+        ranges = prepared.chunk_ranges(chunk_size=1000)
+
+        assert ranges == [(0, 19), (19, 29), (29, 40)]
+
+    def test_chunk_ranges_keep_minimum_pages(self):
+        prepared = PreparedPdf(pdf_data=b"x" * 250, page_count=25, page_sizes=[10] * 25)
+        assert prepared.chunk_ranges(chunk_size=1) == [(0, 10), (10, 20), (20, 25)]
+
+    def test_chunks_are_materialised_once(self, thread_pool):
+        prepared = PreparedPdf.prepare(make_pdf(25))
+        ranges = prepared.chunk_ranges(chunk_size=1)
+
+        async def run():
+            (first,) = await prepared.chunk_bytes_async(ranges[:1])
+            chunks = await prepared.chunk_bytes_async(ranges)
+            again = await prepared.chunk_bytes_async(ranges)
+            return first, chunks, again
+
+        first, chunks, again = asyncio.run(run())
+
+        # Chunk 0 first, then the two others in a single call
+        assert thread_pool == ["extract_page_ranges", "extract_page_ranges"]
+        assert first is chunks[0]
+        assert chunks == again
+        assert [len(fitz.open(stream=c, filetype="pdf")) for c in chunks] == [10, 10, 5]
+
+    def test_whole_document_is_not_rebuilt(self, thread_pool):
+        pdf_bytes = make_pdf(2)
+        prepared = PreparedPdf.prepare(pdf_bytes)
+        (plan,) = prepared.plan_chunks(token_budget=100_000, max_bytes=len(pdf_bytes))
+        document = asyncio.run(prepared.chunk_document(plan))
+        assert document["pdf_data"] is pdf_bytes
+        assert document["text_only"] is True
+        assert document["extracted_text"].startswith("--- Page 1 ---")
+        assert thread_pool == []
+
+
+def make_scan(num_pages: int) -> bytes:
+    """Image-only pages, like a scanned document without a text layer."""
+    doc = fitz.open()
+    pix = fitz.Pixmap(fitz.csRGB, fitz.IRect(0, 0, 400, 400), False)
+    pix.set_rect(pix.irect, (200, 120, 40))
+    image = pix.tobytes("png")
+    for _ in range(num_pages):
+        doc.new_page().insert_image(fitz.Rect(0, 0, 400, 400), stream=image)
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+class TestPlanChunks:
+    def test_text_pages_are_sent_as_text(self):
+        prepared = PreparedPdf.prepare(make_pdf(25))
+        plans = prepared.plan_chunks(token_budget=1000, max_bytes=10 * 1024 * 1024)
+
+        assert all(plan.text_only for plan in plans)
+        assert all(plan.tokens <= 1000 for plan in plans)
+        assert plans[0].start == 0 and plans[-1].end == 25
+        assert all(a.end == b.start for a, b in zip(plans, plans[1:]))
+        # Text-only pages cost no page image
+        assert plans[0].tokens == sum(
+            prepared.page_tokens(p, text_only=True) for p in range(plans[0].start, plans[0].end)
+        )
+
+    def test_scanned_pages_are_sent_as_pdf(self):
+        prepared = PreparedPdf.prepare(make_scan(12))
+        assert prepared.page_image_bytes[0] > 0
+
+        plans = prepared.plan_chunks(token_budget=258 * 5, max_bytes=10 * 1024 * 1024)
+
+        assert [p.page_count for p in plans] == [5, 5, 2]
+        assert not any(p.text_only for p in plans)
+
+    def test_native_chunks_respect_byte_limit(self):
+        sizes = [100] * 30
+        prepared = PreparedPdf(
+            pdf_data=b"x" * 3000,
+            page_count=30,
+            page_texts=[""] * 30,
+            page_sizes=sizes,
+            page_image_bytes=[0] * 30,
+        )
+        plans = prepared.plan_chunks(token_budget=1_000_000, max_bytes=1000)
+        assert [p.page_range for p in plans] == [(0, 10), (10, 20), (20, 30)]
+
+    def test_whole_document_within_budget(self):
+        prepared = PreparedPdf.prepare(make_pdf(3))
+        assert len(prepared.plan_chunks(token_budget=60_000, max_bytes=5 * 1024 * 1024)) == 1
+
+
+class TestBulkChunkedPath:
+    @pytest.fixture
+    def ai(self):
+        ai = MagicMock()
+        ai.classify_document = AsyncMock(return_value="pv_ag")
+        ai.get_cached_analysis = MagicMock(return_value=None)
+        ai.process_pv_ag = AsyncMock(return_value={"summary": "chunk"})
+        ai.merge_chunk_results = AsyncMock(return_value={"summary": "merged"})
+        ai.synthesize_results = AsyncMock(return_value={"summary": "synthesis"})
+        return ai
+
+    async def run_bulk(self, ai, pdf_bytes: bytes, token_budget: int) -> None:
+        mock_db = MagicMock()
+        mock_db.query.return_value.filter.return_value.first.return_value = MagicMock()
+        processor = BulkProcessor()
+        with (
+            patch("app.services.documents.bulk_processor.SessionLocal", return_value=mock_db),
+            patch("app.services.documents.bulk_processor.get_document_processor", return_value=ai),
+            patch.object(processor, "_download_files", new=AsyncMock(return_value=[pdf_bytes])),
+            patch.object(processor, "_save_document_result", new=AsyncMock()),
+            patch.object(processor, "_save_synthesis", new=AsyncMock()),
+            patch(
+                "app.services.documents.bulk_processor.settings.LLM_CHUNK_TOKEN_BUDGET",
+                token_budget,
+            ),
+        ):
+            await processor.process_bulk_upload(
+                workflow_id="wf",
+                property_id=1,
+                document_uploads=[
+                    {"document_id": 1, "filename": "pv.pdf", "storage_key": "k", "file_hash": "h"}
+                ],
+            )
+
+    @pytest.mark.asyncio
+    async def test_text_pdf_chunks_skip_pdf_bytes(self, ai, thread_pool):
+        await self.run_bulk(ai, make_pdf(25), token_budget=1000)
+
+        # Analysed once; no chunk PDF is ever built
+        assert thread_pool == ["analyze_pdf"]
+        docs = [c.args[0] for c in ai.process_pv_ag.await_args_list]
+        assert len(docs) > 1
+        assert all(d["text_only"] and d["pdf_data"] is None for d in docs)
+        assert sum(d["page_count"] for d in docs) == 25
+        ai.merge_chunk_results.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_scanned_pdf_chunks_built_in_one_pass(self, ai, thread_pool):
+        await self.run_bulk(ai, make_scan(12), token_budget=258 * 5)
+
+        assert thread_pool == ["analyze_pdf", "extract_page_ranges"]
+        docs = [c.args[0] for c in ai.process_pv_ag.await_args_list]
+        assert sorted(d["page_count"] for d in docs) == [2, 5, 5]
+        assert all(d["pdf_data"] and not d["text_only"] for d in docs)
+
+
+class TestDocumentParts:
+    @pytest.mark.asyncio
+    async def test_text_only_document_sends_no_pdf(self):
+        with patch.object(DocumentProcessor, "__init__", lambda self: None):
+            processor = DocumentProcessor()
+        processor.files = LocalFileStore(min_bytes=0)
+        parts = await processor._build_document_parts(
+            {"pdf_data": b"%PDF", "text_only": True, "extracted_text": "--- Page 1 ---\nTexte"}
+        )
+        assert len(parts) == 1
+        assert parts[0].inline_data is None
+        assert "--- Page 1 ---" in parts[0].text
@@ -0,0 +1,269 @@
+"""Unit tests for price analysis sale references."""
+
+from datetime import date, datetime
+from unittest.mock import MagicMock, Mock, patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api import properties
+from app.core.better_auth_security import get_current_user_hybrid as get_current_user
+from app.core.database import get_db
+from app.core.http_cache import make_etag
+from app.main import app
+from app.models.price_analysis import PriceAnalysisSale
+from app.models.property import DatasetGeneration
+from app.services import dvf_service
+from app.services.price_analysis_sales import (
+    COMPARABLE,
+    NEIGHBORING,
+    count_sales,
+    ids_for_mutations,
+    mutations_for_ids,
+    replace_sales,
+    serialize_sale,
+)
+
+UPDATED_AT = datetime(2026, 3, 14, 9, 26, 53)
+
+
+def make_sale(sale_id: int, nombre_lots: int = 1, **kwargs) -> Mock:
+    sale = Mock(
+        id=sale_id,
+        id_mutation=f"2024-{sale_id}",
+        adresse_complete=f"{sale_id} RUE DE LA PAIX",
+        date_mutation=date(2024, 5, 1),
+        prix=500000,
+        code_postal="75002",
+        nom_commune="Paris",
+        type_principal="Appartement",
+        surface_bati=50,
+        nombre_pieces=2,
+        prix_m2=10000,
+        nombre_lots=nombre_lots,
+        longitude=2.33,
+        latitude=48.87,
+        spec=[],
+    )
+    for key, value in kwargs.items():
+        setattr(sale, key, value)
+    return sale
+
+
+class TestSerializeSale:
+    def test_single_unit(self):
+        result = serialize_sale(make_sale(1), is_outlier=True)
+        assert result["id"] == 1
+        assert result["sale_date"] == "2024-05-01"
+        assert result["price_per_sqm"] == 10000.0
+        assert result["is_outlier"] is True
+        assert "lots_detail" not in result
+
+    def test_multi_unit_with_lots(self):
+        lots = [
+            Mock(lot_type="Appartement", surface_bati=30, nombre_pieces=1),
+            Mock(lot_type="Appartement", surface_bati=20, nombre_pieces=1),
+        ]
+        result = serialize_sale(make_sale(2, nombre_lots=3, lots=lots))
+        assert result["is_multi_unit"] is True
+        assert result["unit_count"] == 2
+        assert [lot["price_per_sqm"] for lot in result["lots_detail"]] == [10000.0, 10000.0]
+
+
+class TestReplaceSales:
+    def _db(self, stored_rows):
+        db = MagicMock()
+        query = db.query.return_value
+        query.filter.return_value.order_by.return_value.all.return_value = stored_rows
+        return db
+
+    def test_unchanged_references_are_not_rewritten(self):
+        db = self._db([("2024-1", 0, False), ("2024-2", 1, True)])
+        replace_sales(db, 7, COMPARABLE, [make_sale(1), make_sale(2)], [False, True])
+        db.query.return_value.filter.return_value.delete.assert_not_called()
+        db.execute.assert_not_called()
+
+    def test_changed_references_are_replaced(self):
+        db = self._db([("2024-1", 0, False)])
+        replace_sales(db, 7, COMPARABLE, [make_sale(1), make_sale(3), make_sale(3)], [False])
+        db.query.return_value.filter.return_value.delete.assert_called_once()
+        rows = db.execute.call_args.args[1]
+        assert [(r["id_mutation"], r["position"], r["is_outlier"]) for r in rows] == [
+            ("2024-1", 0, False),
+            ("2024-3", 1, False),
+        ]
+        assert {r["kind"] for r in rows} == {COMPARABLE}
+
+
+class TestExclusionKeys:
+    def _db(self, rows):
+        db = MagicMock()
+        db.query.return_value.filter.return_value.all.return_value = rows
+        return db
+
+    def test_ids_are_stored_as_mutations_in_order(self):
+        db = self._db([(7, "2024-7"), (3, "2024-3")])
+        assert mutations_for_ids(db, [3, 99, 7]) == ["2024-3", "2024-7"]
+
+    def test_mutations_map_to_the_renumbered_ids(self):
+        # After a re-import the same mutations come back under new ids
+        db = self._db([("2024-7", 1007), ("2024-3", 1003)])
+        assert ids_for_mutations(db, ["2024-3", "2024-gone", "2024-7"]) == [1003, 1007]
+
+    def test_empty_lists_skip_the_query(self):
+        db = MagicMock()
+        assert mutations_for_ids(db, []) == []
+        assert ids_for_mutations(db, []) == []
+        db.query.assert_not_called()
+
+
+class TestStaleness:
+    def _analysis(self, dvf_generation: int) -> Mock:
+        return Mock(updated_at=datetime.utcnow(), dvf_generation=dvf_generation)
+
+    def test_dvf_reimport_makes_analysis_stale(self):
+        property_obj = Mock(updated_at=None)
+        with patch.object(properties, "get_dvf_generation", return_value=3):
+            assert not properties._is_stale(self._analysis(3), property_obj, MagicMock())
+            assert properties._is_stale(self._analysis(2), property_obj, MagicMock())
+
+
+class TestDvfGeneration:
+    def _db(self, generation):
+        db = MagicMock()
+        db.get.return_value = DatasetGeneration(name="dvf", generation=generation)
+        return db
+
+    def test_read_from_the_database_when_not_cached(self):
+        # Redis lost the counter (evicted, flushed or down): the durable value is used
+        db = self._db(5)
+        with (
+            patch.object(dvf_service, "get_generation", return_value=None),
+            patch.object(dvf_service, "set_generation") as set_generation,
+        ):
+            assert dvf_service.get_dvf_generation(db) == 5
+        db.get.assert_called_once_with(DatasetGeneration, "dvf")
+        set_generation.assert_called_once_with("dvf", 5)
+
+    def test_cached_value_skips_the_database(self):
+        db = self._db(5)
+        with patch.object(dvf_service, "get_generation", return_value=5):
+            assert dvf_service.get_dvf_generation(db) == 5
+        db.get.assert_not_called()
+
+    def test_before_the_first_import(self):
+        db = MagicMock()
+        db.get.return_value = None
+        with (
+            patch.object(dvf_service, "get_generation", return_value=None),
+            patch.object(dvf_service, "set_generation"),
+        ):
+            assert dvf_service.get_dvf_generation(db) == 0
+
+
+@pytest.fixture
+def sales_db():
+    """Session mock: property and analysis lookups, then the sales query."""
+    db = MagicMock()
+    pa = Mock(
+        id=7,
+        updated_at=UPDATED_AT,
+        excluded_sale_mutations=["2024-2"],
+        excluded_neighboring_sale_mutations=["2024-1"],
+    )
+    db.query.return_value.filter.return_value.first.side_effect = [MagicMock(id=5), pa]
+    sales = db.query.return_value.join.return_value.filter.return_value
+    sales.count.return_value = 12
+    page = sales.order_by.return_value.offset.return_value.limit.return_value
+    page.all.return_value = [(make_sale(1), False), (make_sale(2), True)]
+    app.dependency_overrides[get_db] = lambda: db
+    app.dependency_overrides[get_current_user] = lambda: "1"
+    yield db
+    app.dependency_overrides.pop(get_db, None)
+    app.dependency_overrides.pop(get_current_user, None)
+
+
+class TestSalesEndpoint:
+    URL = "/api/properties/5/price-analysis/sales"
+
+    def _get(self, params=None, headers=None, generation=3):
+        with patch.object(properties, "get_dvf_generation", return_value=generation):
+            return TestClient(app).get(self.URL, params=params, headers=headers)
+
+    def _sales_query(self, db):
+        return db.query.return_value.join.return_value.filter.return_value
+
+    def test_page_and_sort(self, sales_db):
+        response = self._get({"page": 2, "page_size": 5, "sort": "price_per_sqm", "order": "desc"})
+
+        assert response.status_code == 200
+        body = response.json()
+        assert (body["total"], body["page"], body["page_size"]) == (12, 2, 5)
+        assert [item["id"] for item in body["items"]] == [1, 2]
+
+        sales = self._sales_query(sales_db)
+        order, tiebreak = sales.order_by.call_args.args
+        assert str(order) == "dvf_sales.prix_m2 DESC NULLS LAST"
+        assert tiebreak is PriceAnalysisSale.position
+        sales.order_by.return_value.offset.assert_called_once_with(5)
+        sales.order_by.return_value.offset.return_value.limit.assert_called_once_with(5)
+
+    def test_defaults_to_position_order(self, sales_db):
+        self._get()
+
+        sales = self._sales_query(sales_db)
+        order, _ = sales.order_by.call_args.args
+        assert str(order) == "price_analysis_sales.position ASC NULLS LAST"
+        sales.order_by.return_value.offset.assert_called_once_with(0)
+
+    def test_invalid_sort_is_rejected(self, sales_db):
+        assert self._get({"sort": "id"}).status_code == 422
+        assert self._get({"page_size": 500}).status_code == 422
+
+    def test_sales_are_joined_on_id_mutation(self, sales_db):
+        self._get()
+
+        (clause,) = sales_db.query.return_value.join.call_args.args[1:]
+        assert str(clause) == "price_analysis_sales.id_mutation = dvf_sales.id_mutation"
+
+    def test_excluded_sales_are_flagged_by_mutation(self, sales_db):
+        items = self._get().json()["items"]
+        assert [item["is_excluded"] for item in items] == [False, True]
+        assert [item["is_outlier"] for item in items] == [False, True]
+
+    def test_neighboring_exclusions(self, sales_db):
+        items = self._get({"kind": "neighboring"}).json()["items"]
+        assert [item["is_excluded"] for item in items] == [True, False]
+
+    def test_etag_includes_dvf_generation(self, sales_db):
+        response = self._get()
+        assert response.headers["etag"] == make_etag(
+            "price-analysis-sales", 7, UPDATED_AT, 3, "comparable", 1, 50, "position", "asc"
+        )
+
+    def test_not_modified_until_dvf_reimport(self, sales_db):
+        etag = make_etag(
+            "price-analysis-sales", 7, UPDATED_AT, 3, "comparable", 1, 50, "position", "asc"
+        )
+        lookup = sales_db.query.return_value.filter.return_value.first
+        lookup.side_effect = list(lookup.side_effect) * 2
+
+        response = self._get(headers={"If-None-Match": etag})
+        assert response.status_code == 304
+        self._sales_query(sales_db).count.assert_not_called()
+
+        response = self._get(headers={"If-None-Match": etag}, generation=4)
+        assert response.status_code == 200
+        assert response.headers["etag"] != etag
+
+
+class TestCountSales:
+    def test_counts_join_dvf_sales_on_id_mutation(self):
+        db = MagicMock()
+        grouped = db.query.return_value.join.return_value.filter.return_value.group_by
+        grouped.return_value.all.return_value = [(COMPARABLE, 4)]
+
+        assert count_sales(db, 7) == {COMPARABLE: 4, NEIGHBORING: 0}
+        target, clause = db.query.return_value.join.call_args.args
+        assert target.__tablename__ == "dvf_sales"
+        assert str(clause) == "dvf_sales.id_mutation = price_analysis_sales.id_mutation"
@@ -0,0 +1,153 @@
+"""Tests for the bulk progress events and their SSE stream."""
+
+import json
+from datetime import datetime
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+import redis
+
+from app.core.responses import raw_json
+from app.services.documents import progress
+from app.services.documents.progress import (
+    format_sse,
+    publish_progress,
+    stream_progress,
+)
+
+
+@pytest.fixture(autouse=True)
+def reset_cooldown():
+    progress._retry_at = 0.0
+    yield
+    progress._retry_at = 0.0
+
+
+def message(seq: int, event: str, **data) -> str:
+    return json.dumps({"id": seq, "event": event, "data": data})
+
+
+class FakePubSub:
+    def __init__(self, live):
+        self.live = list(live)
+        self.channels = []
+        self.aclose = AsyncMock()
+
+    async def subscribe(self, channel):
+        self.channels.append(channel)
+
+    async def get_message(self, ignore_subscribe_messages=True, timeout=None):
+        if not self.live:
+            return None
+        return {"type": "message", "data": self.live.pop(0)}
+
+
+def fake_client(log, live):
+    client = MagicMock()
+    client.pubsub.return_value = FakePubSub(live)
+    client.lrange = AsyncMock(return_value=log)
+    client.aclose = AsyncMock()
+    return client
+
+
+async def collect(workflow_id, last_event_id=0, limit=10):
+    events = []
+    async for event in stream_progress(workflow_id, last_event_id, keepalive=0):
+        events.append(event)
+        if len(events) == limit:
+            break
+    return events
+
+
+class TestPublishProgress:
+    def test_event_is_logged_and_published(self):
+        client = MagicMock()
+        client.incr.return_value = 3
+        pipe = client.pipeline.return_value
+        with patch.object(progress, "get_redis", return_value=client):
+            publish_progress("wf", "chunk_done", document_id=1, chunk=2, chunks=4)
+
+        sent = json.loads(pipe.publish.call_args.args[1])
+        assert pipe.publish.call_args.args[0] == "bulk-events:wf"
+        assert sent == {
+            "id": 3,
+            "event": "chunk_done",
+            "data": {"document_id": 1, "chunk": 2, "chunks": 4},
+        }
+        pipe.rpush.assert_called_once_with("bulk-events:wf:log", pipe.publish.call_args.args[1])
+        pipe.execute.assert_called_once()
+
+    def test_redis_down_is_skipped_for_a_while(self):
+        client = MagicMock()
+        client.incr.side_effect = redis.ConnectionError("refused")
+        with patch.object(progress, "get_redis", return_value=client):
+            publish_progress("wf", "classified", document_id=1)
+            publish_progress("wf", "classified", document_id=2)
+
+        assert client.incr.call_count == 1
+
+    def test_event_data_is_encoded_like_responses(self):
+        client = MagicMock()
+        client.incr.return_value = 1
+        pipe = client.pipeline.return_value
+        with patch.object(progress, "get_redis", return_value=client):
+            publish_progress("wf", "document_saved", saved_at=datetime(2026, 3, 14, 9, 26))
+
+        sent = json.loads(pipe.publish.call_args.args[1])
+        assert sent["data"] == {"saved_at": "2026-03-14T09:26:00"}
+
+    def test_unencodable_event_is_dropped(self):
+        client = MagicMock()
+        with patch.object(progress, "get_redis", return_value=client):
+            publish_progress("wf", "chunk_done", result=object())
+            client.incr.assert_not_called()
+
+            # Not a Redis failure: the next event is still published
+            client.incr.return_value = 1
+            publish_progress("wf", "chunk_done", chunk=1)
+        client.pipeline.return_value.execute.assert_called_once()
+
+    def test_unexpected_error_does_not_raise(self):
+        client = MagicMock()
+        client.incr.side_effect = RuntimeError("event loop is closed")
+        with patch.object(progress, "get_redis", return_value=client):
+            publish_progress("wf", "classified", document_id=1)
+
+
+class TestStreamProgress:
+    @pytest.mark.asyncio
+    async def test_replays_log_after_last_event_then_live(self):
+        log = [message(1, "classified", document_id=1), message(2, "document_saved")]
+        live = [message(2, "document_saved"), message(3, "workflow_done", status="completed")]
+        client = fake_client(log, live)
+        with patch.object(progress, "_async_client", return_value=client):
+            events = await collect("wf", last_event_id=1)
+
+        # Event 2 is in both the log and the channel: sent once
+        assert [e["id"] for e in events] == [2, 3]
+        assert client.pubsub.return_value.channels == ["bulk-events:wf"]
+        client.aclose.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_stops_after_workflow_done_in_log(self):
+        log = [message(1, "workflow_done", status="failed"), message(2, "classified")]
+        client = fake_client(log, [])
+        with patch.object(progress, "_async_client", return_value=client):
+            events = await collect("wf")
+
+        assert [e["event"] for e in events] == ["workflow_done"]
+
+    @pytest.mark.asyncio
+    async def test_keepalive_when_idle(self):
+        client = fake_client([], [])
+        with patch.object(progress, "_async_client", return_value=client):
+            events = await collect("wf", limit=2)
+
+        assert events == [None, None]
+
+
+class TestFormatSse:
+    def test_event_with_id_and_embedded_json(self):
+        text = format_sse("snapshot", {"synthesis": raw_json('{"summary":"ok"}')}, event_id=4)
+
+        assert text == 'id: 4\nevent: snapshot\ndata: {"synthesis":{"summary":"ok"}}\n\n'
@@ -0,0 +1,78 @@
+"""Tests for the prompt template registry."""
+
+import pytest
+
+from app.prompts import (
+    PromptError,
+    PromptRegistry,
+    PromptTemplate,
+    get_prompt,
+    get_system_prompt,
+    load_prompts,
+)
+
+
+def write_prompt(directory, name: str, body: str) -> None:
+    path = directory / "v1" / f"{name}.md"
+    path.parent.mkdir(exist_ok=True)
+    path.write_text(f"---\nname: {name}\nversion: v1\n---\n\n{body}", encoding="utf-8")
+
+
+class TestTemplates:
+    def test_every_shipped_prompt_is_valid(self):
+        templates = load_prompts()
+
+        assert "dp_classify_document" in templates
+        assert templates["dp_classify_document"].variables == {"filename"}
+        assert templates["system_document_classifier"].variables == set()
+
+    def test_render_matches_str_format(self):
+        text = 'Analyse {filename} en {output_language}.\n{{"summary": "{{x}}"}}'
+        template = PromptTemplate.parse("t", text, "v1:x")
+
+        assert template.render(filename="pv.pdf", output_language="French", extra=1) == (
+            text.format(filename="pv.pdf", output_language="French")
+        )
+
+    def test_missing_variable_fails(self):
+        with pytest.raises(PromptError, match="output_language"):
+            get_prompt("dp_process_pv_ag", filename="pv.pdf")
+
+    def test_system_prompts_take_variables(self):
+        prompt = get_system_prompt("synthesis", output_language="English")
+        assert "in English" in prompt
+        assert "{output_language}" not in prompt
+
+    @pytest.mark.parametrize("body", ['{"a": 1}', "{name!r}", "{name:>10}", "{a.b}", "{"])
+    def test_malformed_placeholders_fail(self, body):
+        with pytest.raises(PromptError):
+            PromptTemplate.parse("t", body, "v1:x")
+
+
+class TestRegistry:
+    def test_files_read_once_and_versions_follow_content(self, tmp_path):
+        write_prompt(tmp_path, "greet", "Hello {who}")
+        registry = PromptRegistry(tmp_path)
+
+        first = registry.get("greet")
+        write_prompt(tmp_path, "greet", "Bonjour {who}")
+        # Loaded once: the edit is only seen by a new registry
+        assert registry.get("greet") is first
+        edited = PromptRegistry(tmp_path).get("greet")
+
+        assert first.render(who="Ana") == "Hello Ana"
+        assert edited.render(who="Ana") == "Bonjour Ana"
+        assert first.version.startswith("v1:")
+        assert first.version != edited.version
+
+    def test_load_all_fails_fast_on_a_bad_template(self, tmp_path):
+        write_prompt(tmp_path, "good", "Hello {who}")
+        write_prompt(tmp_path, "bad", 'Return {"a": 1}')
+
+        with pytest.raises(PromptError, match="bad"):
+            PromptRegistry(tmp_path).load_all()
+
+    def test_unknown_prompt(self, tmp_path):
+        write_prompt(tmp_path, "greet", "Hello")
+        with pytest.raises(FileNotFoundError):
+            PromptRegistry(tmp_path).get("missing")
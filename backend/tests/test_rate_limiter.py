@@ -0,0 +1,153 @@
+"""Tests for the process-wide LLM rate limiter."""
+
+import asyncio
+import threading
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import redis
+from google.genai import types
+
+from app.services.ai import llm_gateway, rate_limiter
+from app.services.ai.llm_gateway import LLMGateway
+from app.services.ai.rate_limiter import LLMRateLimiter, TokenBucket, estimate_tokens
+
+
+class TestTokenBucket:
+    def test_burst_then_wait(self):
+        bucket = TokenBucket("rpm", per_minute=60)
+        assert [bucket.reserve(1) for _ in range(60)] == [0.0] * 60
+        # Bucket empty: the next token arrives one second later, the one after that two
+        assert abs(bucket.reserve(1) - 1.0) < 0.05
+        assert abs(bucket.reserve(1) - 2.0) < 0.05
+
+    def test_oversized_reservation_is_capped(self):
+        bucket = TokenBucket("tpm", per_minute=1000)
+        assert bucket.reserve(50_000) == 0.0
+        assert abs(bucket.reserve(1000) - 60.0) < 0.1
+
+    def test_refund_shortens_wait(self):
+        bucket = TokenBucket("tpm", per_minute=600)
+        bucket.reserve(600)
+        bucket.adjust(-300)
+        assert bucket.reserve(300) == 0.0
+
+    def test_redis_reservation_is_one_script_call(self):
+        client = MagicMock()
+        client.register_script.return_value.return_value = "1.500000"
+        bucket = TokenBucket("tpm", per_minute=600, use_redis=True)
+        with patch.object(rate_limiter, "get_redis", return_value=client):
+            assert bucket.reserve(10) == 1.5
+
+        client.register_script.return_value.assert_called_once_with(
+            keys=["llm:ratelimit:tpm"], args=[10, 0.1, 60.0, 600]
+        )
+        client.pipeline.assert_not_called()
+
+    def test_redis_reservation_runs_off_the_event_loop(self):
+        bucket = TokenBucket("rpm", per_minute=60, use_redis=True)
+        threads = []
+
+        def reserve(amount):
+            threads.append(threading.current_thread())
+            return 0.0
+
+        async def reserve_from_loop():
+            with patch.object(bucket, "_reserve_redis", side_effect=reserve):
+                await bucket.areserve(1)
+                await bucket.aadjust(-1)
+            return threading.current_thread()
+
+        loop_thread = asyncio.run(reserve_from_loop())
+        assert len(threads) == 2
+        assert loop_thread not in threads
+
+    def test_redis_failure_falls_back_to_local(self):
+        bucket = TokenBucket("rpm", per_minute=1, use_redis=True)
+        with patch.object(rate_limiter, "get_redis", side_effect=redis.ConnectionError("down")):
+            assert bucket.reserve(1) == 0.0
+            assert bucket.reserve(1) > 59
+
+
+class TestEstimateTokens:
+    def test_text_and_pdf(self):
+        contents = [
+            types.Content(
+                role="user",
+                parts=[
+                    types.Part.from_bytes(data=b"x" * 100 * 1024, mime_type="application/pdf"),
+                    types.Part.from_text(text="a" * 400),
+                ],
+            )
+        ]
+        assert estimate_tokens(contents) == 3 * 258 + 100
+
+    def test_image(self):
+        part = types.Part.from_bytes(data=b"png", mime_type="image/png")
+        assert estimate_tokens([types.Content(role="user", parts=[part])]) == 258
+
+
+def make_client(delay: float = 0.0, total_tokens: int = 10):
+    state = {"active": 0, "peak": 0}
+    lock = threading.Lock()
+
+    async def generate_content(**kwargs):
+        with lock:
+            state["active"] += 1
+            state["peak"] = max(state["peak"], state["active"])
+        await asyncio.sleep(delay)
+        with lock:
+            state["active"] -= 1
+        return MagicMock(usage_metadata=MagicMock(total_token_count=total_tokens))
+
+    client = MagicMock()
+    client.aio.models.generate_content = generate_content
+    return client, state
+
+
+class TestGenerateContent:
+    def test_concurrency_is_shared_across_event_loops(self):
+        limiter = LLMRateLimiter(max_concurrency=2)
+        client, state = make_client(delay=0.05)
+
+        async def burst():
+            await asyncio.gather(
+                *(
+                    LLMGateway(client).generate(model="m", contents="hi", retries=0)
+                    for _ in range(4)
+                )
+            )
+
+        with patch.object(llm_gateway, "get_rate_limiter", return_value=limiter):
+            threads = [threading.Thread(target=asyncio.run, args=(burst(),)) for _ in range(2)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join(timeout=10)
+
+        assert state["peak"] == 2
+
+    def test_token_budget_corrected_with_usage(self):
+        limiter = LLMRateLimiter(tpm=1000)
+        client, _ = make_client(total_tokens=1000)
+
+        with patch.object(llm_gateway, "get_rate_limiter", return_value=limiter):
+            asyncio.run(LLMGateway(client).generate(model="m", contents="hi", retries=0))
+
+        # The call used the whole minute's budget although only ~1 token was estimated
+        assert limiter.tokens.reserve(1) > 0
+
+    def test_slot_released_on_error(self):
+        limiter = LLMRateLimiter(max_concurrency=1)
+        client = MagicMock()
+        client.aio.models.generate_content = AsyncMock(side_effect=RuntimeError("503 UNAVAILABLE"))
+
+        async def call_twice():
+            for _ in range(2):
+                try:
+                    await LLMGateway(client).generate(model="m", contents="hi", retries=0)
+                except RuntimeError:
+                    pass
+
+        with patch.object(llm_gateway, "get_rate_limiter", return_value=limiter):
+            asyncio.run(asyncio.wait_for(call_twice(), timeout=5))
+        assert client.aio.models.generate_content.call_count == 2
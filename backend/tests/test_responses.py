@@ -0,0 +1,75 @@
+"""Tests for the fast JSON response helpers."""
+
+import json
+from datetime import datetime
+from decimal import Decimal
+
+import orjson
+import pytest
+
+from app.core.responses import FastJSONResponse, json_dumps, raw_json
+from app.schemas.property import PriceAnalysisFullResponse
+
+FULL = {
+    "estimated_value": 452000.0,
+    "price_deviation_percent": -3.5,
+    "recommendation": "Prix cohérent avec le marché",
+    "confidence_score": 0.82,
+    "comparables_count": 12,
+    "estimated_value_2025": 455000.0,
+    "trend_used": 1.2,
+    "updated_at": datetime(2026, 3, 14, 9, 26, 53, 589793),
+    "is_stale": False,
+    "price_per_sqm": 10500.0,
+    "market_avg_price_per_sqm": 10800.0,
+    "market_median_price_per_sqm": 10750.0,
+    "market_trend_annual": 1.5,
+    "projected_price_per_sqm": 10900.0,
+    "trend_source": "neighboring",
+    "trend_sample_size": 230,
+    "trend_projection": {"trend_used": 1.2, "base_sale_date": "2021-06-01"},
+    "market_trend": {"years": [2023, 2024], "average_prices": [10400.0, 10550.0]},
+    "excluded_sale_ids": [3],
+    "excluded_neighboring_sale_ids": [],
+    "comparable_sales_count": 14,
+    "neighboring_sales_count": 230,
+}
+
+
+class TestJsonDumps:
+    def test_matches_pydantic_output(self):
+        expected = json.loads(PriceAnalysisFullResponse(**FULL).model_dump_json())
+        assert json.loads(json_dumps(FULL)) == expected
+
+    def test_extra_types(self):
+        data = json.loads(json_dumps({"price": Decimal("1.5"), "tags": {"a"}}))
+        assert data == {"price": 1.5, "tags": ["a"]}
+
+    def test_non_ascii_is_utf8(self):
+        assert json_dumps({"city": "Évry"}) == '{"city":"Évry"}'.encode()
+
+
+class TestRawJson:
+    def test_embeds_stored_json(self):
+        stored = json.dumps({"risk_level": "low", "annual_costs": {"charges": 1200}})
+        body = json_dumps({"synthesis_data": raw_json(stored)})
+        assert json.loads(body) == {"synthesis_data": json.loads(stored)}
+
+    def test_stored_text_is_copied_verbatim(self):
+        stored = '{"b": 1,  "a": [1.50]}'
+        assert isinstance(raw_json(stored), orjson.Fragment)
+        assert json_dumps({"x": raw_json(stored)}) == b'{"x":' + stored.encode() + b"}"
+
+    @pytest.mark.parametrize("value", [None, "", "null", b"null"])
+    def test_empty_values(self, value):
+        assert raw_json(value) is None
+
+    def test_decoded_values_pass_through(self):
+        assert raw_json({"a": 1}) == {"a": 1}
+
+
+class TestFastJSONResponse:
+    def test_render(self):
+        response = FastJSONResponse({"updated_at": datetime(2026, 1, 2, 3, 4, 5)})
+        assert response.media_type == "application/json"
+        assert json.loads(response.body) == {"updated_at": "2026-01-02T03:04:05"}
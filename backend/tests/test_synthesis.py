@@ -0,0 +1,207 @@
+"""Tests for the incremental property synthesis."""
+
+import json
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.models.document import Document, DocumentSummary
+from app.models.job import ProcessingJob
+from app.services.documents import synthesis
+from app.services.documents.synthesis import PropertySynthesizer, schedule_synthesis
+
+
+@pytest.fixture
+def tables():
+    return (Document, DocumentSummary, ProcessingJob)
+
+
+@pytest.fixture
+def sessions(session_factory):
+    """The synthesizer's sessions, on the test database."""
+    opened = []
+
+    def open_session():
+        opened.append(session_factory())
+        return opened[-1]
+
+    with patch.object(synthesis, "SessionLocal", side_effect=open_session):
+        yield opened
+
+
+@pytest.fixture
+def ai():
+    ai = MagicMock()
+    ai.synthesize_results = AsyncMock(return_value={"summary": "full", "risk_level": "low"})
+    ai.update_synthesis = AsyncMock(return_value={"summary": "updated", "risk_level": "low"})
+    with patch.object(synthesis, "get_document_processor", return_value=ai):
+        yield ai
+
+
+def add_document(db, filename: str, summary: str, property_id: int = 1) -> Document:
+    doc = Document(
+        user_id=1,
+        property_id=property_id,
+        filename=filename,
+        file_path="",
+        document_category="pv_ag",
+        is_analyzed=True,
+        analysis_summary=summary,
+        extracted_data=json.dumps({"works": [], "budget": 1200, "note": None}),
+    )
+    db.add(doc)
+    db.commit()
+    return doc
+
+
+def overall(db) -> DocumentSummary:
+    return db.query(DocumentSummary).filter(DocumentSummary.category == None).first()
+
+
+@pytest.mark.usefixtures("sessions")
+class TestPropertySynthesizer:
+    @pytest.mark.asyncio
+    async def test_first_synthesis_is_full_and_compact(self, db, ai):
+        add_document(db, "pv_2023.pdf", "AG 2023")
+        add_document(db, "pv_2024.pdf", "AG 2024")
+
+        await PropertySynthesizer().update(1)
+
+        (results,) = ai.synthesize_results.await_args.args
+        assert [r["filename"] for r in results] == ["pv_2023.pdf", "pv_2024.pdf"]
+        # Empty values are dropped from the digest
+        assert results[0]["result"]["extracted_data"] == {"budget": 1200}
+        assert overall(db).overall_summary == "full"
+        assert len(overall(db).synthesis_state["documents"]) == 2
+
+    @pytest.mark.asyncio
+    async def test_only_changes_are_sent(self, db, ai):
+        add_document(db, "pv_2023.pdf", "AG 2023")
+        old = add_document(db, "pv_2022.pdf", "AG 2022")
+        add_document(db, "pv_2024.pdf", "AG 2024")
+        updater = PropertySynthesizer()
+        await updater.update(1)
+
+        # Nothing changed: no LLM call
+        assert await updater.update(1) == {"summary": "full", "risk_level": "low"}
+        ai.update_synthesis.assert_not_awaited()
+
+        add_document(db, "taxe.pdf", "Taxe foncière 2024")
+        db.delete(old)
+        db.commit()
+        await updater.update(1)
+
+        previous, changed, removed, documents = ai.update_synthesis.await_args.args
+        assert previous["summary"] == "full"
+        assert [d["filename"] for d in changed] == ["taxe.pdf"]
+        assert [d["filename"] for d in removed] == ["pv_2022.pdf"]
+        assert len(documents) == 3
+        assert ai.synthesize_results.await_count == 1
+        assert set(overall(db).synthesis_state["documents"]) == {
+            str(d["document_id"]) for d in documents
+        }
+
+    @pytest.mark.asyncio
+    async def test_reanalyzed_document_is_a_change(self, db, ai):
+        docs = [add_document(db, f"pv_{year}.pdf", f"AG {year}") for year in (2022, 2023, 2024)]
+        updater = PropertySynthesizer()
+        await updater.update(1)
+
+        docs[1].analysis_summary = "AG 2023, travaux votés"
+        db.commit()
+        await updater.update(1)
+
+        (changed,) = [d["filename"] for d in ai.update_synthesis.await_args.args[1]]
+        assert changed == "pv_2023.pdf"
+
+    @pytest.mark.asyncio
+    async def test_full_synthesis_when_most_documents_changed(self, db, ai):
+        add_document(db, "pv_2023.pdf", "AG 2023")
+        updater = PropertySynthesizer()
+        await updater.update(1)
+
+        add_document(db, "pv_2024.pdf", "AG 2024")
+        add_document(db, "diag.pdf", "DPE")
+        await updater.update(1)
+
+        ai.update_synthesis.assert_not_awaited()
+        assert ai.synthesize_results.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_language_change_forces_full_synthesis(self, db, ai):
+        add_document(db, "pv_2023.pdf", "AG 2023")
+        updater = PropertySynthesizer()
+        await updater.update(1)
+        await updater.update(1, output_language="English")
+        assert ai.synthesize_results.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_user_overrides_are_kept_out_of_the_prompt(self, db, ai):
+        for year in (2022, 2023, 2024):
+            add_document(db, f"pv_{year}.pdf", f"AG {year}")
+        updater = PropertySynthesizer()
+        await updater.update(1)
+        summary = overall(db)
+        summary.synthesis_data = json.dumps({"summary": "full", "user_overrides": {"x": 1}})
+        db.commit()
+
+        add_document(db, "taxe.pdf", "Taxe foncière")
+        await updater.update(1)
+
+        assert "user_overrides" not in ai.update_synthesis.await_args.args[0]
+        assert json.loads(overall(db).synthesis_data)["user_overrides"] == {"x": 1}
+
+    @pytest.mark.asyncio
+    async def test_no_documents_deletes_synthesis(self, db, ai):
+        doc = add_document(db, "pv_2023.pdf", "AG 2023")
+        updater = PropertySynthesizer()
+        await updater.update(1)
+        db.delete(doc)
+        db.commit()
+
+        assert await updater.update(1) is None
+        assert overall(db) is None
+
+    @pytest.mark.asyncio
+    async def test_no_session_is_open_during_the_llm_call(self, db, ai, sessions):
+        add_document(db, "pv_2023.pdf", "AG 2023")
+
+        async def synthesize(*args, **kwargs):
+            assert sessions and not any(s.in_transaction() for s in sessions)
+            return {"summary": "full"}
+
+        ai.synthesize_results.side_effect = synthesize
+        await PropertySynthesizer().update(1)
+
+        assert len(sessions) == 2
+        assert overall(db).overall_summary == "full"
+
+
+class TestScheduleSynthesis:
+    def test_burst_of_changes_is_one_job(self, db):
+        first = schedule_synthesis(db, 1)
+        db.commit()
+        run_at = db.get(ProcessingJob, first).run_at
+
+        assert schedule_synthesis(db, 1) == first
+        assert schedule_synthesis(db, 2) != first
+        db.commit()
+
+        job = db.get(ProcessingJob, first)
+        assert job.kind == "synthesis"
+        assert job.run_at >= run_at
+        assert db.query(ProcessingJob).count() == 2
+
+    def test_postponed_at_most_max_delay(self, db):
+        job_id = schedule_synthesis(db, 1)
+        job = db.get(ProcessingJob, job_id)
+        job.created_at = datetime.utcnow() - timedelta(hours=1)
+        run_at = job.run_at
+        db.commit()
+
+        schedule_synthesis(db, 1)
+        db.commit()
+
+        # Already past the maximum delay: not pushed back any further
+        assert db.get(ProcessingJob, job_id).run_at == run_at
@@ -245,7 +245,7 @@ function DocumentsPageContent() {
               if (parsed.lastStatus) {
                 setBulkStatus(parsed.lastStatus);
               }
-              pollBulkStatus(parsed.workflow_id);
+              watchBulkStatus(parsed.workflow_id);
               resumed = true;
             } else {
               localStorage.removeItem(uploadStateKey);
@@ -265,7 +265,7 @@ function DocumentsPageContent() {
             if (workflowId) {
               setBulkUploading(true);
               setUploadPhase('processing');
-              pollBulkStatus(workflowId);
+              watchBulkStatus(workflowId);
             }
           }
         }
@@ -466,7 +466,7 @@ function DocumentsPageContent() {
         startTime: Date.now(),
       }));
 
-      pollBulkStatus(workflow_id);
+      watchBulkStatus(workflow_id);
     } catch (err: any) {
       console.error('Bulk upload error:', err);
       setError(err.response?.data?.detail || 'Failed to upload documents');
@@ -476,33 +476,180 @@ function DocumentsPageContent() {
     }
   };
 
+  const persistUploadState = (
+    workflowId: string,
+    phase: string,
+    lastStatus: BulkUploadStatus | null,
+  ) => {
+    try {
+      const stored = localStorage.getItem(uploadStateKey);
+      const existing = stored ? JSON.parse(stored) : {};
+      localStorage.setItem(uploadStateKey, JSON.stringify({
+        ...existing,
+        workflow_id: workflowId,
+        phase,
+        lastStatus,
+      }));
+    } catch { /* ignore storage errors */ }
+  };
+
+  const endBulkUpload = (message?: string) => {
+    setBulkUploading(false);
+    setUploadPhase('idle');
+    localStorage.removeItem(uploadStateKey);
+    if (message) {
+      setError(message);
+    }
+  };
+
+  const completeBulkUpload = async (status: BulkUploadStatus) => {
+    // Load fresh data BEFORE transitioning out of the active UI,
+    // so synthesis and documents are ready when the completion card renders.
+    await loadDocuments();
+
+    // Set synthesis immediately from bulk status data so it shows
+    // without waiting for a separate API call.
+    if (status.synthesis) {
+      const bs = status.synthesis;
+      setSynthesis({
+        id: 0,
+        property_id: Number(propertyId),
+        overall_summary: bs.summary || '',
+        risk_level: bs.risk_level || 'unknown',
+        total_annual_cost: bs.total_annual_cost || 0,
+        total_one_time_cost: bs.total_one_time_cost || 0,
+        key_findings: bs.key_findings || [],
+        recommendations: bs.recommendations || [],
+        last_updated: new Date().toISOString(),
+        synthesis_data: bs.synthesis_data,
+      });
+    }
+
+    // Also load from the main endpoint in background (has user_overrides)
+    loadSynthesis(2);
+
+    endBulkUpload();
+  };
+
+  // Apply a document event of the progress stream to the last bulk status
+  const applyDocumentEvent = (
+    status: BulkUploadStatus,
+    data: { document_id: number } & Partial<BulkUploadStatus['documents'][number]>,
+  ): BulkUploadStatus => {
+    const { document_id, ...changes } = data;
+    const documents = status.documents.map((doc) =>
+      doc.id === document_id ? { ...doc, ...changes } : doc
+    );
+    const total = documents.length;
+    const completed = documents.filter((d) => d.processing_status === 'completed').length;
+    const failed = documents.filter((d) => d.processing_status === 'failed').length;
+    const processing = documents.filter((d) => d.processing_status === 'processing').length;
+    return {
+      ...status,
+      documents,
+      progress: {
+        total,
+        completed,
+        failed,
+        processing,
+        percentage: total > 0 ? Math.floor((completed / total) * 100) : 0,
+      },
+    };
+  };
+
+  // Follow a bulk upload through its server-sent progress events, falling
+  // back to polling when the stream is unavailable.
+  const watchBulkStatus = (workflowId: string) => {
+    if (typeof EventSource === 'undefined') {
+      pollBulkStatus(workflowId);
+      return;
+    }
+
+    const source = new EventSource(
+      `${api.defaults.baseURL}/api/documents/bulk-status/${workflowId}/events`,
+      { withCredentials: true },
+    );
+    let current: BulkUploadStatus | null = null;
+    let closed = false;
+
+    const close = () => {
+      closed = true;
+      source.close();
+    };
+
+    const update = (status: BulkUploadStatus) => {
+      current = status;
+      setBulkStatus(status);
+      const done = status.progress.completed + status.progress.failed === status.progress.total;
+      if (done && status.progress.completed > 0) {
+        setUploadPhase('synthesizing');
+        persistUploadState(workflowId, 'synthesizing', status);
+      } else {
+        persistUploadState(workflowId, 'processing', status);
+      }
+    };
+
+    source.addEventListener('snapshot', (e) => {
+      update(JSON.parse((e as MessageEvent).data));
+    });
+
+    const onDocumentEvent = (e: Event) => {
+      if (current) {
+        update(applyDocumentEvent(current, JSON.parse((e as MessageEvent).data)));
+      }
+    };
+    ['classified', 'document_saved', 'document_failed'].forEach((name) =>
+      source.addEventListener(name, onDocumentEvent)
+    );
+
+    source.addEventListener('synthesis_done', (e) => {
+      if (current) {
+        update({ ...current, synthesis: JSON.parse((e as MessageEvent).data).synthesis });
+      }
+    });
+
+    source.addEventListener('workflow_done', (e) => {
+      close();
+      const { status } = JSON.parse((e as MessageEvent).data);
+      if (status === 'failed' || !current) {
+        endBulkUpload(t('bulkFailed'));
+      } else if (current.synthesis) {
+        completeBulkUpload(current);
+      } else {
+        // Saved without a synthesis event (e.g. reconnected past it)
+        pollBulkStatus(workflowId);
+      }
+    });
+
+    source.addEventListener('fallback', () => {
+      close();
+      pollBulkStatus(workflowId);
+    });
+
+    source.onerror = () => {
+      // EventSource reconnects by itself (with Last-Event-ID) while the
+      // connection is only interrupted; poll once it gives up.
+      if (!closed && source.readyState === EventSource.CLOSED) {
+        close();
+        pollBulkStatus(workflowId);
+      }
+    };
+  };
+
   const pollBulkStatus = async (workflowId: string) => {
     const maxPolls = 300;
     let pollCount = 0;
 
-    const persistUploadState = (phase: string, lastStatus: BulkUploadStatus | null) => {
-      try {
-        const stored = localStorage.getItem(uploadStateKey);
-        const existing = stored ? JSON.parse(stored) : {};
-        localStorage.setItem(uploadStateKey, JSON.stringify({
-          ...existing,
-          workflow_id: workflowId,
-          phase,
-          lastStatus,
-        }));
-      } catch { /* ignore storage errors */ }
-    };
-
     const poll = async () => {
       try {
         const response = await api.get(`/api/documents/bulk-status/${workflowId}`);
         const status: BulkUploadStatus = response.data;
         setBulkStatus(status);
-        persistUploadState('processing', status);
+        persistUploadState(workflowId, 'processing', status);
 
         if (status.status === 'completed' || status.progress.percentage === 100) {
           setUploadPhase('synthesizing');
-          persistUploadState('synthesizing', status);
+          persistUploadState(workflowId, 'synthesizing', status);
           let currentStatus = status;
           let synthesisAttempts = 0;
           const maxSynthesisAttempts = 20;
@@ -513,7 +660,7 @@ function DocumentsPageContent() {
               const synthResponse = await api.get(`/api/documents/bulk-status/${workflowId}`);
               currentStatus = synthResponse.data;
               setBulkStatus(currentStatus);
-              persistUploadState('synthesizing', currentStatus);
+              persistUploadState(workflowId, 'synthesizing', currentStatus);
               if (currentStatus.synthesis) break;
               synthesisAttempts++;
             } catch (err) {
@@ -522,42 +669,12 @@ function DocumentsPageContent() {
             }
           }
 
-          // Load fresh data BEFORE transitioning out of the active UI,
-          // so synthesis and documents are ready when the completion card renders.
-          await loadDocuments();
-
-          // Set synthesis immediately from bulk status data so it shows
-          // without waiting for a separate API call.
-          if (currentStatus.synthesis) {
-            const bs = currentStatus.synthesis;
-            setSynthesis({
-              id: 0,
-              property_id: Number(propertyId),
-              overall_summary: bs.summary || '',
-              risk_level: bs.risk_level || 'unknown',
-              total_annual_cost: bs.total_annual_cost || 0,
-              total_one_time_cost: bs.total_one_time_cost || 0,
-              key_findings: bs.key_findings || [],
-              recommendations: bs.recommendations || [],
-              last_updated: new Date().toISOString(),
-              synthesis_data: bs.synthesis_data,
-            });
-          }
-
-          // Also load from the main endpoint in background (has user_overrides)
-          loadSynthesis(2);
-
-          setBulkUploading(false);
-          setUploadPhase('idle');
-          localStorage.removeItem(uploadStateKey);
+          await completeBulkUpload(currentStatus);
           return;
         }
 
         if (status.status === 'failed') {
-          setBulkUploading(false);
-          setUploadPhase('idle');
-          localStorage.removeItem(uploadStateKey);
-          setError(t('bulkFailed'));
+          endBulkUpload(t('bulkFailed'));
           return;
         }
 
@@ -565,10 +682,7 @@ function DocumentsPageContent() {
         if (pollCount < maxPolls && (status.status === 'running' || status.status === 'processing')) {
           setTimeout(poll, 2000);
         } else if (pollCount >= maxPolls) {
-          setBulkUploading(false);
-          setUploadPhase('idle');
-          localStorage.removeItem(uploadStateKey);
-          setError(t('processingTimeout'));
+          endBulkUpload(t('processingTimeout'));
         }
       } catch (err: any) {
         console.error('Status poll error:', err);
@@ -576,10 +690,7 @@ function DocumentsPageContent() {
         if (pollCount < maxPolls) {
           setTimeout(poll, 2000);
         } else {
-          setBulkUploading(false);
-          setUploadPhase('idle');
-          localStorage.removeItem(uploadStateKey);
-          setError('Failed to check processing status');
+          endBulkUpload('Failed to check processing status');
         }
       }
     };
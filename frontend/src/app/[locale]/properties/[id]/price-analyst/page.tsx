@@ -158,9 +158,11 @@ function PriceAnalystContent() {
               />
 
               {/* Comparable Sales */}
-              {analysis.comparable_sales && analysis.comparable_sales.length > 0 && (
+              {(analysis.comparable_sales_count ?? 0) > 0 && (
                 <ComparableSalesTable
-                  sales={analysis.comparable_sales}
+                  propertyId={propertyId}
+                  totalCount={analysis.comparable_sales_count ?? 0}
+                  version={analysis.updated_at}
                   excludedIds={excludedSaleIds}
                   onToggle={toggleSaleExclusion}
                   marketAvgPricePerSqm={analysis.market_avg_price_per_sqm}
@@ -173,7 +175,10 @@ function PriceAnalystContent() {
               {/* Trend Projection */}
               {analysis.trend_projection && (
                 <TrendProjectionCard
+                  propertyId={propertyId}
                   trendProjection={analysis.trend_projection}
+                  neighboringCount={analysis.neighboring_sales_count ?? 0}
+                  version={analysis.updated_at}
                   excludedNeighboringIds={excludedNeighboringIds}
                   onToggle={toggleNeighboringExclusion}
                   postalCode={property?.postal_code}
@@ -3,10 +3,13 @@
 import { useState } from 'react';
 import { useTranslations } from 'next-intl';
 import { Building2, ChevronDown, ChevronUp } from 'lucide-react';
-import type { DVFRecord } from '@/types';
+import { SalesPagination, SortableHeader } from '@/components/SalesTableControls';
+import { usePriceAnalysisSales } from '@/lib/usePriceAnalysisSales';
 
 interface ComparableSalesTableProps {
-  sales: DVFRecord[];
+  propertyId: string;
+  totalCount: number;
+  version?: string;
   excludedIds: Set<number>;
   onToggle: (saleId: number) => void;
   marketAvgPricePerSqm?: number;
@@ -16,7 +19,9 @@ interface ComparableSalesTableProps {
 }
 
 export default function ComparableSalesTable({
-  sales,
+  propertyId,
+  totalCount,
+  version,
   excludedIds,
   onToggle,
   marketAvgPricePerSqm,
@@ -26,6 +31,11 @@ export default function ComparableSalesTable({
 }: ComparableSalesTableProps) {
   const t = useTranslations('property');
   const [expandedSales, setExpandedSales] = useState<Set<number>>(new Set());
+  const { sales, page, pageCount, setPage, sort, order, toggleSort } = usePriceAnalysisSales(
+    propertyId,
+    'comparable',
+    version,
+  );
 
   const formatCurrency = (value: number) =>
     new Intl.NumberFormat('fr-FR', {
@@ -41,12 +51,12 @@ export default function ComparableSalesTable({
     setExpandedSales(next);
   };
 
-  if (!sales.length) return null;
+  if (!totalCount) return null;
 
   return (
     <div className="bg-white shadow rounded-lg p-6">
       <h2 className="text-lg font-medium text-gray-900 mb-4">
-        {t('comparables.title', { total: sales.length, included: comparablesCount ?? sales.length })}
+        {t('comparables.title', { total: totalCount, included: comparablesCount ?? totalCount })}
       </h2>
 
       <div className="overflow-x-auto">
@@ -54,11 +64,11 @@ export default function ComparableSalesTable({
           <thead className="bg-gray-50">
             <tr>
               <th className="px-3 py-3 text-left text-xs font-medium text-gray-500 uppercase tracking-wider">{t('comparables.include')}</th>
-              <th className="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase tracking-wider">{t('comparables.saleDate')}</th>
+              <SortableHeader label={t('comparables.saleDate')} sortKey="sale_date" sort={sort} order={order} onSort={toggleSort} className="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase tracking-wider" />
               <th className="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase tracking-wider">{t('comparables.address')}</th>
-              <th className="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase tracking-wider">{t('comparables.surface')}</th>
-              <th className="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase tracking-wider">{t('comparables.salePrice')}</th>
-              <th className="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase tracking-wider">{t('comparables.pricePerSqm')}</th>
+              <SortableHeader label={t('comparables.surface')} sortKey="surface_area" sort={sort} order={order} onSort={toggleSort} className="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase tracking-wider" />
+              <SortableHeader label={t('comparables.salePrice')} sortKey="sale_price" sort={sort} order={order} onSort={toggleSort} className="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase tracking-wider" />
+              <SortableHeader label={t('comparables.pricePerSqm')} sortKey="price_per_sqm" sort={sort} order={order} onSort={toggleSort} className="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase tracking-wider" />
             </tr>
           </thead>
           <tbody className="bg-white divide-y divide-gray-200">
@@ -174,6 +184,8 @@ export default function ComparableSalesTable({
         </table>
       </div>
 
+      <SalesPagination page={page} pageCount={pageCount} onPageChange={setPage} />
+
       {marketAvgPricePerSqm && (
         <div className="mt-6 pt-6 border-t border-gray-200">
           <div className="grid grid-cols-1 gap-4 sm:grid-cols-3">
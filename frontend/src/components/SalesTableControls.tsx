@@ -0,0 +1,66 @@
+"use client";
+
+import { useTranslations } from 'next-intl';
+import { ArrowDown, ArrowUp, ChevronLeft, ChevronRight } from 'lucide-react';
+import type { PriceAnalysisSaleSort } from '@/types';
+
+interface SortableHeaderProps {
+  label: string;
+  sortKey: PriceAnalysisSaleSort;
+  sort: PriceAnalysisSaleSort;
+  order: 'asc' | 'desc';
+  onSort: (key: PriceAnalysisSaleSort) => void;
+  className?: string;
+}
+
+export function SortableHeader({ label, sortKey, sort, order, onSort, className }: SortableHeaderProps) {
+  const active = sort === sortKey;
+  return (
+    <th className={className}>
+      <button
+        type="button"
+        onClick={() => onSort(sortKey)}
+        className={`inline-flex items-center gap-1 uppercase ${active ? 'text-gray-900' : 'hover:text-gray-700'}`}
+      >
+        {label}
+        {active && (order === 'asc' ? <ArrowUp className="h-3 w-3" /> : <ArrowDown className="h-3 w-3" />)}
+      </button>
+    </th>
+  );
+}
+
+interface SalesPaginationProps {
+  page: number;
+  pageCount: number;
+  onPageChange: (page: number) => void;
+}
+
+export function SalesPagination({ page, pageCount, onPageChange }: SalesPaginationProps) {
+  const t = useTranslations('property');
+
+  if (pageCount <= 1) return null;
+
+  return (
+    <div className="flex items-center justify-end gap-3 mt-3 text-sm text-gray-600">
+      <button
+        type="button"
+        onClick={() => onPageChange(page - 1)}
+        disabled={page <= 1}
+        className="inline-flex items-center px-2 py-1 rounded border border-gray-300 disabled:opacity-40 hover:bg-gray-50"
+        aria-label={t('comparables.previousPage')}
+      >
+        <ChevronLeft className="h-4 w-4" />
+      </button>
+      <span>{t('comparables.pagination', { page, pages: pageCount })}</span>
+      <button
+        type="button"
+        onClick={() => onPageChange(page + 1)}
+        disabled={page >= pageCount}
+        className="inline-flex items-center px-2 py-1 rounded border border-gray-300 disabled:opacity-40 hover:bg-gray-50"
+        aria-label={t('comparables.nextPage')}
+      >
+        <ChevronRight className="h-4 w-4" />
+      </button>
+    </div>
+  );
+}
@@ -3,16 +3,8 @@
 import { useState } from 'react';
 import { useTranslations } from 'next-intl';
 import { ChevronDown, ChevronUp, Info } from 'lucide-react';
-
-interface NeighboringSale {
-  id: number;
-  address: string;
-  sale_date: string;
-  sale_price: number;
-  surface_area?: number;
-  price_per_sqm?: number;
-  is_outlier?: boolean;
-}
+import { SalesPagination, SortableHeader } from '@/components/SalesTableControls';
+import { usePriceAnalysisSales } from '@/lib/usePriceAnalysisSales';
 
 interface TrendProjection {
   estimated_value_2025?: number;
@@ -22,25 +14,37 @@ interface TrendProjection {
   trend_sample_size?: number;
   base_sale_date?: string;
   base_price_per_sqm?: number;
-  neighboring_sales?: NeighboringSale[];
   confidence_level?: 'high' | 'moderate' | 'low';
 }
 
 interface TrendProjectionCardProps {
+  propertyId: string;
   trendProjection: TrendProjection;
+  neighboringCount: number;
+  version?: string;
   excludedNeighboringIds: Set<number>;
   onToggle: (saleId: number) => void;
   postalCode?: string;
 }
 
 export default function TrendProjectionCard({
+  propertyId,
   trendProjection,
+  neighboringCount,
+  version,
   excludedNeighboringIds,
   onToggle,
   postalCode,
 }: TrendProjectionCardProps) {
   const t = useTranslations('property');
   const [showNeighboringSales, setShowNeighboringSales] = useState(false);
+  // Neighboring sales are only fetched once the table is expanded
+  const { sales, page, pageCount, setPage, sort, order, toggleSort } = usePriceAnalysisSales(
+    propertyId,
+    'neighboring',
+    version,
+    showNeighboringSales,
+  );
 
   const formatCurrency = (value: number) =>
     new Intl.NumberFormat('fr-FR', {
@@ -111,25 +115,25 @@ export default function TrendProjectionCard({
         </div>
       </div>
 
-      {showNeighboringSales && trendProjection.neighboring_sales && (
+      {showNeighboringSales && neighboringCount > 0 && (
         <div className="bg-white p-4 rounded mb-4">
           <h3 className="text-sm font-medium text-gray-700 mb-3">
-            {t('trend.neighboringSalesTitle', { count: trendProjection.neighboring_sales.length })}
+            {t('trend.neighboringSalesTitle', { count: neighboringCount })}
           </h3>
           <div className="overflow-x-auto">
             <table className="min-w-full divide-y divide-gray-200 text-sm">
               <thead className="bg-gray-50">
                 <tr>
                   <th className="px-2 py-2 text-left text-xs font-medium text-gray-500 uppercase">{t('comparables.include')}</th>
-                  <th className="px-3 py-2 text-left text-xs font-medium text-gray-500 uppercase">{t('comparables.saleDate')}</th>
+                  <SortableHeader label={t('comparables.saleDate')} sortKey="sale_date" sort={sort} order={order} onSort={toggleSort} className="px-3 py-2 text-left text-xs font-medium text-gray-500 uppercase" />
                   <th className="px-3 py-2 text-left text-xs font-medium text-gray-500 uppercase">{t('comparables.address')}</th>
-                  <th className="px-3 py-2 text-left text-xs font-medium text-gray-500 uppercase">{t('comparables.surface')}</th>
-                  <th className="px-3 py-2 text-left text-xs font-medium text-gray-500 uppercase">{t('comparables.salePrice')}</th>
-                  <th className="px-3 py-2 text-left text-xs font-medium text-gray-500 uppercase">{t('comparables.pricePerSqm')}</th>
+                  <SortableHeader label={t('comparables.surface')} sortKey="surface_area" sort={sort} order={order} onSort={toggleSort} className="px-3 py-2 text-left text-xs font-medium text-gray-500 uppercase" />
+                  <SortableHeader label={t('comparables.salePrice')} sortKey="sale_price" sort={sort} order={order} onSort={toggleSort} className="px-3 py-2 text-left text-xs font-medium text-gray-500 uppercase" />
+                  <SortableHeader label={t('comparables.pricePerSqm')} sortKey="price_per_sqm" sort={sort} order={order} onSort={toggleSort} className="px-3 py-2 text-left text-xs font-medium text-gray-500 uppercase" />
                 </tr>
               </thead>
               <tbody className="bg-white divide-y divide-gray-200">
-                {trendProjection.neighboring_sales.map((sale) => (
+                {sales.map((sale) => (
                   <tr
                     key={sale.id}
                     className={`hover:bg-gray-50 ${sale.is_outlier ? 'bg-warning-50' : ''} ${excludedNeighboringIds.has(sale.id) ? 'opacity-50' : ''}`}
@@ -162,6 +166,7 @@ export default function TrendProjectionCard({
               </tbody>
             </table>
           </div>
+          <SalesPagination page={page} pageCount={pageCount} onPageChange={setPage} />
         </div>
       )}
 
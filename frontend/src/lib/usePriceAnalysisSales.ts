@@ -0,0 +1,69 @@
+import { useCallback, useEffect, useState } from 'react'
+import { api } from '@/lib/api'
+import type { PriceAnalysisSaleKind, PriceAnalysisSaleSort, PriceAnalysisSalesPage } from '@/types'
+
+const PAGE_SIZE = 25
+
+/**
+ * Loads one page of comparable or neighboring sales of a price analysis.
+ * `version` (e.g. the analysis updated_at) triggers a reload after a re-run.
+ */
+export function usePriceAnalysisSales(
+  propertyId: string | number,
+  kind: PriceAnalysisSaleKind,
+  version?: string,
+  enabled: boolean = true,
+) {
+  const [page, setPage] = useState(1)
+  const [sort, setSort] = useState<PriceAnalysisSaleSort>('position')
+  const [order, setOrder] = useState<'asc' | 'desc'>('asc')
+  const [data, setData] = useState<PriceAnalysisSalesPage | null>(null)
+  const [loading, setLoading] = useState(false)
+
+  useEffect(() => {
+    if (!enabled) return
+    let cancelled = false
+    setLoading(true)
+    api
+      .get(`/api/properties/${propertyId}/price-analysis/sales`, {
+        params: { kind, page, page_size: PAGE_SIZE, sort, order },
+      })
+      .then((response) => {
+        if (!cancelled) setData(response.data)
+      })
+      .catch((error) => console.error(`Failed to load ${kind} sales:`, error))
+      .finally(() => {
+        if (!cancelled) setLoading(false)
+      })
+    return () => {
+      cancelled = true
+    }
+  }, [propertyId, kind, page, sort, order, version, enabled])
+
+  const toggleSort = useCallback(
+    (key: PriceAnalysisSaleSort) => {
+      if (key === sort) {
+        setOrder(order === 'asc' ? 'desc' : 'asc')
+      } else {
+        setSort(key)
+        setOrder('desc')
+      }
+      setPage(1)
+    },
+    [sort, order],
+  )
+
+  const pageCount = data ? Math.max(1, Math.ceil(data.total / data.page_size)) : 1
+
+  return {
+    sales: data?.items ?? [],
+    total: data?.total ?? 0,
+    page,
+    pageCount,
+    setPage,
+    sort,
+    order,
+    toggleSort,
+    loading,
+  }
+}
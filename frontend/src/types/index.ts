@@ -105,7 +105,8 @@ export interface PriceAnalysisFull extends PriceAnalysisSummary {
   projected_price_per_sqm?: number
   trend_source?: string
   trend_sample_size?: number
-  comparable_sales?: DVFRecord[]
+  comparable_sales_count?: number
+  neighboring_sales_count?: number
   trend_projection?: {
     estimated_value_2025?: number
     projected_price_per_sqm?: number
@@ -114,7 +115,6 @@ export interface PriceAnalysisFull extends PriceAnalysisSummary {
     trend_sample_size?: number
     base_sale_date?: string
     base_price_per_sqm?: number
-    neighboring_sales?: Array<DVFRecord & { is_outlier?: boolean }>
     confidence_level?: 'high' | 'moderate' | 'low'
   }
   market_trend?: {
@@ -130,6 +130,18 @@ export interface PriceAnalysisFull extends PriceAnalysisSummary {
   excluded_neighboring_sale_ids: number[]
 }
 
+export type PriceAnalysisSaleKind = 'comparable' | 'neighboring'
+
+export type PriceAnalysisSaleSort = 'position' | 'sale_date' | 'sale_price' | 'price_per_sqm' | 'surface_area'
+
+export interface PriceAnalysisSalesPage {
+  kind: PriceAnalysisSaleKind
+  items: Array<DVFRecord & { is_excluded?: boolean }>
+  total: number
+  page: number
+  page_size: number
+}
+
 export interface Analysis {
   analysis_id: number
   property_id: number